@@ -30,6 +30,31 @@ DATASET_URLS = {
     'piura': 'https://www.datosabiertos.gob.pe/dataset/casos-de-dengue-en-la-región-piura-gobierno-regional-piura'
 }
 
+# Lista de adyacencia entre regiones (para features espaciales)
+ADYACENCIA_REGIONES_PATH = EXTERNAL_DATA_DIR / 'adyacencia_regiones.csv'
+CENTROIDES_REGIONES_PATH = EXTERNAL_DATA_DIR / 'centroides_regiones.csv'
+
+# Ingeniería de características
+FEATURES_CONFIG = {
+    # Estadísticas por región. False: casos_media_region, casos_zscore, etc., sobre todo el histórico
+    # (columnas originales). True: casos_media_exp, casos_zscore_exp, casos_zscore_ewm, etc., con solo
+    # las semanas anteriores (sin fuga de información futura); cambia las columnas de dengue_features.csv,
+    # así que hay que reentrenar los modelos de anomalías (05) al activarlo
+    'estadisticas_expanding': False,
+    'alpha_ewm': 0.1,                # Suavizado de las medias exponenciales
+    'incremental': True,             # Con expanding: continuar desde el estado guardado (solo semanas nuevas)
+    'resoluciones': ['4semanas', 'mensual', 'temporada']  # Agregados multi-resolución (features, alertas y XGBoost)
+}
+ESTADISTICAS_ESTADO_PATH = PROCESSED_DATA_DIR / 'estado_estadisticas.joblib'
+
+# Covariables externas (clima, precipitación) en data/external
+COVARIABLES_CONFIG = {
+    'patron_archivos': 'clima_*.csv',  # CSV con fecha, departamento (opcional) y variables
+    'agregacion': 'mean',              # Agregación semanal de datos diarios
+    'lags': [0, 1, 2, 4, 8],           # Lags en semanas
+    'rellenar': True                   # Completar semanas sin dato (si no, 05 descarta esas filas)
+}
+
 # Parámetros de análisis
 PERIODO_ANALISIS = {
     'año_inicio': 2000,
@@ -40,6 +65,65 @@ PERIODO_ANALISIS = {
 RANDOM_STATE = 42
 TEST_SIZE = 0.2
 
+# Configuración de los modelos de detección de anomalías
+ANOMALY_CONFIG = {
+    'contamination': 0.05,        # 5% de anomalías esperadas
+    'modo': 'por_region',         # 'por_region' o 'global' (un modelo para todas las series)
+    'global_ocsvm': False,        # Modo global: entrenar también un OCSVM aproximado
+    'n_workers': 1,               # Procesos para entrenar la grilla región × algoritmo
+    'formato_modelos': 'store',   # 'store' (bundle por región) o 'pickle'
+    'ocsvm_backend': 'exacto',    # 'exacto', 'nystroem' o 'rff' (lineal en muestras)
+    'ocsvm_componentes': 100,     # Dimensión de la aproximación del kernel
+    'lof_indice': None,           # 'kd_tree'/'ball_tree' persistido para LOF (requiere 'reduccion')
+    'memoria_max_mb': 512,        # Límite de bundles cargados a la vez
+    'reduccion': None,            # 'pca', 'correlacion' o None
+    'barrido_contaminacion': [0.01, 0.02, 0.05, 0.10, 0.15],  # Umbrales evaluados sin reentrenar
+    'contaminacion_umbral': 0.05, # Proporción de las banderas (cuantil de los scores, sin reentrenar)
+    'contaminacion_por_region': {},  # Proporción propia de algunas regiones {región: contaminación}
+    'reduccion_params': {
+        'varianza_explicada': 0.95,
+        'umbral_correlacion': 0.95
+    }
+}
+
+# Refresco incremental de los Isolation Forest (warm start) y deriva
+IF_REFRESCO_CONFIG = {
+    'ventana_semanas': 52,         # Ventana reciente para los árboles nuevos
+    'arboles_nuevos': 20,          # Árboles añadidos (y retirados) por refresco
+    'refrescar_cada_semanas': 4,   # Calendario de refrescos
+    'reentrenar_cada_semanas': 52, # Reentrenamiento completo aunque no haya deriva
+    'psi_max': 0.25,               # PSI de los scores a partir del cual se reentrena
+    'ks_pvalor_min': 0.001         # p-valor KS por debajo del cual se reentrena
+}
+
+# Detectores epidemiológicos clásicos (EARS, CUSUM, Farrington)
+DETECTORES_EPI_CONFIG = {
+    'activar': False,             # Añade nivel_epidemiologico (no modifica nivel_riesgo)
+    'ventana_ears': 7,            # Semanas de línea base de EARS
+    'umbral_c1': 3.0,
+    'umbral_c2': 3.0,
+    'umbral_c3': 2.0,
+    'ventana_cusum': 52,          # Línea base para estandarizar el CUSUM
+    'k_cusum': 0.5,
+    'h_cusum': 4.0,
+    'anios_farrington': 5,        # Años previos de referencia
+    'semanas_farrington': 3,      # Semanas a cada lado en años previos
+    'alpha_farrington': 0.05,
+    'min_votos': 2                # Familias (EARS, CUSUM, Farrington) que deben coincidir
+}
+
+# Barrido espacio-temporal de clusters (permutación de Kulldorff)
+SCAN_CONFIG = {
+    'semanas_estudio': 52,        # Período de estudio hasta la última semana
+    'max_semanas': 4,             # Duración máxima del cluster
+    'max_vecinos': 10,            # Regiones máximas por zona
+    'max_fraccion_casos': 0.5,    # Fracción máxima de casos dentro de la zona
+    'replicas': 999,              # Réplicas Monte Carlo
+    'n_workers': 1,               # Procesos para las réplicas
+    'alpha': 0.05,
+    'max_clusters': 10
+}
+
 # Umbrales de alerta
 UMBRALES_ALERTA = {
     'bajo': 1.5,      # 1.5 desviaciones estándar
@@ -48,6 +132,50 @@ UMBRALES_ALERTA = {
     'critico': 3.0    # 3.0 desviaciones estándar
 }
 
+# Generación incremental de alertas (solo semanas nuevas o revisadas)
+ALERTAS_INCREMENTALES_CONFIG = {
+    'activar': True,
+    'ventana_historica': 52,      # Semanas de la media/desviación histórica
+    'semanas_revision': 8         # Semanas hacia atrás que se pueden corregir sin recálculo completo
+}
+ESTADO_ALERTAS_PATH = PROCESSED_DATA_DIR / 'estado_alertas.joblib'
+
+# Episodios de alerta (rachas de semanas consecutivas en alerta por región)
+EPISODIOS_CONFIG = {
+    'nivel_minimo': 'bajo'        # Nivel a partir del cual una semana abre o prolonga un episodio
+}
+EPISODIOS_ALERTA_PATH = PROCESSED_DATA_DIR / 'episodios_alerta.csv'
+
+# Almacén de alertas embebido (SQLite, un único archivo sin servidor)
+ALMACEN_ALERTAS_CONFIG = {
+    'activar': True,
+    'exportar_csv': True          # Seguir escribiendo los CSV de alertas y reportes para otros consumidores
+}
+ALMACEN_ALERTAS_PATH = PROCESSED_DATA_DIR / 'alertas.sqlite'
+
+# Despacho de alertas nuevas o escaladas (webhook, SMTP, carpeta local)
+DESPACHO_ALERTAS_CONFIG = {
+    'activar': False,
+    'nivel_minimo': 'alto',                       # Alertas semanales a notificar
+    'nivel_minimo_predictivo': 'alerta_temprana', # Alertas predictivas a notificar
+    'ultimas_semanas': 4,         # No notificar semanas antiguas en un recálculo completo
+    'tamano_lote': 50,            # Alertas por lote y destinatario
+    'reintentos': 3,
+    'espera_base': 2.0,           # Segundos antes del primer reintento (se duplica en cada uno)
+    'timeout': 10.0,
+    'retencion_dias': 365,        # Días que se recuerda una alerta ya notificada
+    'destinos': [
+        {'tipo': 'archivo', 'nombre': 'buzon_local', 'directorio': str(PROCESSED_DATA_DIR / 'despachos'),
+         'destinatarios': [{'id': 'vigilancia'}]},
+        # {'tipo': 'webhook', 'nombre': 'sala_situacional', 'url': 'https://...', 'envios_por_minuto': 30,
+        #  'destinatarios': [{'id': 'nacional'}, {'id': 'lima', 'regiones': ['LIMA'], 'nivel_minimo': 'medio'}]},
+        # {'tipo': 'smtp', 'nombre': 'correo', 'host': 'smtp.example.org', 'puerto': 587, 'starttls': True,
+        #  'usuario': 'sidet', 'clave_env': 'SIDET_SMTP_CLAVE', 'remitente': 'sidet@example.org',
+        #  'envios_por_minuto': 20, 'destinatarios': [{'id': 'epidemiologia', 'email': 'epi@example.org'}]},
+    ],
+}
+DESPACHO_REGISTRO_PATH = PROCESSED_DATA_DIR / 'despachos_registro.json'
+
 # Configuración de visualización
 PLOT_CONFIG = {
     'figsize': (14, 8),
@@ -88,6 +216,16 @@ ENSEMBLE_WEIGHTS = {
 # Rutas de modelos de forecasting
 FORECASTING_MODELS_DIR = BASE_DIR / 'models' / 'saved' / 'forecasting'
 PREDICTIONS_DIR = PROCESSED_DATA_DIR / 'predictions'
+PRONOSTICOS_ARCHIVO_PATH = PREDICTIONS_DIR / 'pronosticos_archivo.csv'
+
+# Vigilancia por residuos de pronóstico (usa el archivo de pronósticos guardados)
+RESIDUOS_PRONOSTICO_CONFIG = {
+    'umbral_z': 3.0,              # Residuo estandarizado para marcar la semana
+    'nivel_intervalo': 0.95,      # Nivel de los intervalos guardados
+    'usar_intervalo': True,       # Marcar también semanas sobre el límite superior
+    'horizonte': 1,               # Pronóstico emitido una semana antes
+    'horizonte_archivo': 4        # Pasos archivados por corrida de 08
+}
 
 # Parámetros para backtesting
 BACKTESTING_CONFIG = {
@@ -105,6 +243,25 @@ UMBRALES_ALERTA_PREDICTIVA = {
     'critico': float('inf') # >100% incremento
 }
 
+# Alertas predictivas probabilísticas: probabilidad de superar el umbral epidémico
+# (percentil histórico + k desviaciones) según trayectorias simuladas, cuantiles o,
+# si no hay ninguno de los dos, los intervalos del 95% del ensamble
+ALERTAS_PROBABILISTICAS_CONFIG = {
+    'activar': False,             # Activar cuando el pronóstico guarde trayectorias o cuantiles (ver abajo)
+    'percentil_umbral': 75,
+    'desviaciones_umbral': 2.0,
+    'probabilidad_minima': {      # Probabilidad de excedencia que abre cada nivel
+        'vigilancia': 0.10,
+        'preparacion': 0.25,
+        'alerta_temprana': 0.50,
+        'critico': 0.80
+    },
+    'series_por_bloque': 128      # Series por bloque al reducir las trayectorias
+}
+# Archivo .npz con 'series', 'fechas' y 'muestras' (series × horizonte × muestras)
+# o 'cuantiles' (series × horizonte × cuantiles) y 'niveles_cuantil'
+MUESTRAS_PRONOSTICO_PATH = PREDICTIONS_DIR / 'muestras_pronostico.npz'
+
 # Colores para alertas predictivas
 COLORES_ALERTA_PREDICTIVA = {
     'normal': '#27ae60',
@@ -113,3 +270,14 @@ COLORES_ALERTA_PREDICTIVA = {
     'alerta_temprana': '#e74c3c',
     'critico': '#9b59b6'
 }
+
+# Motor de reglas de alerta: por defecto se construye con UMBRALES_ALERTA y
+# UMBRALES_ALERTA_PREDICTIVA. Si existe este JSON, cada conjunto que defina
+# ('semanal' o 'predictivo') sustituye al de config y se recarga al modificarse:
+# {"semanal": {"niveles": ["normal", "bajo", "medio", "alto", "critico"],
+#              "combinacion": "maximo",
+#              "reglas": {"nivel_estadistico": {"variable": "z_score", "comparacion": ">=",
+#                                               "umbrales": {"bajo": 1.5, "medio": 2.0, "alto": 2.5, "critico": 3.0}},
+#                         "nivel_anomalia": {"variable": "consenso_modelos", "comparacion": ">=",
+#                                            "umbrales": {"medio": 1, "alto": 2, "critico": 3}}}}}
+REGLAS_ALERTA_PATH = BASE_DIR / 'reglas_alerta.json'
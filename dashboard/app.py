@@ -15,7 +15,10 @@ import sys
 ROOT_DIR = Path(__file__).parent.parent
 sys.path.append(str(ROOT_DIR))
 
-from config import PROCESSED_DATA_DIR, REGIONES_OBJETIVO, COLORES_ALERTA
+from config import (PROCESSED_DATA_DIR, REGIONES_OBJETIVO, COLORES_ALERTA, EPISODIOS_CONFIG,
+                    ALMACEN_ALERTAS_PATH)
+from src.models.episodios_alerta import construir_episodios, episodios_activos, resumen_episodios
+from src.models.almacen_alertas import AlmacenAlertas
 
 # Configuración de la página
 st.set_page_config(
@@ -465,6 +468,9 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 # Funciones de carga de datos
+# Con almacén de alertas se consultan solo las filas filtradas; sin él, se leen los CSV
+almacen = AlmacenAlertas(ALMACEN_ALERTAS_PATH)
+
 @st.cache_data
 def cargar_datos_alertas():
     """Carga datos de alertas"""
@@ -479,22 +485,78 @@ def cargar_datos_alertas():
     df['fecha'] = pd.to_datetime(df['fecha'])
     return df
 
+@st.cache_data
+def cargar_opciones_filtros():
+    """Regiones y rango de fechas disponibles"""
+    if almacen.existe('alertas'):
+        return almacen.regiones(), *almacen.rango_fechas()
+    df = cargar_datos_alertas()
+    return sorted(df['departamento'].unique().tolist()), df['fecha'].min(), df['fecha'].max()
+
+@st.cache_data
+def consultar_alertas(region, fecha_inicio, fecha_fin, niveles):
+    """Alertas de una región (o todas), un rango de fechas y unos niveles"""
+    regiones = None if region == 'Todas' else [region]
+    if almacen.existe('alertas'):
+        return almacen.consultar('alertas', fecha_inicio, fecha_fin, regiones, niveles)
+    
+    df = cargar_datos_alertas()
+    if regiones is not None:
+        df = df[df['departamento'].isin(regiones)]
+    return df[
+        (df['fecha'] >= pd.to_datetime(fecha_inicio)) &
+        (df['fecha'] <= pd.to_datetime(fecha_fin)) &
+        (df['nivel_riesgo'].isin(niveles))
+    ]
+
+@st.cache_data
+def contar_niveles(region, fecha_inicio, fecha_fin, niveles):
+    """Semanas por nivel de riesgo de una región (o todas) en un rango de fechas"""
+    regiones = None if region == 'Todas' else [region]
+    if almacen.existe('alertas'):
+        conteo = almacen.conteo_niveles('alertas', fecha_inicio, fecha_fin, regiones)
+        return conteo[conteo['nivel'].isin(niveles)].reset_index(drop=True)
+    
+    conteo = consultar_alertas(region, fecha_inicio, fecha_fin, niveles)['nivel_riesgo'].value_counts()
+    return conteo.rename_axis('nivel').reset_index(name='cantidad')
+
+@st.cache_data
+def cargar_semanas_activas(region):
+    """Semanas en alerta (medio o superior) de las últimas 4 semanas"""
+    regiones = None if region == 'Todas' else [region]
+    if almacen.existe('alertas'):
+        return almacen.alertas_activas(['medio', 'alto', 'critico'], ultimas_semanas=4, regiones=regiones)
+    
+    df = cargar_datos_alertas()
+    df = df[
+        (df['nivel_riesgo'].isin(['medio', 'alto', 'critico'])) &
+        (df['fecha'] >= df['fecha'].max() - pd.Timedelta(weeks=4))
+    ]
+    if regiones is not None:
+        df = df[df['departamento'].isin(regiones)]
+    orden = df['nivel_riesgo'].map({'critico': 0, 'alto': 1, 'medio': 2})
+    return df.assign(orden=orden).sort_values(['orden', 'fecha'], ascending=[True, False]).drop(columns='orden')
+
+
+@st.cache_data
+def cargar_episodios():
+    """Carga episodios de alerta (los construye desde las alertas si no existen)"""
+    if almacen.existe('episodios'):
+        return almacen.consultar('episodios')
+    filepath = Path(__file__).parent.parent / 'data' / 'processed' / 'episodios_alerta.csv'
+    if filepath.exists():
+        return pd.read_csv(filepath, parse_dates=['fecha_inicio', 'fecha_fin'])
+    return construir_episodios(cargar_datos_alertas(), nivel_minimo=EPISODIOS_CONFIG['nivel_minimo'])
 
 @st.cache_data
 def cargar_reporte_alertas():
     """Carga reporte de alertas por región"""
-    df = cargar_datos_alertas()
-    # Generar reporte básico
-    return df.groupby('departamento').size().reset_index(name='total_alertas')
+    return resumen_episodios(cargar_episodios())
 
 @st.cache_data
 def cargar_alertas_activas():
-    """Carga alertas activas"""
-    df = cargar_datos_alertas()
-    df['fecha'] = pd.to_datetime(df['fecha'])
-    fecha_max = df['fecha'].max()
-    fecha_limite = fecha_max - pd.Timedelta(weeks=4)
-    return df[df['fecha'] >= fecha_limite]
+    """Carga episodios de alerta abiertos en las últimas 4 semanas"""
+    return episodios_activos(cargar_episodios(), ultimas_semanas=4)
 
 # ============================================
 # FUNCIONES PARA PREDICCIONES
@@ -513,6 +575,8 @@ def cargar_predicciones():
 @st.cache_data
 def cargar_alertas_predictivas():
     """Carga alertas predictivas"""
+    if almacen.existe('alertas_predictivas'):
+        return almacen.consultar('alertas_predictivas')
     filepath = Path(__file__).parent.parent / 'data' / 'processed' / 'predictions' / 'alertas_predictivas.csv'
     if filepath.exists():
         df = pd.read_csv(filepath)
@@ -523,6 +587,8 @@ def cargar_alertas_predictivas():
 @st.cache_data
 def cargar_alertas_criticas_predictivas():
     """Carga alertas críticas predictivas (próximos 12 meses)"""
+    if almacen.existe('alertas_predictivas'):
+        return almacen.alertas_predictivas_criticas(['alerta_temprana', 'critico'], meses_adelante=12)
     filepath = Path(__file__).parent.parent / 'data' / 'processed' / 'predictions' / 'alertas_criticas_12_meses.csv'
     if filepath.exists():
         df = pd.read_csv(filepath)
@@ -575,16 +641,14 @@ with st.sidebar:
     # Filtros
     st.markdown("### <i class='fas fa-filter'></i> Filtros", unsafe_allow_html=True)
     
-    # Cargar datos
-    df_alertas = cargar_datos_alertas()
+    # Cargar opciones de filtro
+    regiones, fecha_min, fecha_max = cargar_opciones_filtros()
     
     # Selector de región
-    regiones_disponibles = ['Todas'] + sorted(df_alertas['departamento'].unique().tolist())
+    regiones_disponibles = ['Todas'] + regiones
     region_seleccionada = st.selectbox("Región", regiones_disponibles)
     
     # Selector de rango de fechas
-    fecha_min = df_alertas['fecha'].min()
-    fecha_max = df_alertas['fecha'].max()
     
     fecha_inicio = st.date_input(
         "Fecha inicio",
@@ -616,16 +680,9 @@ with st.sidebar:
     """, unsafe_allow_html=True)
 
 # Filtrar datos
-df_filtrado = df_alertas.copy()
-
-if region_seleccionada != 'Todas':
-    df_filtrado = df_filtrado[df_filtrado['departamento'] == region_seleccionada]
-
-df_filtrado = df_filtrado[
-    (df_filtrado['fecha'] >= pd.to_datetime(fecha_inicio)) &
-    (df_filtrado['fecha'] <= pd.to_datetime(fecha_fin)) &
-    (df_filtrado['nivel_riesgo'].isin(niveles_alerta))
-]
+df_filtrado = consultar_alertas(region_seleccionada, fecha_inicio, fecha_fin, niveles_alerta)
+conteo_niveles = contar_niveles(region_seleccionada, fecha_inicio, fecha_fin, niveles_alerta)
+semanas_por_nivel = dict(zip(conteo_niveles['nivel'], conteo_niveles['cantidad']))
 
 # KPIs principales
 st.markdown("### <i class='fas fa-chart-line' style='margin-right: 0.5rem;'></i>Indicadores Clave", unsafe_allow_html=True)
@@ -633,15 +690,15 @@ st.markdown("### <i class='fas fa-chart-line' style='margin-right: 0.5rem;'></i>
 col1, col2, col3, col4, col5 = st.columns(5)
 
 with col1:
-    total_alertas = len(df_filtrado)
+    total_alertas = int(conteo_niveles['cantidad'].sum())
     st.metric("Total Alertas", f"{total_alertas:,}")
 
 with col2:
-    alertas_criticas = len(df_filtrado[df_filtrado['nivel_riesgo'] == 'critico'])
+    alertas_criticas = int(semanas_por_nivel.get('critico', 0))
     st.metric("Alertas Críticas", alertas_criticas, delta=None, delta_color="inverse")
 
 with col3:
-    alertas_altas = len(df_filtrado[df_filtrado['nivel_riesgo'] == 'alto'])
+    alertas_altas = int(semanas_por_nivel.get('alto', 0))
     st.metric("Alertas Altas", alertas_altas, delta=None, delta_color="inverse")
 
 with col4:
@@ -684,8 +741,7 @@ with tab1:
         # Distribución de alertas por nivel
         st.markdown("#### Distribución de Alertas por Nivel de Riesgo")
         
-        distribucion = df_filtrado['nivel_riesgo'].value_counts().reset_index()
-        distribucion.columns = ['Nivel', 'Cantidad']
+        distribucion = conteo_niveles.rename(columns={'nivel': 'Nivel', 'cantidad': 'Cantidad'})
         
         # Mapear colores neón
         color_map = {
@@ -861,35 +917,47 @@ with tab4:
         st.markdown(f"""
         <div style='background: rgba(245, 158, 11, 0.15); padding: 1rem; border-radius: 12px; border-left: 4px solid #f59e0b;'>
             <i class='fas fa-exclamation-triangle' style='color: #f59e0b; margin-right: 0.5rem;'></i>
-            <span style='color: #fbbf24; font-weight: 600; font-size: 1.1rem;'>{len(df_activas)} alertas activas detectadas</span>
+            <span style='color: #fbbf24; font-weight: 600; font-size: 1.1rem;'>{len(df_activas)} episodios de alerta activos</span>
         </div>
         """, unsafe_allow_html=True)
         
-        # Mostrar alertas críticas primero
-        alertas_criticas = df_activas[df_activas['nivel_riesgo'] == 'critico']
+        # Mostrar episodios con pico crítico primero
+        alertas_criticas = df_activas[df_activas['nivel_pico'] == 'critico']
         if len(alertas_criticas) > 0:
             st.markdown("### <i class='fas fa-bell' style='color: #ef4444; margin-right: 0.5rem;'></i>Alertas Críticas", unsafe_allow_html=True)
             for _, row in alertas_criticas.head(5).iterrows():
                 st.markdown(f"""
                 <div class="alert-critico">
                     <i class="fas fa-map-marker-alt"></i> {row['departamento']} | 
-                    <i class="fas fa-calendar-alt"></i> {row['fecha'].strftime('%Y-%m-%d')} | 
-                    <i class="fas fa-chart-bar"></i> {int(row['casos_actual'])} casos ({row['porcentaje_incremento']:.1f}% vs media)
+                    <i class="fas fa-calendar-alt"></i> desde {row['fecha_inicio'].strftime('%Y-%m-%d')} ({int(row['semanas'])} semanas) | 
+                    <i class="fas fa-chart-bar"></i> {int(row['casos_totales'])} casos (z máx. {row['z_score_pico']:.1f})
                 </div>
                 """, unsafe_allow_html=True)
                 st.markdown("")
         
-        # Tabla completa de alertas activas
-        st.markdown("### Todas las Alertas Activas")
-        cols_mostrar = ['departamento', 'fecha', 'nivel_riesgo', 'casos_actual', 
-                       'media_historica', 'z_score', 'consenso_modelos']
+        # Tabla completa de episodios activos
+        st.markdown("### Todos los Episodios Activos")
+        cols_mostrar = ['departamento', 'fecha_inicio', 'fecha_fin', 'semanas', 'nivel_pico',
+                        'z_score_pico', 'casos_totales']
         st.dataframe(
-            df_activas[cols_mostrar].sort_values(['nivel_riesgo', 'fecha'], ascending=[True, False]),
+            df_activas[cols_mostrar],
             use_container_width=True,
             hide_index=True
         )
     else:
         st.success("<i class='fas fa-check-circle' style='color: #10b981;'></i> No hay alertas activas en las últimas 4 semanas")
+    
+    # Semanas en alerta de las últimas 4 semanas (detalle semanal de los episodios)
+    df_semanas_activas = cargar_semanas_activas(region_seleccionada)
+    if len(df_semanas_activas) > 0:
+        st.markdown("### Semanas en Alerta Recientes")
+        cols_mostrar = [c for c in ['departamento', 'fecha', 'nivel_riesgo', 'casos_actual', 'z_score']
+                        if c in df_semanas_activas.columns]
+        st.dataframe(
+            df_semanas_activas[cols_mostrar],
+            use_container_width=True,
+            hide_index=True
+        )
 
 # ============================================
 # PESTAÑA 5: PREDICCIONES 2026-2028
@@ -1128,6 +1196,10 @@ with tab6:
                     'normal': '#64748b'
                 }.get(row['nivel_riesgo_predictivo'], '#64748b')
                 
+                probabilidad = (f" | <i class='fas fa-percentage' style='color: #f59e0b; margin-right: 0.3rem;'></i> "
+                                f"Prob. de superar el umbral epidémico: <strong style='color: #ffffff;'>"
+                                f"{row['probabilidad_excedencia']:.0%}</strong>"
+                                if pd.notna(row.get('probabilidad_excedencia')) else '')
                 st.markdown(f"""
                 <div style='background: rgba(255, 255, 255, 0.05); padding: 1rem; border-radius: 12px; 
                             border-left: 4px solid {nivel_color}; margin-bottom: 0.8rem;'>
@@ -1148,7 +1220,7 @@ with tab6:
                     </div>
                     <div style='margin-top: 0.5rem; color: #f1f5f9;'>
                         <i class='fas fa-chart-bar' style='color: #a855f7; margin-right: 0.3rem;'></i> Casos predichos: <strong style='color: #ffffff;'>{row['casos_predichos']:.0f}</strong> | 
-                        <i class='fas fa-chart-line' style='color: #00f5ff; margin-right: 0.3rem;'></i> Incremento esperado: <strong style='color: #ffffff;'>{row['porcentaje_incremento']:.1f}%</strong>
+                        <i class='fas fa-chart-line' style='color: #00f5ff; margin-right: 0.3rem;'></i> Incremento esperado: <strong style='color: #ffffff;'>{row['porcentaje_incremento']:.1f}%</strong>{probabilidad}
                     </div>
                 </div>
                 """, unsafe_allow_html=True)
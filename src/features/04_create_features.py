@@ -8,8 +8,11 @@ from pathlib import Path
 ROOT_DIR = Path(__file__).parent.parent.parent
 sys.path.append(str(ROOT_DIR))
 
-from config import PROCESSED_DATA_DIR
+from config import (PROCESSED_DATA_DIR, EXTERNAL_DATA_DIR, ADYACENCIA_REGIONES_PATH, COVARIABLES_CONFIG,
+                    FEATURES_CONFIG, ESTADISTICAS_ESTADO_PATH)
 from src.features.feature_engineering import DengueFeatureEngineer
+from src.features.estadisticas_incrementales import EstadisticasIncrementales
+from src.features.covariables import CovariablesExternas
 import pandas as pd
 
 def main():
@@ -30,9 +33,54 @@ def main():
     # Inicializar feature engineer
     fe = DengueFeatureEngineer()
     
+    # Usar features espaciales si existe la lista de adyacencia
+    ruta_adyacencia = ADYACENCIA_REGIONES_PATH if ADYACENCIA_REGIONES_PATH.exists() else None
+    if ruta_adyacencia is not None:
+        print(f"✓ Adyacencia encontrada: {ruta_adyacencia}")
+    
+    # Cargar covariables externas (clima, precipitación) si existen
+    covariables = CovariablesExternas(lags=COVARIABLES_CONFIG['lags'], rellenar=COVARIABLES_CONFIG['rellenar'])
+    covariables.cargar_directorio(
+        EXTERNAL_DATA_DIR,
+        patron=COVARIABLES_CONFIG['patron_archivos'],
+        agregacion=COVARIABLES_CONFIG['agregacion']
+    )
+    if covariables.variables:
+        print(f"✓ Covariables cargadas: {list(covariables.variables)}")
+    
+    # Estadísticas expanding: continuar desde el estado de la ejecución anterior
+    expanding = FEATURES_CONFIG['estadisticas_expanding']
+    estado = None
+    if expanding and FEATURES_CONFIG['incremental'] and ESTADISTICAS_ESTADO_PATH.exists() \
+            and output_path.exists():
+        estado = EstadisticasIncrementales.cargar(ESTADISTICAS_ESTADO_PATH)
+        # Última semana incorporada de cada región (antes de que el estado avance)
+        cortes = estado.cortes()
+        print(f"✓ Estado de estadísticas cargado (semanas hasta {estado.ultima_fecha.date()})")
+    
     # Crear todas las características
     print("\nCreando características...")
-    df_features = fe.crear_todas_features(df)
+    parametros = dict(estadisticas_expanding=expanding, alpha=FEATURES_CONFIG['alpha_ewm'],
+                      ruta_adyacencia=ruta_adyacencia, covariables=covariables,
+                      resoluciones=FEATURES_CONFIG['resoluciones'])
+    df_features = fe.crear_todas_features(df, estado=estado, **parametros)
+    
+    # Las semanas ya incorporadas al estado se conservan del archivo anterior
+    if estado is not None:
+        df_anteriores = pd.read_csv(output_path, parse_dates=['fecha'])
+        if list(df_anteriores.columns) == list(df_features.columns):
+            nuevas = ~(df_features['fecha'] <= df_features['departamento'].map(cortes))
+            incorporadas = df_anteriores['fecha'] <= df_anteriores['departamento'].map(cortes)
+            df_features = pd.concat([df_anteriores[incorporadas], df_features[nuevas]],
+                                    ignore_index=True)
+            print(f"✓ Semanas nuevas añadidas: {nuevas.sum():,} registros")
+        else:
+            print("⚠ Las columnas cambiaron desde la última ejecución: se recalcula todo")
+            fe = DengueFeatureEngineer()
+            df_features = fe.crear_todas_features(df, **parametros)
+    
+    if expanding:
+        fe.estadisticas_incrementales.guardar(ESTADISTICAS_ESTADO_PATH)
     
     # Guardar datos con features
     print(f"\nGuardando datos con features en: {output_path}")
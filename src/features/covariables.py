@@ -0,0 +1,288 @@
+"""
+Módulo de covariables externas (clima, precipitación)
+Carga series locales de data/external, las lleva a semanas epidemiológicas
+y las une al panel de casos con un join as-of indexado
+"""
+
+import pandas as pd
+import numpy as np
+from typing import Dict, List
+import logging
+from pathlib import Path
+
+from src.features.panel import PanelSemanal, desplazar
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Columna usada para covariables sin región (se aplican a todas las regiones)
+SERIE_NACIONAL = '__NACIONAL__'
+
+# Columnas de calendario que no son covariables aunque sean numéricas
+COLUMNAS_CALENDARIO = {'año', 'ano', 'anio', 'year', 'anio_epi', 'semana', 'semana_epi', 'week',
+                       'mes', 'month', 'dia', 'day', 'trimestre'}
+
+
+def inicio_semana(fechas: pd.Series) -> pd.Series:
+    """
+    Lleva cada fecha al lunes de su semana (mismo criterio que la columna fecha)
+
+    Args:
+        fechas: Serie de fechas
+
+    Returns:
+        Serie con el inicio de la semana de cada fecha
+    """
+    fechas = pd.to_datetime(fechas).dt.normalize()
+    return fechas - pd.to_timedelta(fechas.dt.dayofweek, unit='D')
+
+
+class CovariablesExternas:
+    """Covariables semanales alineadas al panel de casos mediante un índice de semanas"""
+
+    def __init__(self, col_fecha: str = 'fecha', col_departamento: str = 'departamento',
+                 lags: List[int] = [0, 1, 2, 4, 8], rellenar: bool = True):
+        """
+        Inicializa el contenedor de covariables
+
+        Args:
+            col_fecha: Columna de fecha en los archivos externos
+            col_departamento: Columna de región en los archivos externos (opcional en el archivo)
+            lags: Lags en semanas por defecto (0 = semana actual)
+            rellenar: Si True, completa las semanas sin dato (ver rellenar_faltantes) para
+                     que el entrenamiento no descarte esas filas; si no, quedan en NaN
+        """
+        self.col_fecha = col_fecha
+        self.col_departamento = col_departamento
+        self.lags = lags
+        self.rellenar = rellenar
+
+        # Por variable: DataFrame semanal (índice de semanas ordenado × regiones)
+        self.variables: Dict[str, pd.DataFrame] = {}
+        # Por variable: máxima antigüedad aceptada en el join as-of
+        self.tolerancias: Dict[str, pd.Timedelta] = {}
+        # Por variable: archivo del que se cargó
+        self.fuentes: Dict[str, Path] = {}
+
+    def _variables_archivo(self, chunk: pd.DataFrame) -> List[str]:
+        """Columnas numéricas del archivo salvo fecha, región y calendario"""
+        excluidas = {self.col_fecha, self.col_departamento}
+        return [col for col in chunk.select_dtypes(include='number').columns
+                if col not in excluidas and col.strip().lower() not in COLUMNAS_CALENDARIO]
+
+    def _verificar_nombres(self, variables: List[str], filepath: Path):
+        """Rechaza variables ya cargadas desde otro archivo (se reemplazarían en silencio)"""
+        for var in variables:
+            fuente = self.fuentes.get(var)
+            if fuente is not None and Path(fuente).resolve() != Path(filepath).resolve():
+                raise ValueError(f"La covariable '{var}' de {filepath} ya se cargó desde {fuente}; "
+                                 f"renombrar la columna en uno de los archivos")
+
+    def cargar_fuente(self, filepath: Path, variables: List[str] = None,
+                      agregacion: str = 'mean', chunksize: int = 100000):
+        """
+        Carga un archivo de covariables y lo agrega a semanas en una sola pasada
+
+        Los datos diarios se agregan por semana; los mensuales (u otra resolución
+        más gruesa) quedan en la semana de su fecha y el join as-of los extiende
+        a las semanas siguientes hasta el próximo valor. Una variable con el mismo
+        nombre que otra cargada desde otro archivo es un ValueError.
+
+        Args:
+            filepath: Ruta al CSV (columna de fecha, región opcional y variables numéricas)
+            variables: Columnas a cargar (por defecto las numéricas salvo fecha, región y calendario)
+            agregacion: 'mean' o 'sum' para agregar los valores dentro de la semana
+            chunksize: Tamaño de los chunks de lectura
+        """
+        logger.info(f"Cargando covariables desde: {filepath}")
+
+        parciales = []
+        for chunk in pd.read_csv(filepath, chunksize=chunksize):
+            if not parciales:
+                if variables is None:
+                    variables = self._variables_archivo(chunk)
+                self._verificar_nombres(variables, filepath)
+
+            semana = inicio_semana(chunk[self.col_fecha])
+            if self.col_departamento in chunk.columns:
+                region = chunk[self.col_departamento].astype(str).str.upper().str.strip()
+            else:
+                region = pd.Series(SERIE_NACIONAL, index=chunk.index)
+
+            datos = chunk[variables].astype(float)
+            claves = [semana.rename('semana'), region.rename('region')]
+
+            # Sumas y conteos parciales para poder combinar chunks
+            parciales.append(pd.concat([
+                datos.groupby(claves).sum(min_count=1).add_suffix('__suma'),
+                datos.groupby(claves).count().add_suffix('__n'),
+            ], axis=1))
+
+        if not parciales:
+            logger.warning(f"Archivo de covariables vacío: {filepath}")
+            return
+
+        acumulado = pd.concat(parciales).groupby(level=['semana', 'region']).sum(min_count=1)
+
+        for var in variables:
+            if agregacion == 'sum':
+                valores = acumulado[f'{var}__suma']
+            else:
+                valores = acumulado[f'{var}__suma'] / acumulado[f'{var}__n'].replace(0, np.nan)
+
+            # Índice de semanas ordenado una sola vez para los joins posteriores
+            tabla = valores.unstack('region').sort_index()
+            self.variables[var] = tabla
+            self.fuentes[var] = filepath
+
+            # Tolerancia del as-of según la resolución original de la fuente
+            pasos = tabla.index.to_series().diff().dropna()
+            # (los meses duran entre 4 y 5 semanas, por eso se agrega una semana de margen)
+            paso = pasos.median() if len(pasos) > 0 else pd.Timedelta(weeks=1)
+            if paso > pd.Timedelta(weeks=1):
+                paso += pd.Timedelta(weeks=1)
+            self.tolerancias[var] = max(paso, pd.Timedelta(weeks=1))
+
+            logger.info(f"  {var}: {len(tabla):,} semanas, {tabla.shape[1]} regiones, "
+                        f"resolución ~{self.tolerancias[var].days} días")
+
+        logger.info(f"✓ Covariables cargadas: {len(variables)} variables")
+
+    def cargar_directorio(self, directorio: Path, patron: str = 'clima_*.csv',
+                          agregacion: str = 'mean'):
+        """
+        Carga todos los archivos de covariables de un directorio
+
+        Args:
+            directorio: Directorio con los archivos (p. ej. data/external)
+            patron: Patrón de nombre de los archivos
+            agregacion: 'mean' o 'sum' para agregar los valores dentro de la semana
+        """
+        archivos = sorted(directorio.glob(patron))
+
+        if not archivos:
+            logger.warning(f"No se encontraron covariables con patrón '{patron}' en {directorio}")
+
+        for filepath in archivos:
+            self.cargar_fuente(filepath, agregacion=agregacion)
+
+    def alinear(self, variable: str, fechas: pd.DatetimeIndex, series: pd.Index) -> np.ndarray:
+        """
+        Une una covariable a las semanas y regiones del panel (join as-of)
+
+        Args:
+            variable: Nombre de la covariable
+            fechas: Semanas del panel
+            series: Regiones del panel
+
+        Returns:
+            Matriz (n_semanas, n_series) con el último valor disponible en cada semana
+        """
+        tabla = self.variables[variable]
+        semanas = tabla.index.values
+
+        # Búsqueda binaria sobre el índice ordenado: último valor <= semana objetivo
+        pos = np.searchsorted(semanas, fechas.values, side='right') - 1
+        validos = pos >= 0
+        antiguedad = np.full(len(fechas), np.timedelta64('NaT'), dtype='timedelta64[ns]')
+        antiguedad[validos] = fechas.values[validos] - semanas[pos[validos]]
+        validos &= antiguedad <= self.tolerancias[variable].to_timedelta64()
+
+        # Columnas de la fuente para cada región (o la nacional si no existe)
+        col = tabla.columns.get_indexer(series)
+        if SERIE_NACIONAL in tabla.columns:
+            col = np.where(col >= 0, col, tabla.columns.get_loc(SERIE_NACIONAL))
+
+        valores = tabla.to_numpy(dtype=float)
+        salida = np.full((len(fechas), len(series)), np.nan)
+        filas = np.flatnonzero(validos)
+        cols = np.flatnonzero(col >= 0)
+        salida[np.ix_(filas, cols)] = valores[np.ix_(pos[filas], col[cols])]
+
+        return salida
+
+    @staticmethod
+    def rellenar_faltantes(matriz: np.ndarray, semanas: pd.DatetimeIndex) -> np.ndarray:
+        """
+        Completa los huecos de una covariable alineada
+
+        Primero con la media de la misma semana del año en la región, luego con la
+        media de la región y, para regiones sin ningún dato, con la media de las
+        demás regiones en esa semana.
+
+        Args:
+            matriz: Matriz (n_semanas, n_series) con NaN en semanas sin dato
+            semanas: Semanas de las filas de la matriz
+
+        Returns:
+            Matriz rellenada (NaN solo si la variable no tiene ningún dato en esa semana)
+        """
+        tabla = pd.DataFrame(matriz, index=semanas)
+        semana_anio = semanas.isocalendar().week.to_numpy()
+        tabla = tabla.fillna(tabla.groupby(semana_anio).transform('mean'))
+        tabla = tabla.fillna(tabla.mean())
+        tabla = tabla.T.fillna(tabla.mean(axis=1)).T
+        return tabla.to_numpy(dtype=float)
+
+    def crear_features_covariables(self, df: pd.DataFrame, lags: List[int] = None,
+                                   col_casos: str = 'casos',
+                                   col_departamento: str = 'departamento',
+                                   col_fecha: str = 'fecha') -> pd.DataFrame:
+        """
+        Agrega las covariables y sus lags a cada fila región-semana
+
+        Los lags se toman sobre un índice semanal completo (semanas sin casos
+        incluidas), de modo que el lag k es siempre la covariable de k semanas
+        antes. Se registra la cobertura de cada variable y, con rellenar, los
+        huecos se completan con rellenar_faltantes.
+
+        Args:
+            df: DataFrame con datos
+            lags: Lags en semanas (por defecto los del constructor)
+            col_casos: Columna de casos
+            col_departamento: Columna de departamento
+            col_fecha: Columna de fecha
+
+        Returns:
+            DataFrame con features de covariables
+        """
+        lags = lags if lags is not None else self.lags
+        logger.info(f"Creando características de covariables: {list(self.variables)}, lags={lags}")
+
+        df_copy = df.copy()
+
+        panel = PanelSemanal.desde_dataframe(df_copy, col_casos, col_fecha, col_departamento)
+        _, idx_s = panel.indices_filas(df_copy, col_fecha, col_departamento)
+
+        # Índice semanal completo desde max(lags) semanas antes de la primera fecha
+        semanas = pd.date_range(panel.fechas[0] - pd.Timedelta(weeks=max(lags, default=0)),
+                                panel.fechas[-1], freq='7D')
+        idx_t = semanas.get_indexer(pd.to_datetime(df_copy[col_fecha]))
+        fuera = (idx_t < 0) & (idx_s >= 0)
+        if fuera.any():
+            logger.warning(f"  {fuera.sum():,} filas con fecha fuera de la grilla semanal: "
+                           f"sin covariables")
+
+        filas = (idx_t >= 0) & (idx_s >= 0)
+        for variable in self.variables:
+            matriz = self.alinear(variable, semanas, panel.series)
+
+            # Cobertura: filas del DataFrame con dato de la semana actual
+            observadas = ~np.isnan(panel.a_filas(matriz, idx_t, idx_s)[filas])
+            cobertura = observadas.mean() if len(observadas) > 0 else 0.0
+            sin_datos = [str(s) for s, n in zip(panel.series, np.isfinite(matriz).sum(axis=0)) if n == 0]
+            logger.info(f"  {variable}: cobertura {cobertura:.1%} de {len(observadas):,} filas")
+            if sin_datos:
+                logger.warning(f"  {variable}: sin datos para {sin_datos}")
+
+            if self.rellenar and cobertura < 1:
+                matriz = self.rellenar_faltantes(matriz, semanas)
+                logger.info(f"  {variable}: {(~observadas).sum():,} filas rellenadas")
+
+            for lag in lags:
+                nombre = variable if lag == 0 else f'{variable}_lag_{lag}'
+                df_copy[nombre] = panel.a_filas(desplazar(matriz, lag), idx_t, idx_s)
+
+        logger.info(f"✓ Creadas {len(self.variables) * len(lags)} características de covariables")
+
+        return df_copy
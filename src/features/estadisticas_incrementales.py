@@ -0,0 +1,245 @@
+"""
+Módulo de estadísticas incrementales por región
+Media, desviación, máximo, mínimo y medias exponenciales acumuladas con
+sumas acumuladas sobre el bloque de semanas nuevas de todas las series del panel
+"""
+
+import pandas as pd
+import numpy as np
+from typing import Dict
+import logging
+import joblib
+from pathlib import Path
+
+from src.features.panel import PanelSemanal
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Máximo exponente decimal de los factores de la recurrencia exponencial por bloque
+_EXPONENTE_MAX = 50
+
+
+def _recurrencia_exponencial(inicial: np.ndarray, entradas: np.ndarray, obs: np.ndarray,
+                             factor: float) -> np.ndarray:
+    """
+    Resuelve y = factor * y_prev + entrada en las semanas observadas de cada serie
+
+    Las semanas no observadas conservan el valor anterior. Con k observaciones
+    acumuladas, y_t = factor^k (y_0 + sum_j factor^-k_j entrada_j); el bloque se
+    recorre en tramos para que factor^-k no desborde.
+
+    Args:
+        inicial: Valor previo de cada serie (n_series,)
+        entradas: Matriz (n_semanas, n_series) con el término añadido en cada semana
+        obs: Matriz booleana de semanas observadas
+        factor: Factor de decaimiento (0 < factor <= 1)
+
+    Returns:
+        Matriz (n_semanas, n_series) con el valor tras cada semana
+    """
+    salida = np.empty(entradas.shape)
+    tramo = entradas.shape[0] if factor >= 1 else max(1, int(_EXPONENTE_MAX / -np.log10(factor)))
+    previo = inicial
+
+    for inicio in range(0, entradas.shape[0], tramo):
+        bloque = slice(inicio, inicio + tramo)
+        k = np.cumsum(obs[bloque], axis=0)
+        potencia = factor ** k
+        acumulado = np.cumsum(np.where(obs[bloque], entradas[bloque] / potencia, 0.0), axis=0)
+        salida[bloque] = potencia * (previo + acumulado)
+        previo = salida[bloque][-1]
+
+    return salida
+
+
+class EstadisticasIncrementales:
+    """
+    Estado acumulado por serie que se actualiza semana a semana.
+
+    Las estadísticas que se devuelven para la semana t solo usan las semanas
+    anteriores a t, por lo que los z-scores y ratios no filtran información futura.
+    """
+
+    def __init__(self, alpha: float = 0.1):
+        """
+        Inicializa el estado vacío
+
+        Args:
+            alpha: Factor de suavizado de las medias exponenciales
+        """
+        self.alpha = alpha
+        self.series = pd.Index([])
+        # Última semana incorporada de cada serie (NaT si aún no tiene datos)
+        self.ultimas_fechas = np.array([], dtype='datetime64[ns]')
+
+        self.n = np.zeros(0)
+        self.media = np.zeros(0)
+        self.m2 = np.zeros(0)
+        self.maximo = np.zeros(0)
+        self.minimo = np.zeros(0)
+        self.ewm_media = np.zeros(0)
+        self.ewm_var = np.zeros(0)
+
+    def _alinear_series(self, series: pd.Index) -> np.ndarray:
+        """
+        Añade al estado las series que aún no existen
+
+        Args:
+            series: Series del panel entrante
+
+        Returns:
+            Posición de cada serie del panel dentro del estado
+        """
+        nuevas = series.difference(self.series, sort=False)
+
+        if len(nuevas) > 0:
+            k = len(nuevas)
+            self.series = self.series.append(nuevas)
+            self.ultimas_fechas = np.concatenate([self.ultimas_fechas,
+                                                  np.full(k, np.datetime64('NaT'), dtype='datetime64[ns]')])
+            self.n = np.concatenate([self.n, np.zeros(k)])
+            self.media = np.concatenate([self.media, np.full(k, np.nan)])
+            self.m2 = np.concatenate([self.m2, np.zeros(k)])
+            self.maximo = np.concatenate([self.maximo, np.full(k, np.nan)])
+            self.minimo = np.concatenate([self.minimo, np.full(k, np.nan)])
+            self.ewm_media = np.concatenate([self.ewm_media, np.full(k, np.nan)])
+            self.ewm_var = np.concatenate([self.ewm_var, np.full(k, np.nan)])
+
+        return self.series.get_indexer(series)
+
+    def __setstate__(self, estado: Dict):
+        """Estados guardados con una sola última fecha global: se aplica a cada serie con datos"""
+        if 'ultimas_fechas' not in estado:
+            ultima = estado.pop('ultima_fecha', None)
+            fecha = np.datetime64(ultima, 'ns') if ultima is not None else np.datetime64('NaT', 'ns')
+            estado['ultimas_fechas'] = np.where(estado['n'] > 0, fecha, np.datetime64('NaT', 'ns'))
+        self.__dict__.update(estado)
+
+    def cortes(self) -> pd.Series:
+        """
+        Última semana incorporada de cada serie
+
+        Returns:
+            Serie región → fecha (NaT si la región aún no tiene datos)
+        """
+        return pd.Series(self.ultimas_fechas.copy(), index=self.series)
+
+    @property
+    def ultima_fecha(self) -> pd.Timestamp:
+        """Semana más reciente incorporada en alguna serie (None si el estado está vacío)"""
+        fechas = self.ultimas_fechas[~np.isnat(self.ultimas_fechas)]
+        return pd.Timestamp(fechas.max()) if len(fechas) > 0 else None
+
+    def actualizar(self, panel: PanelSemanal) -> Dict[str, np.ndarray]:
+        """
+        Incorpora las semanas nuevas del panel al estado
+
+        Args:
+            panel: Panel con las semanas a procesar
+
+        Returns:
+            Diccionario de matrices (n_semanas, n_series) con el estado previo a
+            cada semana: n, media, std, max, min, ewm_media, ewm_std. Las semanas
+            ya incorporadas en llamadas anteriores quedan en NaN.
+        """
+        pos = self._alinear_series(panel.series)
+        forma = panel.valores.shape
+        salida = {nombre: np.full(forma, np.nan)
+                  for nombre in ['n', 'media', 'std', 'max', 'min', 'ewm_media', 'ewm_std']}
+
+        # Cada serie continúa desde su propia última semana: una semana atrasada
+        # de una región no se pierde porque otra región ya tenga semanas posteriores
+        ultimas = self.ultimas_fechas[pos]
+        nuevas = np.isnat(ultimas)[None, :] | (panel.fechas.values[:, None] > ultimas[None, :])
+        x = np.where(nuevas, panel.valores, np.nan)
+        obs = ~np.isnan(x)
+
+        omitidas = (~nuevas & ~np.isnan(panel.valores)).sum()
+        if omitidas > 0:
+            logger.warning(f"Se omitieron {omitidas} semanas-serie ya incorporadas al estado")
+
+        if not obs.any():
+            return salida
+
+        a = self.alpha
+        n0 = self.n[pos]
+        sin_datos = n0 == 0
+        primera = np.where(obs.any(axis=0), x[obs.argmax(axis=0), np.arange(forma[1])], np.nan)
+
+        # Media y M2: sumas acumuladas de las desviaciones respecto a la media previa
+        # (o a la primera observación del bloque en series sin datos)
+        centro = np.where(sin_datos, primera, self.media[pos])
+        d = np.where(obs, x - centro, 0.0)
+        n = n0 + np.cumsum(obs, axis=0)
+        s1 = np.cumsum(d, axis=0)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            media = np.where(n > 0, centro + s1 / n, np.nan)
+            m2 = self.m2[pos] + np.cumsum(d ** 2, axis=0) - np.where(n > 0, s1 ** 2 / n, 0.0)
+        m2 = np.maximum(m2, 0.0)
+
+        maximo = np.fmax.accumulate(np.vstack([self.maximo[pos], x]), axis=0)[1:]
+        minimo = np.fmin.accumulate(np.vstack([self.minimo[pos], x]), axis=0)[1:]
+
+        # Medias exponenciales: m = (1 - a) m_prev + a x y v = (1 - a)(v_prev + a (x - m_prev)^2)
+        ewm_inicial = np.where(sin_datos, primera, self.ewm_media[pos])
+        ewm_media = _recurrencia_exponencial(ewm_inicial, a * x, obs, 1 - a)
+        ewm_previa = np.vstack([ewm_inicial, ewm_media[:-1]])
+        ewm_var_inicial = np.where(sin_datos, 0.0, self.ewm_var[pos])
+        ewm_var = _recurrencia_exponencial(ewm_var_inicial, (1 - a) * a * (x - ewm_previa) ** 2, obs, 1 - a)
+
+        # Estado previo a cada semana (point-in-time): el que quedó tras la semana anterior
+        def previo(inicial, matriz):
+            return np.vstack([inicial, matriz[:-1]])
+
+        n_previo = previo(n0, n)
+        vacio = n_previo == 0
+        salida['n'] = np.where(nuevas, n_previo, np.nan)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            std = np.where(n_previo > 1, np.sqrt(previo(self.m2[pos], m2) / (n_previo - 1)), np.nan)
+        for nombre, inicial, matriz in [('media', self.media[pos], media),
+                                        ('max', self.maximo[pos], maximo),
+                                        ('min', self.minimo[pos], minimo),
+                                        ('ewm_media', self.ewm_media[pos], ewm_media),
+                                        ('ewm_std', np.sqrt(self.ewm_var[pos]), np.sqrt(ewm_var))]:
+            salida[nombre] = np.where(nuevas & ~vacio, previo(inicial, matriz), np.nan)
+        salida['std'] = np.where(nuevas, std, np.nan)
+
+        # Estado tras el bloque en las series observadas
+        p = pos[obs.any(axis=0)]
+        ultima = obs.any(axis=0)
+        self.n[p] = n[-1][ultima]
+        self.media[p] = media[-1][ultima]
+        self.m2[p] = m2[-1][ultima]
+        self.maximo[p] = maximo[-1][ultima]
+        self.minimo[p] = minimo[-1][ultima]
+        self.ewm_media[p] = ewm_media[-1][ultima]
+        self.ewm_var[p] = ewm_var[-1][ultima]
+        ultima_obs = forma[0] - 1 - obs[::-1].argmax(axis=0)
+        self.ultimas_fechas[p] = panel.fechas.values[ultima_obs[ultima]]
+
+        return salida
+
+    def guardar(self, filepath: Path):
+        """
+        Guarda el estado para continuar en la siguiente ejecución
+
+        Args:
+            filepath: Ruta del archivo de estado
+        """
+        filepath.parent.mkdir(parents=True, exist_ok=True)
+        joblib.dump(self, filepath)
+        logger.info(f"✓ Estado de estadísticas guardado en: {filepath}")
+
+    @staticmethod
+    def cargar(filepath: Path) -> 'EstadisticasIncrementales':
+        """
+        Carga un estado guardado
+
+        Args:
+            filepath: Ruta del archivo de estado
+
+        Returns:
+            Estado de estadísticas incrementales
+        """
+        return joblib.load(filepath)
@@ -7,6 +7,13 @@ import pandas as pd
 import numpy as np
 from typing import List
 import logging
+from pathlib import Path
+
+from src.features.panel import PanelSemanal
+from src.features.estadisticas_incrementales import EstadisticasIncrementales
+from src.features.spatial_features import SpatialFeatureEngineer
+from src.features.covariables import CovariablesExternas
+from src.features.multiresolucion import crear_features_multiresolucion
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -17,7 +24,8 @@ class DengueFeatureEngineer:
     
     def __init__(self):
         """Inicializa el ingeniero de características"""
-        pass
+        # Estado de las estadísticas expanding (para actualizaciones incrementales)
+        self.estadisticas_incrementales = None
     
     def crear_features_temporales(self, df: pd.DataFrame, col_fecha: str = 'fecha') -> pd.DataFrame:
         """
@@ -185,8 +193,112 @@ class DengueFeatureEngineer:
         
         return df_copy
     
+    def crear_features_estadisticas_expanding(self, df: pd.DataFrame, col_casos: str = 'casos',
+                                              col_departamento: str = 'departamento',
+                                              col_fecha: str = 'fecha',
+                                              alpha: float = 0.1,
+                                              estado: EstadisticasIncrementales = None) -> pd.DataFrame:
+        """
+        Crea características estadísticas por región sin fuga de información futura
+        
+        Cada semana se compara con las estadísticas acumuladas hasta la semana
+        anterior (expanding y exponenciales). Si se pasa un estado previo, solo
+        se calculan las semanas posteriores a las ya incorporadas.
+        
+        Args:
+            df: DataFrame con datos
+            col_casos: Columna de casos
+            col_departamento: Columna de departamento
+            col_fecha: Columna de fecha
+            alpha: Factor de suavizado de las medias exponenciales
+            estado: Estado incremental de una ejecución anterior (opcional)
+            
+        Returns:
+            DataFrame con features estadísticas point-in-time
+        """
+        logger.info("Creando características estadísticas expanding...")
+        
+        df_copy = df.copy()
+        
+        if estado is None:
+            estado = EstadisticasIncrementales(alpha=alpha)
+        self.estadisticas_incrementales = estado
+        
+        # Actualizar el estado con todas las series a la vez
+        panel = PanelSemanal.desde_dataframe(df_copy, col_casos, col_fecha, col_departamento)
+        stats = estado.actualizar(panel)
+        idx_t, idx_s = panel.indices_filas(df_copy, col_fecha, col_departamento)
+        
+        for nombre in ['media', 'std', 'max', 'min']:
+            df_copy[f'casos_{nombre}_exp'] = panel.a_filas(stats[nombre], idx_t, idx_s)
+        df_copy['casos_ewm_media'] = panel.a_filas(stats['ewm_media'], idx_t, idx_s)
+        df_copy['casos_ewm_std'] = panel.a_filas(stats['ewm_std'], idx_t, idx_s)
+        
+        casos = df_copy[col_casos].to_numpy(dtype=float)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            media = df_copy['casos_media_exp'].to_numpy()
+            std = df_copy['casos_std_exp'].to_numpy()
+            ewm_media = df_copy['casos_ewm_media'].to_numpy()
+            ewm_std = df_copy['casos_ewm_std'].to_numpy()
+            
+            # Ratio y z-scores respecto al histórico disponible en cada semana
+            df_copy['casos_ratio_media_exp'] = np.where(media > 0, casos / media, np.nan)
+            df_copy['casos_zscore_exp'] = np.where(std > 0, (casos - media) / std, np.nan)
+            df_copy['casos_zscore_ewm'] = np.where(ewm_std > 0, (casos - ewm_media) / ewm_std, np.nan)
+        
+        logger.info("✓ Creadas 9 características estadísticas expanding")
+        
+        return df_copy
+    
+    def crear_features_espaciales(self, df: pd.DataFrame, ruta_adyacencia: Path,
+                                  col_casos: str = 'casos',
+                                  col_departamento: str = 'departamento',
+                                  col_fecha: str = 'fecha') -> pd.DataFrame:
+        """
+        Crea características de regiones vecinas a partir de un archivo de adyacencia
+        
+        Args:
+            df: DataFrame con datos
+            ruta_adyacencia: CSV con pares de regiones vecinas
+            col_casos: Columna de casos
+            col_departamento: Columna de departamento
+            col_fecha: Columna de fecha
+            
+        Returns:
+            DataFrame con features espaciales
+        """
+        series = pd.Index(sorted(df[col_departamento].unique()))
+        spatial = SpatialFeatureEngineer.desde_archivo(ruta_adyacencia, series)
+        
+        return spatial.crear_features_espaciales(df, col_casos, col_departamento, col_fecha)
+    
+    def crear_features_multiresolucion(self, df: pd.DataFrame, col_casos: str = 'casos',
+                                       col_departamento: str = 'departamento',
+                                       col_fecha: str = 'fecha',
+                                       resoluciones: List[str] = ['4semanas', 'mensual', 'temporada']) -> pd.DataFrame:
+        """
+        Crea características agregadas a 4 semanas, mes y temporada epidemiológica
+        
+        Args:
+            df: DataFrame con datos
+            col_casos: Columna de casos
+            col_departamento: Columna de departamento
+            col_fecha: Columna de fecha
+            resoluciones: Resoluciones a calcular
+            
+        Returns:
+            DataFrame con features multi-resolución
+        """
+        return crear_features_multiresolucion(df, col_casos, col_departamento, col_fecha, resoluciones)
+    
     def crear_todas_features(self, df: pd.DataFrame, col_fecha: str = 'fecha',
-                            col_casos: str = 'casos', col_departamento: str = 'departamento') -> pd.DataFrame:
+                            col_casos: str = 'casos', col_departamento: str = 'departamento',
+                            estadisticas_expanding: bool = False,
+                            estado: EstadisticasIncrementales = None,
+                            alpha: float = 0.1,
+                            ruta_adyacencia: Path = None,
+                            covariables: CovariablesExternas = None,
+                            resoluciones: List[str] = None) -> pd.DataFrame:
         """
         Crea todas las características de una vez
         
@@ -195,6 +307,16 @@ class DengueFeatureEngineer:
             col_fecha: Columna de fecha
             col_casos: Columna de casos
             col_departamento: Columna de departamento
+            estadisticas_expanding: Si True, usa estadísticas point-in-time (columnas
+                casos_*_exp y casos_*_ewm) en lugar de las calculadas sobre todo el
+                histórico (casos_*_region, casos_ratio_media, casos_zscore)
+            estado: Estado de estadísticas expanding de una ejecución anterior; solo se
+                calculan las semanas posteriores a las ya incorporadas (el estado
+                actualizado queda en self.estadisticas_incrementales)
+            alpha: Factor de suavizado de las medias exponenciales (estado nuevo)
+            ruta_adyacencia: CSV de regiones vecinas; si se indica, agrega features espaciales
+            covariables: Covariables externas cargadas; si se indican, agrega sus lags
+            resoluciones: Resoluciones de agregación (p. ej. ['4semanas', 'mensual', 'temporada'])
             
         Returns:
             DataFrame con todas las features
@@ -218,7 +340,31 @@ class DengueFeatureEngineer:
         df_features = self.crear_features_diferencias(df_features, col_casos, col_departamento=col_departamento)
         
         # 5. Features estadísticas
-        df_features = self.crear_features_estadisticas(df_features, col_casos, col_departamento=col_departamento)
+        if estadisticas_expanding:
+            df_features = self.crear_features_estadisticas_expanding(
+                df_features, col_casos, col_departamento=col_departamento, col_fecha=col_fecha,
+                alpha=alpha, estado=estado
+            )
+        else:
+            df_features = self.crear_features_estadisticas(df_features, col_casos, col_departamento=col_departamento)
+        
+        # 6. Features espaciales (opcional)
+        if ruta_adyacencia is not None:
+            df_features = self.crear_features_espaciales(
+                df_features, ruta_adyacencia, col_casos, col_departamento, col_fecha
+            )
+        
+        # 7. Covariables externas (opcional)
+        if covariables is not None and covariables.variables:
+            df_features = covariables.crear_features_covariables(
+                df_features, col_casos=col_casos, col_departamento=col_departamento, col_fecha=col_fecha
+            )
+        
+        # 8. Features multi-resolución (opcional)
+        if resoluciones:
+            df_features = self.crear_features_multiresolucion(
+                df_features, col_casos, col_departamento, col_fecha, resoluciones
+            )
         
         # Eliminar filas con NaN en features críticos (debido a lags y rolling)
         features_iniciales = len(df_features)
@@ -0,0 +1,156 @@
+"""
+Módulo de características multi-resolución
+Agrega el panel semanal a 4 semanas, meses y temporadas epidemiológicas en
+un único paso de remuestreo y devuelve los agregados a las filas semanales
+"""
+
+import pandas as pd
+import numpy as np
+from typing import Dict, List
+import logging
+
+from src.features.panel import PanelSemanal
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Resoluciones soportadas
+RESOLUCIONES = ['semanal', '4semanas', 'mensual', 'temporada']
+
+
+class ResampleadorPanel:
+    """
+    Remuestreo compartido del panel semanal.
+
+    Calcula una sola vez, para cada resolución, el período al que pertenece
+    cada semana y las sumas/conteos por período de todas las series.
+    """
+
+    def __init__(self, resoluciones: List[str] = ['4semanas', 'mensual', 'temporada'],
+                 mes_inicio_temporada: int = 7):
+        """
+        Inicializa el resampleador
+
+        Args:
+            resoluciones: Resoluciones a calcular (ver RESOLUCIONES)
+            mes_inicio_temporada: Mes en que empieza la temporada epidemiológica
+        """
+        desconocidas = set(resoluciones) - set(RESOLUCIONES)
+        if desconocidas:
+            raise ValueError(f"Resoluciones no soportadas: {sorted(desconocidas)}")
+
+        self.resoluciones = resoluciones
+        self.mes_inicio_temporada = mes_inicio_temporada
+
+    def codigos_periodo(self, fechas: pd.DatetimeIndex, resolucion: str) -> np.ndarray:
+        """
+        Asigna a cada semana un código de período creciente
+
+        Args:
+            fechas: Semanas del panel (ordenadas)
+            resolucion: Resolución de agregación
+
+        Returns:
+            Array (n_semanas,) con códigos 0..n_periodos-1
+        """
+        if resolucion == 'semanal':
+            claves = np.arange(len(fechas))
+        elif resolucion == '4semanas':
+            # Bloques fijos de 28 días contados desde la época
+            claves = (fechas.values.astype('datetime64[D]').astype(np.int64) - 4) // 28
+        elif resolucion == 'mensual':
+            claves = fechas.year.values * 12 + fechas.month.values
+        else:
+            # La temporada lleva el año en que empieza
+            claves = fechas.year.values - (fechas.month.values < self.mes_inicio_temporada)
+
+        _, codigos = np.unique(claves, return_inverse=True)
+        return codigos
+
+    def agregar(self, panel: PanelSemanal, incluir_actual: bool = True) -> Dict[str, Dict[str, np.ndarray]]:
+        """
+        Calcula los agregados de todas las resoluciones sobre el panel
+
+        Args:
+            panel: Panel semanal
+            incluir_actual: Si False, el acumulado se detiene en la semana anterior
+                            (0 en la primera semana de cada período), para usarlo
+                            como feature al predecir la semana actual
+
+        Returns:
+            Por resolución, matrices (n_semanas, n_series):
+            'acumulado' (suma del período hasta la semana),
+            'anterior' (total del período anterior completo) y
+            'media_anterior' (media semanal del período anterior)
+        """
+        valores = np.nan_to_num(panel.valores, nan=0.0)
+        observados = (~np.isnan(panel.valores)).astype(float)
+
+        # Sumas acumuladas compartidas por todas las resoluciones
+        ceros = np.zeros((1, valores.shape[1]))
+        suma_acum = np.vstack([ceros, np.cumsum(valores, axis=0)])
+        n_acum = np.vstack([ceros, np.cumsum(observados, axis=0)])
+
+        resultado = {}
+        for resolucion in self.resoluciones:
+            codigos = self.codigos_periodo(panel.fechas, resolucion)
+
+            # Filas de inicio y fin de cada período (las semanas están ordenadas)
+            inicio = np.searchsorted(codigos, np.arange(codigos.max() + 1), side='left')
+            fin = np.searchsorted(codigos, np.arange(codigos.max() + 1), side='right')
+
+            total = suma_acum[fin] - suma_acum[inicio]
+            n = n_acum[fin] - n_acum[inicio]
+            with np.errstate(invalid='ignore', divide='ignore'):
+                media = np.where(n > 0, total / n, np.nan)
+
+            # Período anterior de cada período (el primero no tiene)
+            total_ant = np.vstack([np.full((1, total.shape[1]), np.nan), total[:-1]])
+            media_ant = np.vstack([np.full((1, media.shape[1]), np.nan), media[:-1]])
+
+            # Difusión a semanas por indexado con el código de período
+            hasta = suma_acum[1:] if incluir_actual else suma_acum[:-1]
+            resultado[resolucion] = {
+                'acumulado': hasta - suma_acum[inicio[codigos]],
+                'anterior': total_ant[codigos],
+                'media_anterior': media_ant[codigos],
+            }
+
+        return resultado
+
+
+def crear_features_multiresolucion(df: pd.DataFrame, col_casos: str = 'casos',
+                                   col_departamento: str = 'departamento',
+                                   col_fecha: str = 'fecha',
+                                   resoluciones: List[str] = ['4semanas', 'mensual', 'temporada'],
+                                   mes_inicio_temporada: int = 7) -> pd.DataFrame:
+    """
+    Crea características agregadas a varias resoluciones para cada fila semanal
+
+    Args:
+        df: DataFrame con datos
+        col_casos: Columna de casos
+        col_departamento: Columna de departamento
+        col_fecha: Columna de fecha
+        resoluciones: Resoluciones a calcular
+        mes_inicio_temporada: Mes en que empieza la temporada epidemiológica
+
+    Returns:
+        DataFrame con features casos_<resolucion>_{acumulado,anterior,media_anterior}
+    """
+    logger.info(f"Creando características multi-resolución: {resoluciones}")
+
+    df_copy = df.copy()
+
+    panel = PanelSemanal.desde_dataframe(df_copy, col_casos, col_fecha, col_departamento)
+    idx_t, idx_s = panel.indices_filas(df_copy, col_fecha, col_departamento)
+
+    agregados = ResampleadorPanel(resoluciones, mes_inicio_temporada).agregar(panel)
+
+    for resolucion, matrices in agregados.items():
+        for nombre, matriz in matrices.items():
+            df_copy[f'casos_{resolucion}_{nombre}'] = panel.a_filas(matriz, idx_t, idx_s)
+
+    logger.info(f"✓ Creadas {len(resoluciones) * 3} características multi-resolución")
+
+    return df_copy
@@ -0,0 +1,110 @@
+"""
+Módulo de panel semanal para series de dengue
+Convierte el formato largo (región-semana) en una matriz semanas × series
+para calcular features de todas las series a la vez
+"""
+
+import pandas as pd
+import numpy as np
+from typing import Tuple
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class PanelSemanal:
+    """Matriz semanas × series con los índices para volver al formato largo"""
+
+    def __init__(self, valores: np.ndarray, fechas: pd.DatetimeIndex, series: pd.Index):
+        """
+        Inicializa el panel
+
+        Args:
+            valores: Matriz (n_semanas, n_series) con NaN en semanas sin dato
+            fechas: Fechas de cada fila (ordenadas)
+            series: Nombre de cada columna (región)
+        """
+        self.valores = valores
+        self.fechas = fechas
+        self.series = series
+
+    @classmethod
+    def desde_dataframe(cls, df: pd.DataFrame, col_valor: str = 'casos',
+                        col_fecha: str = 'fecha',
+                        col_departamento: str = 'departamento') -> 'PanelSemanal':
+        """
+        Construye el panel a partir de un DataFrame en formato largo
+
+        Args:
+            df: DataFrame con una fila por región y semana
+            col_valor: Columna con los valores de la serie
+            col_fecha: Columna de fecha
+            col_departamento: Columna de departamento
+
+        Returns:
+            PanelSemanal con las fechas y regiones ordenadas
+        """
+        fechas = pd.to_datetime(df[col_fecha])
+        tabla = (
+            pd.DataFrame({'fecha': fechas.values, 'serie': df[col_departamento].values,
+                          'valor': df[col_valor].values})
+            .groupby(['fecha', 'serie'])['valor'].sum(min_count=1)
+            .unstack('serie')
+            .sort_index()
+        )
+
+        return cls(tabla.to_numpy(dtype=float), pd.DatetimeIndex(tabla.index), tabla.columns)
+
+    def indices_filas(self, df: pd.DataFrame, col_fecha: str = 'fecha',
+                      col_departamento: str = 'departamento') -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Obtiene la posición (semana, serie) de cada fila de un DataFrame largo
+
+        Args:
+            df: DataFrame en formato largo
+            col_fecha: Columna de fecha
+            col_departamento: Columna de departamento
+
+        Returns:
+            Tupla (idx_semana, idx_serie); -1 si la fila no está en el panel
+        """
+        idx_t = self.fechas.get_indexer(pd.to_datetime(df[col_fecha]))
+        idx_s = self.series.get_indexer(df[col_departamento])
+        return idx_t, idx_s
+
+    def a_filas(self, matriz: np.ndarray, idx_t: np.ndarray, idx_s: np.ndarray) -> np.ndarray:
+        """
+        Lleva una matriz con la forma del panel de vuelta a las filas del DataFrame largo
+
+        Args:
+            matriz: Matriz (n_semanas, n_series) alineada con el panel
+            idx_t: Índice de semana de cada fila (de indices_filas)
+            idx_s: Índice de serie de cada fila (de indices_filas)
+
+        Returns:
+            Array con un valor por fila (NaN si la fila no está en el panel)
+        """
+        validos = (idx_t >= 0) & (idx_s >= 0)
+        salida = np.full(len(idx_t), np.nan)
+        salida[validos] = matriz[idx_t[validos], idx_s[validos]]
+        return salida
+
+
+def desplazar(matriz: np.ndarray, lag: int) -> np.ndarray:
+    """
+    Desplaza una matriz del panel lag semanas hacia adelante
+
+    Args:
+        matriz: Matriz (n_semanas, n_series)
+        lag: Número de semanas a desplazar
+
+    Returns:
+        Matriz desplazada con NaN en las primeras lag semanas
+    """
+    salida = np.full(matriz.shape, np.nan)
+    if lag == 0:
+        salida[:] = matriz
+    elif lag < matriz.shape[0]:
+        salida[lag:] = matriz[:matriz.shape[0] - lag]
+    return salida
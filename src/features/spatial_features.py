@@ -0,0 +1,183 @@
+"""
+Módulo de características espaciales para datos de dengue
+Features de regiones vecinas calculadas con una matriz de adyacencia dispersa
+sobre el panel semanal completo
+"""
+
+import pandas as pd
+import numpy as np
+from scipy import sparse
+from typing import List
+import logging
+from pathlib import Path
+
+from src.features.panel import PanelSemanal, desplazar
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def cargar_adyacencia(filepath: Path, series: pd.Index,
+                      col_origen: str = 'region_origen',
+                      col_destino: str = 'region_destino',
+                      col_peso: str = 'peso',
+                      simetrica: bool = True) -> sparse.csr_matrix:
+    """
+    Carga una lista de adyacencia y la convierte en matriz dispersa
+
+    El archivo es un CSV con una fila por par de regiones vecinas y una
+    columna de peso opcional (1.0 si no existe). Un par repetido cuenta una
+    sola vez, con el peso de su primera aparición.
+
+    Args:
+        filepath: Ruta al CSV de adyacencia
+        series: Orden de las regiones en el panel
+        col_origen: Columna con la región de origen
+        col_destino: Columna con la región vecina
+        col_peso: Columna de peso (opcional)
+        simetrica: Si True, cada par se agrega en ambos sentidos
+
+    Returns:
+        Matriz (n_series, n_series) donde la fila i contiene los vecinos de i
+    """
+    logger.info(f"Cargando adyacencia desde: {filepath}")
+
+    df_ady = pd.read_csv(filepath)
+    origen = series.get_indexer(df_ady[col_origen].astype(str).str.upper().str.strip())
+    destino = series.get_indexer(df_ady[col_destino].astype(str).str.upper().str.strip())
+    pesos = df_ady[col_peso].to_numpy(dtype=float) if col_peso in df_ady.columns else np.ones(len(df_ady))
+
+    # Descartar pares con regiones que no están en el panel
+    validos = (origen >= 0) & (destino >= 0) & (origen != destino)
+    descartados = int((~validos).sum())
+    if descartados > 0:
+        logger.warning(f"Pares de adyacencia descartados (región desconocida o bucle): {descartados:,}")
+    origen, destino, pesos = origen[validos], destino[validos], pesos[validos]
+
+    if simetrica:
+        origen, destino = np.concatenate([origen, destino]), np.concatenate([destino, origen])
+        pesos = np.concatenate([pesos, pesos])
+
+    # La matriz dispersa suma los pares repetidos: se deja la primera aparición de
+    # cada (origen, destino), así un sentido listado explícitamente prevalece sobre el simétrico
+    n = len(series)
+    _, primeras = np.unique(origen * n + destino, return_index=True)
+    repetidos = len(origen) - len(primeras)
+    if repetidos > 0:
+        logger.info(f"Pares de adyacencia repetidos ignorados: {repetidos:,}")
+    origen, destino, pesos = origen[primeras], destino[primeras], pesos[primeras]
+
+    adyacencia = sparse.coo_matrix((pesos, (origen, destino)), shape=(n, n)).tocsr()
+
+    logger.info(f"✓ Adyacencia cargada: {n:,} regiones, {adyacencia.nnz:,} enlaces")
+
+    return adyacencia
+
+
+class SpatialFeatureEngineer:
+    """Features de vecinos calculados con productos matriz dispersa × panel"""
+
+    def __init__(self, adyacencia: sparse.csr_matrix, series: pd.Index, normalizar: bool = True):
+        """
+        Inicializa el generador de features espaciales
+
+        Args:
+            adyacencia: Matriz de adyacencia alineada con series
+            series: Orden de las regiones en la matriz
+            normalizar: Si True, usa la media ponderada de los vecinos en lugar de la suma
+        """
+        self.series = series
+        self.normalizar = normalizar
+        self.adyacencia = adyacencia.tocsr()
+
+        if normalizar:
+            grados = np.asarray(self.adyacencia.sum(axis=1)).ravel()
+            inversos = np.divide(1.0, grados, out=np.zeros_like(grados), where=grados > 0)
+            self.adyacencia = sparse.diags(inversos) @ self.adyacencia
+
+    @classmethod
+    def desde_archivo(cls, filepath: Path, series: pd.Index,
+                      normalizar: bool = True) -> 'SpatialFeatureEngineer':
+        """
+        Crea el generador a partir de un CSV de adyacencia
+
+        Args:
+            filepath: Ruta al CSV de adyacencia
+            series: Orden de las regiones en el panel
+            normalizar: Si True, usa la media ponderada de los vecinos
+
+        Returns:
+            SpatialFeatureEngineer listo para usar
+        """
+        return cls(cargar_adyacencia(filepath, series), series, normalizar=normalizar)
+
+    def casos_vecinos(self, panel: PanelSemanal) -> np.ndarray:
+        """
+        Calcula los casos ponderados de los vecinos de cada serie en cada semana
+
+        Args:
+            panel: Panel semanal alineado con las series de la adyacencia
+
+        Returns:
+            Matriz (n_semanas, n_series)
+        """
+        # Semanas sin dato cuentan como 0 casos en los vecinos
+        valores = np.nan_to_num(panel.valores, nan=0.0)
+        return np.asarray((self.adyacencia @ valores.T).T)
+
+    @staticmethod
+    def _suma_movil(matriz: np.ndarray, window: int) -> np.ndarray:
+        """Suma móvil sobre el eje temporal (min_periods=1) con sumas acumuladas"""
+        acumulada = np.vstack([np.zeros((1, matriz.shape[1])), np.cumsum(matriz, axis=0)])
+        fin = np.arange(1, matriz.shape[0] + 1)
+        inicio = np.maximum(fin - window, 0)
+        return acumulada[fin] - acumulada[inicio]
+
+    def crear_features_espaciales(self, df: pd.DataFrame, col_casos: str = 'casos',
+                                  col_departamento: str = 'departamento',
+                                  col_fecha: str = 'fecha',
+                                  lags: List[int] = [1, 2, 4],
+                                  windows: List[int] = [4, 8]) -> pd.DataFrame:
+        """
+        Crea lags y sumas móviles de los casos de las regiones vecinas
+
+        Con normalizar, los casos de los vecinos son su media ponderada y las
+        columnas de ventana (suma móvil de esa media) se llaman
+        casos_vecinos_media_<window> en lugar de casos_vecinos_suma_<window>.
+
+        Args:
+            df: DataFrame con datos
+            col_casos: Columna de casos
+            col_departamento: Columna de departamento
+            col_fecha: Columna de fecha
+            lags: Lags de los casos vecinos
+            windows: Ventanas de suma móvil de los casos vecinos
+
+        Returns:
+            DataFrame con features espaciales
+        """
+        logger.info(f"Creando características espaciales: lags={lags}, windows={windows}")
+
+        df_copy = df.copy()
+
+        panel = PanelSemanal.desde_dataframe(df_copy, col_casos, col_fecha, col_departamento)
+        # Reordenar las columnas del panel según la adyacencia
+        pos = panel.series.get_indexer(self.series)
+        valores = np.full((len(panel.fechas), len(self.series)), np.nan)
+        valores[:, pos >= 0] = panel.valores[:, pos[pos >= 0]]
+        panel = PanelSemanal(valores, panel.fechas, self.series)
+
+        vecinos = self.casos_vecinos(panel)
+        idx_t, idx_s = panel.indices_filas(df_copy, col_fecha, col_departamento)
+
+        for lag in lags:
+            df_copy[f'casos_vecinos_lag_{lag}'] = panel.a_filas(desplazar(vecinos, lag), idx_t, idx_s)
+
+        agregado = 'media' if self.normalizar else 'suma'
+        for window in windows:
+            df_copy[f'casos_vecinos_{agregado}_{window}'] = panel.a_filas(self._suma_movil(vecinos, window),
+                                                                        idx_t, idx_s)
+
+        logger.info(f"✓ Creadas {len(lags) + len(windows)} características espaciales")
+
+        return df_copy
@@ -8,10 +8,49 @@ from pathlib import Path
 ROOT_DIR = Path(__file__).parent.parent.parent
 sys.path.append(str(ROOT_DIR))
 
-from config import PROCESSED_DATA_DIR, REGIONES_OBJETIVO
+from config import PROCESSED_DATA_DIR, REGIONES_OBJETIVO, ANOMALY_CONFIG
 from src.models.anomaly_detection import AnomalyDetector
+from src.models.global_anomaly import GlobalAnomalyDetector
+from src.models.umbrales import barrido_umbrales, etiqueta_referencia_brote
 import pandas as pd
 
+def entrenar_por_region(df: pd.DataFrame, feature_cols: list, models_dir: Path):
+    """Entrena y aplica los modelos de cada región (modo por defecto); devuelve resultados y umbrales"""
+    
+    # Inicializar detector
+    detector = AnomalyDetector(
+        contamination=ANOMALY_CONFIG['contamination'],
+        reduccion=ANOMALY_CONFIG['reduccion'],
+        reduccion_params=ANOMALY_CONFIG['reduccion_params'],
+        ocsvm_backend=ANOMALY_CONFIG['ocsvm_backend'],
+        ocsvm_componentes=ANOMALY_CONFIG['ocsvm_componentes'],
+        lof_indice=ANOMALY_CONFIG['lof_indice'],
+        contaminacion_umbral=ANOMALY_CONFIG['contaminacion_umbral'],
+        contaminacion_por_region=ANOMALY_CONFIG['contaminacion_por_region']
+    )
+    
+    # Entrenar modelos para todas las regiones
+    detector.entrenar_todos_modelos(df, feature_cols, REGIONES_OBJETIVO,
+                                    n_workers=ANOMALY_CONFIG['n_workers'])
+    
+    # Tiempo de cada tarea región × algoritmo
+    print("\nTiempos de entrenamiento (segundos):")
+    print(detector.tiempos_entrenamiento.pivot(index='region', columns='modelo', values='segundos').round(2))
+    
+    # Guardar modelos
+    detector.guardar_modelos(models_dir, formato=ANOMALY_CONFIG['formato_modelos'])
+    
+    # Detectar anomalías en datos de entrenamiento
+    print("\n" + "=" * 70)
+    print("DETECTANDO ANOMALÍAS EN DATOS DE ENTRENAMIENTO")
+    print("=" * 70)
+    
+    df_resultados = detector.detectar_anomalias_lote(df, feature_cols, REGIONES_OBJETIVO,
+                                                     n_workers=ANOMALY_CONFIG['n_workers'],
+                                                     todos_scores=True)
+    
+    return df_resultados, detector.umbrales(ANOMALY_CONFIG['barrido_contaminacion'])
+
 def main():
     """Entrena los modelos de detección de anomalías"""
     
@@ -34,26 +73,29 @@ def main():
     print(f"\nFeatures seleccionadas: {len(feature_cols)}")
     print(f"Primeras 10 features: {feature_cols[:10]}")
     
-    # Inicializar detector
-    detector = AnomalyDetector(contamination=0.05)  # 5% de anomalías esperadas
-    
-    # Entrenar modelos para todas las regiones
-    detector.entrenar_todos_modelos(df, feature_cols, REGIONES_OBJETIVO)
-    
-    # Guardar modelos
     models_dir = ROOT_DIR / 'models' / 'saved'
-    detector.guardar_modelos(models_dir)
-    
-    # Detectar anomalías en datos de entrenamiento
-    print("\n" + "=" * 70)
-    print("DETECTANDO ANOMALÍAS EN DATOS DE ENTRENAMIENTO")
-    print("=" * 70)
     
-    resultados = []
-    for region in REGIONES_OBJETIVO:
-        df_anomalias = detector.detectar_anomalias(df, feature_cols, region)
-        resultados.append(df_anomalias)
+    if ANOMALY_CONFIG['modo'] == 'global':
+        # Un único modelo para todas las series con umbrales por región
+        detector = GlobalAnomalyDetector(
+            contamination=ANOMALY_CONFIG['contamination'],
+            usar_ocsvm=ANOMALY_CONFIG['global_ocsvm'],
+            ocsvm_componentes=ANOMALY_CONFIG['ocsvm_componentes'],
+            contaminacion_umbral=ANOMALY_CONFIG['contaminacion_umbral']
+        )
+        detector.entrenar(df, feature_cols, REGIONES_OBJETIVO)
+        detector.guardar_modelos(models_dir)
+        
+        print("\n" + "=" * 70)
+        print("DETECTANDO ANOMALÍAS EN DATOS DE ENTRENAMIENTO")
+        print("=" * 70)
         
+        df_resultados = detector.detectar_anomalias(df[df['departamento'].isin(REGIONES_OBJETIVO)])
+        umbrales = detector.umbrales_contaminacion(ANOMALY_CONFIG['barrido_contaminacion'])
+    else:
+        df_resultados, umbrales = entrenar_por_region(df, feature_cols, models_dir)
+    
+    for region, df_anomalias in df_resultados.groupby('departamento', sort=False):
         n_anomalias = df_anomalias['anomalia_consenso'].sum()
         pct_anomalias = (n_anomalias / len(df_anomalias)) * 100
         
@@ -62,15 +104,28 @@ def main():
         print(f"  Anomalías detectadas: {n_anomalias:,} ({pct_anomalias:.2f}%)")
     
     # Guardar resultados
-    df_resultados = pd.concat(resultados, ignore_index=True)
     output_path = PROCESSED_DATA_DIR / 'dengue_anomalias.csv'
     df_resultados.to_csv(output_path, index=False)
     
+    # Barrido de contaminación sobre los scores (sin reentrenar)
+    print("\n" + "=" * 70)
+    print("BARRIDO DE CONTAMINACIÓN")
+    print("=" * 70)
+    
+    df_resultados['brote_referencia'] = etiqueta_referencia_brote(df_resultados)
+    barrido = barrido_umbrales(df_resultados, umbrales, col_referencia='brote_referencia')
+    print("\n" + barrido[barrido['modelo'] == 'consenso'].round(3).to_string(index=False))
+    
+    barrido_path = PROCESSED_DATA_DIR / 'barrido_contaminacion.csv'
+    barrido.to_csv(barrido_path, index=False)
+    umbrales.to_csv(PROCESSED_DATA_DIR / 'umbrales_anomalias.csv', index=False)
+    
     print("\n" + "=" * 70)
     print("✓ ENTRENAMIENTO COMPLETADO")
     print("=" * 70)
     print(f"Modelos guardados en: {models_dir}")
     print(f"Resultados guardados en: {output_path}")
+    print(f"Barrido de contaminación: {barrido_path}")
     print("=" * 70)
 
 if __name__ == "__main__":
@@ -8,8 +8,22 @@ from pathlib import Path
 ROOT_DIR = Path(__file__).parent.parent.parent
 sys.path.append(str(ROOT_DIR))
 
-from config import PROCESSED_DATA_DIR, REGIONES_OBJETIVO
+from config import (PROCESSED_DATA_DIR, REGIONES_OBJETIVO, DETECTORES_EPI_CONFIG,
+                    CENTROIDES_REGIONES_PATH, SCAN_CONFIG, PRONOSTICOS_ARCHIVO_PATH,
+                    RESIDUOS_PRONOSTICO_CONFIG, ALERTAS_INCREMENTALES_CONFIG, ESTADO_ALERTAS_PATH,
+                    EPISODIOS_CONFIG, EPISODIOS_ALERTA_PATH, ALMACEN_ALERTAS_CONFIG,
+                    ALMACEN_ALERTAS_PATH, DESPACHO_ALERTAS_CONFIG, DESPACHO_REGISTRO_PATH,
+                    UMBRALES_ALERTA, UMBRALES_ALERTA_PREDICTIVA, REGLAS_ALERTA_PATH, FEATURES_CONFIG)
 from src.models.alert_system import AlertSystem
+from src.models.alertas_incrementales import EstadoAlertas
+from src.models.almacen_alertas import AlmacenAlertas, COLUMNAS_SEMANA_EPI
+from src.models.despacho_alertas import DespachadorAlertas
+from src.models.motor_reglas import MotorReglas, reglas_desde_umbrales
+from src.models.episodios_alerta import (construir_episodios, actualizar_episodios, episodios_activos,
+                                        resumen_episodios, NIVELES_ALERTA)
+from src.models.detectores_epidemiologicos import DetectoresEpidemiologicos
+from src.models.scan_espacio_temporal import ScanEspacioTemporal
+from src.models.residuos_pronostico import DetectorResiduosPronostico
 import pandas as pd
 
 def main():
@@ -26,17 +40,140 @@ def main():
     df = pd.read_csv(input_path)
     print(f"✓ Datos cargados: {len(df):,} registros")
     
-    # Inicializar sistema de alertas
-    alert_system = AlertSystem()
+    # Inicializar sistema de alertas (umbrales de config o del archivo de reglas)
+    motor_reglas = MotorReglas(reglas_desde_umbrales(UMBRALES_ALERTA, UMBRALES_ALERTA_PREDICTIVA),
+                               REGLAS_ALERTA_PATH)
+    alert_system = AlertSystem(umbrales=UMBRALES_ALERTA, motor_reglas=motor_reglas)
     
-    # Generar alertas
-    print("\nGenerando alertas...")
-    df_alertas = alert_system.generar_alertas(df)
+    # Casos acumulados del período y total del período anterior (4 semanas, mes, temporada).
+    # Se calculan sobre toda la historia para que también valgan en modo incremental
+    df = alert_system.agregar_contexto_multiresolucion(df, resoluciones=FEATURES_CONFIG['resoluciones'])
     
-    # Guardar alertas completas
+    # Almacén embebido: upserts de las semanas recalculadas en lugar de reescribir archivos
+    almacen = AlmacenAlertas(ALMACEN_ALERTAS_PATH) if ALMACEN_ALERTAS_CONFIG['activar'] else None
+    exportar_csv = almacen is None or ALMACEN_ALERTAS_CONFIG['exportar_csv']
+    
+    # Generar alertas (solo semanas nuevas o revisadas si hay estado previo)
     output_path = PROCESSED_DATA_DIR / 'dengue_alertas.csv'
-    df_alertas.to_csv(output_path, index=False)
-    print(f"✓ Alertas guardadas en: {output_path}")
+    incremental = ALERTAS_INCREMENTALES_CONFIG['activar']
+    df_tabla = None
+    
+    if incremental:
+        estado = None
+        if ESTADO_ALERTAS_PATH.exists():
+            if almacen is not None and almacen.existe('alertas'):
+                df_tabla = almacen.consultar('alertas').drop(columns=COLUMNAS_SEMANA_EPI)
+            elif output_path.exists():
+                df_tabla = pd.read_csv(output_path)
+            if df_tabla is not None:
+                estado = EstadoAlertas.cargar(ESTADO_ALERTAS_PATH)
+                print(f"\nEstado incremental cargado desde: {ESTADO_ALERTAS_PATH}")
+        
+        print("\nGenerando alertas incrementales...")
+        if estado is not None:
+            try:
+                df_alertas = alert_system.generar_alertas_incrementales(df, estado)
+            except ValueError as e:
+                print(f"  {e}")
+                estado = None
+        
+        # Sin estado (o revisión demasiado antigua, o reglas cambiadas): toda la historia desde un estado vacío
+        if estado is None:
+            estado = EstadoAlertas(ventana=ALERTAS_INCREMENTALES_CONFIG['ventana_historica'],
+                                   semanas_revision=ALERTAS_INCREMENTALES_CONFIG['semanas_revision'])
+            df_tabla = None
+            df_alertas = alert_system.generar_alertas_incrementales(df, estado)
+    else:
+        print("\nGenerando alertas...")
+        df_alertas = alert_system.generar_alertas(df)
+    
+    # Detectores epidemiológicos clásicos sobre la serie completa de casos
+    if DETECTORES_EPI_CONFIG['activar']:
+        print("\nAplicando detectores EARS / CUSUM / Farrington...")
+        features_path = PROCESSED_DATA_DIR / 'dengue_features.csv'
+        df_casos = pd.read_csv(features_path, usecols=['departamento', 'fecha', 'casos']) \
+            if features_path.exists() else df[['departamento', 'fecha', 'casos']]
+        
+        params = {k: v for k, v in DETECTORES_EPI_CONFIG.items() if k != 'activar'}
+        df_epi = DetectoresEpidemiologicos(**params).detectar_anomalias(df_casos)
+        df_alertas = alert_system.incorporar_detectores_epidemiologicos(df_alertas, df_epi)
+    
+    # Residuos frente a los pronósticos ya guardados (sin ejecutar modelos)
+    if PRONOSTICOS_ARCHIVO_PATH.exists():
+        print("\nComparando con pronósticos archivados...")
+        params = {k: v for k, v in RESIDUOS_PRONOSTICO_CONFIG.items() if k != 'horizonte_archivo'}
+        df_residuos = DetectorResiduosPronostico(**params).detectar_anomalias(
+            df[['departamento', 'fecha', 'casos']], pd.read_csv(PRONOSTICOS_ARCHIVO_PATH)
+        )
+        cols_residuo = ['casos_pronosticados', 'z_residuo', 'excede_intervalo', 'anomalia_residuo']
+        df_alertas = df_alertas.merge(df_residuos[['departamento', 'fecha'] + cols_residuo],
+                                      on=['departamento', 'fecha'], how='left')
+    
+    # Guardar alertas completas (upsert de las semanas recalculadas en modo incremental)
+    df_nuevas = df_alertas
+    if incremental:
+        estado.registrar_niveles(df_alertas)
+        if df_tabla is not None:
+            print(f"\n✓ Semanas recalculadas: {len(df_alertas):,}")
+            df_alertas = alert_system.actualizar_tabla_alertas(df_tabla, df_alertas)
+    
+    if almacen is not None:
+        alert_system.guardar_alertas(df_nuevas, almacen)
+        print(f"✓ Alertas guardadas en: {ALMACEN_ALERTAS_PATH}")
+    if exportar_csv:
+        alert_system.exportar_alertas_csv(df_alertas, output_path)
+        print(f"✓ Alertas guardadas en: {output_path}")
+    
+    # Episodios de alerta: solo se actualizan con las semanas recalculadas
+    df_episodios_previos = None
+    if incremental and df_tabla is not None:
+        if almacen is not None and almacen.existe('episodios'):
+            df_episodios_previos = almacen.consultar('episodios')
+        elif EPISODIOS_ALERTA_PATH.exists():
+            df_episodios_previos = pd.read_csv(EPISODIOS_ALERTA_PATH, parse_dates=['fecha_inicio', 'fecha_fin'])
+    
+    if df_episodios_previos is not None:
+        df_episodios = actualizar_episodios(df_episodios_previos, df_nuevas, df_alertas,
+                                            nivel_minimo=EPISODIOS_CONFIG['nivel_minimo'])
+        regiones_episodios = df_nuevas['departamento'].unique()
+    else:
+        df_episodios = construir_episodios(df_alertas, nivel_minimo=EPISODIOS_CONFIG['nivel_minimo'])
+        regiones_episodios = None
+    
+    if almacen is not None:
+        almacen.guardar_episodios(df_episodios, regiones=regiones_episodios)
+    if exportar_csv:
+        df_episodios.to_csv(EPISODIOS_ALERTA_PATH, index=False)
+    print(f"✓ {len(df_episodios):,} episodios ({len(df_alertas):,} semanas) guardados")
+    
+    if incremental:
+        estado.guardar(ESTADO_ALERTAS_PATH)
+    
+    # Notificar las semanas nuevas o escaladas (el registro evita repetir notificaciones)
+    if DESPACHO_ALERTAS_CONFIG['activar']:
+        print("\nDespachando alertas nuevas o escaladas...")
+        despachador = DespachadorAlertas.desde_config(DESPACHO_ALERTAS_CONFIG, DESPACHO_REGISTRO_PATH)
+        despachos = despachador.despachar(df_nuevas, tipo='semanal',
+                                          nivel_minimo=DESPACHO_ALERTAS_CONFIG['nivel_minimo'],
+                                          ultimas_semanas=DESPACHO_ALERTAS_CONFIG['ultimas_semanas'])
+        if len(despachos) > 0:
+            print(despachos.groupby(['destino', 'estado'])['alertas'].sum().to_string())
+    
+    # Clusters espacio-temporales (requiere centroides de las regiones)
+    if CENTROIDES_REGIONES_PATH.exists():
+        print("\nBuscando clusters espacio-temporales...")
+        df_panel = df_casos if DETECTORES_EPI_CONFIG['activar'] else df
+        params = {k: SCAN_CONFIG[k] for k in ['max_vecinos', 'max_semanas', 'max_fraccion_casos',
+                                              'replicas', 'n_workers']}
+        scan = ScanEspacioTemporal.desde_archivo(CENTROIDES_REGIONES_PATH,
+                                                 pd.Index(df_panel['departamento'].unique()), **params)
+        df_clusters = scan.detectar_clusters(df_panel, semanas_estudio=SCAN_CONFIG['semanas_estudio'],
+                                             max_clusters=SCAN_CONFIG['max_clusters'])
+        alertas_clusters = alert_system.alertas_desde_clusters(df_clusters, alpha=SCAN_CONFIG['alpha'])
+        
+        clusters_path = PROCESSED_DATA_DIR / 'alertas_clusters.csv'
+        alertas_clusters.to_csv(clusters_path, index=False)
+        print(f"✓ {len(alertas_clusters)} alertas por cluster guardadas en: {clusters_path}")
     
     # Generar reporte por región
     print("\n" + "=" * 70)
@@ -47,16 +184,35 @@ def main():
     print("\n" + reporte.to_string(index=False))
     
     # Guardar reporte
-    reporte_path = PROCESSED_DATA_DIR / 'reporte_alertas.csv'
-    reporte.to_csv(reporte_path, index=False)
-    print(f"\n✓ Reporte guardado en: {reporte_path}")
+    if exportar_csv:
+        reporte_path = PROCESSED_DATA_DIR / 'reporte_alertas.csv'
+        reporte.to_csv(reporte_path, index=False)
+        print(f"\n✓ Reporte guardado en: {reporte_path}")
+    
+    # Reporte por región y episodios en curso a partir de los episodios
+    reporte_episodios = resumen_episodios(df_episodios)
+    reporte_episodios_path = PROCESSED_DATA_DIR / 'reporte_episodios.csv'
+    if exportar_csv:
+        reporte_episodios.to_csv(reporte_episodios_path, index=False)
+    
+    en_curso = episodios_activos(df_episodios, niveles=['medio', 'alto', 'critico'])
+    print(f"\nEpisodios de alerta en curso: {len(en_curso)}")
+    if len(en_curso) > 0:
+        cols_mostrar = ['departamento', 'fecha_inicio', 'fecha_fin', 'semanas', 'nivel_pico',
+                        'z_score_pico', 'casos_totales']
+        print(en_curso[cols_mostrar].head(10).to_string(index=False))
+    if exportar_csv:
+        print(f"\n✓ Reporte de episodios guardado en: {reporte_episodios_path}")
     
     # Filtrar alertas activas (últimas 4 semanas)
     print("\n" + "=" * 70)
     print("ALERTAS ACTIVAS (ÚLTIMAS 4 SEMANAS)")
     print("=" * 70)
     
-    alertas_activas = alert_system.filtrar_alertas_activas(df_alertas)
+    if almacen is not None:
+        alertas_activas = almacen.alertas_activas()
+    else:
+        alertas_activas = alert_system.filtrar_alertas_activas(df_alertas)
     
     if len(alertas_activas) > 0:
         print(f"\n✓ {len(alertas_activas)} alertas activas encontradas\n")
@@ -67,9 +223,10 @@ def main():
         print(alertas_activas[cols_mostrar].head(10).to_string(index=False))
         
         # Guardar alertas activas
-        activas_path = PROCESSED_DATA_DIR / 'alertas_activas.csv'
-        alertas_activas.to_csv(activas_path, index=False)
-        print(f"\n✓ Alertas activas guardadas en: {activas_path}")
+        if exportar_csv:
+            activas_path = PROCESSED_DATA_DIR / 'alertas_activas.csv'
+            alertas_activas.to_csv(activas_path, index=False)
+            print(f"\n✓ Alertas activas guardadas en: {activas_path}")
     else:
         print("\n✓ No hay alertas activas en las últimas 4 semanas")
     
@@ -78,8 +235,10 @@ def main():
     print("DISTRIBUCIÓN DE ALERTAS POR NIVEL DE RIESGO")
     print("=" * 70)
     
-    distribucion = df_alertas['nivel_riesgo'].value_counts().sort_index()
-    total = len(df_alertas)
+    distribucion = df_episodios[[f'semanas_{nivel}' for nivel in NIVELES_ALERTA]].sum()
+    distribucion.index = NIVELES_ALERTA
+    distribucion = distribucion[distribucion > 0].sort_index()
+    total = int(distribucion.sum())
     
     for nivel, count in distribucion.items():
         porcentaje = (count / total) * 100
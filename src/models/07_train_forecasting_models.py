@@ -18,6 +18,7 @@ from config import (
     FORECASTING_MODELS_DIR,
     REGIONES_OBJETIVO,
     FORECASTING_CONFIG,
+    FEATURES_CONFIG,
     ENSEMBLE_WEIGHTS
 )
 
@@ -107,7 +108,7 @@ def train_models_for_region(df_region: pd.DataFrame, region_name: str):
     # 4. XGBoost
     print(f"\n[4/4] Entrenando XGBoost...")
     try:
-        xgboost = XGBoostForecaster(lookback=52)
+        xgboost = XGBoostForecaster(lookback=52, resoluciones=FEATURES_CONFIG['resoluciones'])
         xgboost.fit(df_region, target_col='casos')
         models['xgboost'] = xgboost
         print("✓ XGBoost entrenado exitosamente")
@@ -18,13 +18,16 @@ from config import (
     FORECASTING_MODELS_DIR,
     REGIONES_OBJETIVO,
     FORECASTING_CONFIG,
-    ENSEMBLE_WEIGHTS
+    ENSEMBLE_WEIGHTS,
+    PRONOSTICOS_ARCHIVO_PATH,
+    RESIDUOS_PRONOSTICO_CONFIG
 )
 
 from src.models.forecasting_models import (
     BaseForecaster,
     EnsembleForecaster
 )
+from src.models.residuos_pronostico import archivar_pronosticos
 
 
 def load_model(region: str, model_name: str) -> BaseForecaster:
@@ -165,6 +168,10 @@ def main():
     output_file = output_dir / 'predicciones_2026_2028.csv'
     df_all_predictions.to_csv(output_file, index=False)
     
+    # Archivar los primeros pasos para la vigilancia por residuos de pronóstico
+    archivar_pronosticos(df_all_predictions, PRONOSTICOS_ARCHIVO_PATH,
+                         horizonte_max=RESIDUOS_PRONOSTICO_CONFIG['horizonte_archivo'])
+    
     print("\n" + "="*60)
     print("RESUMEN DE PREDICCIONES")
     print("="*60)
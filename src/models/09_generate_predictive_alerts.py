@@ -16,10 +16,21 @@ from config import (
     PROCESSED_DATA_DIR,
     PREDICTIONS_DIR,
     UMBRALES_ALERTA_PREDICTIVA,
-    COLORES_ALERTA_PREDICTIVA
+    COLORES_ALERTA_PREDICTIVA,
+    ALMACEN_ALERTAS_CONFIG,
+    ALMACEN_ALERTAS_PATH,
+    DESPACHO_ALERTAS_CONFIG,
+    DESPACHO_REGISTRO_PATH,
+    UMBRALES_ALERTA,
+    REGLAS_ALERTA_PATH,
+    ALERTAS_PROBABILISTICAS_CONFIG,
+    MUESTRAS_PRONOSTICO_PATH
 )
 
 from src.models.alert_system import AlertSystem
+from src.models.almacen_alertas import AlmacenAlertas
+from src.models.despacho_alertas import DespachadorAlertas
+from src.models.motor_reglas import MotorReglas, reglas_desde_umbrales
 
 
 def main():
@@ -61,21 +72,53 @@ def main():
     
     # Generar alertas predictivas
     print("\n[3/3] Generando alertas predictivas...")
-    alert_system = AlertSystem(umbrales=UMBRALES_ALERTA_PREDICTIVA)
-    
-    df_alertas_predictivas = alert_system.generar_alertas_predictivas(
-        df_predicciones=df_predicciones,
-        df_historico=df_historico,
-        col_casos_pred='casos_predichos_ensamble',
-        col_region='region',
-        col_fecha='fecha'
-    )
+    config_prob = ALERTAS_PROBABILISTICAS_CONFIG
+    motor_reglas = MotorReglas(reglas_desde_umbrales(UMBRALES_ALERTA, UMBRALES_ALERTA_PREDICTIVA,
+                                                     config_prob['probabilidad_minima']),
+                               REGLAS_ALERTA_PATH)
+    alert_system = AlertSystem(umbrales=UMBRALES_ALERTA, umbrales_predictivos=UMBRALES_ALERTA_PREDICTIVA,
+                               motor_reglas=motor_reglas)
+    
+    if config_prob['activar']:
+        # Trayectorias o cuantiles simulados si existen; si no, intervalos del ensamble
+        distribucion = {}
+        if MUESTRAS_PRONOSTICO_PATH.exists():
+            with np.load(MUESTRAS_PRONOSTICO_PATH, allow_pickle=False) as archivo:
+                distribucion = {clave: archivo[clave] for clave in archivo.files}
+            print(f"✓ Distribución pronosticada cargada desde: {MUESTRAS_PRONOSTICO_PATH}")
+        
+        df_alertas_predictivas = alert_system.generar_alertas_probabilisticas(
+            df_predicciones=df_predicciones,
+            df_historico=df_historico,
+            **distribucion,
+            percentil=config_prob['percentil_umbral'],
+            desviaciones=config_prob['desviaciones_umbral'],
+            series_por_bloque=config_prob['series_por_bloque'],
+            col_casos_pred='casos_predichos_ensamble',
+            col_region='region',
+            col_fecha='fecha'
+        )
+    else:
+        df_alertas_predictivas = alert_system.generar_alertas_predictivas(
+            df_predicciones=df_predicciones,
+            df_historico=df_historico,
+            col_casos_pred='casos_predichos_ensamble',
+            col_region='region',
+            col_fecha='fecha'
+        )
+    
+    # Guardar alertas predictivas (cada ejecución sustituye el pronóstico anterior)
+    almacen = AlmacenAlertas(ALMACEN_ALERTAS_PATH) if ALMACEN_ALERTAS_CONFIG['activar'] else None
+    exportar_csv = almacen is None or ALMACEN_ALERTAS_CONFIG['exportar_csv']
+    
+    if almacen is not None:
+        alert_system.guardar_alertas(df_alertas_predictivas, almacen, predictivas=True, reemplazar=True)
+        print(f"\n✓ Alertas predictivas guardadas en: {ALMACEN_ALERTAS_PATH}")
     
-    # Guardar alertas predictivas
     output_file = PREDICTIONS_DIR / 'alertas_predictivas.csv'
-    df_alertas_predictivas.to_csv(output_file, index=False)
-    
-    print(f"\n✓ Alertas predictivas guardadas en: {output_file}")
+    if exportar_csv:
+        df_alertas_predictivas.to_csv(output_file, index=False)
+        print(f"\n✓ Alertas predictivas guardadas en: {output_file}")
     
     # Filtrar alertas críticas (próximos 12 meses)
     print("\n" + "="*60)
@@ -98,6 +141,8 @@ def main():
             print(f"   Nivel: {row['nivel_riesgo_predictivo'].upper()}")
             print(f"   Casos predichos: {row['casos_predichos']:.0f}")
             print(f"   Incremento esperado: {row['porcentaje_incremento']:.1f}%")
+            if 'probabilidad_excedencia' in row:
+                print(f"   Probabilidad de superar el umbral epidémico: {row['probabilidad_excedencia']:.0%}")
             
             # Obtener recomendaciones
             recomendaciones = alert_system.generar_recomendaciones_predictivas(
@@ -106,13 +151,22 @@ def main():
             print(f"   Prioridad: {recomendaciones['prioridad']}")
             print(f"   Tiempo de anticipación: {recomendaciones['tiempo_anticipacion']}")
         
-        # Guardar alertas críticas
+        # Guardar alertas críticas (con almacén se consultan con alertas_predictivas_criticas)
         output_criticas = PREDICTIONS_DIR / 'alertas_criticas_12_meses.csv'
-        df_criticas.to_csv(output_criticas, index=False)
-        print(f"\n✓ Alertas críticas guardadas en: {output_criticas}")
+        if exportar_csv:
+            df_criticas.to_csv(output_criticas, index=False)
+            print(f"\n✓ Alertas críticas guardadas en: {output_criticas}")
     else:
         print("\n✓ No se detectaron alertas críticas para los próximos 12 meses")
     
+    # Notificar alertas predictivas críticas nuevas o escaladas
+    if DESPACHO_ALERTAS_CONFIG['activar'] and len(df_criticas) > 0:
+        despachador = DespachadorAlertas.desde_config(DESPACHO_ALERTAS_CONFIG, DESPACHO_REGISTRO_PATH)
+        despachador.despachar(df_criticas, tipo='predictiva',
+                              nivel_minimo=DESPACHO_ALERTAS_CONFIG['nivel_minimo_predictivo'],
+                              col_region='region', col_nivel='nivel_riesgo_predictivo',
+                              col_casos='casos_predichos')
+    
     # Resumen por región
     print("\n" + "="*60)
     print("RESUMEN POR REGIÓN")
@@ -142,9 +196,12 @@ def main():
     print("PROCESO COMPLETADO EXITOSAMENTE")
     print("="*60)
     print(f"\nArchivos generados:")
-    print(f"  1. {output_file}")
-    if len(df_criticas) > 0:
-        print(f"  2. {output_criticas}")
+    if almacen is not None:
+        print(f"  - {ALMACEN_ALERTAS_PATH}")
+    if exportar_csv:
+        print(f"  - {output_file}")
+        if len(df_criticas) > 0:
+            print(f"  - {output_criticas}")
     
 
 if __name__ == "__main__":
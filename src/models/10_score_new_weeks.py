@@ -0,0 +1,68 @@
+"""
+Script para puntuar semanas epidemiológicas nuevas con los modelos ya entrenados
+
+Uso:
+    python src/models/10_score_new_weeks.py [archivo_features_nuevas.csv]
+    python src/models/10_score_new_weeks.py --servir   (worker JSON por stdin/stdout)
+"""
+
+import sys
+import time
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).parent.parent.parent
+sys.path.append(str(ROOT_DIR))
+
+from config import PROCESSED_DATA_DIR, ANOMALY_CONFIG
+from src.models.scoring import ServicioScoring, actualizar_anomalias
+import pandas as pd
+
+def main():
+    """Puntúa las filas de features nuevas sin reentrenar"""
+
+    models_dir = ROOT_DIR / 'models' / 'saved'
+    # Las semanas puntuadas van a la tabla de anomalías que consume 06_generate_alerts.py
+    output_path = PROCESSED_DATA_DIR / 'dengue_anomalias.csv'
+    servicio = ServicioScoring(
+        models_dir,
+        modo=ANOMALY_CONFIG['modo'],
+        formato=ANOMALY_CONFIG['formato_modelos'],
+        memoria_max_mb=ANOMALY_CONFIG['memoria_max_mb'],
+        contaminacion_umbral=ANOMALY_CONFIG['contaminacion_umbral'],
+        contaminacion_por_region=ANOMALY_CONFIG['contaminacion_por_region'],
+        archivo_anomalias=output_path
+    )
+
+    # Worker de larga duración: micro-lotes JSON por stdin
+    if '--servir' in sys.argv[1:]:
+        servicio.servir()
+        return
+
+    print("=" * 70)
+    print("SCORING DE SEMANAS NUEVAS - SIDET")
+    print("=" * 70)
+
+    argumentos = [a for a in sys.argv[1:] if not a.startswith('--')]
+    input_path = Path(argumentos[0]) if argumentos else PROCESSED_DATA_DIR / 'dengue_features_nuevas.csv'
+    print(f"\nCargando datos desde: {input_path}")
+
+    df = pd.read_csv(input_path)
+    print(f"✓ Datos cargados: {len(df):,} registros de {df['departamento'].nunique()} regiones")
+
+    inicio = time.perf_counter()
+    df_resultados = servicio.puntuar(df)
+    print(f"✓ Puntuadas {len(df_resultados):,} filas en {(time.perf_counter() - inicio) * 1000:.1f} ms")
+    print(f"  Anomalías (consenso): {df_resultados['anomalia_consenso'].sum():,}")
+
+    df_tabla = actualizar_anomalias(df_resultados, output_path)
+    print(f"✓ Tabla de anomalías: {len(df_tabla):,} registros")
+
+    print("\n" + "=" * 70)
+    print("✓ SCORING COMPLETADO")
+    print("=" * 70)
+    print(f"Resultados actualizados en: {output_path}")
+    print("Siguiente paso: python src/models/06_generate_alerts.py")
+    print("=" * 70)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+Script para el mantenimiento semanal de los modelos de anomalías
+Refresca los Isolation Forest con la ventana reciente (warm start) y solo
+reentrena desde cero las regiones con deriva o reentrenamiento vencido
+"""
+
+import sys
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).parent.parent.parent
+sys.path.append(str(ROOT_DIR))
+
+from config import PROCESSED_DATA_DIR, REGIONES_OBJETIVO, ANOMALY_CONFIG, IF_REFRESCO_CONFIG
+from src.models.anomaly_detection import AnomalyDetector
+import pandas as pd
+
+def main():
+    """Refresca los modelos de detección de anomalías"""
+    
+    print("=" * 70)
+    print("REFRESCO DE MODELOS DE ANOMALÍAS - SIDET")
+    print("=" * 70)
+    
+    input_path = PROCESSED_DATA_DIR / 'dengue_features.csv'
+    print(f"\nCargando datos desde: {input_path}")
+    
+    df = pd.read_csv(input_path)
+    print(f"✓ Datos cargados: {len(df):,} registros")
+    
+    # Cargar modelos guardados
+    models_dir = ROOT_DIR / 'models' / 'saved'
+    detector = AnomalyDetector(
+        contamination=ANOMALY_CONFIG['contamination'],
+        reduccion=ANOMALY_CONFIG['reduccion'],
+        reduccion_params=ANOMALY_CONFIG['reduccion_params'],
+        ocsvm_backend=ANOMALY_CONFIG['ocsvm_backend'],
+        ocsvm_componentes=ANOMALY_CONFIG['ocsvm_componentes'],
+        lof_indice=ANOMALY_CONFIG['lof_indice'],
+        contaminacion_umbral=ANOMALY_CONFIG['contaminacion_umbral'],
+        contaminacion_por_region=ANOMALY_CONFIG['contaminacion_por_region']
+    )
+    detector.cargar_modelos(models_dir, formato=ANOMALY_CONFIG['formato_modelos'],
+                            memoria_max_mb=ANOMALY_CONFIG['memoria_max_mb'])
+    
+    # Refrescar / reentrenar según calendario y deriva
+    reporte = detector.refrescar_modelos(df, IF_REFRESCO_CONFIG, REGIONES_OBJETIVO)
+    
+    print("\n" + "=" * 70)
+    print("ACCIONES POR REGIÓN")
+    print("=" * 70)
+    print("\n" + reporte.round(4).to_string(index=False))
+    
+    # Guardar solo si algo cambió
+    if (reporte['accion'] != 'ninguna').any():
+        detector.guardar_modelos(models_dir, formato=ANOMALY_CONFIG['formato_modelos'])
+    
+    reporte_path = PROCESSED_DATA_DIR / 'reporte_refresco_modelos.csv'
+    reporte.to_csv(reporte_path, index=False)
+    
+    print("\n" + "=" * 70)
+    print("✓ REFRESCO COMPLETADO")
+    print("=" * 70)
+    print(f"Reporte guardado en: {reporte_path}")
+    print("=" * 70)
+
+if __name__ == "__main__":
+    main()
@@ -8,20 +8,49 @@ import numpy as np
 from typing import Dict, List, Tuple
 import logging
 from datetime import datetime, timedelta
+from pathlib import Path
+
+from src.features.multiresolucion import crear_features_multiresolucion
+from src.models.detectores_epidemiologicos import DETECTORES, votos_familias
+from src.models.alertas_incrementales import EstadoAlertas
+from src.models.almacen_alertas import AlmacenAlertas
+from src.models.motor_reglas import MotorReglas, reglas_desde_umbrales
+from src.models.alertas_probabilisticas import (umbral_epidemico, probabilidad_desde_muestras,
+                                                probabilidad_desde_cuantiles, probabilidad_desde_intervalos)
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Límite superior del incremento esperado de cada nivel predictivo (si no se pasan umbrales)
+UMBRALES_PREDICTIVOS_DEFECTO = {
+    'normal': 0.10,
+    'vigilancia': 0.30,
+    'preparacion': 0.60,
+    'alerta_temprana': 1.0,
+    'critico': float('inf')
+}
+
+# Probabilidad de superar el umbral epidémico que abre cada nivel predictivo (si no se pasan)
+PROBABILIDAD_MINIMA_DEFECTO = {
+    'vigilancia': 0.10,
+    'preparacion': 0.25,
+    'alerta_temprana': 0.50,
+    'critico': 0.80
+}
+
 
 class AlertSystem:
     """Sistema de alertas temprana para detección de brotes de dengue"""
     
-    def __init__(self, umbrales: Dict = None):
+    def __init__(self, umbrales: Dict = None, umbrales_predictivos: Dict = None,
+                 motor_reglas: MotorReglas = None):
         """
         Inicializa el sistema de alertas
         
         Args:
             umbrales: Diccionario con umbrales personalizados
+            umbrales_predictivos: Límites superiores del incremento esperado por nivel predictivo
+            motor_reglas: Motor de reglas (por defecto, uno construido con los umbrales)
         """
         # Umbrales por defecto (en desviaciones estándar)
         self.umbrales = umbrales or {
@@ -30,6 +59,10 @@ class AlertSystem:
             'alto': 2.5,
             'critico': 3.0
         }
+        self.umbrales_predictivos = umbrales_predictivos or UMBRALES_PREDICTIVOS_DEFECTO
+        self.motor_reglas = motor_reglas or MotorReglas(
+            reglas_desde_umbrales(self.umbrales, self.umbrales_predictivos, PROBABILIDAD_MINIMA_DEFECTO)
+        )
         
         # Colores para visualización
         self.colores = {
@@ -174,45 +207,223 @@ class AlertSystem:
         
         df_alertas = df.copy()
         df_alertas[col_fecha] = pd.to_datetime(df_alertas[col_fecha])
+        df_alertas = df_alertas.reset_index(drop=True)
         
-        # Calcular estadísticas históricas por región
-        df_alertas['media_historica'] = df_alertas.groupby(col_departamento)[col_casos].transform(
-            lambda x: x.rolling(window=ventana_historica, min_periods=1).mean().shift(1)
-        )
+        # Estadísticas históricas por región en una sola pasada agrupada
+        historia = self.estadisticas_historicas(df_alertas, col_casos, col_departamento, ventana_historica)
+        df_alertas['media_historica'] = historia['mean']
+        df_alertas['std_historica'] = historia['std']
         
-        df_alertas['std_historica'] = df_alertas.groupby(col_departamento)[col_casos].transform(
-            lambda x: x.rolling(window=ventana_historica, min_periods=1).std().shift(1)
-        )
+        # Niveles de riesgo de todas las filas a la vez
+        alertas_df = self.calcular_niveles_riesgo(df_alertas, col_casos) if len(df_alertas) else pd.DataFrame()
         
-        # Inicializar columnas de alerta
-        alertas = []
+        # Agregar información de alertas al DataFrame
+        df_resultado = pd.concat([df_alertas, alertas_df], axis=1)
         
-        for idx, row in df_alertas.iterrows():
-            # Obtener valores de anomalías si existen
-            anomalia_if = row.get('anomalia_if', 0)
-            anomalia_lof = row.get('anomalia_lof', 0)
-            anomalia_ocsvm = row.get('anomalia_ocsvm', 0)
-            
-            # Calcular nivel de riesgo
-            info_riesgo = self.calcular_nivel_riesgo_combinado(
-                casos_actual=row[col_casos],
-                media_historica=row['media_historica'],
-                std_historica=row['std_historica'],
-                anomalia_if=anomalia_if,
-                anomalia_lof=anomalia_lof,
-                anomalia_ocsvm=anomalia_ocsvm
-            )
+        logger.info(f"✓ Alertas generadas: {len(df_resultado):,} registros")
+        
+        return df_resultado
+    
+    def generar_alertas_incrementales(self, df: pd.DataFrame, estado: EstadoAlertas,
+                                      col_casos: str = 'casos',
+                                      col_departamento: str = 'departamento',
+                                      col_fecha: str = 'fecha') -> pd.DataFrame:
+        """
+        Genera alertas solo para las semanas nuevas o revisadas
+        
+        La historia de cada semana sale del estado incremental (ventanas por
+        región de ejecuciones anteriores), que queda actualizado. El resultado
+        coincide con las filas correspondientes de generar_alertas sobre los
+        mismos datos (con una fila por región y semana en orden de fecha). Si las
+        reglas de alerta cambiaron desde que se calcularon los niveles del estado
+        (p. ej. al recargar el archivo de reglas) es un ValueError: los niveles
+        guardados ya no corresponden a las reglas y hay que recalcular todo.
+        
+        Args:
+            df: DataFrame con casos y anomalías (semanas recientes o toda la historia)
+            estado: Estado incremental de las alertas (se modifica)
+            col_casos: Columna de casos
+            col_departamento: Columna de departamento
+            col_fecha: Columna de fecha
             
-            alertas.append(info_riesgo)
+        Returns:
+            DataFrame con alertas de las semanas recalculadas (media_historica una sola vez)
+        """
+        logger.info("Generando alertas incrementales...")
         
-        # Agregar información de alertas al DataFrame
-        alertas_df = pd.DataFrame(alertas)
-        df_resultado = pd.concat([df_alertas.reset_index(drop=True), alertas_df], axis=1)
+        huella_reglas = self.motor_reglas.huella('semanal')
+        previa = getattr(estado, 'huella_reglas', None)
+        if len(estado.series) > 0 and previa is not None and previa != huella_reglas:
+            raise ValueError("Las reglas de alerta cambiaron desde la última ejecución; "
+                             "regenerar las alertas completas")
         
-        logger.info(f"✓ Alertas generadas: {len(df_resultado):,} registros")
+        df_alertas = df.copy()
+        df_alertas[col_fecha] = pd.to_datetime(df_alertas[col_fecha])
+        df_alertas = df_alertas.reset_index(drop=True)
+        
+        historia = estado.actualizar(df_alertas, col_casos, col_fecha, col_departamento).sort_index()
+        df_alertas = df_alertas.loc[historia.index].reset_index(drop=True)
+        df_alertas['media_historica'] = historia['mean'].to_numpy()
+        df_alertas['std_historica'] = historia['std'].to_numpy()
+        
+        # Igual que generar_alertas pero sin repetir media_historica
+        alertas_df = self.calcular_niveles_riesgo(df_alertas, col_casos).drop(columns='media_historica')
+        df_resultado = pd.concat([df_alertas, alertas_df], axis=1)
+        
+        estado.registrar_niveles(df_resultado, col_fecha, col_departamento)
+        estado.huella_reglas = huella_reglas
+        
+        logger.info(f"✓ Alertas incrementales generadas: {len(df_resultado):,} registros")
         
         return df_resultado
     
+    @staticmethod
+    def actualizar_tabla_alertas(df_tabla: pd.DataFrame, df_nuevas: pd.DataFrame,
+                                 col_departamento: str = 'departamento',
+                                 col_fecha: str = 'fecha') -> pd.DataFrame:
+        """
+        Inserta o reemplaza alertas en la tabla guardada
+        
+        Args:
+            df_tabla: Tabla de alertas existente
+            df_nuevas: Alertas recalculadas (nuevas o revisadas)
+            col_departamento: Columna de departamento
+            col_fecha: Columna de fecha
+            
+        Returns:
+            Tabla actualizada, ordenada por región y fecha
+        """
+        df_tabla = df_tabla.copy()
+        df_tabla[col_fecha] = pd.to_datetime(df_tabla[col_fecha])
+        
+        claves = pd.MultiIndex.from_frame(df_nuevas[[col_departamento, col_fecha]])
+        reemplazadas = pd.MultiIndex.from_frame(df_tabla[[col_departamento, col_fecha]]).isin(claves)
+        
+        df_resultado = pd.concat([df_tabla[~reemplazadas], df_nuevas], ignore_index=True)
+        df_resultado = df_resultado.sort_values([col_departamento, col_fecha], kind='stable')
+        
+        logger.info(f"Tabla de alertas: {int(reemplazadas.sum()):,} filas reemplazadas, "
+                    f"{len(df_nuevas) - int(reemplazadas.sum()):,} nuevas")
+        
+        return df_resultado.reset_index(drop=True)
+    
+    @staticmethod
+    def guardar_alertas(df_alertas: pd.DataFrame, almacen: AlmacenAlertas,
+                        predictivas: bool = False, reemplazar: bool = False) -> int:
+        """
+        Inserta o reemplaza alertas en el almacén en una única transacción
+        
+        Args:
+            df_alertas: Alertas nuevas o revisadas
+            almacen: Almacén de alertas
+            predictivas: Si True, guarda en la tabla de alertas predictivas
+            reemplazar: Si True, descarta antes las alertas predictivas anteriores
+            
+        Returns:
+            Filas escritas
+        """
+        if predictivas:
+            return almacen.upsert_alertas_predictivas(df_alertas, reemplazar=reemplazar)
+        return almacen.upsert_alertas(df_alertas)
+    
+    @staticmethod
+    def exportar_alertas_csv(df_alertas: pd.DataFrame, filepath: Path):
+        """
+        Escribe la tabla de alertas con el mismo esquema en modo completo e incremental
+        
+        La salida de generar_alertas lleva media_historica dos veces (la de la
+        ventana y la de calcular_niveles_riesgo, que al leer el CSV queda como
+        media_historica.1); el modo incremental y el almacén la guardan una vez.
+        Aquí se normaliza a una columna y se vuelve a escribir la segunda tras
+        casos_actual, como en el CSV del modo completo.
+        
+        Args:
+            df_alertas: Tabla de alertas (de generar_alertas, del modo incremental o leída del CSV)
+            filepath: Ruta del CSV
+        """
+        df = df_alertas.loc[:, ~df_alertas.columns.duplicated()].drop(columns='media_historica.1',
+                                                                     errors='ignore')
+        if 'media_historica' in df.columns and 'casos_actual' in df.columns:
+            df.insert(df.columns.get_loc('casos_actual') + 1, 'media_historica', df['media_historica'],
+                      allow_duplicates=True)
+        df.to_csv(filepath, index=False)
+    
+    @staticmethod
+    def estadisticas_historicas(df: pd.DataFrame, col_casos: str = 'casos',
+                                col_departamento: str = 'departamento',
+                                ventana_historica: int = 52) -> pd.DataFrame:
+        """
+        Media y desviación móviles de las semanas anteriores de cada región
+        
+        Equivale a rolling(ventana, min_periods=1).mean()/.std() desplazado una
+        semana dentro de cada región, calculado con un único rolling agrupado.
+        
+        Args:
+            df: DataFrame con casos
+            col_casos: Columna de casos
+            col_departamento: Columna de departamento
+            ventana_historica: Semanas de la ventana
+            
+        Returns:
+            DataFrame con columnas mean y std alineado con el índice de df
+        """
+        grupos = df.groupby(col_departamento, sort=False)[col_casos]
+        movil = grupos.rolling(window=ventana_historica, min_periods=1).agg(['mean', 'std'])
+        movil = movil.groupby(level=0, sort=False).shift(1)
+        return movil.droplevel(0).reindex(df.index)
+    
+    def calcular_niveles_riesgo(self, df_alertas: pd.DataFrame, col_casos: str = 'casos') -> pd.DataFrame:
+        """
+        Versión columnar de calcular_nivel_riesgo_combinado para todas las filas
+        
+        Args:
+            df_alertas: DataFrame con media_historica, std_historica y (opcionalmente)
+                       anomalia_if, anomalia_lof y anomalia_ocsvm
+            col_casos: Columna de casos
+            
+        Returns:
+            DataFrame con las mismas columnas y tipos que calcular_nivel_riesgo_combinado
+        """
+        casos = df_alertas[col_casos].to_numpy()
+        media = df_alertas['media_historica'].to_numpy()
+        std = df_alertas['std_historica'].to_numpy()
+        
+        # Z-score (0 si la desviación es 0; NaN si no hay historia)
+        std_cero = std == 0
+        with np.errstate(invalid='ignore', divide='ignore'):
+            z_score = np.where(std_cero, 0.0, (casos - media) / std)
+        if std_cero.all():
+            z_score = z_score.astype(np.int64)
+        
+        # Consenso de modelos (columnas ausentes cuentan como 0)
+        consenso = 0
+        for col in ['anomalia_if', 'anomalia_lof', 'anomalia_ocsvm']:
+            if col in df_alertas.columns:
+                consenso = consenso + df_alertas[col].to_numpy()
+        consenso = np.broadcast_to(np.asarray(consenso), len(df_alertas))
+        
+        # Reglas estadística y de anomalías en una pasada
+        niveles_orden = self.motor_reglas.niveles('semanal')
+        idx = self.motor_reglas.evaluar('semanal', {'z_score': z_score, 'consenso_modelos': consenso})
+        
+        media_positiva = media > 0
+        with np.errstate(invalid='ignore', divide='ignore'):
+            porcentaje = np.where(media_positiva, (casos - media) / media * 100, 0.0)
+        if not media_positiva.any():
+            porcentaje = porcentaje.astype(np.int64)
+        
+        return pd.DataFrame({
+            'nivel_riesgo': niveles_orden[idx['combinado']],
+            'nivel_estadistico': niveles_orden[idx['nivel_estadistico']],
+            'nivel_anomalia': niveles_orden[idx['nivel_anomalia']],
+            'z_score': z_score,
+            'consenso_modelos': consenso,
+            'casos_actual': df_alertas[col_casos].to_numpy(),
+            'media_historica': media,
+            'desviacion_media': casos - media,
+            'porcentaje_incremento': porcentaje
+        })
+    
     def filtrar_alertas_activas(self, df_alertas: pd.DataFrame,
                                niveles_minimos: List[str] = ['medio', 'alto', 'critico'],
                                col_fecha: str = 'fecha',
@@ -248,6 +459,111 @@ class AlertSystem:
         
         return df_filtrado
     
+    def agregar_contexto_multiresolucion(self, df_alertas: pd.DataFrame,
+                                         col_casos: str = 'casos',
+                                         col_departamento: str = 'departamento',
+                                         col_fecha: str = 'fecha',
+                                         resoluciones: List[str] = ['4semanas', 'mensual', 'temporada']) -> pd.DataFrame:
+        """
+        Agrega a cada alerta los casos acumulados del período y el total del período anterior
+        
+        Args:
+            df_alertas: DataFrame con alertas
+            col_casos: Columna de casos
+            col_departamento: Columna de departamento
+            col_fecha: Columna de fecha
+            resoluciones: Resoluciones de agregación
+            
+        Returns:
+            DataFrame de alertas con columnas casos_<resolucion>_*
+        """
+        # Si las features ya vienen del pipeline de features, no se recalculan
+        faltantes = [r for r in resoluciones if f'casos_{r}_acumulado' not in df_alertas.columns]
+        if not faltantes:
+            return df_alertas
+        
+        return crear_features_multiresolucion(df_alertas, col_casos, col_departamento, col_fecha, faltantes)
+    
+    def incorporar_detectores_epidemiologicos(self, df_alertas: pd.DataFrame,
+                                              df_epi: pd.DataFrame,
+                                              col_departamento: str = 'departamento',
+                                              col_fecha: str = 'fecha') -> pd.DataFrame:
+        """
+        Combina las alertas con los detectores EARS/CUSUM/Farrington
+        
+        El nivel epidemiológico se asigna por número de familias de detectores
+        que marcan la semana (EARS C1/C2/C3 cuentan como un solo voto): 1 bajo,
+        2 medio, 3 alto. Se guarda en su propia columna; nivel_riesgo no cambia.
+        
+        Args:
+            df_alertas: DataFrame de generar_alertas
+            df_epi: DataFrame de DetectoresEpidemiologicos.detectar_anomalias
+            col_departamento: Columna de departamento
+            col_fecha: Columna de fecha
+            
+        Returns:
+            DataFrame de alertas con anomalia_<detector>, votos_epidemiologicos
+            y nivel_epidemiologico
+        """
+        anomaly_cols = [f'anomalia_{d}' for d in DETECTORES]
+        epi = df_epi[[col_departamento, col_fecha] + anomaly_cols].copy()
+        epi[col_fecha] = pd.to_datetime(epi[col_fecha])
+        
+        df_resultado = df_alertas.copy()
+        df_resultado[col_fecha] = pd.to_datetime(df_resultado[col_fecha])
+        df_resultado = df_resultado.merge(epi, on=[col_departamento, col_fecha], how='left')
+        df_resultado[anomaly_cols] = df_resultado[anomaly_cols].fillna(0).astype(int)
+        
+        votos = votos_familias(df_resultado)
+        df_resultado['votos_epidemiologicos'] = votos
+        df_resultado['nivel_epidemiologico'] = np.select(
+            [votos >= 3, votos == 2, votos == 1],
+            ['alto', 'medio', 'bajo'],
+            default='normal'
+        )
+        
+        logger.info(f"✓ Detectores epidemiológicos incorporados: "
+                    f"{(votos > 0).sum():,} semanas marcadas por al menos una familia de detectores")
+        
+        return df_resultado
+    
+    def alertas_desde_clusters(self, df_clusters: pd.DataFrame, alpha: float = 0.05,
+                               col_departamento: str = 'departamento',
+                               col_fecha: str = 'fecha') -> pd.DataFrame:
+        """
+        Convierte los clusters espacio-temporales significativos en alertas por región
+        
+        Args:
+            df_clusters: Tabla de ScanEspacioTemporal.detectar_clusters
+            alpha: Nivel de significancia
+            col_departamento: Nombre de la columna de departamento en la salida
+            col_fecha: Nombre de la columna de fecha en la salida
+            
+        Returns:
+            DataFrame con una alerta por región y cluster significativo
+            (nivel crítico p < 0.001, alto p < 0.01, medio p < alpha)
+        """
+        columnas = [col_departamento, col_fecha, 'cluster_id', 'nivel_riesgo', 'casos_observados',
+                    'casos_esperados', 'riesgo_relativo', 'p_valor', 'fecha_inicio', 'tipo_alerta']
+        if df_clusters.empty:
+            return pd.DataFrame(columns=columnas)
+        
+        significativos = df_clusters[df_clusters['p_valor'] < alpha].copy()
+        significativos['nivel_riesgo'] = np.select(
+            [significativos['p_valor'] < 0.001, significativos['p_valor'] < 0.01],
+            ['critico', 'alto'],
+            default='medio'
+        )
+        significativos['tipo_alerta'] = 'cluster_espacio_temporal'
+        significativos[col_departamento] = significativos['regiones'].str.split(';')
+        significativos[col_fecha] = pd.to_datetime(significativos['fecha_fin'])
+        
+        df_alertas = significativos.explode(col_departamento, ignore_index=True)[columnas]
+        
+        logger.info(f"✓ Alertas por cluster: {len(significativos)} clusters, {len(df_alertas)} regiones")
+        
+        return df_alertas
+    
     def generar_reporte_alertas(self, df_alertas: pd.DataFrame,
                                col_departamento: str = 'departamento') -> pd.DataFrame:
         """
@@ -312,20 +628,38 @@ class AlertSystem:
         else:
             porcentaje_incremento = (casos_predichos - media_historica) / media_historica
         
-        # Clasificar según incremento esperado
-        if porcentaje_incremento > 1.0:  # >100% incremento
-            nivel = 'critico'
-        elif porcentaje_incremento > 0.60:  # 60-100% incremento
-            nivel = 'alerta_temprana'
-        elif porcentaje_incremento > 0.30:  # 30-60% incremento
-            nivel = 'preparacion'
-        elif porcentaje_incremento > 0.10:  # 10-30% incremento
-            nivel = 'vigilancia'
-        else:  # <10% incremento
-            nivel = 'normal'
+        # Clasificar según incremento esperado (umbrales del motor de reglas)
+        idx = self.motor_reglas.evaluar('predictivo', {'incremento_esperado': np.array([porcentaje_incremento])})
+        nivel = self.motor_reglas.niveles('predictivo')[idx['combinado'][0]]
         
         return nivel, porcentaje_incremento
     
+    def calcular_niveles_riesgo_predictivo(self, casos_predichos: np.ndarray,
+                                           media_historica: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Versión columnar de calcular_nivel_riesgo_predictivo
+        
+        Args:
+            casos_predichos: Casos predichos de cada fila
+            media_historica: Media histórica de la región de cada fila
+            
+        Returns:
+            Tupla (niveles, incrementos) con un valor por fila
+        """
+        casos_predichos = np.asarray(casos_predichos)
+        media_historica = np.asarray(media_historica)
+        
+        media_cero = media_historica == 0
+        with np.errstate(invalid='ignore', divide='ignore'):
+            incremento = np.where(media_cero, 0.0, (casos_predichos - media_historica) / media_historica)
+        if media_cero.all():
+            incremento = incremento.astype(np.int64)
+        
+        # Umbrales que hay que superar estrictamente; NaN queda en el primer nivel
+        idx = self.motor_reglas.evaluar('predictivo', {'incremento_esperado': incremento})
+        
+        return self.motor_reglas.niveles('predictivo')[idx['combinado']], incremento
+    
     def generar_alertas_predictivas(self, df_predicciones: pd.DataFrame,
                                     df_historico: pd.DataFrame,
                                     col_casos_pred: str = 'casos_predichos_ensamble',
@@ -350,49 +684,143 @@ class AlertSystem:
         df_pred[col_fecha] = pd.to_datetime(df_pred[col_fecha])
         
         # Calcular media histórica por región
-        medias_historicas = df_historico.groupby('departamento')['casos'].mean().to_dict()
+        medias_historicas = df_historico.groupby('departamento')['casos'].mean()
+        
+        # Media histórica de cada fila (regiones sin historia: sus propios casos predichos)
+        regiones = df_pred[col_region]
+        casos_pred = df_pred[col_casos_pred].to_numpy()
+        con_historia = regiones.isin(medias_historicas.index).to_numpy()
+        if con_historia.any():
+            media_hist = np.where(con_historia, regiones.map(medias_historicas).to_numpy(dtype=float), casos_pred)
+        else:
+            media_hist = casos_pred
         
-        # Generar alertas
-        alertas_predictivas = []
+        # Nivel de riesgo según incremento esperado
+        nivel, incremento = self.calcular_niveles_riesgo_predictivo(casos_pred, media_hist)
         
-        for idx, row in df_pred.iterrows():
-            region = row[col_region]
-            casos_pred = row[col_casos_pred]
-            fecha = row[col_fecha]
-            
-            # Obtener media histórica
-            media_hist = medias_historicas.get(region, casos_pred)
+        # Calcular intervalo de confianza si existe
+        if 'intervalo_inferior_95' in df_pred.columns:
+            lower = df_pred['intervalo_inferior_95'].to_numpy()
+        else:
+            lower = casos_pred * 0.85
+        if 'intervalo_superior_95' in df_pred.columns:
+            upper = df_pred['intervalo_superior_95'].to_numpy()
+        else:
+            upper = casos_pred * 1.15
+        
+        # Campos de calendario de toda la columna a la vez
+        fechas = df_pred[col_fecha]
+        
+        df_alertas = pd.DataFrame({
+            'region': regiones.to_numpy(),
+            'fecha': fechas.to_numpy(),
+            'año': fechas.dt.year.to_numpy(dtype=np.int64),
+            'mes': fechas.dt.month.to_numpy(dtype=np.int64),
+            'semana': fechas.dt.isocalendar().week.to_numpy(dtype=np.int64),
+            'casos_predichos': casos_pred,
+            'media_historica': media_hist,
+            'incremento_esperado': incremento,
+            'porcentaje_incremento': incremento * 100,
+            'nivel_riesgo_predictivo': nivel,
+            'intervalo_inferior': lower,
+            'intervalo_superior': upper,
+            'rango_incertidumbre': upper - lower
+        })
+        
+        logger.info(f"✓ Alertas predictivas generadas: {len(df_alertas):,} registros")
+        
+        # Resumen por nivel de riesgo
+        resumen = df_alertas['nivel_riesgo_predictivo'].value_counts()
+        logger.info(f"Distribución de alertas:")
+        for nivel, count in resumen.items():
+            logger.info(f"  - {nivel}: {count} ({count/len(df_alertas)*100:.1f}%)")
+        
+        return df_alertas
+    
+    def generar_alertas_probabilisticas(self, df_predicciones: pd.DataFrame,
+                                        df_historico: pd.DataFrame,
+                                        muestras: np.ndarray = None,
+                                        cuantiles: np.ndarray = None,
+                                        niveles_cuantil: np.ndarray = None,
+                                        series: List[str] = None,
+                                        fechas: List = None,
+                                        percentil: float = 75,
+                                        desviaciones: float = 2.0,
+                                        series_por_bloque: int = 128,
+                                        col_casos_pred: str = 'casos_predichos_ensamble',
+                                        col_region: str = 'region',
+                                        col_fecha: str = 'fecha') -> pd.DataFrame:
+        """
+        Genera alertas predictivas según la probabilidad de superar el umbral epidémico
+        
+        La probabilidad sale de las trayectorias simuladas si se pasan, si no de
+        los cuantiles, y si no de los intervalos de predicción de cada fila. Solo
+        con trayectorias o cuantiles el nivel por probabilidad sustituye al nivel
+        por incremento en nivel_riesgo_predictivo; con intervalos (una normal
+        partida supuesta, no una distribución pronosticada) queda como
+        nivel_probabilidad informativo.
+        
+        Args:
+            df_predicciones: DataFrame con predicciones futuras
+            df_historico: DataFrame con datos históricos
+            muestras: Trayectorias simuladas (series × horizonte × muestras)
+            cuantiles: Cuantiles pronosticados (series × horizonte × cuantiles)
+            niveles_cuantil: Niveles de los cuantiles, crecientes
+            series: Región de cada fila de muestras/cuantiles (por defecto regiones ordenadas)
+            fechas: Fecha de cada paso del horizonte (por defecto fechas ordenadas)
+            percentil: Percentil histórico del umbral epidémico
+            desviaciones: Desviaciones estándar que se suman al percentil
+            series_por_bloque: Series por bloque al reducir las trayectorias
+            col_casos_pred: Columna con casos predichos
+            col_region: Columna de región
+            col_fecha: Columna de fecha
             
-            # Calcular nivel de riesgo
-            nivel, incremento = self.calcular_nivel_riesgo_predictivo(casos_pred, media_hist)
+        Returns:
+            DataFrame de generar_alertas_predictivas con umbral_epidemico, probabilidad_excedencia,
+            nivel_probabilidad y nivel_incremento (nivel por incremento puntual)
+        """
+        df_alertas = self.generar_alertas_predictivas(df_predicciones, df_historico, col_casos_pred,
+                                                      col_region, col_fecha)
+        
+        logger.info("Calculando probabilidad de superar el umbral epidémico...")
+        umbrales = umbral_epidemico(df_historico, percentil, desviaciones)
+        umbral = df_alertas['region'].map(umbrales).to_numpy(dtype=float)
+        
+        distribucion = muestras is not None or cuantiles is not None
+        if distribucion:
+            series = pd.Index(sorted(df_alertas['region'].unique()) if series is None else series)
+            fechas = pd.DatetimeIndex(sorted(df_alertas['fecha'].unique()) if fechas is None else fechas)
+            umbral_series = umbrales.reindex(series).to_numpy(dtype=float)
             
-            # Calcular intervalo de confianza si existe
-            lower = row.get('intervalo_inferior_95', casos_pred * 0.85)
-            upper = row.get('intervalo_superior_95', casos_pred * 1.15)
+            if muestras is not None:
+                matriz = probabilidad_desde_muestras(muestras, umbral_series, series_por_bloque)
+                fuente = f"{muestras.shape[2]:,} trayectorias"
+            else:
+                matriz = probabilidad_desde_cuantiles(cuantiles, niveles_cuantil, umbral_series)
+                fuente = f"{cuantiles.shape[2]} cuantiles"
             
-            alertas_predictivas.append({
-                'region': region,
-                'fecha': fecha,
-                'año': fecha.year,
-                'mes': fecha.month,
-                'semana': fecha.isocalendar().week,
-                'casos_predichos': casos_pred,
-                'media_historica': media_hist,
-                'incremento_esperado': incremento,
-                'porcentaje_incremento': incremento * 100,
-                'nivel_riesgo_predictivo': nivel,
-                'intervalo_inferior': lower,
-                'intervalo_superior': upper,
-                'rango_incertidumbre': upper - lower
-            })
+            # Celda (serie, paso) de cada fila; filas sin celda quedan sin probabilidad
+            i = series.get_indexer(df_alertas['region'])
+            j = fechas.get_indexer(df_alertas['fecha'])
+            con_celda = (i >= 0) & (j >= 0)
+            probabilidad = np.where(con_celda, matriz[np.maximum(i, 0), np.maximum(j, 0)], np.nan)
+        else:
+            probabilidad = probabilidad_desde_intervalos(df_alertas['casos_predichos'], df_alertas['intervalo_inferior'],
+                                                         df_alertas['intervalo_superior'], umbral)
+            fuente = "intervalos de predicción"
         
-        df_alertas = pd.DataFrame(alertas_predictivas)
+        idx = self.motor_reglas.evaluar('probabilistico', {'probabilidad_excedencia': probabilidad})
         
-        logger.info(f"✓ Alertas predictivas generadas: {len(df_alertas):,} registros")
+        df_alertas['nivel_incremento'] = df_alertas['nivel_riesgo_predictivo']
+        df_alertas['umbral_epidemico'] = umbral
+        df_alertas['probabilidad_excedencia'] = probabilidad
+        df_alertas['nivel_probabilidad'] = self.motor_reglas.niveles('probabilistico')[idx['combinado']]
+        if distribucion:
+            df_alertas['nivel_riesgo_predictivo'] = df_alertas['nivel_probabilidad']
         
-        # Resumen por nivel de riesgo
         resumen = df_alertas['nivel_riesgo_predictivo'].value_counts()
-        logger.info(f"Distribución de alertas:")
+        logger.info(f"✓ Probabilidad de excedencia desde {fuente} "
+                    f"(nivel por {'probabilidad' if distribucion else 'incremento'}). Distribución de alertas:")
         for nivel, count in resumen.items():
             logger.info(f"  - {nivel}: {count} ({count/len(df_alertas)*100:.1f}%)")
         
@@ -0,0 +1,355 @@
+"""
+Estado incremental de las alertas por región
+Guarda las sumas y sumas de cuadrados de la ventana histórica de cada región,
+las últimas semanas de casos, una huella de las entradas de cada semana y el
+último nivel de alerta, para calcular solo las alertas de semanas nuevas o
+revisadas sin recorrer toda la historia
+"""
+
+import pandas as pd
+import numpy as np
+import joblib
+from pathlib import Path
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Entradas del nivel de alerta además de los casos (el consenso sale de ellas)
+COLUMNAS_ANOMALIA = ['anomalia_if', 'anomalia_lof', 'anomalia_ocsvm']
+
+
+def huella_entradas(df: pd.DataFrame, col_casos: str = 'casos') -> np.ndarray:
+    """
+    Hash por fila de las entradas del nivel de alerta (casos y flags de anomalía)
+
+    Args:
+        df: DataFrame con casos y (opcionalmente) anomalia_if, anomalia_lof y anomalia_ocsvm
+        col_casos: Columna de casos
+
+    Returns:
+        Array uint64 con una huella por fila
+    """
+    columnas = [col_casos] + [c for c in COLUMNAS_ANOMALIA if c in df.columns]
+    return pd.util.hash_pandas_object(df[columnas].astype(float), index=False).to_numpy()
+
+
+class EstadoAlertas:
+    """
+    Ventana móvil de casos por región que se actualiza semana a semana.
+
+    Las estadísticas de cada semana son las de las `ventana` semanas
+    anteriores de su región (media y desviación con ddof=1), igual que el
+    rolling(ventana, min_periods=1) desplazado de AlertSystem.generar_alertas.
+    Además de la ventana se guardan `semanas_revision` semanas extra para poder
+    rehacer las alertas cuando se corrigen semanas ya procesadas. De todas las
+    semanas procesadas se guarda la huella de sus entradas: una semana cuenta
+    como revisada si cambian sus casos o sus flags de anomalía.
+    """
+
+    def __init__(self, ventana: int = 52, semanas_revision: int = 8):
+        """
+        Inicializa el estado vacío
+
+        Args:
+            ventana: Semanas de la ventana histórica
+            semanas_revision: Semanas hacia atrás que se pueden revisar sin recálculo completo
+        """
+        self.ventana = ventana
+        self.semanas_revision = semanas_revision
+        self.capacidad = ventana + semanas_revision
+
+        self.series = pd.Index([])
+        self.valores = np.full((0, self.capacidad), np.nan)
+        self.fechas = np.full((0, self.capacidad), np.datetime64('NaT'), dtype='datetime64[ns]')
+        self.descartadas = np.zeros(0, dtype=np.int64)  # Semanas que ya salieron de la memoria
+        self.suma = np.zeros(0)
+        self.suma_cuadrados = np.zeros(0)
+        self.conteo = np.zeros(0)
+        self.ultimo_nivel = np.full(0, None, dtype=object)
+        self.fecha_ultimo_nivel = np.full(0, np.datetime64('NaT'), dtype='datetime64[ns]')
+        # Huella de las reglas de alerta con que se calcularon los niveles guardados
+        self.huella_reglas = None
+        # Huella de las entradas de cada semana procesada, indexada por (serie, fecha)
+        self.huellas = pd.Series([], dtype='uint64',
+                                 index=pd.MultiIndex.from_arrays([[], pd.DatetimeIndex([])],
+                                                                 names=['serie', 'fecha']))
+
+    def _alinear_series(self, series: pd.Index) -> np.ndarray:
+        """
+        Añade al estado las series que aún no existen
+
+        Args:
+            series: Series entrantes
+
+        Returns:
+            Posición de cada serie dentro del estado
+        """
+        nuevas = series.difference(self.series, sort=False)
+
+        if len(nuevas) > 0:
+            k = len(nuevas)
+            self.series = self.series.append(nuevas)
+            self.valores = np.vstack([self.valores, np.full((k, self.capacidad), np.nan)])
+            self.fechas = np.vstack([self.fechas, np.full((k, self.capacidad), np.datetime64('NaT'),
+                                                          dtype='datetime64[ns]')])
+            self.descartadas = np.concatenate([self.descartadas, np.zeros(k, dtype=np.int64)])
+            self.suma = np.concatenate([self.suma, np.zeros(k)])
+            self.suma_cuadrados = np.concatenate([self.suma_cuadrados, np.zeros(k)])
+            self.conteo = np.concatenate([self.conteo, np.zeros(k)])
+            self.ultimo_nivel = np.concatenate([self.ultimo_nivel, np.full(k, None, dtype=object)])
+            self.fecha_ultimo_nivel = np.concatenate([self.fecha_ultimo_nivel,
+                                                      np.full(k, np.datetime64('NaT'),
+                                                              dtype='datetime64[ns]')])
+
+        return self.series.get_indexer(series)
+
+    def _recalcular_sumas(self, pos: np.ndarray):
+        """Recalcula sumas y conteos de la ventana desde las semanas guardadas"""
+        w = self.valores[pos, -self.ventana:]
+        self.suma[pos] = np.nansum(w, axis=1)
+        self.suma_cuadrados[pos] = np.nansum(w ** 2, axis=1)
+        self.conteo[pos] = (~np.isnan(w)).sum(axis=1)
+
+    def _estadisticas(self, pos: np.ndarray):
+        """
+        Media y desviación de la ventana actual de las series indicadas
+
+        Returns:
+            Tupla (media, std); NaN sin datos (media) o con menos de 2 (std)
+        """
+        c = self.conteo[pos]
+        s = self.suma[pos]
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            media = np.where(c > 0, s / c, np.nan)
+            var = np.where(c > 1, (c * self.suma_cuadrados[pos] - s ** 2) / (c * (c - 1)), np.nan)
+        var = np.maximum(var, 0.0)
+
+        # Ventanas constantes: varianza exactamente 0 (como el rolling de pandas)
+        w = self.valores[pos, -self.ventana:]
+        con_datos = c > 0
+        constante = np.zeros(len(pos), dtype=bool)
+        if con_datos.any():
+            wc = w[con_datos]
+            constante[con_datos] = np.nanmax(wc, axis=1) == np.nanmin(wc, axis=1)
+        var = np.where(constante & (c > 1), 0.0, var)
+
+        return media, np.sqrt(var)
+
+    def _empujar(self, pos: np.ndarray, x: np.ndarray, fechas: np.ndarray):
+        """Añade una semana a cada serie indicada (una por serie) y desliza la ventana"""
+        saliente = self.valores[pos, -self.ventana]
+        sale = ~np.isnan(saliente)
+        entra = ~np.isnan(x)
+
+        self.suma[pos] += np.where(entra, x, 0.0) - np.where(sale, saliente, 0.0)
+        self.suma_cuadrados[pos] += np.where(entra, x ** 2, 0.0) - np.where(sale, saliente ** 2, 0.0)
+        self.conteo[pos] += entra.astype(float) - sale.astype(float)
+
+        self.descartadas[pos] += ~np.isnat(self.fechas[pos, 0])
+        self.valores[pos, :-1] = self.valores[pos, 1:]
+        self.valores[pos, -1] = x
+        self.fechas[pos, :-1] = self.fechas[pos, 1:]
+        self.fechas[pos, -1] = fechas
+
+    def _verificar_revision(self, p: int, inicio: np.datetime64):
+        """Comprueba que quedan semanas suficientes en memoria para rehacer la serie desde `inicio`"""
+        fechas = self.fechas[p]
+        conservadas = int((~np.isnat(fechas) & (fechas < inicio)).sum())
+        if self.descartadas[p] > 0 and conservadas < self.ventana:
+            raise ValueError(
+                f"Revisión de {self.series[p]} desde {pd.Timestamp(inicio).date()} anterior a la "
+                f"memoria del estado ({self.semanas_revision} semanas); regenerar las alertas completas"
+            )
+
+    def _rebobinar(self, p: int, inicio: np.datetime64) -> pd.DataFrame:
+        """
+        Retira de una serie las semanas desde `inicio` en adelante
+
+        Returns:
+            Semanas retiradas (fecha, valor) para volver a procesarlas
+        """
+        fechas = self.fechas[p]
+        quitar = ~np.isnat(fechas) & (fechas >= inicio)
+        n_quitar = int(quitar.sum())
+        retiradas = pd.DataFrame({'fecha': fechas[quitar], 'valor': self.valores[p, quitar]})
+
+        if n_quitar > 0:
+            self.valores[p] = np.concatenate([np.full(n_quitar, np.nan), self.valores[p, ~quitar]])
+            self.fechas[p] = np.concatenate([np.full(n_quitar, np.datetime64('NaT'), dtype='datetime64[ns]'),
+                                             fechas[~quitar]])
+
+        return retiradas
+
+    def actualizar(self, df: pd.DataFrame, col_casos: str = 'casos', col_fecha: str = 'fecha',
+                   col_departamento: str = 'departamento') -> pd.DataFrame:
+        """
+        Incorpora las semanas nuevas o revisadas de df y devuelve su historia
+
+        Las filas iguales a las ya guardadas (mismos casos y flags de anomalía)
+        no se recalculan. Si una semana guardada cambia (o aparece una semana
+        intermedia), la serie se rebobina hasta ella y se vuelven a procesar
+        todas sus semanas posteriores. Un cambio en una semana anterior a la
+        memoria del estado es un ValueError: hay que recalcular todo.
+
+        Args:
+            df: DataFrame con una fila por región y semana (puede contener toda la historia)
+            col_casos: Columna de casos
+            col_fecha: Columna de fecha
+            col_departamento: Columna de departamento
+
+        Returns:
+            DataFrame indexado como las filas recalculadas de df con columnas mean y std
+        """
+        d = pd.DataFrame({
+            'serie': df[col_departamento].to_numpy(),
+            'fecha': pd.to_datetime(df[col_fecha]).to_numpy(dtype='datetime64[ns]'),
+            'valor': df[col_casos].to_numpy(dtype=float),
+            'huella': huella_entradas(df, col_casos),
+            'fila': df.index
+        })
+        series = pd.Index(d['serie'].unique())
+        d['pos'] = self._alinear_series(series)[series.get_indexer(d['serie'])]
+
+        # Semanas guardadas de las series presentes
+        pos_df = np.unique(d['pos'].to_numpy())
+        guardadas = pd.DataFrame({
+            'pos': np.repeat(pos_df, self.capacidad),
+            'fecha': self.fechas[pos_df].ravel(),
+            'valor_guardado': self.valores[pos_df].ravel()
+        }).dropna(subset=['fecha'])
+
+        d = d.merge(guardadas, on=['pos', 'fecha'], how='left', indicator=True)
+        ultima = pd.Series(self.fechas[:, -1])
+        primera = guardadas.groupby('pos')['fecha'].min()
+        completo = pd.Series(self.descartadas == 0)
+
+        # Huella guardada de cada semana (estados de versiones anteriores no la tienen)
+        huellas = getattr(self, 'huellas', None)
+        if huellas is not None:
+            claves = pd.MultiIndex.from_arrays([d['serie'], d['fecha']])
+            huella_guardada = huellas.reindex(claves).to_numpy()
+            misma_huella = d['huella'].to_numpy() == huella_guardada
+        else:
+            misma_huella = np.ones(len(d), dtype=bool)
+
+        en_estado = d['_merge'] == 'both'
+        igual = en_estado & misma_huella & ((d['valor'] == d['valor_guardado']) |
+                                            (d['valor'].isna() & d['valor_guardado'].isna()))
+        # Semanas anteriores a la memoria del estado: ya definitivas salvo que cambien sus entradas
+        antigua = ~en_estado & ~d['pos'].map(completo) & \
+            (d['fecha'].to_numpy() < primera.reindex(d['pos']).to_numpy())
+        if huellas is not None:
+            antigua_cambiada = antigua & pd.notna(huella_guardada) & ~misma_huella
+            if antigua_cambiada.any():
+                primeras = d.loc[antigua_cambiada].groupby('serie')['fecha'].min()
+                raise ValueError(
+                    f"Entradas revisadas en {len(primeras)} series antes de la memoria del estado "
+                    f"(p. ej. {primeras.index[0]} desde {primeras.iloc[0].date()}); "
+                    f"regenerar las alertas completas"
+                )
+        cambiada = ~igual & ~antigua
+
+        # Primera semana a recalcular de cada serie
+        inicios = d.loc[cambiada].groupby('pos')['fecha'].min()
+        if len(inicios) == 0:
+            logger.info("✓ Sin semanas nuevas ni revisadas")
+            return pd.DataFrame({'mean': [], 'std': []}, index=df.index[:0])
+
+        revisadas = inicios[inicios <= inicios.index.map(ultima)]
+        pendientes = [d.loc[d['fecha'] >= d['pos'].map(inicios), ['pos', 'fecha', 'valor', 'fila']]]
+
+        # Validar todas las revisiones antes de modificar el estado
+        for p, inicio in revisadas.items():
+            self._verificar_revision(p, inicio.to_datetime64())
+
+        # Series revisadas: rebobinar y reprocesar también las semanas guardadas que no vienen en df
+        for p, inicio in revisadas.items():
+            retiradas = self._rebobinar(p, inicio.to_datetime64())
+            ausentes = retiradas[~retiradas['fecha'].isin(d.loc[d['pos'] == p, 'fecha'])]
+            if len(ausentes) > 0:
+                logger.warning(f"{self.series[p]}: {len(ausentes)} semanas posteriores a la revisión "
+                               f"no vienen en los datos; se usan las guardadas")
+                pendientes.append(ausentes.assign(pos=p, fila=-1))
+        if len(revisadas) > 0:
+            self._recalcular_sumas(revisadas.index.to_numpy())
+            logger.info(f"Series con semanas revisadas: {len(revisadas)}")
+
+        pendientes = pd.concat(pendientes, ignore_index=True).sort_values(['pos', 'fecha'], kind='stable')
+        pendientes['paso'] = pendientes.groupby('pos').cumcount()
+
+        # Una semana por serie en cada paso, todas las series a la vez
+        media = np.full(len(pendientes), np.nan)
+        std = np.full(len(pendientes), np.nan)
+        pasos = pendientes['paso'].to_numpy()
+        pos = pendientes['pos'].to_numpy()
+        valor = pendientes['valor'].to_numpy(dtype=float)
+        fechas = pendientes['fecha'].to_numpy(dtype='datetime64[ns]')
+        orden = np.argsort(pasos, kind='stable')
+        cortes = np.searchsorted(pasos[orden], np.arange(pasos.max() + 2))
+
+        for paso in range(pasos.max() + 1):
+            sel = orden[cortes[paso]:cortes[paso + 1]]
+            media[sel], std[sel] = self._estadisticas(pos[sel])
+            self._empujar(pos[sel], valor[sel], fechas[sel])
+
+        # Sumas exactas al final para no acumular error de redondeo entre ejecuciones
+        self._recalcular_sumas(np.unique(pos))
+
+        historia = pd.DataFrame({'mean': media, 'std': std}, index=pendientes['fila'].to_numpy())
+        historia = historia[pendientes['fila'].to_numpy() != -1]
+
+        # Huellas de las semanas recalculadas (las retiradas que no vienen en df conservan la suya)
+        if huellas is not None:
+            calculadas = d[d['fila'].isin(historia.index)]
+            nuevas = pd.Series(calculadas['huella'].to_numpy(),
+                               index=pd.MultiIndex.from_arrays([calculadas['serie'], calculadas['fecha']],
+                                                               names=['serie', 'fecha']))
+            huellas = pd.concat([huellas, nuevas])
+            self.huellas = huellas[~huellas.index.duplicated(keep='last')]
+
+        logger.info(f"✓ Semanas recalculadas: {len(historia):,} en {len(inicios)} series")
+
+        return historia
+
+    def registrar_niveles(self, df_alertas: pd.DataFrame, col_fecha: str = 'fecha',
+                          col_departamento: str = 'departamento'):
+        """
+        Guarda el nivel de riesgo de la última semana calculada de cada serie
+
+        Args:
+            df_alertas: Alertas recién calculadas (con nivel_riesgo)
+            col_fecha: Columna de fecha
+            col_departamento: Columna de departamento
+        """
+        if len(df_alertas) == 0:
+            return
+        ultimas = df_alertas.sort_values(col_fecha).groupby(col_departamento).tail(1)
+        pos = self.series.get_indexer(ultimas[col_departamento])
+        self.ultimo_nivel[pos] = ultimas['nivel_riesgo'].to_numpy()
+        self.fecha_ultimo_nivel[pos] = pd.to_datetime(ultimas[col_fecha]).to_numpy(dtype='datetime64[ns]')
+
+    def guardar(self, filepath: Path):
+        """
+        Guarda el estado para continuar en la siguiente ejecución
+
+        Args:
+            filepath: Ruta del archivo de estado
+        """
+        filepath.parent.mkdir(parents=True, exist_ok=True)
+        joblib.dump(self, filepath)
+        logger.info(f"✓ Estado de alertas guardado en: {filepath}")
+
+    @staticmethod
+    def cargar(filepath: Path) -> 'EstadoAlertas':
+        """
+        Carga un estado guardado
+
+        Args:
+            filepath: Ruta del archivo de estado
+
+        Returns:
+            Estado incremental de las alertas
+        """
+        return joblib.load(filepath)
@@ -0,0 +1,139 @@
+"""
+Alertas predictivas probabilísticas
+Probabilidad de que los casos pronosticados superen el umbral epidémico de
+cada región (percentil histórico + k desviaciones), calculada a partir de
+trayectorias simuladas, cuantiles o intervalos de predicción con reducciones
+vectorizadas sobre arrays (series × horizonte × muestras)
+"""
+
+import pandas as pd
+import numpy as np
+from scipy.special import ndtr, ndtri
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def umbral_epidemico(df_historico: pd.DataFrame, percentil: float = 75, desviaciones: float = 2.0,
+                     col_region: str = 'departamento', col_casos: str = 'casos') -> pd.Series:
+    """
+    Umbral epidémico por región: percentil histórico de casos semanales + k desviaciones estándar
+
+    Args:
+        df_historico: Casos semanales históricos
+        percentil: Percentil de referencia (0-100)
+        desviaciones: Desviaciones estándar que se suman al percentil
+        col_region: Columna de región
+        col_casos: Columna de casos
+
+    Returns:
+        Serie con el umbral de cada región
+    """
+    grupos = df_historico.groupby(col_region)[col_casos]
+    return grupos.quantile(percentil / 100) + desviaciones * grupos.std().fillna(0)
+
+
+def probabilidad_desde_muestras(muestras: np.ndarray, umbral: np.ndarray,
+                                series_por_bloque: int = 128) -> np.ndarray:
+    """
+    Fracción de trayectorias simuladas que superan el umbral de su serie
+
+    Se procesa por bloques de series para que la comparación no duplique en
+    memoria el array completo. Las muestras NaN no cuentan.
+
+    Args:
+        muestras: Array (series × horizonte × muestras)
+        umbral: Umbral de cada serie (series,)
+        series_por_bloque: Series por bloque
+
+    Returns:
+        Probabilidad de excedencia (series × horizonte); NaN si la serie no tiene umbral o muestras
+    """
+    n_series, horizonte, n_muestras = muestras.shape
+    flotante = np.issubdtype(muestras.dtype, np.floating)
+    umbral = np.asarray(umbral, dtype=float)
+    probabilidad = np.empty((n_series, horizonte))
+
+    for inicio in range(0, n_series, series_por_bloque):
+        bloque = muestras[inicio:inicio + series_por_bloque]
+        # Umbral en el tipo de las muestras para no convertir el bloque entero a float64
+        limite = umbral[inicio:inicio + series_por_bloque, None, None].astype(muestras.dtype if flotante else float)
+        excede = np.count_nonzero(bloque > limite, axis=2)
+        validas = n_muestras - np.count_nonzero(np.isnan(bloque), axis=2) if flotante else n_muestras
+        with np.errstate(invalid='ignore', divide='ignore'):
+            probabilidad[inicio:inicio + series_por_bloque] = excede / validas
+
+    probabilidad[np.isnan(umbral)] = np.nan
+    return probabilidad
+
+
+def probabilidad_desde_cuantiles(cuantiles: np.ndarray, niveles: np.ndarray,
+                                 umbral: np.ndarray) -> np.ndarray:
+    """
+    Probabilidad de excedencia interpolando linealmente la función de distribución entre cuantiles
+
+    Fuera del rango de cuantiles la probabilidad se acota a 1 - primer nivel o a
+    1 - último nivel (lo único que los cuantiles permiten afirmar).
+
+    Args:
+        cuantiles: Array (series × horizonte × cuantiles) con los valores de cada cuantil
+        niveles: Niveles de los cuantiles en orden creciente (p. ej. 0.05, 0.1, ..., 0.95)
+        umbral: Umbral de cada serie (series,)
+
+    Returns:
+        Probabilidad de excedencia (series × horizonte)
+    """
+    niveles = np.asarray(niveles, dtype=float)
+    valores = np.sort(cuantiles, axis=2)  # cuantiles cruzados de modelos distintos
+    umbral = np.asarray(umbral, dtype=float)[:, None]
+
+    # Cuantiles por debajo o iguales al umbral → intervalo [k-1, k] que lo contiene
+    k = np.count_nonzero(valores <= umbral[..., None], axis=2)
+    k_inf = np.clip(k - 1, 0, len(niveles) - 1)
+    k_sup = np.clip(k, 0, len(niveles) - 1)
+    v_inf = np.take_along_axis(valores, k_inf[..., None], axis=2)[..., 0]
+    v_sup = np.take_along_axis(valores, k_sup[..., None], axis=2)[..., 0]
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        fraccion = np.where(v_sup > v_inf, (umbral - v_inf) / (v_sup - v_inf), 1.0)
+    distribucion = niveles[k_inf] + np.clip(fraccion, 0, 1) * (niveles[k_sup] - niveles[k_inf])
+    distribucion = np.where(k == 0, niveles[0], distribucion)
+
+    probabilidad = 1 - distribucion
+    probabilidad[np.isnan(umbral[:, 0])] = np.nan
+    return probabilidad
+
+
+def probabilidad_desde_intervalos(centro: np.ndarray, inferior: np.ndarray, superior: np.ndarray,
+                                  umbral: np.ndarray, confianza: float = 0.95) -> np.ndarray:
+    """
+    Probabilidad de excedencia con una normal partida ajustada al pronóstico puntual y su intervalo
+
+    Se usa cuando solo hay intervalos: la desviación de cada lado se deduce de
+    la distancia del pronóstico a ese extremo del intervalo.
+
+    Args:
+        centro: Pronóstico puntual por fila
+        inferior: Extremo inferior del intervalo
+        superior: Extremo superior del intervalo
+        umbral: Umbral por fila
+        confianza: Nivel de confianza del intervalo
+
+    Returns:
+        Probabilidad de excedencia por fila
+    """
+    z = ndtri(0.5 + confianza / 2)
+    centro, inferior, superior, umbral = (np.asarray(x, dtype=float) for x in (centro, inferior, superior, umbral))
+
+    # Lado del intervalo en el que cae el umbral
+    desviacion = np.where(umbral >= centro, superior - centro, centro - inferior) / z
+    with np.errstate(invalid='ignore', divide='ignore'):
+        estandar = (umbral - centro) / desviacion
+    probabilidad = 1 - ndtr(estandar)
+
+    # Intervalo degenerado: certeza según el lado del pronóstico
+    degenerado = ~(desviacion > 0)
+    probabilidad[degenerado] = (centro[degenerado] > umbral[degenerado]).astype(float)
+    probabilidad[np.isnan(umbral) | np.isnan(centro)] = np.nan
+    return probabilidad
@@ -0,0 +1,358 @@
+"""
+Almacén de alertas embebido (SQLite)
+Guarda alertas semanales, episodios y alertas predictivas en un único archivo
+con índices por región, semana epidemiológica y nivel, upserts transaccionales
+y consultas para alertas activas, rangos de fechas y conteos por nivel
+"""
+
+import sqlite3
+import pandas as pd
+import numpy as np
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, List
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+NIVELES_ALERTA = ['normal', 'bajo', 'medio', 'alto', 'critico']
+NIVELES_PREDICTIVOS = ['normal', 'vigilancia', 'preparacion', 'alerta_temprana', 'critico']
+
+# Tabla → (columnas clave, columna de región, columna de fecha, columna de nivel, orden de niveles)
+TABLAS = {
+    'alertas': (['departamento', 'fecha'], 'departamento', 'fecha', 'nivel_riesgo', NIVELES_ALERTA),
+    'alertas_predictivas': (['region', 'fecha'], 'region', 'fecha', 'nivel_riesgo_predictivo',
+                            NIVELES_PREDICTIVOS),
+    'episodios': (['departamento', 'episodio'], 'departamento', 'fecha_inicio', 'nivel_pico', NIVELES_ALERTA),
+}
+
+# Columnas derivadas que añade el almacén para indexar por semana epidemiológica
+COLUMNAS_SEMANA_EPI = ['anio_epi', 'semana_epi']
+
+# Columnas con fechas (se guardan como texto ISO y se leen como datetime)
+COLUMNAS_FECHA = ['fecha', 'fecha_inicio', 'fecha_fin', 'en_alerta_desde']
+
+
+def _tipo_sql(serie: pd.Series) -> str:
+    """Tipo de columna SQLite para una serie de pandas"""
+    if pd.api.types.is_bool_dtype(serie) or pd.api.types.is_integer_dtype(serie):
+        return 'INTEGER'
+    if pd.api.types.is_float_dtype(serie):
+        return 'REAL'
+    return 'TEXT'
+
+
+def _preparar_filas(df: pd.DataFrame) -> List[tuple]:
+    """Convierte un DataFrame en tuplas de tipos nativos (fechas ISO, NaN → NULL)"""
+    df = df.copy()
+    for col in df.columns:
+        if pd.api.types.is_datetime64_any_dtype(df[col]):
+            df[col] = df[col].dt.strftime('%Y-%m-%d')
+        elif pd.api.types.is_bool_dtype(df[col]):
+            df[col] = df[col].astype(int)
+    valores = df.astype(object).where(df.notna(), None)
+    return list(valores.itertuples(index=False, name=None))
+
+
+class AlmacenAlertas:
+    """Alertas persistidas en un archivo SQLite sin servidor"""
+
+    def __init__(self, ruta: Path):
+        """
+        Inicializa el almacén (crea el archivo al primer upsert)
+
+        Args:
+            ruta: Archivo SQLite
+        """
+        self.ruta = Path(ruta)
+
+    @contextmanager
+    def _conectar(self):
+        """Conexión por operación (segura entre hilos, p. ej. en el dashboard)"""
+        self.ruta.parent.mkdir(parents=True, exist_ok=True)
+        conexion = sqlite3.connect(self.ruta)
+        try:
+            yield conexion
+        finally:
+            conexion.close()
+
+    def _columnas(self, conexion: sqlite3.Connection, tabla: str) -> List[str]:
+        """Columnas actuales de una tabla (vacía si no existe)"""
+        return [fila[1] for fila in conexion.execute(f'PRAGMA table_info("{tabla}")')]
+
+    def _asegurar_tabla(self, conexion: sqlite3.Connection, tabla: str, df: pd.DataFrame):
+        """Crea la tabla y sus índices, o añade las columnas nuevas de df"""
+        claves, col_region, col_fecha, col_nivel, _ = TABLAS[tabla]
+        existentes = self._columnas(conexion, tabla)
+
+        if not existentes:
+            definicion = ', '.join(f'"{c}" {_tipo_sql(df[c])}' for c in df.columns)
+            pk = ', '.join(f'"{c}"' for c in claves)
+            conexion.execute(f'CREATE TABLE "{tabla}" ({definicion}, PRIMARY KEY ({pk}))')
+            conexion.execute(f'CREATE INDEX "idx_{tabla}_region" ON "{tabla}" ("{col_region}")')
+            conexion.execute(f'CREATE INDEX "idx_{tabla}_nivel" ON "{tabla}" ("{col_nivel}")')
+            conexion.execute(f'CREATE INDEX "idx_{tabla}_fecha" ON "{tabla}" ("{col_fecha}")')
+            if 'anio_epi' in df.columns:
+                conexion.execute(f'CREATE INDEX "idx_{tabla}_semana_epi" ON "{tabla}" ("anio_epi", "semana_epi")')
+            return
+
+        for c in df.columns:
+            if c not in existentes:
+                conexion.execute(f'ALTER TABLE "{tabla}" ADD COLUMN "{c}" {_tipo_sql(df[c])}')
+
+    def _upsert(self, tabla: str, df: pd.DataFrame, reemplazar: bool = False) -> int:
+        """Inserta o reemplaza filas por clave en una única transacción (reemplazar: vacía la tabla antes)"""
+        if len(df) == 0 and not reemplazar:
+            return 0
+
+        claves = TABLAS[tabla][0]
+        df = df.loc[:, ~df.columns.duplicated()]
+        columnas = ', '.join(f'"{c}"' for c in df.columns)
+        marcadores = ', '.join('?' for _ in df.columns)
+        conflicto = ', '.join(f'"{c}"' for c in claves)
+        actualizar = ', '.join(f'"{c}" = excluded."{c}"' for c in df.columns if c not in claves) or \
+            f'"{claves[0]}" = excluded."{claves[0]}"'
+        sql = (f'INSERT INTO "{tabla}" ({columnas}) VALUES ({marcadores}) '
+               f'ON CONFLICT ({conflicto}) DO UPDATE SET {actualizar}')
+
+        with self._conectar() as conexion:
+            with conexion:  # transacción: todo o nada
+                self._asegurar_tabla(conexion, tabla, df)
+                if reemplazar:
+                    conexion.execute(f'DELETE FROM "{tabla}"')
+                conexion.executemany(sql, _preparar_filas(df))
+
+        logger.info(f"✓ {len(df):,} filas guardadas en {tabla} ({self.ruta.name})")
+        return len(df)
+
+    def _consultar(self, sql: str, parametros: tuple = ()) -> pd.DataFrame:
+        """Ejecuta una consulta y convierte las columnas de fecha"""
+        if not self.ruta.exists():
+            return pd.DataFrame()
+        with self._conectar() as conexion:
+            df = pd.read_sql_query(sql, conexion, params=parametros)
+        for col in df.columns.intersection(COLUMNAS_FECHA):
+            df[col] = pd.to_datetime(df[col])
+        return df
+
+    def existe(self, tabla: str) -> bool:
+        """Indica si el almacén tiene la tabla"""
+        if not self.ruta.exists():
+            return False
+        with self._conectar() as conexion:
+            return len(self._columnas(conexion, tabla)) > 0
+
+    # ----------------------------------------
+    # Escritura
+    # ----------------------------------------
+
+    def upsert_alertas(self, df_alertas: pd.DataFrame) -> int:
+        """
+        Inserta o actualiza alertas semanales por (departamento, fecha)
+
+        Args:
+            df_alertas: DataFrame de generar_alertas / generar_alertas_incrementales
+
+        Returns:
+            Filas escritas
+        """
+        df = df_alertas.copy()
+        df['fecha'] = pd.to_datetime(df['fecha'])
+        calendario = df['fecha'].dt.isocalendar()
+        df['anio_epi'] = calendario['year'].astype(np.int64)
+        df['semana_epi'] = calendario['week'].astype(np.int64)
+        return self._upsert('alertas', df)
+
+    def upsert_alertas_predictivas(self, df_alertas_pred: pd.DataFrame, reemplazar: bool = False) -> int:
+        """
+        Inserta o actualiza alertas predictivas por (region, fecha)
+
+        Args:
+            df_alertas_pred: DataFrame de generar_alertas_predictivas
+            reemplazar: Si True, descarta las alertas de pronósticos anteriores
+
+        Returns:
+            Filas escritas
+        """
+        df = df_alertas_pred.copy()
+        df['fecha'] = pd.to_datetime(df['fecha'])
+        df['anio_epi'] = df['fecha'].dt.isocalendar()['year'].astype(np.int64)
+        df['semana_epi'] = df['semana'].astype(np.int64)
+        return self._upsert('alertas_predictivas', df, reemplazar=reemplazar)
+
+    def guardar_episodios(self, df_episodios: pd.DataFrame, regiones: List[str] = None) -> int:
+        """
+        Reemplaza los episodios de las regiones indicadas (por defecto todas las de df)
+
+        Los episodios se renumeran al reconstruirse, así que se borran y se
+        insertan en la misma transacción.
+
+        Args:
+            df_episodios: Tabla de episodios
+            regiones: Regiones a reemplazar
+
+        Returns:
+            Filas escritas
+        """
+        regiones = list(df_episodios['departamento'].unique()) if regiones is None else list(regiones)
+        df = df_episodios[df_episodios['departamento'].isin(regiones)]
+        if len(df) == 0:
+            return 0
+
+        columnas = ', '.join(f'"{c}"' for c in df.columns)
+        marcadores = ', '.join('?' for _ in df.columns)
+
+        with self._conectar() as conexion:
+            with conexion:
+                self._asegurar_tabla(conexion, 'episodios', df)
+                conexion.executemany('DELETE FROM "episodios" WHERE "departamento" = ?',
+                                     [(r,) for r in regiones])
+                conexion.executemany(f'INSERT INTO "episodios" ({columnas}) VALUES ({marcadores})',
+                                     _preparar_filas(df))
+
+        logger.info(f"✓ {len(df):,} episodios guardados ({len(regiones)} regiones)")
+        return len(df)
+
+    # ----------------------------------------
+    # Consultas
+    # ----------------------------------------
+
+    def regiones(self, tabla: str = 'alertas') -> List[str]:
+        """Regiones presentes en una tabla"""
+        col_region = TABLAS[tabla][1]
+        df = self._consultar(f'SELECT DISTINCT "{col_region}" FROM "{tabla}" ORDER BY 1')
+        return df[col_region].tolist() if len(df) else []
+
+    def rango_fechas(self, tabla: str = 'alertas') -> tuple:
+        """Primera y última fecha de una tabla"""
+        col_fecha = TABLAS[tabla][2]
+        df = self._consultar(f'SELECT MIN("{col_fecha}") AS inicio, MAX("{col_fecha}") AS fin FROM "{tabla}"')
+        return pd.to_datetime(df['inicio'].iloc[0]), pd.to_datetime(df['fin'].iloc[0])
+
+    def _filtros(self, tabla: str, fecha_inicio=None, fecha_fin=None, regiones: List[str] = None,
+                 niveles: List[str] = None) -> tuple:
+        """Cláusula WHERE y parámetros para los filtros habituales"""
+        _, col_region, col_fecha, col_nivel, _ = TABLAS[tabla]
+        condiciones, parametros = [], []
+
+        if fecha_inicio is not None:
+            condiciones.append(f'"{col_fecha}" >= ?')
+            parametros.append(pd.Timestamp(fecha_inicio).strftime('%Y-%m-%d'))
+        if fecha_fin is not None:
+            condiciones.append(f'"{col_fecha}" <= ?')
+            parametros.append(pd.Timestamp(fecha_fin).strftime('%Y-%m-%d'))
+        if regiones is not None:
+            condiciones.append(f'"{col_region}" IN ({", ".join("?" for _ in regiones)})')
+            parametros.extend(regiones)
+        if niveles is not None:
+            condiciones.append(f'"{col_nivel}" IN ({", ".join("?" for _ in niveles)})')
+            parametros.extend(niveles)
+
+        where = f'WHERE {" AND ".join(condiciones)}' if condiciones else ''
+        return where, tuple(parametros)
+
+    def _orden_nivel(self, tabla: str) -> str:
+        """Expresión SQL con la severidad del nivel (0 = normal)"""
+        _, _, _, col_nivel, niveles = TABLAS[tabla]
+        casos = ' '.join(f"WHEN '{n}' THEN {i}" for i, n in enumerate(niveles))
+        return f'CASE "{col_nivel}" {casos} ELSE -1 END'
+
+    def consultar(self, tabla: str = 'alertas', fecha_inicio=None, fecha_fin=None,
+                  regiones: List[str] = None, niveles: List[str] = None,
+                  columnas: List[str] = None) -> pd.DataFrame:
+        """
+        Filas de una tabla por rango de fechas, regiones y niveles
+
+        Args:
+            tabla: 'alertas', 'alertas_predictivas' o 'episodios'
+            fecha_inicio: Fecha mínima (incluida)
+            fecha_fin: Fecha máxima (incluida)
+            regiones: Regiones a incluir (por defecto todas)
+            niveles: Niveles a incluir (por defecto todos)
+            columnas: Columnas a devolver (por defecto todas)
+
+        Returns:
+            DataFrame ordenado por región y fecha
+        """
+        if not self.existe(tabla):
+            return pd.DataFrame()
+        _, col_region, col_fecha, _, _ = TABLAS[tabla]
+        where, parametros = self._filtros(tabla, fecha_inicio, fecha_fin, regiones, niveles)
+        seleccion = ', '.join(f'"{c}"' for c in columnas) if columnas else '*'
+        return self._consultar(f'SELECT {seleccion} FROM "{tabla}" {where} '
+                               f'ORDER BY "{col_region}", "{col_fecha}"', parametros)
+
+    def alertas_activas(self, niveles: List[str] = ['medio', 'alto', 'critico'],
+                        ultimas_semanas: int = 4, regiones: List[str] = None) -> pd.DataFrame:
+        """
+        Alertas recientes de los niveles indicados (como filtrar_alertas_activas)
+
+        Args:
+            niveles: Niveles a incluir
+            ultimas_semanas: Semanas hacia atrás desde la última fecha
+            regiones: Regiones a incluir (por defecto todas)
+
+        Returns:
+            DataFrame ordenado de más a menos severo y de más a menos reciente
+        """
+        if not self.existe('alertas'):
+            return pd.DataFrame()
+        _, fin = self.rango_fechas('alertas')
+        where, parametros = self._filtros('alertas', fin - pd.Timedelta(weeks=ultimas_semanas), None,
+                                          regiones, niveles)
+        return self._consultar(f'SELECT * FROM "alertas" {where} '
+                               f'ORDER BY {self._orden_nivel("alertas")} DESC, "fecha" DESC', parametros)
+
+    def conteo_niveles(self, tabla: str = 'alertas', fecha_inicio=None, fecha_fin=None,
+                       regiones: List[str] = None, por_region: bool = False) -> pd.DataFrame:
+        """
+        Número de semanas por nivel (y opcionalmente por región)
+
+        Args:
+            tabla: 'alertas' o 'alertas_predictivas'
+            fecha_inicio: Fecha mínima (incluida)
+            fecha_fin: Fecha máxima (incluida)
+            regiones: Regiones a incluir
+            por_region: Si True, un conteo por región y nivel
+
+        Returns:
+            DataFrame con nivel, cantidad (y región)
+        """
+        if not self.existe(tabla):
+            return pd.DataFrame(columns=['nivel', 'cantidad'])
+        _, col_region, _, col_nivel, _ = TABLAS[tabla]
+        where, parametros = self._filtros(tabla, fecha_inicio, fecha_fin, regiones)
+        grupo = f'"{col_region}", ' if por_region else ''
+        return self._consultar(
+            f'SELECT {grupo}"{col_nivel}" AS nivel, COUNT(*) AS cantidad FROM "{tabla}" {where} '
+            f'GROUP BY {grupo}"{col_nivel}" ORDER BY {grupo}{self._orden_nivel(tabla)} DESC', parametros
+        )
+
+    def alertas_predictivas_criticas(self, niveles: List[str] = ['alerta_temprana', 'critico'],
+                                     meses_adelante: int = 12) -> pd.DataFrame:
+        """
+        Alertas predictivas graves en los próximos meses (como filtrar_alertas_predictivas_criticas)
+
+        Args:
+            niveles: Niveles a incluir
+            meses_adelante: Meses desde la primera fecha pronosticada
+
+        Returns:
+            DataFrame ordenado por severidad y fecha
+        """
+        if not self.existe('alertas_predictivas'):
+            return pd.DataFrame()
+        inicio, _ = self.rango_fechas('alertas_predictivas')
+        where, parametros = self._filtros('alertas_predictivas', None,
+                                          inicio + pd.DateOffset(months=meses_adelante), None, niveles)
+        return self._consultar(f'SELECT * FROM "alertas_predictivas" {where} '
+                               f'ORDER BY {self._orden_nivel("alertas_predictivas")} DESC, "fecha"', parametros)
+
+    def resumen(self) -> Dict[str, int]:
+        """Filas por tabla"""
+        if not self.ruta.exists():
+            return {}
+        with self._conectar() as conexion:
+            return {t: conexion.execute(f'SELECT COUNT(*) FROM "{t}"').fetchone()[0]
+                    for t in TABLAS if self._columnas(conexion, t)}
@@ -8,30 +8,259 @@ import numpy as np
 from sklearn.ensemble import IsolationForest
 from sklearn.neighbors import LocalOutlierFactor
 from sklearn.svm import OneClassSVM
+from sklearn.linear_model import SGDOneClassSVM
+from sklearn.kernel_approximation import Nystroem, RBFSampler
+from sklearn.pipeline import Pipeline
 from sklearn.preprocessing import StandardScaler
 from typing import Dict, List, Tuple
 import logging
 import joblib
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
 from pathlib import Path
+from threadpoolctl import threadpool_limits
+
+from src.models.reduccion_dimensional import ReductorFeatures
+from src.models.model_store import AnomalyModelStore
+from src.models.lof_indexado import LOFIndexado
+from src.models.umbrales import calcular_umbrales, marcar_anomalias
+from src.models.refresco_modelos import refrescar_isolation_forest, medir_deriva, decidir_accion
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
+# Algoritmos entrenados por región
+TIPOS_MODELO = ['if', 'lof', 'ocsvm']
+
+
+# Backends de One-Class SVM
+OCSVM_BACKENDS = ['exacto', 'nystroem', 'rff']
+
+
+def crear_modelo(tipo: str, config: Dict, n_jobs: int = -1, n_features: int = None):
+    """
+    Crea un modelo de anomalías sin entrenar
+    
+    Args:
+        tipo: 'if', 'lof' u 'ocsvm'
+        config: Configuración del detector (ver AnomalyDetector.config_modelos)
+        n_jobs: Hilos internos del modelo (IF y LOF)
+        n_features: Número de features de entrada (para el gamma de los OCSVM aproximados)
+        
+    Returns:
+        Modelo de scikit-learn
+    """
+    if tipo == 'if':
+        return IsolationForest(
+            contamination=config['contamination'],
+            random_state=42,
+            n_estimators=100,
+            max_samples='auto',
+            n_jobs=n_jobs
+        )
+    if tipo == 'lof' and config.get('lof_indice'):
+        # Índice de vecinos explícito que se guarda con el modelo
+        return LOFIndexado(
+            n_neighbors=20,
+            contamination=config['contamination'],
+            indice=config['lof_indice'],
+            n_jobs=n_jobs
+        )
+    if tipo == 'lof':
+        return LocalOutlierFactor(
+            contamination=config['contamination'],
+            n_neighbors=20,
+            novelty=True,  # Para poder predecir nuevos datos
+            n_jobs=n_jobs
+        )
+    if tipo == 'ocsvm' and config.get('ocsvm_backend', 'exacto') != 'exacto':
+        # Kernel RBF aproximado + SVM lineal por SGD: coste lineal en muestras
+        gamma = 1.0 / n_features if n_features else 1.0  # equivalente a gamma='auto'
+        if config['ocsvm_backend'] == 'nystroem':
+            kernel = Nystroem(kernel='rbf', gamma=gamma, n_components=config['ocsvm_componentes'],
+                              random_state=42)
+        else:
+            kernel = RBFSampler(gamma=gamma, n_components=config['ocsvm_componentes'], random_state=42)
+        return Pipeline([
+            ('kernel', kernel),
+            ('ocsvm', SGDOneClassSVM(nu=config['contamination'], random_state=42))
+        ])
+    if tipo == 'ocsvm':
+        return OneClassSVM(
+            nu=config['contamination'],  # nu es similar a contamination
+            kernel='rbf',
+            gamma='auto'
+        )
+    raise ValueError(f"Tipo de modelo desconocido: {tipo}")
+
+
+def entrenar_tarea(tipo: str, region: str, X: np.ndarray, config: Dict,
+                   reductor: ReductorFeatures = None, n_jobs: int = -1) -> Tuple:
+    """
+    Entrena un modelo (región × algoritmo); se ejecuta en procesos worker
+    
+    Args:
+        tipo: 'if', 'lof' u 'ocsvm'
+        region: Nombre de la región
+        X: Array de features de la región
+        config: Configuración del detector
+        reductor: Reductor de features de la región (opcional)
+        n_jobs: Hilos internos del modelo
+        
+    Returns:
+        Tupla (tipo, region, scaler, modelo, segundos)
+    """
+    inicio = time.perf_counter()
+    
+    scaler = StandardScaler()
+    X_scaled = scaler.fit_transform(X)
+    if reductor is not None:
+        X_scaled = reductor.transform(X_scaled)
+    
+    model = crear_modelo(tipo, config, n_jobs, n_features=X_scaled.shape[1])
+    model.fit(X_scaled)
+    
+    return tipo, region, scaler, model, time.perf_counter() - inicio
+
+
+def puntuar_region(modelos: Dict[str, Tuple], X: np.ndarray,
+                   reductor: ReductorFeatures = None,
+                   todos_scores: bool = False, predecir: bool = True) -> Dict[str, np.ndarray]:
+    """
+    Aplica los modelos de una región a un array de features
+    
+    Args:
+        modelos: Por tipo de modelo, tupla (scaler, modelo)
+        X: Array de features (sin NaN)
+        reductor: Reductor de features de la región (opcional)
+        todos_scores: Si True, devuelve el score continuo de cada modelo
+                     (score_if, score_lof, score_ocsvm); si no, solo score_if
+        predecir: Si True, añade anomalia_<tipo> con el predict de cada modelo (umbral
+                 de la contaminación de entrenamiento); si no, las banderas se derivan
+                 después de los scores con umbrales.marcar_anomalias
+        
+    Returns:
+        Diccionario columna → array (anomalia_<tipo>, score_<tipo>)
+    """
+    columnas = {}
+    
+    for model_type in TIPOS_MODELO:
+        if model_type not in modelos:
+            continue
+        scaler, model = modelos[model_type]
+        
+        # Escalar datos
+        X_scaled = scaler.transform(X)
+        if reductor is not None:
+            X_scaled = reductor.transform(X_scaled)
+        
+        # Predecir (-1 = anomalía, 1 = normal) y convertir a binario (1 = anomalía)
+        if predecir:
+            predictions = model.predict(X_scaled)
+            columnas[f'anomalia_{model_type}'] = (predictions == -1).astype(int)
+        
+        # Obtener scores
+        if model_type == 'if' or todos_scores:
+            columnas[f'score_{model_type}'] = model.score_samples(X_scaled)
+    
+    return columnas
+
+
+def calcular_scores_entrenamiento(modelos: Dict[str, Tuple], X: np.ndarray,
+                                   reductor: ReductorFeatures = None) -> Dict[str, np.ndarray]:
+    """
+    Scores continuos de los datos de entrenamiento de una región (más bajo = más anómalo)
+    
+    Se guardan con los modelos para derivar umbrales de cualquier nivel de
+    contaminación sin reentrenar.
+    
+    Args:
+        modelos: Por tipo de modelo, tupla (scaler, modelo)
+        X: Array de features de entrenamiento (sin NaN)
+        reductor: Reductor de features de la región (opcional)
+        
+    Returns:
+        Diccionario tipo → array de scores
+    """
+    scores = {}
+    
+    for model_type, (scaler, model) in modelos.items():
+        if model_type == 'lof':
+            # En modo novelty el LOF de los puntos de entrenamiento se guarda al ajustar
+            scores[model_type] = np.asarray(model.negative_outlier_factor_)
+            continue
+        
+        X_scaled = scaler.transform(X)
+        if reductor is not None:
+            X_scaled = reductor.transform(X_scaled)
+        scores[model_type] = model.score_samples(X_scaled)
+    
+    return scores
+
+
+def _puntuar_tarea(region: str, modelos: Dict[str, Tuple], X: np.ndarray,
+                   reductor: ReductorFeatures = None, todos_scores: bool = False,
+                   predecir: bool = True) -> Tuple[str, Dict[str, np.ndarray]]:
+    """Puntúa una región en un proceso worker"""
+    return region, puntuar_region(modelos, X, reductor, todos_scores, predecir)
+
+
+def _inicializar_worker(n_hilos: int):
+    """Limita los hilos BLAS/OpenMP de cada proceso worker"""
+    threadpool_limits(limits=n_hilos)
+
+
 class AnomalyDetector:
     """Clase para detección de anomalías en casos de dengue"""
     
-    def __init__(self, contamination=0.1):
+    def __init__(self, contamination=0.1, reduccion: str = None, reduccion_params: Dict = None,
+                 ocsvm_backend: str = 'exacto', ocsvm_componentes: int = 100,
+                 lof_indice: str = None, contaminacion_umbral: float = None,
+                 contaminacion_por_region: Dict[str, float] = None):
         """
         Inicializa el detector de anomalías
         
         Args:
-            contamination: Proporción esperada de anomalías (0.1 = 10%)
+            contamination: Proporción esperada de anomalías (0.1 = 10%) con que se entrenan los modelos
+            reduccion: Reducción de features por región ('pca', 'correlacion' o None)
+            reduccion_params: Parámetros del reductor (varianza_explicada, umbral_correlacion)
+            ocsvm_backend: 'exacto' (OneClassSVM RBF), 'nystroem' o 'rff'
+                          (aproximación del kernel + SGDOneClassSVM lineal)
+            ocsvm_componentes: Dimensión de la aproximación del kernel
+            lof_indice: Índice de vecinos persistido para LOF ('kd_tree', 'ball_tree')
+                       o None para LocalOutlierFactor de scikit-learn. Requiere
+                       reduccion: con 40+ features un árbol no mejora la búsqueda exhaustiva
+            contaminacion_umbral: Proporción de anomalías de las banderas, como cuantil de los
+                                 scores de entrenamiento de cada región (por defecto contamination);
+                                 se puede cambiar sin reentrenar
+            contaminacion_por_region: Proporción propia de algunas regiones ({región: contaminación})
         """
+        if ocsvm_backend not in OCSVM_BACKENDS:
+            raise ValueError(f"Backend de OCSVM no soportado: {ocsvm_backend}")
+        if lof_indice and not reduccion:
+            raise ValueError("lof_indice requiere reduccion ('pca' o 'correlacion'): sin reducir "
+                             "las features el índice no es más rápido que la búsqueda exhaustiva")
+        
         self.contamination = contamination
+        self.contaminacion_umbral = contaminacion_umbral if contaminacion_umbral is not None else contamination
+        self.contaminacion_por_region = dict(contaminacion_por_region or {})
+        self.ocsvm_backend = ocsvm_backend
+        self.ocsvm_componentes = ocsvm_componentes
+        self.lof_indice = lof_indice
+        self.reduccion = reduccion
+        self.reduccion_params = reduccion_params or {}
         self.models = {}
         self.scalers = {}
+        self.reductores = {}
         self.feature_columns = None
+        self.tiempos_entrenamiento = None
+        self.scores_entrenamiento = {}
+        self.scores_ventana = {}
+        self.scores_umbral = {}
+        self.refrescos = {}
+        self.store = None
         
     def preparar_datos(self, df: pd.DataFrame, feature_cols: List[str],
                       target_col: str = 'casos') -> Tuple[pd.DataFrame, np.ndarray]:
@@ -58,6 +287,153 @@ class AnomalyDetector:
         
         return df_clean, X
     
+    def config_modelos(self) -> Dict:
+        """
+        Configuración necesaria para crear los modelos fuera del detector
+        
+        Returns:
+            Diccionario con los parámetros de los modelos
+        """
+        return {
+            'contamination': self.contamination,
+            'ocsvm_backend': self.ocsvm_backend,
+            'ocsvm_componentes': self.ocsvm_componentes,
+            'lof_indice': self.lof_indice
+        }
+    
+    def ajustar_reductor(self, X: np.ndarray, region: str) -> ReductorFeatures:
+        """
+        Ajusta el reductor de features de una región sobre los datos escalados
+        
+        Args:
+            X: Array de features
+            region: Nombre de la región
+            
+        Returns:
+            Reductor ajustado
+        """
+        X_scaled = StandardScaler().fit_transform(X)
+        reductor = ReductorFeatures(metodo=self.reduccion, **self.reduccion_params).fit(X_scaled)
+        self.reductores[region] = reductor
+        
+        logger.info(f"✓ Reducción {self.reduccion} para {region}: "
+                    f"{reductor.n_features_entrada} → {reductor.n_features_salida} features")
+        
+        return reductor
+    
+    def _reducir(self, X_scaled: np.ndarray, region: str) -> np.ndarray:
+        """Aplica el reductor de la región si existe"""
+        if region in self.reductores:
+            return self.reductores[region].transform(X_scaled)
+        return X_scaled
+    
+    def _modelos_region(self, region: str) -> Dict[str, Tuple]:
+        """Modelos entrenados de una región como {tipo: (scaler, modelo)}"""
+        modelos = {}
+        for model_type in TIPOS_MODELO:
+            model_key = f'{model_type}_{region}'
+            if model_key in self.models:
+                modelos[model_type] = (self.scalers[model_key], self.models[model_key])
+        
+        # Si no están en memoria, se cargan del almacén bajo demanda
+        if not modelos and self.store is not None and region in self.store:
+            bundle = self.store.cargar_region(region)
+            modelos = {tipo: (bundle['scaler'], modelo) for tipo, modelo in bundle['modelos'].items()}
+        
+        return modelos
+    
+    def _reductor_region(self, region: str):
+        """Reductor de features de una región (en memoria o en el almacén)"""
+        if region in self.reductores:
+            return self.reductores[region]
+        if self.store is not None and region in self.store:
+            return self.store.cargar_region(region)['reductor']
+        return None
+    
+    def _scores_entrenamiento_region(self, region: str) -> Dict[str, np.ndarray]:
+        """Scores de entrenamiento de una región (en memoria o en el almacén)"""
+        if region in self.scores_entrenamiento:
+            return self.scores_entrenamiento[region]
+        if self.store is not None and region in self.store:
+            return self.store.cargar_region(region).get('scores_entrenamiento', {})
+        return {}
+    
+    def _scores_umbral_region(self, region: str) -> Dict[str, np.ndarray]:
+        """
+        Scores del histórico con los modelos vigentes de una región
+
+        Son los de entrenamiento salvo para los modelos refrescados después
+        (Isolation Forest con árboles nuevos), que guardan los suyos en scores_umbral.
+        """
+        scores = dict(self._scores_entrenamiento_region(region))
+        if region in self.scores_entrenamiento:
+            scores.update(self.scores_umbral.get(region, {}))
+        elif self.store is not None and region in self.store:
+            scores.update(self.store.cargar_region(region).get('scores_umbral', {}))
+        return scores
+    
+    def umbrales(self, contaminaciones: List[float], regiones: List[str] = None) -> pd.DataFrame:
+        """
+        Umbrales de score por región y modelo para varios niveles de contaminación
+        
+        Args:
+            contaminaciones: Proporciones de anomalías a evaluar
+            regiones: Regiones (por defecto todas las que tienen modelos)
+            
+        Returns:
+            DataFrame con columnas region, modelo, contaminacion, umbral
+        """
+        if regiones is None:
+            regiones = list(self.scores_entrenamiento)
+            if self.store is not None:
+                regiones += [r for r in self.store.regiones() if r not in self.scores_entrenamiento]
+        
+        scores = {region: self._scores_umbral_region(region) for region in regiones}
+        return calcular_umbrales(scores, contaminaciones)
+    
+    def aplicar_umbrales(self, df_scores: pd.DataFrame, col_departamento: str = 'departamento') -> pd.DataFrame:
+        """
+        Banderas de anomalía y consenso a partir de los scores con la contaminación configurada
+        
+        Args:
+            df_scores: Filas puntuadas con score_if, score_lof y score_ocsvm
+            col_departamento: Columna de departamento
+            
+        Returns:
+            Copia de df_scores con anomalia_<tipo> y anomalia_consenso
+        """
+        niveles = sorted({self.contaminacion_umbral, *self.contaminacion_por_region.values()})
+        regiones = [r for r in df_scores[col_departamento].unique() if self._tiene_modelos(r)]
+        return marcar_anomalias(df_scores, self.umbrales(niveles, regiones), self.contaminacion_umbral,
+                                col_departamento, contaminacion_por_region=self.contaminacion_por_region)
+    
+    def _materializar_region(self, region: str):
+        """Copia a memoria los modelos de una región del almacén para poder modificarlos"""
+        if any(f'{tipo}_{region}' in self.models for tipo in TIPOS_MODELO):
+            return
+        if self.store is None or region not in self.store:
+            raise KeyError(f"Región sin modelos: {region}")
+        
+        bundle = self.store.cargar_region(region)
+        for tipo, modelo in bundle['modelos'].items():
+            self.scalers[f'{tipo}_{region}'] = bundle['scaler']
+            self.models[f'{tipo}_{region}'] = modelo
+        if bundle.get('reductor') is not None:
+            self.reductores[region] = bundle['reductor']
+        self.scores_entrenamiento[region] = dict(bundle.get('scores_entrenamiento', {}))
+        if bundle.get('scores_ventana'):
+            self.scores_ventana[region] = dict(bundle['scores_ventana'])
+        if bundle.get('scores_umbral'):
+            self.scores_umbral[region] = dict(bundle['scores_umbral'])
+        if bundle.get('refresco'):
+            self.refrescos[region] = dict(bundle['refresco'])
+    
+    def _tiene_modelos(self, region: str) -> bool:
+        """Indica si hay modelos para la región sin cargarlos"""
+        if any(f'{tipo}_{region}' in self.models for tipo in TIPOS_MODELO):
+            return True
+        return self.store is not None and region in self.store
+    
     def entrenar_isolation_forest(self, X: np.ndarray, region: str) -> IsolationForest:
         """
         Entrena modelo Isolation Forest
@@ -73,16 +449,10 @@ class AnomalyDetector:
         
         # Escalar datos
         scaler = StandardScaler()
-        X_scaled = scaler.fit_transform(X)
+        X_scaled = self._reducir(scaler.fit_transform(X), region)
         
         # Entrenar modelo
-        model = IsolationForest(
-            contamination=self.contamination,
-            random_state=42,
-            n_estimators=100,
-            max_samples='auto',
-            n_jobs=-1
-        )
+        model = crear_modelo('if', self.config_modelos())
         model.fit(X_scaled)
         
         # Guardar scaler y modelo
@@ -93,7 +463,7 @@ class AnomalyDetector:
         
         return model
     
-    def entrenar_lof(self, X: np.ndarray, region: str) -> LocalOutlierFactor:
+    def entrenar_lof(self, X: np.ndarray, region: str):
         """
         Entrena modelo Local Outlier Factor
         
@@ -108,15 +478,10 @@ class AnomalyDetector:
         
         # Escalar datos
         scaler = StandardScaler()
-        X_scaled = scaler.fit_transform(X)
+        X_scaled = self._reducir(scaler.fit_transform(X), region)
         
         # Entrenar modelo
-        model = LocalOutlierFactor(
-            contamination=self.contamination,
-            n_neighbors=20,
-            novelty=True,  # Para poder predecir nuevos datos
-            n_jobs=-1
-        )
+        model = crear_modelo('lof', self.config_modelos())
         model.fit(X_scaled)
         
         # Guardar scaler y modelo
@@ -127,7 +492,7 @@ class AnomalyDetector:
         
         return model
     
-    def entrenar_ocsvm(self, X: np.ndarray, region: str) -> OneClassSVM:
+    def entrenar_ocsvm(self, X: np.ndarray, region: str):
         """
         Entrena modelo One-Class SVM
         
@@ -142,14 +507,10 @@ class AnomalyDetector:
         
         # Escalar datos
         scaler = StandardScaler()
-        X_scaled = scaler.fit_transform(X)
+        X_scaled = self._reducir(scaler.fit_transform(X), region)
         
         # Entrenar modelo
-        model = OneClassSVM(
-            nu=self.contamination,  # nu es similar a contamination
-            kernel='rbf',
-            gamma='auto'
-        )
+        model = crear_modelo('ocsvm', self.config_modelos(), n_features=X_scaled.shape[1])
         model.fit(X_scaled)
         
         # Guardar scaler y modelo
@@ -190,76 +551,324 @@ class AnomalyDetector:
         
         logger.info(f"Datos preparados: {len(df_clean):,} registros con {len(features_disponibles)} features")
         
-        # Predecir con cada modelo
-        for model_type in ['if', 'lof', 'ocsvm']:
-            model_key = f'{model_type}_{region}'
-            
-            if model_key in self.models:
-                # Escalar datos
-                X_scaled = self.scalers[model_key].transform(X)
-                
-                # Predecir (-1 = anomalía, 1 = normal)
-                predictions = self.models[model_key].predict(X_scaled)
-                
-                # Convertir a binario (1 = anomalía, 0 = normal)
-                df_clean[f'anomalia_{model_type}'] = (predictions == -1).astype(int)
-                
-                # Obtener scores
-                if model_type == 'if':
-                    scores = self.models[model_key].score_samples(X_scaled)
-                    df_clean[f'score_{model_type}'] = scores
-        
-        # Crear consenso de anomalías (al menos 2 de 3 modelos)
-        anomaly_cols = [f'anomalia_{mt}' for mt in ['if', 'lof', 'ocsvm']]
-        df_clean['anomalia_consenso'] = (df_clean[anomaly_cols].sum(axis=1) >= 2).astype(int)
+        # Scores de cada modelo; banderas y consenso (al menos 2 de 3) por umbrales de score
+        predecir = not self._scores_umbral_region(region)
+        columnas = puntuar_region(self._modelos_region(region), X, self._reductor_region(region),
+                                  todos_scores=True, predecir=predecir)
+        for col, valores in columnas.items():
+            df_clean[col] = valores
+        df_clean = self.aplicar_umbrales(df_clean, col_departamento)
+        df_clean = df_clean.drop(columns=['score_lof', 'score_ocsvm'], errors='ignore')
         
         logger.info(f"✓ Anomalías detectadas: {df_clean['anomalia_consenso'].sum():,}")
         
         return df_clean
     
+    def detectar_anomalias_lote(self, df: pd.DataFrame, feature_cols: List[str],
+                                regiones: List[str] = None,
+                                col_departamento: str = 'departamento',
+                                n_workers: int = 1, todos_scores: bool = False) -> pd.DataFrame:
+        """
+        Detecta anomalías de todas las regiones recorriendo el DataFrame una sola vez
+        
+        Args:
+            df: DataFrame con datos
+            feature_cols: Columnas de features
+            regiones: Regiones a analizar (por defecto todas las que tienen modelos)
+            col_departamento: Columna de departamento
+            n_workers: Procesos para puntuar regiones en paralelo (1 = secuencial)
+            todos_scores: Si True, añade score_lof y score_ocsvm además de score_if
+            
+        Las banderas salen de los scores con los umbrales de contaminacion_umbral
+        (y contaminacion_por_region); el predict de cada modelo solo se usa en
+        regiones guardadas sin scores de entrenamiento.
+            
+        Returns:
+            DataFrame con las filas puntuadas en el orden original y las mismas
+            columnas de anomalías que detectar_anomalias
+        """
+        logger.info("Detectando anomalías en lote...")
+        
+        features_disponibles = [col for col in feature_cols if col in df.columns]
+        X_total = df[features_disponibles].to_numpy(dtype=float)
+        completas = ~np.isnan(X_total).any(axis=1)
+        
+        # Agrupar una sola vez: posiciones de las filas completas de cada región
+        grupos = df.groupby(col_departamento).indices
+        if regiones is None:
+            regiones = [r for r in grupos if self._tiene_modelos(r)]
+        posiciones = {r: grupos[r][completas[grupos[r]]] for r in regiones if r in grupos}
+        
+        # Columnas de salida preasignadas
+        n = len(df)
+        salida = {}
+        for model_type in TIPOS_MODELO:
+            salida[f'anomalia_{model_type}'] = np.zeros(n, dtype=int)
+            salida[f'score_{model_type}'] = np.full(n, np.nan)
+        
+        # Las tareas se generan al consumirlas: cada bundle del almacén se carga
+        # justo antes de puntuar su región y el LRU puede liberar los anteriores
+        def tareas():
+            for r, pos in posiciones.items():
+                modelos = self._modelos_region(r)
+                predecir = not self._scores_umbral_region(r)
+                yield r, modelos, X_total[pos], self._reductor_region(r), True, predecir
+        
+        def guardar(region, columnas):
+            for col, valores in columnas.items():
+                salida[col][posiciones[region]] = valores
+        
+        if n_workers <= 1 or len(posiciones) <= 1:
+            for tarea in tareas():
+                guardar(*_puntuar_tarea(*tarea))
+        else:
+            # Como máximo 2 tareas por worker en cola para no retener todos los bundles
+            with ProcessPoolExecutor(max_workers=n_workers) as executor:
+                pendientes = set()
+                for tarea in tareas():
+                    if len(pendientes) >= 2 * n_workers:
+                        hechas, pendientes = wait(pendientes, return_when=FIRST_COMPLETED)
+                        for futuro in hechas:
+                            guardar(*futuro.result())
+                    pendientes.add(executor.submit(_puntuar_tarea, *tarea))
+                for futuro in wait(pendientes)[0]:
+                    guardar(*futuro.result())
+        
+        # Filas puntuadas en el orden original
+        puntuadas = np.zeros(n, dtype=bool)
+        for pos in posiciones.values():
+            puntuadas[pos] = True
+        
+        df_resultado = df.iloc[np.flatnonzero(puntuadas)].copy()
+        for col, valores in salida.items():
+            df_resultado[col] = valores[puntuadas]
+        
+        # Banderas y consenso de anomalías (al menos 2 de 3 modelos) por umbrales de score
+        df_resultado = self.aplicar_umbrales(df_resultado, col_departamento)
+        if not todos_scores:
+            df_resultado = df_resultado.drop(columns=['score_lof', 'score_ocsvm'])
+        
+        logger.info(f"✓ Anomalías detectadas: {df_resultado['anomalia_consenso'].sum():,} "
+                    f"en {len(posiciones)} regiones")
+        
+        return df_resultado
+    
     def entrenar_todos_modelos(self, df: pd.DataFrame, feature_cols: List[str],
-                               regiones: List[str], col_departamento: str = 'departamento'):
+                               regiones: List[str], col_departamento: str = 'departamento',
+                               n_workers: int = 1, col_fecha: str = 'fecha'):
         """
         Entrena todos los modelos para todas las regiones
         
+        Con n_workers > 1 la grilla región × algoritmo se reparte en un pool de
+        procesos y los hilos internos de cada modelo se limitan para no
+        sobresuscribir los núcleos.
+        
         Args:
             df: DataFrame con features
             feature_cols: Columnas de features
             regiones: Lista de regiones
             col_departamento: Columna de departamento
+            n_workers: Procesos para entrenar en paralelo (1 = secuencial)
+            col_fecha: Columna de fecha (inicia el calendario de refrescos)
         """
         logger.info("=" * 70)
         logger.info("ENTRENANDO MODELOS DE DETECCIÓN DE ANOMALÍAS")
         logger.info("=" * 70)
         
         self.feature_columns = feature_cols
+        if not self.reduccion:
+            self.reductores = {}
         
+        # Agrupar una sola vez y preparar los datos de cada región
+        grupos = df.groupby(col_departamento).indices
+        datos = {}
         for region in regiones:
-            logger.info(f"\n--- Región: {region} ---")
-            
-            # Filtrar datos de la región
-            df_region = df[df[col_departamento] == region]
+            if region not in grupos:
+                logger.warning(f"Región sin datos: {region}")
+                continue
+            df_region = df.iloc[grupos[region]]
             df_clean, X = self.preparar_datos(df_region, feature_cols)
+            datos[region] = X
             
-            # Entrenar los 3 modelos
-            self.entrenar_isolation_forest(X, region)
-            self.entrenar_lof(X, region)
-            self.entrenar_ocsvm(X, region)
+            if col_fecha in df_region.columns and len(df_clean) > 0:
+                fecha = str(pd.to_datetime(df_region.loc[df_clean.index, col_fecha]).max().date())
+                self.refrescos[region] = {'ultimo_reentrenamiento': fecha, 'ultimo_refresco': fecha,
+                                          'n_refrescos': 0}
+            
+            # Reducción de dimensionalidad opcional (compartida por los 3 modelos)
+            if self.reduccion:
+                self.ajustar_reductor(X, region)
+        
+        tiempos = []
+        
+        if n_workers <= 1:
+            entrenadores = {
+                'if': self.entrenar_isolation_forest,
+                'lof': self.entrenar_lof,
+                'ocsvm': self.entrenar_ocsvm
+            }
+            for region, X in datos.items():
+                logger.info(f"\n--- Región: {region} ---")
+                
+                # Entrenar los 3 modelos
+                for tipo in TIPOS_MODELO:
+                    inicio = time.perf_counter()
+                    entrenadores[tipo](X, region)
+                    tiempos.append({'region': region, 'modelo': tipo,
+                                    'segundos': time.perf_counter() - inicio})
+        else:
+            # Paralelismo anidado: workers externos × hilos internos <= núcleos
+            n_hilos = max(1, (os.cpu_count() or 1) // n_workers)
+            logger.info(f"Entrenando en paralelo: {n_workers} procesos × {n_hilos} hilos")
+            
+            config = self.config_modelos()
+            tareas = [(tipo, region) for region in datos for tipo in TIPOS_MODELO]
+            
+            with ProcessPoolExecutor(max_workers=n_workers, initializer=_inicializar_worker,
+                                     initargs=(n_hilos,)) as executor:
+                futuros = [
+                    executor.submit(entrenar_tarea, tipo, region, datos[region], config,
+                                    self.reductores.get(region), n_hilos)
+                    for tipo, region in tareas
+                ]
+                
+                # Recoger en el orden de las tareas para que el resultado sea determinista
+                for futuro in futuros:
+                    tipo, region, scaler, model, segundos = futuro.result()
+                    self.scalers[f'{tipo}_{region}'] = scaler
+                    self.models[f'{tipo}_{region}'] = model
+                    tiempos.append({'region': region, 'modelo': tipo, 'segundos': segundos})
+                    logger.info(f"✓ {tipo.upper()} entrenado para {region} ({segundos:.2f} s)")
+        
+        self.tiempos_entrenamiento = pd.DataFrame(tiempos)
+        
+        # Scores continuos de entrenamiento para umbrales a posteriori
+        self.scores_entrenamiento = {
+            region: calcular_scores_entrenamiento(self._modelos_region(region), X,
+                                                  self.reductores.get(region))
+            for region, X in datos.items()
+        }
         
         logger.info("\n" + "=" * 70)
         logger.info(f"✓ ENTRENAMIENTO COMPLETADO")
         logger.info(f"  Total de modelos entrenados: {len(self.models)}")
+        if tiempos:
+            logger.info(f"  Tiempo total de tareas: {self.tiempos_entrenamiento['segundos'].sum():.2f} s")
         logger.info("=" * 70)
     
-    def guardar_modelos(self, output_dir: Path):
+    def refrescar_modelos(self, df: pd.DataFrame, config: Dict, regiones: List[str] = None,
+                          col_fecha: str = 'fecha',
+                          col_departamento: str = 'departamento') -> pd.DataFrame:
+        """
+        Mantenimiento incremental de los modelos según calendario y deriva
+        
+        Para cada región se puntúa la ventana reciente con el Isolation Forest
+        actual y se compara con los scores de entrenamiento (PSI y KS). Si hay
+        deriva, o el último reentrenamiento es demasiado antiguo, se reentrenan
+        los 3 modelos; si no, y toca según el calendario, se añaden árboles
+        entrenados con la ventana reciente y se retiran los más antiguos.
+        
+        Los scores de entrenamiento siguen siendo la referencia de deriva hasta
+        el siguiente reentrenamiento; los de la ventana se guardan aparte en
+        scores_ventana y los del modelo refrescado sobre todo el histórico, de
+        los que salen los umbrales de las banderas, en scores_umbral.
+        
+        Args:
+            df: DataFrame con features (histórico incluida la ventana reciente)
+            config: Configuración de refresco (ver IF_REFRESCO_CONFIG)
+            regiones: Regiones a mantener (por defecto todas las que tienen modelos)
+            col_fecha: Columna de fecha
+            col_departamento: Columna de departamento
+            
+        Returns:
+            DataFrame con la acción tomada y las métricas de deriva por región
+        """
+        logger.info("Refrescando modelos de anomalías...")
+        
+        grupos = df.groupby(col_departamento).indices
+        if regiones is None:
+            regiones = [r for r in grupos if self._tiene_modelos(r)]
+        
+        entrenadores = {
+            'if': self.entrenar_isolation_forest,
+            'lof': self.entrenar_lof,
+            'ocsvm': self.entrenar_ocsvm
+        }
+        reporte = []
+        
+        for region in regiones:
+            if region not in grupos or not self._tiene_modelos(region):
+                continue
+            self._materializar_region(region)
+            
+            df_region = df.iloc[grupos[region]]
+            df_clean, X = self.preparar_datos(df_region, self.feature_columns)
+            fechas = pd.to_datetime(df_region.loc[df_clean.index, col_fecha]).to_numpy()
+            fecha_max = pd.Timestamp(fechas.max())
+            
+            scaler = self.scalers[f'if_{region}']
+            model = self.models[f'if_{region}']
+            
+            # Ventana reciente; al menos tantas filas como muestras por árbol
+            orden = np.argsort(fechas, kind='stable')
+            n_ventana = int((fechas > fecha_max - pd.Timedelta(weeks=config['ventana_semanas'])).sum())
+            n_ventana = min(len(X), max(n_ventana, model.max_samples_))
+            X_todo = self._reducir(scaler.transform(X), region)
+            X_reciente = X_todo[orden[-n_ventana:]]
+            
+            scores_reciente = model.score_samples(X_reciente)
+            referencia = self.scores_entrenamiento.get(region, {}).get('if')
+            if referencia is None:
+                referencia = model.score_samples(X_todo)
+            deriva = medir_deriva(np.asarray(referencia), scores_reciente)
+            
+            estado = self.refrescos.setdefault(region, {})
+            accion = decidir_accion(estado, fecha_max, deriva, config)
+            
+            if accion == 'reentrenar':
+                if self.reduccion:
+                    self.ajustar_reductor(X, region)
+                for tipo in TIPOS_MODELO:
+                    entrenadores[tipo](X, region)
+                self.scores_entrenamiento[region] = calcular_scores_entrenamiento(
+                    self._modelos_region(region), X, self.reductores.get(region)
+                )
+                self.scores_ventana.pop(region, None)
+                self.scores_umbral.pop(region, None)
+                estado['ultimo_reentrenamiento'] = str(fecha_max.date())
+                estado['ultimo_refresco'] = str(fecha_max.date())
+                estado['n_refrescos'] = 0
+            elif accion == 'refrescar':
+                n_refrescos = estado.get('n_refrescos', 0) + 1
+                # Umbral sobre el histórico completo; la referencia de deriva no cambia
+                refrescar_isolation_forest(model, X_reciente, config['arboles_nuevos'],
+                                           semilla=42 + n_refrescos, X_umbral=X_todo)
+                self.scores_ventana.setdefault(region, {})['if'] = model.score_samples(X_reciente)
+                # Los umbrales de las banderas salen de los scores del modelo refrescado
+                self.scores_umbral.setdefault(region, {})['if'] = model.score_samples(X_todo)
+                estado['ultimo_refresco'] = str(fecha_max.date())
+                estado['n_refrescos'] = n_refrescos
+            
+            reporte.append({'region': region, 'accion': accion, 'filas_ventana': n_ventana, **deriva})
+            logger.info(f"{region}: {accion} (PSI={deriva['psi']:.3f}, KS p={deriva['ks_pvalor']:.3g})")
+        
+        return pd.DataFrame(reporte)
+    
+    def guardar_modelos(self, output_dir: Path, formato: str = 'pickle'):
         """
         Guarda los modelos entrenados
         
         Args:
             output_dir: Directorio de salida
+            formato: 'pickle' (un archivo con todos los modelos) o 'store'
+                    (un bundle por región en output_dir/anomaly_store)
         """
         output_dir.mkdir(parents=True, exist_ok=True)
         
+        if formato == 'store':
+            self.guardar_store(output_dir / 'anomaly_store')
+            return
+        
         # Guardar modelos
         models_path = output_dir / 'anomaly_models.pkl'
         joblib.dump(self.models, models_path)
@@ -272,15 +881,73 @@ class AnomalyDetector:
         features_path = output_dir / 'feature_columns.pkl'
         joblib.dump(self.feature_columns, features_path)
         
+        # Guardar reductores de features (si se usaron)
+        if self.reductores:
+            reductores_path = output_dir / 'anomaly_reductores.pkl'
+            joblib.dump(self.reductores, reductores_path)
+        
+        # Guardar scores de entrenamiento (umbrales sin reentrenar)
+        if self.scores_entrenamiento:
+            scores_path = output_dir / 'anomaly_scores_entrenamiento.pkl'
+            joblib.dump(self.scores_entrenamiento, scores_path)
+        
+        # Guardar scores de la última ventana refrescada
+        if self.scores_ventana:
+            ventana_path = output_dir / 'anomaly_scores_ventana.pkl'
+            joblib.dump(self.scores_ventana, ventana_path)
+        
+        # Guardar scores del histórico de los modelos refrescados (umbrales)
+        if self.scores_umbral:
+            umbral_path = output_dir / 'anomaly_scores_umbral.pkl'
+            joblib.dump(self.scores_umbral, umbral_path)
+        
+        # Guardar calendario de refrescos
+        if self.refrescos:
+            refrescos_path = output_dir / 'anomaly_refrescos.pkl'
+            joblib.dump(self.refrescos, refrescos_path)
+        
         logger.info(f"✓ Modelos guardados en: {output_dir}")
     
-    def cargar_modelos(self, input_dir: Path):
+    def guardar_store(self, store_dir: Path):
+        """
+        Guarda los modelos en un almacén con un bundle por región
+        
+        Args:
+            store_dir: Directorio del almacén
+        """
+        store = AnomalyModelStore(store_dir)
+        
+        regiones = sorted({key.split('_', 1)[1] for key in self.models})
+        for region in regiones:
+            modelos = self._modelos_region(region)
+            # Los 3 scalers de la región se ajustan sobre los mismos datos: se guarda uno
+            scaler = next(iter(modelos.values()))[0]
+            store.guardar_region(
+                region, scaler,
+                {tipo: modelo for tipo, (_, modelo) in modelos.items()},
+                reductor=self.reductores.get(region),
+                extra={'scores_entrenamiento': self.scores_entrenamiento.get(region, {}),
+                       'scores_ventana': self.scores_ventana.get(region, {}),
+                       'scores_umbral': self.scores_umbral.get(region, {}),
+                       'refresco': self.refrescos.get(region, {})}
+            )
+        store.guardar_feature_columns(self.feature_columns)
+        
+        logger.info(f"✓ Modelos guardados en almacén por región: {store_dir} ({len(regiones)} regiones)")
+    
+    def cargar_modelos(self, input_dir: Path, formato: str = 'pickle', memoria_max_mb: float = 512):
         """
         Carga modelos previamente entrenados
         
         Args:
             input_dir: Directorio con modelos
+            formato: 'pickle' o 'store' (carga perezosa por región)
+            memoria_max_mb: Límite de memoria de bundles cargados (solo 'store')
         """
+        if formato == 'store':
+            self.usar_store(input_dir / 'anomaly_store', memoria_max_mb)
+            return
+        
         models_path = input_dir / 'anomaly_models.pkl'
         scalers_path = input_dir / 'anomaly_scalers.pkl'
         features_path = input_dir / 'feature_columns.pkl'
@@ -289,4 +956,39 @@ class AnomalyDetector:
         self.scalers = joblib.load(scalers_path)
         self.feature_columns = joblib.load(features_path)
         
+        reductores_path = input_dir / 'anomaly_reductores.pkl'
+        self.reductores = joblib.load(reductores_path) if reductores_path.exists() else {}
+        
+        scores_path = input_dir / 'anomaly_scores_entrenamiento.pkl'
+        self.scores_entrenamiento = joblib.load(scores_path) if scores_path.exists() else {}
+        
+        ventana_path = input_dir / 'anomaly_scores_ventana.pkl'
+        self.scores_ventana = joblib.load(ventana_path) if ventana_path.exists() else {}
+        
+        umbral_path = input_dir / 'anomaly_scores_umbral.pkl'
+        self.scores_umbral = joblib.load(umbral_path) if umbral_path.exists() else {}
+        
+        refrescos_path = input_dir / 'anomaly_refrescos.pkl'
+        self.refrescos = joblib.load(refrescos_path) if refrescos_path.exists() else {}
+        
         logger.info(f"✓ Modelos cargados desde: {input_dir}")
+    
+    def usar_store(self, store_dir: Path, memoria_max_mb: float = 512):
+        """
+        Usa un almacén por región; los bundles se cargan al puntuar cada región
+        
+        Args:
+            store_dir: Directorio del almacén
+            memoria_max_mb: Límite de memoria de bundles cargados
+        """
+        self.models = {}
+        self.scalers = {}
+        self.reductores = {}
+        self.scores_entrenamiento = {}
+        self.scores_ventana = {}
+        self.scores_umbral = {}
+        self.refrescos = {}
+        self.store = AnomalyModelStore(store_dir, memoria_max_mb=memoria_max_mb)
+        self.feature_columns = self.store.feature_columns
+        
+        logger.info(f"✓ Almacén de modelos: {store_dir} ({len(self.store.regiones())} regiones)")
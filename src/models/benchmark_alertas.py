@@ -0,0 +1,151 @@
+"""
+Benchmark de la generación de alertas
+Mide la clasificación columnar semanal y predictiva sobre 1M de filas, la
+evaluación del motor de reglas, las alertas probabilísticas y una semana
+incremental frente al recálculo completo. La paridad con las implementaciones
+fila a fila y el resto de comprobaciones están en tests/test_alert_system.py
+"""
+
+import sys
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).parent.parent.parent
+sys.path.append(str(ROOT_DIR))
+
+from src.models.alert_system import AlertSystem
+from src.models.alertas_incrementales import EstadoAlertas
+from src.models.alertas_probabilisticas import probabilidad_desde_muestras
+import pandas as pd
+import numpy as np
+import time
+from typing import Callable, Tuple
+
+
+def datos_sinteticos(n_filas: int, n_regiones: int = 50, con_anomalias: bool = True,
+                     semilla: int = 42) -> pd.DataFrame:
+    """
+    Datos semanales sintéticos con los casos límite de las alertas
+
+    Incluye regiones intercaladas, semanas con casos constantes (std = 0),
+    regiones con una sola semana y valores faltantes.
+    """
+    rng = np.random.default_rng(semilla)
+    semanas = int(np.ceil(n_filas / n_regiones))
+    fechas = pd.date_range('2000-01-02', periods=semanas, freq='W')
+
+    df = pd.DataFrame({
+        'departamento': np.tile([f'R{i:03d}' for i in range(n_regiones)], semanas)[:n_filas],
+        'fecha': np.repeat(fechas, n_regiones)[:n_filas],
+        'casos': rng.poisson(rng.uniform(0, 50, n_filas)).astype(float),
+    })
+
+    # Tramos constantes y faltantes
+    df.loc[df['departamento'] == 'R000', 'casos'] = 7.0
+    df.loc[rng.random(n_filas) < 0.01, 'casos'] = np.nan
+    df.loc[len(df)] = ['UNICA', fechas[0], 3.0]
+
+    if con_anomalias:
+        for col in ['anomalia_if', 'anomalia_lof', 'anomalia_ocsvm']:
+            df[col] = (rng.random(len(df)) < 0.1).astype(int)
+
+    return df
+
+
+def predicciones_sinteticas(n_series: int, semanas: int = 156, con_intervalos: bool = True,
+                            semilla: int = 42) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Pronósticos sintéticos e histórico para las alertas predictivas
+
+    Incluye regiones sin histórico, medias históricas nulas, cruces exactos de
+    los cortes de nivel y predicciones faltantes.
+
+    Returns:
+        Tupla (df_predicciones, df_historico)
+    """
+    rng = np.random.default_rng(semilla)
+    regiones = [f'R{i:04d}' for i in range(n_series)]
+    fechas = pd.date_range('2026-01-04', periods=semanas, freq='W')
+
+    df_pred = pd.DataFrame({
+        'region': np.repeat(regiones, semanas),
+        'fecha': np.tile(fechas, n_series),
+        'casos_predichos_ensamble': rng.gamma(2.0, 10.0, n_series * semanas),
+    })
+    df_pred.loc[rng.random(len(df_pred)) < 0.01, 'casos_predichos_ensamble'] = np.nan
+    if con_intervalos:
+        df_pred['intervalo_inferior_95'] = df_pred['casos_predichos_ensamble'] * 0.7
+        df_pred['intervalo_superior_95'] = df_pred['casos_predichos_ensamble'] * 1.4
+
+    # Histórico: media 10 en casi todas las regiones, 0 en una, sin datos en otras
+    historicas = regiones[:max(1, int(n_series * 0.9))]
+    df_hist = pd.DataFrame({'departamento': np.repeat(historicas, 2),
+                            'casos': np.tile([5.0, 15.0], len(historicas))})
+    df_hist.loc[df_hist['departamento'] == regiones[0], 'casos'] = 0.0
+
+    # Incrementos exactamente en los cortes (10%, 30%, 60%, 100%)
+    cortes = df_pred.index[df_pred['region'] == regiones[-1 if n_series == 1 else 1]][:4]
+    df_pred.loc[cortes, 'casos_predichos_ensamble'] = [11.0, 13.0, 16.0, 20.0]
+
+    return df_pred, df_hist
+
+
+def medir(funcion: Callable, *args) -> float:
+    """Segundos de una llamada"""
+    inicio = time.perf_counter()
+    funcion(*args)
+    return time.perf_counter() - inicio
+
+
+def main():
+    """Mide la generación de alertas"""
+
+    print("=" * 70)
+    print("BENCHMARK DE GENERACIÓN DE ALERTAS - SIDET")
+    print("=" * 70)
+
+    alert_system = AlertSystem()
+
+    print("\nTiempos:")
+    n_filas = 1_000_000
+    df_grande = datos_sinteticos(n_filas, n_regiones=1000)
+
+    t_completo = medir(alert_system.generar_alertas, df_grande)
+    print(f"  Alertas semanales columnar ({n_filas:,} filas): {t_completo:8.2f} s")
+
+    variables = {'z_score': np.random.default_rng(0).normal(size=n_filas),
+                 'consenso_modelos': np.random.default_rng(1).integers(0, 4, n_filas)}
+    t_reglas = medir(alert_system.motor_reglas.evaluar, 'semanal', variables)
+    print(f"  Evaluación de reglas ({n_filas:,} filas):       {t_reglas:8.2f} s")
+
+    n_series = 2000
+    df_pred, df_hist = predicciones_sinteticas(n_series)
+    t_predictivo = medir(alert_system.generar_alertas_predictivas, df_pred, df_hist)
+    print(f"  Predictivas columnar ({n_series:,} series × 156 semanas): {t_predictivo:8.2f} s")
+
+    # Alertas probabilísticas: series × 156 semanas × 1.000 trayectorias (float32)
+    n_muestras = 1000
+    escala = df_pred['casos_predichos_ensamble'].fillna(0).to_numpy(dtype=np.float32).reshape(n_series, 156)
+    muestras = np.random.default_rng(0).standard_normal((n_series, 156, n_muestras), dtype=np.float32)
+    muestras *= 0.3 * escala[..., None]
+    muestras += escala[..., None]
+    t_reduccion = medir(probabilidad_desde_muestras, muestras, np.full(n_series, 20.0))
+    t_probabilistico = medir(alert_system.generar_alertas_probabilisticas, df_pred, df_hist, muestras)
+    print(f"  Probabilidad de excedencia ({n_series:,} × 156 × {n_muestras:,} muestras): {t_reduccion:8.2f} s")
+    print(f"  Alertas probabilísticas completas:                      {t_probabilistico:8.2f} s")
+    del muestras
+
+    # Semana nueva con estado frente a recalcular toda la historia
+    df_grande = df_grande.sort_values(['departamento', 'fecha'], kind='stable')
+    ultima = df_grande['fecha'].max()
+    estado = EstadoAlertas()
+    alert_system.generar_alertas_incrementales(df_grande[df_grande['fecha'] < ultima], estado)
+    df_semana = df_grande[df_grande['fecha'] == ultima]
+    t_incremental = medir(alert_system.generar_alertas_incrementales, df_semana, estado)
+    print(f"  Última semana incremental ({len(df_semana):,} filas): {t_incremental:8.2f} s "
+          f"frente a {t_completo:.2f} s del recálculo completo")
+
+    print("\n" + "=" * 70)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,296 @@
+"""
+Script de benchmark de los modelos de detección de anomalías
+Compara variantes de configuración contra la configuración base en tiempo
+de entrenamiento, tiempo de scoring y concordancia de anomalías
+"""
+
+import sys
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).parent.parent.parent
+sys.path.append(str(ROOT_DIR))
+
+from config import PROCESSED_DATA_DIR, REGIONES_OBJETIVO, ANOMALY_CONFIG
+from src.models.anomaly_detection import AnomalyDetector, entrenar_tarea
+from src.models.global_anomaly import GlobalAnomalyDetector
+from sklearn.preprocessing import StandardScaler
+import pandas as pd
+import numpy as np
+import time
+import tempfile
+from typing import Dict, List, Tuple
+
+MODELOS = ['if', 'lof', 'ocsvm']
+
+
+def medir_detector(detector: AnomalyDetector, df: pd.DataFrame, feature_cols: List[str],
+                   regiones: List[str]) -> Tuple[float, float, pd.DataFrame]:
+    """
+    Entrena y aplica un detector midiendo los tiempos
+
+    Args:
+        detector: Detector a evaluar
+        df: DataFrame con features
+        feature_cols: Columnas de features
+        regiones: Regiones a entrenar
+
+    Returns:
+        Tupla (segundos_entrenamiento, segundos_scoring, resultados)
+    """
+    inicio = time.perf_counter()
+    detector.entrenar_todos_modelos(df, feature_cols, regiones)
+    t_entrenamiento = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    resultados = pd.concat(
+        [detector.detectar_anomalias(df, feature_cols, region) for region in regiones]
+    )
+    t_scoring = time.perf_counter() - inicio
+
+    return t_entrenamiento, t_scoring, resultados
+
+
+def concordancia(base: pd.DataFrame, variante: pd.DataFrame) -> Dict[str, float]:
+    """
+    Mide la concordancia de anomalías entre dos resultados sobre las mismas filas
+
+    Args:
+        base: Resultados de la configuración base
+        variante: Resultados de la variante
+
+    Returns:
+        Diccionario con % de acuerdo por modelo y Jaccard del consenso
+    """
+    comunes = base.index.intersection(variante.index)
+    base, variante = base.loc[comunes], variante.loc[comunes]
+
+    metricas = {}
+    for modelo in MODELOS + ['consenso']:
+        col = f'anomalia_{modelo}'
+        if col in base.columns and col in variante.columns:
+            metricas[f'acuerdo_{modelo}'] = (base[col] == variante[col]).mean() * 100
+
+    a = base['anomalia_consenso'] == 1
+    b = variante['anomalia_consenso'] == 1
+    union = (a | b).sum()
+    metricas['jaccard_consenso'] = (a & b).sum() / union if union > 0 else 1.0
+
+    return metricas
+
+
+def evaluar_reduccion(df: pd.DataFrame, feature_cols: List[str], regiones: List[str],
+                      metodos: List[str] = ['pca', 'correlacion'],
+                      contamination: float = 0.05) -> pd.DataFrame:
+    """
+    Compara los modelos con y sin reducción de dimensionalidad
+
+    Args:
+        df: DataFrame con features
+        feature_cols: Columnas de features
+        regiones: Regiones a evaluar
+        metodos: Métodos de reducción a comparar
+        contamination: Proporción esperada de anomalías
+
+    Returns:
+        DataFrame con una fila por configuración
+    """
+    base = AnomalyDetector(contamination=contamination)
+    t_train_base, t_score_base, res_base = medir_detector(base, df, feature_cols, regiones)
+
+    filas = [{
+        'configuracion': 'sin_reduccion',
+        'features_promedio': len(feature_cols),
+        'tiempo_entrenamiento_s': t_train_base,
+        'tiempo_scoring_s': t_score_base,
+    }]
+
+    for metodo in metodos:
+        detector = AnomalyDetector(contamination=contamination, reduccion=metodo,
+                                   reduccion_params=ANOMALY_CONFIG['reduccion_params'])
+        t_train, t_score, resultados = medir_detector(detector, df, feature_cols, regiones)
+
+        filas.append({
+            'configuracion': metodo,
+            'features_promedio': np.mean([r.n_features_salida for r in detector.reductores.values()]),
+            'tiempo_entrenamiento_s': t_train,
+            'tiempo_scoring_s': t_score,
+            **concordancia(res_base, resultados)
+        })
+
+    return pd.DataFrame(filas)
+
+
+def evaluar_ocsvm(df: pd.DataFrame, feature_cols: List[str], regiones: List[str],
+                  backends: List[str] = ['nystroem', 'rff'],
+                  contamination: float = 0.05, componentes: int = 100,
+                  col_departamento: str = 'departamento') -> pd.DataFrame:
+    """
+    Compara los OCSVM aproximados con el OCSVM RBF exacto
+
+    Se evalúa por región y también sobre todas las regiones juntas (cada una
+    normalizada por separado), que es el caso de series agrupadas o distritos.
+
+    Args:
+        df: DataFrame con features
+        feature_cols: Columnas de features
+        regiones: Regiones a evaluar
+        backends: Backends aproximados a comparar
+        contamination: Proporción esperada de anomalías
+        componentes: Dimensión de la aproximación del kernel
+        col_departamento: Columna de departamento
+
+    Returns:
+        DataFrame con tiempos y concordancia por conjunto de datos y backend
+    """
+    conjuntos = {}
+    for region in regiones:
+        X = df.loc[df[col_departamento] == region, feature_cols].dropna().to_numpy(dtype=float)
+        if len(X) > 0:
+            conjuntos[region] = X
+    conjuntos['TODAS (agrupadas)'] = np.vstack([StandardScaler().fit_transform(X)
+                                                for X in conjuntos.values()])
+
+    filas = []
+    for nombre, X in conjuntos.items():
+        predicciones = {}
+        for backend in ['exacto'] + backends:
+            config = {'contamination': contamination, 'ocsvm_backend': backend,
+                      'ocsvm_componentes': componentes}
+            _, _, scaler, model, t_entrenamiento = entrenar_tarea('ocsvm', nombre, X, config)
+
+            inicio = time.perf_counter()
+            predicciones[backend] = model.predict(scaler.transform(X)) == -1
+            t_scoring = time.perf_counter() - inicio
+
+            fila = {
+                'datos': nombre,
+                'muestras': len(X),
+                'backend': backend,
+                'tiempo_entrenamiento_s': t_entrenamiento,
+                'tiempo_scoring_s': t_scoring,
+                'pct_anomalias': predicciones[backend].mean() * 100,
+            }
+            if backend != 'exacto':
+                a, b = predicciones['exacto'], predicciones[backend]
+                fila['acuerdo_exacto'] = (a == b).mean() * 100
+                fila['jaccard_exacto'] = (a & b).sum() / max((a | b).sum(), 1)
+            filas.append(fila)
+
+    return pd.DataFrame(filas)
+
+
+def tamano_directorio(directorio: Path) -> int:
+    """Tamaño total en bytes de los archivos de un directorio"""
+    return sum(f.stat().st_size for f in Path(directorio).rglob('*') if f.is_file())
+
+
+def evaluar_modelo_global(df: pd.DataFrame, feature_cols: List[str], regiones: List[str],
+                          contamination: float = 0.05, componentes: int = 100,
+                          col_departamento: str = 'departamento') -> pd.DataFrame:
+    """
+    Compara el modelo global (todas las series agrupadas) con los modelos por región
+
+    Args:
+        df: DataFrame con features
+        feature_cols: Columnas de features
+        regiones: Regiones a evaluar
+        contamination: Proporción esperada de anomalías
+        componentes: Dimensión de la aproximación del kernel del OCSVM global
+        col_departamento: Columna de departamento
+
+    Returns:
+        DataFrame con tiempos, tamaño de artefactos y concordancia por modo
+    """
+    df = df[df[col_departamento].isin(regiones)]
+
+    base = AnomalyDetector(contamination=contamination)
+    t_train_base, t_score_base, res_base = medir_detector(base, df, feature_cols, regiones)
+    with tempfile.TemporaryDirectory() as tmp:
+        base.guardar_modelos(Path(tmp), formato='store')
+        tamano_base = tamano_directorio(tmp)
+
+    filas = [{
+        'modo': 'por_region',
+        'modelos': len(base.models),
+        'tiempo_entrenamiento_s': t_train_base,
+        'tiempo_scoring_s': t_score_base,
+        'tamano_mb': tamano_base / 1024 ** 2,
+        'pct_anomalias': res_base['anomalia_consenso'].mean() * 100,
+    }]
+
+    for usar_ocsvm in [False, True]:
+        detector = GlobalAnomalyDetector(contamination=contamination, usar_ocsvm=usar_ocsvm,
+                                         ocsvm_componentes=componentes)
+        inicio = time.perf_counter()
+        detector.entrenar(df, feature_cols, regiones, col_departamento=col_departamento)
+        t_train = time.perf_counter() - inicio
+
+        inicio = time.perf_counter()
+        resultados = detector.detectar_anomalias(df, col_departamento=col_departamento)
+        t_score = time.perf_counter() - inicio
+
+        with tempfile.TemporaryDirectory() as tmp:
+            tamano = detector.guardar_modelos(Path(tmp)).stat().st_size
+
+        filas.append({
+            'modo': 'global_if_ocsvm' if usar_ocsvm else 'global_if',
+            'modelos': len(detector.models),
+            'tiempo_entrenamiento_s': t_train,
+            'tiempo_scoring_s': t_score,
+            'tamano_mb': tamano / 1024 ** 2,
+            'pct_anomalias': resultados['anomalia_consenso'].mean() * 100,
+            **concordancia(res_base, resultados)
+        })
+
+    return pd.DataFrame(filas)
+
+
+def main():
+    """Ejecuta el benchmark de los modelos de anomalías"""
+
+    print("=" * 70)
+    print("BENCHMARK DE MODELOS DE ANOMALÍAS - SIDET")
+    print("=" * 70)
+
+    input_path = PROCESSED_DATA_DIR / 'dengue_features.csv'
+    print(f"\nCargando datos desde: {input_path}")
+
+    df = pd.read_csv(input_path)
+    print(f"✓ Datos cargados: {len(df):,} registros, {len(df.columns)} columnas")
+
+    exclude_cols = ['departamento', 'fecha', 'casos', 'ano', 'semana']
+    feature_cols = [col for col in df.columns if col not in exclude_cols]
+
+    print("\n" + "=" * 70)
+    print("REDUCCIÓN DE DIMENSIONALIDAD")
+    print("=" * 70)
+
+    reporte = evaluar_reduccion(df, feature_cols, REGIONES_OBJETIVO,
+                                contamination=ANOMALY_CONFIG['contamination'])
+    print("\n" + reporte.round(3).to_string(index=False))
+
+    print("\n" + "=" * 70)
+    print("ONE-CLASS SVM EXACTO VS APROXIMADO")
+    print("=" * 70)
+
+    reporte = evaluar_ocsvm(df, feature_cols, REGIONES_OBJETIVO,
+                            contamination=ANOMALY_CONFIG['contamination'],
+                            componentes=ANOMALY_CONFIG['ocsvm_componentes'])
+    print("\n" + reporte.round(3).to_string(index=False))
+
+    print("\n" + "=" * 70)
+    print("MODELO GLOBAL VS MODELOS POR REGIÓN")
+    print("=" * 70)
+
+    reporte = evaluar_modelo_global(df, feature_cols, REGIONES_OBJETIVO,
+                                    contamination=ANOMALY_CONFIG['contamination'],
+                                    componentes=ANOMALY_CONFIG['ocsvm_componentes'])
+    print("\n" + reporte.round(3).to_string(index=False))
+
+    print("\n" + "=" * 70)
+    print("✓ BENCHMARK COMPLETADO")
+    print("=" * 70)
+
+
+if __name__ == "__main__":
+    main()
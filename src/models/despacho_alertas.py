@@ -0,0 +1,403 @@
+"""
+Despacho de alertas
+Envía las alertas nuevas o escaladas de cada ejecución a destinos configurables
+(webhook HTTP, correo SMTP, carpeta local) en paralelo, agrupadas en lotes por
+destinatario, con límite de envíos por destino, reintentos con espera
+exponencial y una clave de idempotencia por alerta para no notificar dos veces
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import random
+import smtplib
+import time
+import urllib.error
+import urllib.request
+from abc import ABC, abstractmethod
+from datetime import datetime, timedelta
+from email.message import EmailMessage
+from pathlib import Path
+from typing import Dict, List
+import pandas as pd
+import numpy as np
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Orden de severidad por tipo de alerta
+NIVELES_DESPACHO = {
+    'semanal': ['normal', 'bajo', 'medio', 'alto', 'critico'],
+    'predictiva': ['normal', 'vigilancia', 'preparacion', 'alerta_temprana', 'critico'],
+}
+
+
+def clave_lote(claves: List[str]) -> str:
+    """Clave de idempotencia de un lote (hash de las claves de sus alertas)"""
+    return hashlib.sha256('\n'.join(sorted(claves)).encode()).hexdigest()[:32]
+
+
+class LimitadorTasa:
+    """Espaciado mínimo entre envíos a un mismo destino"""
+
+    def __init__(self, envios_por_minuto: float = None):
+        """
+        Args:
+            envios_por_minuto: Máximo de envíos por minuto (None = sin límite)
+        """
+        self.intervalo = 60.0 / envios_por_minuto if envios_por_minuto else 0.0
+        self._siguiente = 0.0
+
+    async def esperar(self):
+        """Reserva el siguiente turno libre del destino y espera hasta él"""
+        if self.intervalo == 0:
+            return
+        # Sin await entre leer y reservar: las corrutinas del mismo bucle no se pisan
+        ahora = time.monotonic()
+        turno = max(ahora, self._siguiente)
+        self._siguiente = turno + self.intervalo
+        await asyncio.sleep(turno - ahora)
+
+
+class DestinoDespacho(ABC):
+    """Destino de alertas con sus destinatarios (los envíos son síncronos y se ejecutan en hilos)"""
+
+    tipo = None
+
+    def __init__(self, nombre: str, destinatarios: List[Dict], envios_por_minuto: float = None,
+                 timeout: float = 10.0):
+        """
+        Args:
+            nombre: Nombre del destino (parte de la clave de idempotencia registrada)
+            destinatarios: Lista de dicts con 'id' y filtros opcionales 'regiones' y 'nivel_minimo'
+            envios_por_minuto: Límite de envíos por minuto del destino
+            timeout: Segundos máximos por envío
+        """
+        self.nombre = nombre
+        self.destinatarios = destinatarios
+        self.limitador = LimitadorTasa(envios_por_minuto)
+        self.timeout = timeout
+
+    @abstractmethod
+    def enviar(self, destinatario: Dict, lote: Dict):
+        """Envía un lote a un destinatario (lanza una excepción si falla)"""
+
+    @staticmethod
+    def es_permanente(error: Exception) -> bool:
+        """Errores que no se resuelven reintentando"""
+        return False
+
+
+class DestinoArchivo(DestinoDespacho):
+    """Deja cada lote como un archivo JSON en una carpeta (buzón local)"""
+
+    tipo = 'archivo'
+
+    def __init__(self, nombre: str, destinatarios: List[Dict], directorio: str, **kwargs):
+        super().__init__(nombre, destinatarios, **kwargs)
+        self.directorio = Path(directorio)
+
+    def enviar(self, destinatario: Dict, lote: Dict):
+        carpeta = self.directorio / str(destinatario['id'])
+        carpeta.mkdir(parents=True, exist_ok=True)
+        # Escritura atómica: el nombre es la clave del lote, así que repetirlo no duplica archivos
+        destino = carpeta / f"{lote['clave_lote']}.json"
+        temporal = destino.with_suffix('.tmp')
+        temporal.write_text(json.dumps(lote, ensure_ascii=False, indent=2), encoding='utf-8')
+        temporal.replace(destino)
+
+
+class DestinoWebhook(DestinoDespacho):
+    """POST JSON a una URL (la del destinatario o la del destino)"""
+
+    tipo = 'webhook'
+
+    def __init__(self, nombre: str, destinatarios: List[Dict], url: str = None,
+                 cabeceras: Dict = None, **kwargs):
+        super().__init__(nombre, destinatarios, **kwargs)
+        self.url = url
+        self.cabeceras = cabeceras or {}
+
+    def enviar(self, destinatario: Dict, lote: Dict):
+        peticion = urllib.request.Request(
+            destinatario.get('url', self.url),
+            data=json.dumps(lote, ensure_ascii=False).encode('utf-8'),
+            headers={'Content-Type': 'application/json', 'Idempotency-Key': lote['clave_lote'],
+                     **self.cabeceras},
+            method='POST'
+        )
+        with urllib.request.urlopen(peticion, timeout=self.timeout) as respuesta:
+            respuesta.read()
+
+    @staticmethod
+    def es_permanente(error: Exception) -> bool:
+        # 4xx (salvo 408 y 429) indica una petición mal formada o no autorizada
+        return isinstance(error, urllib.error.HTTPError) and 400 <= error.code < 500 \
+            and error.code not in (408, 429)
+
+
+class DestinoSMTP(DestinoDespacho):
+    """Un correo por lote al email del destinatario"""
+
+    tipo = 'smtp'
+
+    def __init__(self, nombre: str, destinatarios: List[Dict], host: str = 'localhost',
+                 puerto: int = 25, remitente: str = 'sidet@localhost', usuario: str = None,
+                 clave_env: str = None, starttls: bool = False, **kwargs):
+        super().__init__(nombre, destinatarios, **kwargs)
+        self.host = host
+        self.puerto = puerto
+        self.remitente = remitente
+        self.usuario = usuario
+        self.clave = os.environ.get(clave_env) if clave_env else None  # Nunca en config.py
+        self.starttls = starttls
+
+    def enviar(self, destinatario: Dict, lote: Dict):
+        mensaje = EmailMessage()
+        mensaje['From'] = self.remitente
+        mensaje['To'] = destinatario.get('email', destinatario['id'])
+        mensaje['Subject'] = (f"[SIDET] {len(lote['alertas'])} alertas {lote['tipo']} "
+                              f"(máximo: {lote['nivel_maximo']})")
+        mensaje['X-Idempotency-Key'] = lote['clave_lote']
+        lineas = [f"{a['region']}  {a['fecha']}  {a['nivel'].upper():16s} casos: {a['casos']}"
+                  for a in lote['alertas']]
+        mensaje.set_content('\n'.join(lineas))
+
+        with smtplib.SMTP(self.host, self.puerto, timeout=self.timeout) as servidor:
+            if self.starttls:
+                servidor.starttls()
+            if self.usuario:
+                servidor.login(self.usuario, self.clave)
+            servidor.send_message(mensaje)
+
+    @staticmethod
+    def es_permanente(error: Exception) -> bool:
+        # Respuestas 5xx del servidor (destinatario rechazado, autenticación, etc.)
+        return isinstance(error, (smtplib.SMTPRecipientsRefused, smtplib.SMTPAuthenticationError))
+
+
+DESTINOS = {
+    'archivo': DestinoArchivo,
+    'webhook': DestinoWebhook,
+    'smtp': DestinoSMTP,
+}
+
+
+class DespachadorAlertas:
+    """
+    Reparte alertas entre destinos y destinatarios.
+
+    Cada (destino, destinatario) recibe sus alertas en lotes de `tamano_lote`.
+    Los lotes de todos los destinos se envían concurrentemente; dentro de un
+    destino se respeta su límite de envíos por minuto. El registro guarda,
+    por destinatario y semana, el nivel más alto ya notificado: una semana
+    solo se vuelve a notificar si escala de nivel.
+    """
+
+    def __init__(self, destinos: List[DestinoDespacho], registro_path: Path = None,
+                 tamano_lote: int = 50, reintentos: int = 3, espera_base: float = 1.0,
+                 retencion_dias: int = 365):
+        """
+        Args:
+            destinos: Destinos de despacho
+            registro_path: Archivo JSON con las alertas ya notificadas (None = sin persistencia)
+            tamano_lote: Alertas máximas por lote
+            reintentos: Reintentos tras el primer fallo
+            espera_base: Segundos de espera antes del primer reintento (se duplica en cada uno)
+            retencion_dias: Días que se conservan las entradas del registro
+        """
+        self.destinos = destinos
+        self.registro_path = Path(registro_path) if registro_path is not None else None
+        self.tamano_lote = tamano_lote
+        self.reintentos = reintentos
+        self.espera_base = espera_base
+        self.retencion_dias = retencion_dias
+        self.registro = self._cargar_registro()
+
+    @classmethod
+    def desde_config(cls, config: Dict, registro_path: Path = None) -> 'DespachadorAlertas':
+        """
+        Crea el despachador a partir de DESPACHO_ALERTAS_CONFIG
+
+        Args:
+            config: Configuración de despacho
+            registro_path: Archivo del registro de notificaciones
+
+        Returns:
+            Despachador configurado
+        """
+        destinos = []
+        for params in config['destinos']:
+            params = dict(params)
+            clase = DESTINOS[params.pop('tipo')]
+            params.setdefault('timeout', config.get('timeout', 10.0))
+            destinos.append(clase(**params))
+
+        return cls(destinos, registro_path, tamano_lote=config['tamano_lote'],
+                   reintentos=config['reintentos'], espera_base=config['espera_base'],
+                   retencion_dias=config['retencion_dias'])
+
+    def _cargar_registro(self) -> Dict:
+        """Lee el registro de notificaciones y descarta las entradas caducadas"""
+        if self.registro_path is None or not self.registro_path.exists():
+            return {}
+        registro = json.loads(self.registro_path.read_text(encoding='utf-8'))
+        limite = (datetime.now() - timedelta(days=self.retencion_dias)).isoformat()
+        return {k: v for k, v in registro.items() if v['enviado'] >= limite}
+
+    def _guardar_registro(self):
+        """Escribe el registro de forma atómica"""
+        if self.registro_path is None:
+            return
+        self.registro_path.parent.mkdir(parents=True, exist_ok=True)
+        temporal = self.registro_path.with_suffix('.tmp')
+        temporal.write_text(json.dumps(self.registro, ensure_ascii=False), encoding='utf-8')
+        temporal.replace(self.registro_path)
+
+    @staticmethod
+    def preparar_alertas(df_alertas: pd.DataFrame, tipo: str = 'semanal',
+                         nivel_minimo: str = 'alto', ultimas_semanas: int = None,
+                         col_region: str = 'departamento', col_fecha: str = 'fecha',
+                         col_nivel: str = 'nivel_riesgo',
+                         col_casos: str = 'casos_actual') -> pd.DataFrame:
+        """
+        Alertas candidatas a notificar con su clave de idempotencia
+
+        Args:
+            df_alertas: Alertas nuevas o recalculadas de la ejecución
+            tipo: 'semanal' o 'predictiva'
+            nivel_minimo: Nivel a partir del cual se notifica
+            ultimas_semanas: Solo semanas recientes (evita notificar la historia en un recálculo completo)
+            col_region: Columna de región
+            col_fecha: Columna de fecha
+            col_nivel: Columna de nivel
+            col_casos: Columna de casos
+
+        Returns:
+            DataFrame con region, fecha, nivel, orden, casos, base y clave
+            (clave = tipo:region:fecha:nivel, la misma semana y nivel nunca se notifica dos veces)
+        """
+        niveles = NIVELES_DESPACHO[tipo]
+        orden = pd.Series(np.arange(len(niveles)), index=niveles)
+
+        fechas = pd.to_datetime(df_alertas[col_fecha])
+        mascara = df_alertas[col_nivel].map(orden).fillna(-1).to_numpy() >= orden[nivel_minimo]
+        if ultimas_semanas is not None and len(df_alertas) > 0:
+            mascara &= (fechas >= fechas.max() - pd.Timedelta(weeks=ultimas_semanas)).to_numpy()
+
+        df = pd.DataFrame({
+            'region': df_alertas[col_region].astype(str).to_numpy()[mascara],
+            'fecha': fechas.dt.strftime('%Y-%m-%d').to_numpy()[mascara],
+            'nivel': df_alertas[col_nivel].to_numpy()[mascara],
+            'casos': pd.to_numeric(df_alertas[col_casos], errors='coerce').round(1).to_numpy()[mascara],
+        })
+        df['orden'] = df['nivel'].map(orden).astype(np.int64)
+        df['base'] = tipo + ':' + df['region'] + ':' + df['fecha']
+        df['clave'] = df['base'] + ':' + df['nivel']
+        return df
+
+    def _lotes(self, destino: DestinoDespacho, df: pd.DataFrame, tipo: str) -> List[tuple]:
+        """Lotes pendientes de cada destinatario (filtrados y sin alertas ya notificadas)"""
+        niveles = NIVELES_DESPACHO[tipo]
+        lotes = []
+
+        for destinatario in destino.destinatarios:
+            sub = df
+            if destinatario.get('regiones'):
+                sub = sub[sub['region'].isin(destinatario['regiones'])]
+            if destinatario.get('nivel_minimo'):
+                sub = sub[sub['orden'] >= niveles.index(destinatario['nivel_minimo'])]
+
+            # Solo alertas nuevas o que escalan sobre lo ya notificado a este destinatario
+            prefijo = f"{destino.nombre}|{destinatario['id']}|"
+            notificado = sub['base'].map(lambda b: self.registro.get(prefijo + b, {}).get('orden', -1))
+            sub = sub[sub['orden'] > notificado].sort_values(['orden', 'fecha'], ascending=[False, False])
+
+            for inicio in range(0, len(sub), self.tamano_lote):
+                parte = sub.iloc[inicio:inicio + self.tamano_lote]
+                lote = {
+                    'tipo': tipo,
+                    'destinatario': destinatario['id'],
+                    'clave_lote': clave_lote(parte['clave'].tolist()),
+                    'nivel_maximo': niveles[int(parte['orden'].max())],
+                    'generado': datetime.now().isoformat(timespec='seconds'),
+                    'alertas': [
+                        {'clave': c, 'region': r, 'fecha': f, 'nivel': n,
+                         'casos': None if pd.isna(x) else float(x)}
+                        for c, r, f, n, x in zip(parte['clave'], parte['region'], parte['fecha'],
+                                                 parte['nivel'], parte['casos'])
+                    ],
+                }
+                lotes.append((destinatario, lote, parte[['base', 'orden']]))
+
+        return lotes
+
+    async def _enviar_con_reintentos(self, destino: DestinoDespacho, destinatario: Dict,
+                                     lote: Dict) -> Dict:
+        """Envía un lote reintentando con espera exponencial y jitter"""
+        error = None
+        for intento in range(self.reintentos + 1):
+            await destino.limitador.esperar()
+            try:
+                await asyncio.to_thread(destino.enviar, destinatario, lote)
+                return {'estado': 'enviado', 'intentos': intento + 1, 'error': None}
+            except Exception as e:
+                error = e
+                if destino.es_permanente(e) or intento == self.reintentos:
+                    break
+                espera = self.espera_base * 2 ** intento * (1 + random.random() * 0.1)
+                logger.warning(f"{destino.nombre}/{destinatario['id']}: {e!r}; reintento en {espera:.1f}s")
+                await asyncio.sleep(espera)
+
+        return {'estado': 'fallido', 'intentos': intento + 1, 'error': repr(error)}
+
+    async def _despachar(self, df: pd.DataFrame, tipo: str) -> List[Dict]:
+        """Envía concurrentemente todos los lotes de todos los destinos"""
+        trabajos = [(destino, destinatario, lote, claves)
+                    for destino in self.destinos
+                    for destinatario, lote, claves in self._lotes(destino, df, tipo)]
+
+        resultados = await asyncio.gather(*[
+            self._enviar_con_reintentos(destino, destinatario, lote)
+            for destino, destinatario, lote, _ in trabajos
+        ])
+
+        filas = []
+        ahora = datetime.now().isoformat()
+        for (destino, destinatario, lote, claves), resultado in zip(trabajos, resultados):
+            if resultado['estado'] == 'enviado':
+                prefijo = f"{destino.nombre}|{destinatario['id']}|"
+                for base, orden in zip(claves['base'], claves['orden']):
+                    self.registro[prefijo + base] = {'orden': int(orden), 'enviado': ahora}
+            filas.append({'destino': destino.nombre, 'tipo_destino': destino.tipo,
+                          'destinatario': destinatario['id'], 'clave_lote': lote['clave_lote'],
+                          'alertas': len(lote['alertas']), **resultado})
+        return filas
+
+    def despachar(self, df_alertas: pd.DataFrame, tipo: str = 'semanal', nivel_minimo: str = 'alto',
+                  ultimas_semanas: int = None, **columnas) -> pd.DataFrame:
+        """
+        Notifica las alertas nuevas o escaladas a todos los destinos
+
+        Args:
+            df_alertas: Alertas nuevas o recalculadas de la ejecución
+            tipo: 'semanal' o 'predictiva'
+            nivel_minimo: Nivel a partir del cual se notifica
+            ultimas_semanas: Solo semanas recientes
+            **columnas: Nombres de columnas para preparar_alertas (col_region, col_fecha, ...)
+
+        Returns:
+            DataFrame con un registro por lote (destino, destinatario, alertas, estado, intentos, error)
+        """
+        df = self.preparar_alertas(df_alertas, tipo, nivel_minimo, ultimas_semanas, **columnas)
+        filas = asyncio.run(self._despachar(df, tipo))
+        self._guardar_registro()
+
+        df_resultado = pd.DataFrame(filas, columns=['destino', 'tipo_destino', 'destinatario', 'clave_lote',
+                                                    'alertas', 'estado', 'intentos', 'error'])
+        enviados = df_resultado['estado'] == 'enviado'
+        logger.info(f"✓ Despacho: {int(df_resultado.loc[enviados, 'alertas'].sum()):,} alertas en "
+                    f"{int(enviados.sum())} lotes enviados, {int((~enviados).sum())} lotes fallidos")
+        return df_resultado
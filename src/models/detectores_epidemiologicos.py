@@ -0,0 +1,299 @@
+"""
+Detectores clásicos de aberraciones de vigilancia epidemiológica
+EARS C1/C2/C3, CUSUM y una línea base estacional tipo Farrington calculados
+para todas las series a la vez sobre la matriz semanas × series del panel
+"""
+
+import pandas as pd
+import numpy as np
+from scipy.stats import norm
+from typing import Dict, Tuple
+import logging
+
+from src.features.panel import PanelSemanal, desplazar
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Detectores disponibles (columna anomalia_<nombre> en la salida)
+DETECTORES = ['ears_c1', 'ears_c2', 'ears_c3', 'cusum', 'farrington']
+
+# Familias de detectores: C1/C2/C3 comparten línea base y se disparan juntos,
+# así que en el consenso cuentan como un solo voto
+FAMILIAS = {
+    'ears': ['ears_c1', 'ears_c2', 'ears_c3'],
+    'cusum': ['cusum'],
+    'farrington': ['farrington'],
+}
+
+
+def votos_familias(df: pd.DataFrame) -> np.ndarray:
+    """
+    Número de familias de detectores que marcan cada fila
+
+    Args:
+        df: DataFrame con las columnas anomalia_<detector> (0/1)
+
+    Returns:
+        Array con los votos por fila (una familia vota si alguno de sus detectores marca)
+    """
+    return sum(
+        (df[[f'anomalia_{d}' for d in detectores]].to_numpy() > 0).any(axis=1).astype(int)
+        for detectores in FAMILIAS.values()
+    )
+
+
+def estadisticas_ventana(matriz: np.ndarray, ventana: int,
+                         retraso: int = 0) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Media y desviación estándar de las `ventana` semanas anteriores a t - retraso
+
+    Se calculan con sumas acumuladas (O(semanas × series)) ignorando los NaN;
+    solo hay valor cuando la ventana de referencia está completa.
+
+    Args:
+        matriz: Matriz (n_semanas, n_series)
+        ventana: Semanas de la línea base
+        retraso: Semanas de guarda entre la línea base y la semana evaluada
+
+    Returns:
+        Tupla (media, std) con la forma de la matriz
+    """
+    n = matriz.shape[0]
+    presentes = ~np.isnan(matriz)
+    valores = np.where(presentes, matriz, 0.0)
+
+    ceros = np.zeros((1, matriz.shape[1]))
+    suma = np.vstack([ceros, np.cumsum(valores, axis=0)])
+    suma_cuad = np.vstack([ceros, np.cumsum(valores ** 2, axis=0)])
+    conteo = np.vstack([ceros, np.cumsum(presentes, axis=0)])
+
+    fin = np.arange(n) - retraso          # exclusivo
+    inicio = fin - ventana
+    validas = inicio >= 0
+
+    media = np.full(matriz.shape, np.nan)
+    std = np.full(matriz.shape, np.nan)
+
+    f, i = fin[validas], inicio[validas]
+    n_obs = conteo[f] - conteo[i]
+    s = suma[f] - suma[i]
+    s2 = suma_cuad[f] - suma_cuad[i]
+
+    completas = n_obs == ventana
+    with np.errstate(invalid='ignore', divide='ignore'):
+        m = s / n_obs
+        var = np.maximum(s2 - n_obs * m ** 2, 0.0) / (n_obs - 1)
+
+    media[validas] = np.where(completas, m, np.nan)
+    std[validas] = np.where(completas, np.sqrt(var), np.nan)
+
+    return media, std
+
+
+class DetectoresEpidemiologicos:
+    """Algoritmos de aberración de salud pública vectorizados sobre todas las series"""
+
+    def __init__(self, ventana_ears: int = 7, umbral_c1: float = 3.0, umbral_c2: float = 3.0,
+                 umbral_c3: float = 2.0, std_minima: float = 0.5,
+                 ventana_cusum: int = 52, k_cusum: float = 0.5, h_cusum: float = 4.0,
+                 anios_farrington: int = 5, semanas_farrington: int = 3,
+                 alpha_farrington: float = 0.05, min_casos_farrington: int = 5,
+                 min_votos: int = 2):
+        """
+        Inicializa los detectores
+
+        Args:
+            ventana_ears: Semanas de línea base de EARS
+            umbral_c1: Umbral del estadístico C1
+            umbral_c2: Umbral del estadístico C2
+            umbral_c3: Umbral del estadístico C3
+            std_minima: Desviación mínima de la línea base (evita divisiones por 0)
+            ventana_cusum: Semanas de línea base para estandarizar el CUSUM
+            k_cusum: Holgura de referencia del CUSUM (en desviaciones)
+            h_cusum: Umbral de decisión del CUSUM
+            anios_farrington: Años previos usados como referencia
+            semanas_farrington: Semanas a cada lado de la misma semana en años previos
+            alpha_farrington: Nivel del umbral superior
+            min_casos_farrington: Casos mínimos en las últimas 4 semanas para alertar
+            min_votos: Familias de detectores (EARS, CUSUM, Farrington) que deben coincidir para el consenso
+        """
+        self.ventana_ears = ventana_ears
+        self.umbral_c1 = umbral_c1
+        self.umbral_c2 = umbral_c2
+        self.umbral_c3 = umbral_c3
+        self.std_minima = std_minima
+        self.ventana_cusum = ventana_cusum
+        self.k_cusum = k_cusum
+        self.h_cusum = h_cusum
+        self.anios_farrington = anios_farrington
+        self.semanas_farrington = semanas_farrington
+        self.alpha_farrington = alpha_farrington
+        self.min_casos_farrington = min_casos_farrington
+        self.min_votos = min_votos
+
+    def _estadistico_ears(self, matriz: np.ndarray, retraso: int) -> np.ndarray:
+        """(x_t - media) / std de la línea base EARS con el retraso dado"""
+        media, std = estadisticas_ventana(matriz, self.ventana_ears, retraso)
+        return (matriz - media) / np.maximum(std, self.std_minima)
+
+    def ears(self, matriz: np.ndarray) -> Dict[str, np.ndarray]:
+        """
+        EARS C1 (línea base inmediata), C2 (2 semanas de guarda) y C3 (suma de
+        los excesos de C2 en las últimas 3 semanas)
+
+        Args:
+            matriz: Matriz de casos (n_semanas, n_series)
+
+        Returns:
+            Diccionario con los estadísticos ears_c1, ears_c2 y ears_c3
+        """
+        c1 = self._estadistico_ears(matriz, retraso=0)
+        c2 = self._estadistico_ears(matriz, retraso=2)
+
+        exceso = np.maximum(c2 - 1.0, 0.0)
+        c3 = exceso + desplazar(exceso, 1) + desplazar(exceso, 2)
+        c3[np.isnan(c2)] = np.nan
+
+        return {'ears_c1': c1, 'ears_c2': c2, 'ears_c3': c3}
+
+    def cusum(self, matriz: np.ndarray) -> np.ndarray:
+        """
+        CUSUM unilateral superior sobre los casos estandarizados
+
+        La recursión avanza semana a semana, pero cada paso actualiza todas las
+        series a la vez. El acumulado se reinicia tras cada alarma.
+
+        Args:
+            matriz: Matriz de casos (n_semanas, n_series)
+
+        Returns:
+            Matriz con el estadístico CUSUM
+        """
+        media, std = estadisticas_ventana(matriz, self.ventana_cusum, retraso=2)
+        z = (matriz - media) / np.maximum(std, self.std_minima)
+
+        salida = np.full(matriz.shape, np.nan)
+        acumulado = np.zeros(matriz.shape[1])
+
+        for t in range(matriz.shape[0]):
+            validos = ~np.isnan(z[t])
+            acumulado = np.where(validos, np.maximum(0.0, acumulado + np.nan_to_num(z[t]) - self.k_cusum),
+                                 acumulado)
+            salida[t] = np.where(validos, acumulado, np.nan)
+            acumulado = np.where(acumulado > self.h_cusum, 0.0, acumulado)
+
+        return salida
+
+    def farrington(self, matriz: np.ndarray, semanas_anio: int = 52) -> Dict[str, np.ndarray]:
+        """
+        Línea base estacional tipo Farrington
+
+        El valor esperado es la media de las mismas semanas (± semanas_farrington)
+        de los años previos; el umbral superior usa la transformación 2/3 de
+        Farrington con sobredispersión estimada. No se ajusta tendencia.
+
+        Args:
+            matriz: Matriz de casos (n_semanas, n_series)
+            semanas_anio: Semanas por año
+
+        Returns:
+            Diccionario con farrington_esperado, farrington_umbral y
+            casos_4_semanas (para la regla de casos mínimos)
+        """
+        suma = np.zeros(matriz.shape)
+        suma_cuad = np.zeros(matriz.shape)
+        conteo = np.zeros(matriz.shape)
+
+        # Acumular las semanas de referencia sin materializar un cubo 3-D
+        for anio in range(1, self.anios_farrington + 1):
+            for d in range(-self.semanas_farrington, self.semanas_farrington + 1):
+                ref = desplazar(matriz, anio * semanas_anio + d)
+                presentes = ~np.isnan(ref)
+                ref = np.where(presentes, ref, 0.0)
+                suma += ref
+                suma_cuad += ref ** 2
+                conteo += presentes
+
+        suficientes = conteo >= 2 * self.semanas_farrington + 1
+        with np.errstate(invalid='ignore', divide='ignore'):
+            esperado = np.where(suficientes, suma / conteo, np.nan)
+            var = np.maximum(suma_cuad - conteo * esperado ** 2, 0.0) / (conteo - 1)
+            phi = np.where(esperado > 0, np.maximum(1.0, var / esperado), 1.0)
+
+            z = norm.ppf(1 - self.alpha_farrington)
+            umbral = np.where(
+                esperado > 0,
+                esperado * (1 + (2.0 / 3.0) * z * np.sqrt(phi / esperado)) ** 1.5,
+                0.0
+            )
+        umbral[~suficientes] = np.nan
+
+        casos = np.nan_to_num(matriz)
+        casos_4_semanas = casos + sum(np.nan_to_num(desplazar(matriz, k)) for k in range(1, 4))
+
+        return {'farrington_esperado': esperado, 'farrington_umbral': umbral,
+                'casos_4_semanas': casos_4_semanas}
+
+    def calcular(self, panel: PanelSemanal) -> Dict[str, np.ndarray]:
+        """
+        Calcula estadísticos y banderas de todos los detectores sobre el panel
+
+        Args:
+            panel: Panel semanal de casos
+
+        Returns:
+            Diccionario columna → matriz (n_semanas, n_series)
+        """
+        casos = panel.valores
+        salida = self.ears(casos)
+        salida['cusum'] = self.cusum(casos)
+        farrington = self.farrington(casos)
+        salida['farrington_esperado'] = farrington['farrington_esperado']
+        salida['farrington_umbral'] = farrington['farrington_umbral']
+
+        salida['anomalia_ears_c1'] = salida['ears_c1'] > self.umbral_c1
+        salida['anomalia_ears_c2'] = salida['ears_c2'] > self.umbral_c2
+        salida['anomalia_ears_c3'] = salida['ears_c3'] > self.umbral_c3
+        salida['anomalia_cusum'] = salida['cusum'] > self.h_cusum
+        salida['anomalia_farrington'] = (
+            (casos > farrington['farrington_umbral'])
+            & (farrington['casos_4_semanas'] > self.min_casos_farrington)
+        )
+
+        return salida
+
+    def detectar_anomalias(self, df: pd.DataFrame, col_casos: str = 'casos',
+                           col_fecha: str = 'fecha',
+                           col_departamento: str = 'departamento') -> pd.DataFrame:
+        """
+        Aplica todos los detectores a todas las regiones de una vez
+
+        Args:
+            df: DataFrame con una fila por región y semana
+            col_casos: Columna de casos
+            col_fecha: Columna de fecha
+            col_departamento: Columna de departamento
+
+        Returns:
+            Copia del DataFrame con los estadísticos, anomalia_<detector> (0/1)
+            y anomalia_consenso (al menos min_votos familias de detectores)
+        """
+        logger.info("Aplicando detectores epidemiológicos (EARS, CUSUM, Farrington)...")
+
+        panel = PanelSemanal.desde_dataframe(df, col_casos, col_fecha, col_departamento)
+        idx_t, idx_s = panel.indices_filas(df, col_fecha, col_departamento)
+
+        df_resultado = df.copy()
+        for col, matriz in self.calcular(panel).items():
+            valores = panel.a_filas(matriz.astype(float), idx_t, idx_s)
+            if col.startswith('anomalia_'):
+                valores = np.nan_to_num(valores).astype(int)
+            df_resultado[col] = valores
+
+        df_resultado['anomalia_consenso'] = (votos_familias(df_resultado) >= self.min_votos).astype(int)
+
+        logger.info(f"✓ Semanas con aberración (consenso): {df_resultado['anomalia_consenso'].sum():,} "
+                    f"en {len(panel.series)} series")
+
+        return df_resultado
@@ -0,0 +1,253 @@
+"""
+Episodios de alerta
+Comprime la serie semanal de niveles de riesgo de cada región en episodios
+(rachas consecutivas en alerta o en normalidad) con una codificación por
+longitud de rachas vectorizada, y los actualiza al llegar semanas nuevas
+"""
+
+import pandas as pd
+import numpy as np
+from typing import List
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+NIVELES_ALERTA = ['normal', 'bajo', 'medio', 'alto', 'critico']
+COLUMNAS_SEMANAS = [f'semanas_{nivel}' for nivel in NIVELES_ALERTA]
+
+
+def construir_episodios(df_alertas: pd.DataFrame, nivel_minimo: str = 'bajo',
+                        col_departamento: str = 'departamento', col_fecha: str = 'fecha',
+                        col_casos: str = 'casos_actual') -> pd.DataFrame:
+    """
+    Agrupa las semanas consecutivas de cada región según estén o no en alerta
+
+    Args:
+        df_alertas: DataFrame de alertas (una fila por región y semana con nivel_riesgo y z_score)
+        nivel_minimo: Nivel a partir del cual la semana cuenta como alerta
+        col_departamento: Columna de departamento
+        col_fecha: Columna de fecha
+        col_casos: Columna de casos
+
+    Returns:
+        DataFrame con un episodio por fila: departamento, episodio, fecha_inicio,
+        fecha_fin, semanas, activo, nivel_pico, z_score_pico, casos_totales y
+        semanas por nivel
+    """
+    df = df_alertas[[col_departamento, col_fecha, 'nivel_riesgo', 'z_score', col_casos]].copy()
+    df[col_fecha] = pd.to_datetime(df[col_fecha])
+    df = df.sort_values([col_departamento, col_fecha], kind='stable')
+
+    region = df[col_departamento].to_numpy()
+    nivel = pd.Categorical(df['nivel_riesgo'], categories=NIVELES_ALERTA).codes
+    activo = nivel >= NIVELES_ALERTA.index(nivel_minimo)
+
+    # Inicio de racha: cambia la región o el estado de alerta
+    cambio = np.ones(len(df), dtype=bool)
+    cambio[1:] = (region[1:] != region[:-1]) | (activo[1:] != activo[:-1])
+    inicios = np.flatnonzero(cambio)
+    finales = np.append(inicios[1:], len(df))[:len(inicios)] - 1
+
+    fechas = df[col_fecha].to_numpy()
+    z = df['z_score'].to_numpy(dtype=float)
+    casos = np.nan_to_num(df[col_casos].to_numpy(dtype=float))
+    una_semana = np.eye(len(NIVELES_ALERTA), dtype=np.int64)[np.maximum(nivel, 0)]
+
+    episodios = pd.DataFrame({
+        col_departamento: region[inicios],
+        'fecha_inicio': fechas[inicios],
+        'fecha_fin': fechas[finales],
+        'semanas': finales - inicios + 1,
+        'activo': activo[inicios],
+        'nivel_pico': np.maximum.reduceat(nivel, inicios) if len(inicios) else nivel[:0],
+        'z_score_pico': np.fmax.reduceat(z, inicios) if len(inicios) else z[:0],
+        'casos_totales': np.add.reduceat(casos, inicios) if len(inicios) else casos[:0],
+    })
+    conteos = np.add.reduceat(una_semana, inicios, axis=0) if len(inicios) else una_semana[:0]
+    for i, col in enumerate(COLUMNAS_SEMANAS):
+        episodios[col] = conteos[:, i]
+
+    episodios['nivel_pico'] = np.array(NIVELES_ALERTA, dtype=object)[episodios['nivel_pico'].to_numpy()]
+
+    return _numerar(episodios, col_departamento)
+
+
+def _numerar(episodios: pd.DataFrame, col_departamento: str) -> pd.DataFrame:
+    """Ordena los episodios y los numera dentro de cada región"""
+    episodios = episodios.sort_values([col_departamento, 'fecha_inicio'], kind='stable').reset_index(drop=True)
+    episodios.insert(1, 'episodio', episodios.groupby(col_departamento).cumcount() + 1)
+    return episodios
+
+
+def _unir(anterior: pd.DataFrame, siguiente: pd.DataFrame) -> pd.DataFrame:
+    """Une dos episodios contiguos del mismo estado (filas alineadas)"""
+    unido = anterior.copy()
+    unido['fecha_fin'] = siguiente['fecha_fin'].to_numpy()
+    unido['semanas'] = anterior['semanas'].to_numpy() + siguiente['semanas'].to_numpy()
+    orden = {nivel: i for i, nivel in enumerate(NIVELES_ALERTA)}
+    pico = np.maximum(anterior['nivel_pico'].map(orden).to_numpy(), siguiente['nivel_pico'].map(orden).to_numpy())
+    unido['nivel_pico'] = np.array(NIVELES_ALERTA, dtype=object)[pico]
+    unido['z_score_pico'] = np.fmax(anterior['z_score_pico'].to_numpy(), siguiente['z_score_pico'].to_numpy())
+    unido['casos_totales'] = anterior['casos_totales'].to_numpy() + siguiente['casos_totales'].to_numpy()
+    for col in COLUMNAS_SEMANAS:
+        unido[col] = anterior[col].to_numpy() + siguiente[col].to_numpy()
+    return unido
+
+
+def actualizar_episodios(df_episodios: pd.DataFrame, df_nuevas: pd.DataFrame,
+                         df_alertas: pd.DataFrame = None, nivel_minimo: str = 'bajo',
+                         col_departamento: str = 'departamento', col_fecha: str = 'fecha',
+                         col_casos: str = 'casos_actual') -> pd.DataFrame:
+    """
+    Incorpora semanas nuevas o revisadas a la tabla de episodios
+
+    Las semanas posteriores al último episodio de su región se codifican y el
+    primer episodio nuevo se une al último guardado si tienen el mismo estado.
+    Si llegan semanas revisadas, los episodios afectados (desde el anterior a
+    la primera semana revisada) se reconstruyen desde la tabla de alertas completa.
+
+    Args:
+        df_episodios: Episodios guardados
+        df_nuevas: Alertas recién calculadas
+        df_alertas: Tabla de alertas completa (necesaria solo para revisiones)
+        nivel_minimo: Nivel a partir del cual la semana cuenta como alerta
+        col_departamento: Columna de departamento
+        col_fecha: Columna de fecha
+        col_casos: Columna de casos
+
+    Returns:
+        Tabla de episodios actualizada (igual a construir_episodios sobre todas las semanas)
+    """
+    if len(df_nuevas) == 0:
+        return df_episodios
+
+    df_episodios = df_episodios.drop(columns='episodio').copy()
+    for col in ['fecha_inicio', 'fecha_fin']:
+        df_episodios[col] = pd.to_datetime(df_episodios[col])
+    fechas_nuevas = pd.to_datetime(df_nuevas[col_fecha])
+
+    ultimo_fin = df_episodios.groupby(col_departamento)['fecha_fin'].max()
+    inicio_nuevas = fechas_nuevas.groupby(df_nuevas[col_departamento].to_numpy()).min()
+    revisadas = inicio_nuevas.index[inicio_nuevas <= inicio_nuevas.index.map(ultimo_fin)]
+
+    # Regiones con semanas revisadas: reconstruir desde la tabla completa
+    reconstruidos = []
+    if len(revisadas) > 0:
+        if df_alertas is None:
+            raise ValueError(f"Semanas revisadas en {list(revisadas)}: hace falta la tabla de alertas completa")
+        # Se reconstruye también el episodio anterior a la primera semana revisada:
+        # si la revisión cambia el estado de esa semana, la racha reconstruida
+        # puede continuar la anterior y hay que unirlas igual que en construir_episodios
+        en_revision = df_episodios[col_departamento].isin(revisadas)
+        inicio_revision = df_episodios[col_departamento].map(inicio_nuevas)
+        previos = df_episodios[en_revision & (df_episodios['fecha_fin'] < inicio_revision)]
+        posteriores = df_episodios[en_revision & (df_episodios['fecha_fin'] >= inicio_revision)]
+        desde = pd.concat([
+            previos.groupby(col_departamento)['fecha_inicio'].max(),
+            posteriores.groupby(col_departamento)['fecha_inicio'].min(),
+        ]).groupby(level=0).min()
+        desde = np.minimum(desde, inicio_nuevas[desde.index])
+        afectados = en_revision & (df_episodios['fecha_inicio'] >= df_episodios[col_departamento].map(desde))
+        df_episodios = df_episodios[~afectados]
+
+        fechas_tabla = pd.to_datetime(df_alertas[col_fecha])
+        filas = df_alertas[col_departamento].isin(revisadas) & \
+            (fechas_tabla >= df_alertas[col_departamento].map(desde))
+        reconstruidos.append(construir_episodios(df_alertas[filas], nivel_minimo, col_departamento,
+                                                 col_fecha, col_casos).drop(columns='episodio'))
+        logger.info(f"Episodios reconstruidos por revisión: {len(revisadas)} regiones")
+
+    # Regiones con semanas solo nuevas: codificar y unir con el último episodio
+    anexas = df_nuevas[~df_nuevas[col_departamento].isin(revisadas)]
+    nuevos = construir_episodios(anexas, nivel_minimo, col_departamento, col_fecha,
+                                 col_casos).drop(columns='episodio')
+
+    primeros = nuevos.groupby(col_departamento).head(1)
+    ultimos = df_episodios.sort_values('fecha_inicio').groupby(col_departamento).tail(1)
+    pares = ultimos.reset_index().merge(primeros.reset_index(), on=col_departamento,
+                                        suffixes=('_anterior', '_siguiente'))
+    pares = pares[pares['activo_anterior'] == pares['activo_siguiente']]
+
+    if len(pares) > 0:
+        columnas = [c for c in nuevos.columns if c != col_departamento]
+        anterior = df_episodios.loc[pares['index_anterior']]
+        siguiente = nuevos.loc[pares['index_siguiente'], columnas]
+        unidos = _unir(anterior, siguiente)
+        for col in columnas:
+            df_episodios.loc[pares['index_anterior'], col] = unidos[col].to_numpy()
+        nuevos = nuevos.drop(index=pares['index_siguiente'])
+
+    resultado = pd.concat([df_episodios, nuevos] + reconstruidos, ignore_index=True)
+    resultado = resultado.astype({col: np.int64 for col in ['semanas'] + COLUMNAS_SEMANAS})
+    resultado['activo'] = resultado['activo'].astype(bool)
+
+    logger.info(f"✓ Episodios actualizados: {len(resultado):,} ({len(df_nuevas):,} semanas nuevas o revisadas)")
+
+    return _numerar(resultado, col_departamento)
+
+
+def episodios_activos(df_episodios: pd.DataFrame, fecha_referencia=None, ultimas_semanas: int = 4,
+                      niveles: List[str] = None, col_departamento: str = 'departamento') -> pd.DataFrame:
+    """
+    Episodios en alerta que siguen abiertos en las últimas semanas
+
+    Args:
+        df_episodios: Tabla de episodios
+        fecha_referencia: Fecha actual (por defecto el último fin de episodio)
+        ultimas_semanas: Semanas recientes a considerar
+        niveles: Niveles pico a incluir (por defecto todos)
+        col_departamento: Columna de departamento
+
+    Returns:
+        Episodios activos ordenados por nivel pico y z-score
+    """
+    fecha_fin = pd.to_datetime(df_episodios['fecha_fin'])
+    if fecha_referencia is None:
+        fecha_referencia = fecha_fin.max()
+    limite = pd.Timestamp(fecha_referencia) - pd.Timedelta(weeks=ultimas_semanas)
+
+    activos = df_episodios[df_episodios['activo'].astype(bool) & (fecha_fin >= limite)].copy()
+    if niveles is not None:
+        activos = activos[activos['nivel_pico'].isin(niveles)]
+
+    activos['orden'] = activos['nivel_pico'].map({n: -i for i, n in enumerate(NIVELES_ALERTA)})
+    activos = activos.sort_values(['orden', 'z_score_pico'], ascending=[True, False])
+    return activos.drop(columns='orden')
+
+
+def resumen_episodios(df_episodios: pd.DataFrame, col_departamento: str = 'departamento') -> pd.DataFrame:
+    """
+    Reporte por región a partir de los episodios (sin recorrer las semanas)
+
+    Args:
+        df_episodios: Tabla de episodios
+        col_departamento: Columna de departamento
+
+    Returns:
+        DataFrame con semanas por nivel, episodios de alerta, el más largo,
+        z-score máximo y el estado del último episodio de cada región
+    """
+    df = df_episodios.copy()
+    df['semanas_alerta'] = np.where(df['activo'].astype(bool), df['semanas'], 0)
+    df['episodios_alerta'] = df['activo'].astype(bool).astype(int)
+
+    resumen = df.groupby(col_departamento).agg(
+        total_registros=('semanas', 'sum'),
+        episodios_alerta=('episodios_alerta', 'sum'),
+        semanas_alerta=('semanas_alerta', 'sum'),
+        episodio_mas_largo=('semanas_alerta', 'max'),
+        alertas_criticas=('semanas_critico', 'sum'),
+        alertas_altas=('semanas_alto', 'sum'),
+        alertas_medias=('semanas_medio', 'sum'),
+        alertas_bajas=('semanas_bajo', 'sum'),
+        casos_totales=('casos_totales', 'sum'),
+        z_score_maximo=('z_score_pico', 'max')
+    )
+
+    ultimos = df.sort_values('fecha_inicio').groupby(col_departamento).tail(1).set_index(col_departamento)
+    resumen['en_alerta'] = ultimos['activo'].astype(bool)
+    resumen['en_alerta_desde'] = ultimos['fecha_inicio'].where(ultimos['activo'].astype(bool))
+
+    resumen = resumen.reset_index().rename(columns={col_departamento: 'region'})
+    return resumen.sort_values('alertas_criticas', ascending=False)
@@ -27,6 +27,9 @@ from tensorflow.keras import Sequential
 from tensorflow.keras.layers import LSTM, Dense, Dropout
 from tensorflow.keras.callbacks import EarlyStopping
 
+from src.features.panel import PanelSemanal
+from src.features.multiresolucion import ResampleadorPanel
+
 warnings.filterwarnings('ignore')
 
 
@@ -337,9 +340,16 @@ class LSTMForecaster(BaseForecaster):
 class XGBoostForecaster(BaseForecaster):
     """Modelo XGBoost para predicción con features engineered"""
     
-    def __init__(self, lookback: int = 52):
+    def __init__(self, lookback: int = 52, resoluciones: List[str] = None):
+        """
+        Args:
+            lookback: Ventana de observación
+            resoluciones: Agregados multi-resolución a incluir como features
+                         (p. ej. ['4semanas', 'mensual', 'temporada'])
+        """
         super().__init__('XGBoost')
         self.lookback = lookback
+        self.resoluciones = resoluciones
         self.feature_columns = []
         
     def _create_features(self, data: pd.DataFrame, target_col: str = 'casos') -> pd.DataFrame:
@@ -362,6 +372,19 @@ class XGBoostForecaster(BaseForecaster):
             df['mes'] = df['fecha'].dt.month
             df['trimestre'] = df['fecha'].dt.quarter
         
+        # Agregados a 4 semanas, mes y temporada (modelos guardados antes no los tienen)
+        resoluciones = getattr(self, 'resoluciones', None)
+        if resoluciones and 'fecha' in df.columns:
+            panel = PanelSemanal(df[[target_col]].to_numpy(dtype=float),
+                                 pd.DatetimeIndex(df['fecha']), pd.Index([target_col]))
+            # Acumulado del período sin la semana actual (no usa el objetivo); el total
+            # del período anterior es el mismo en todas las semanas del período
+            agregados = ResampleadorPanel(resoluciones).agregar(panel, incluir_actual=False)
+            for resolucion, matrices in agregados.items():
+                df[f'{resolucion}_acumulado'] = matrices['acumulado'][:, 0]
+                df[f'{resolucion}_anterior'] = matrices['anterior'][:, 0]
+                df[f'{resolucion}_media_anterior'] = matrices['media_anterior'][:, 0]
+        
         # Tendencia
         df['tendencia'] = np.arange(len(df))
         
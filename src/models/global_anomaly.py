@@ -0,0 +1,225 @@
+"""
+Modelo global de anomalías para todas las series
+Un único Isolation Forest (y opcionalmente un OCSVM aproximado) entrenado sobre
+las features normalizadas por serie, con umbrales calibrados por región
+"""
+
+import pandas as pd
+import numpy as np
+from sklearn.ensemble import IsolationForest
+from typing import Dict, List
+import logging
+import joblib
+from pathlib import Path
+
+from src.models.anomaly_detection import crear_modelo
+from src.models.umbrales import calcular_umbrales
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Clave de los umbrales usados para regiones sin calibración propia
+UMBRAL_GLOBAL = '__GLOBAL__'
+
+
+class GlobalAnomalyDetector:
+    """Detector de anomalías con un modelo compartido por todas las regiones"""
+
+    def __init__(self, contamination: float = 0.1, usar_ocsvm: bool = False,
+                 ocsvm_backend: str = 'nystroem', ocsvm_componentes: int = 100,
+                 contaminacion_umbral: float = None):
+        """
+        Inicializa el detector global
+
+        Args:
+            contamination: Proporción esperada de anomalías por región
+            usar_ocsvm: Si True, entrena también un OCSVM (aproximado por defecto)
+            ocsvm_backend: Backend del OCSVM ('nystroem', 'rff' o 'exacto')
+            ocsvm_componentes: Dimensión de la aproximación del kernel
+            contaminacion_umbral: Proporción de anomalías de las banderas (por defecto
+                                 contamination); ver calibrar_umbrales
+        """
+        self.contamination = contamination
+        self.contaminacion_umbral = contaminacion_umbral if contaminacion_umbral is not None else contamination
+        self.usar_ocsvm = usar_ocsvm
+        self.ocsvm_backend = ocsvm_backend
+        self.ocsvm_componentes = ocsvm_componentes
+
+        self.models = {}
+        self.umbrales: Dict[str, Dict[str, float]] = {}
+        self.scores_entrenamiento: Dict[str, Dict[str, np.ndarray]] = {}
+        self.regiones = pd.Index([])
+        self.medias = None
+        self.stds = None
+        self.feature_columns = None
+
+    def _normalizar(self, df: pd.DataFrame, X: np.ndarray, col_departamento: str) -> np.ndarray:
+        """Normaliza cada fila con la media y desviación de su serie"""
+        codigos = self.regiones.get_indexer(df[col_departamento])
+        conocidas = codigos >= 0
+        X_norm = np.full(X.shape, np.nan)
+        X_norm[conocidas] = (X[conocidas] - self.medias[codigos[conocidas]]) / self.stds[codigos[conocidas]]
+        return X_norm
+
+    def _scores(self, X_norm: np.ndarray) -> Dict[str, np.ndarray]:
+        """Scores continuos de cada modelo (más bajo = más anómalo)"""
+        return {tipo: model.score_samples(X_norm) for tipo, model in self.models.items()}
+
+    def entrenar(self, df: pd.DataFrame, feature_cols: List[str], regiones: List[str] = None,
+                 col_departamento: str = 'departamento'):
+        """
+        Entrena el modelo global y calibra los umbrales por región
+
+        Args:
+            df: DataFrame con features
+            feature_cols: Columnas de features
+            regiones: Regiones a incluir (por defecto todas)
+            col_departamento: Columna de departamento
+        """
+        logger.info("=" * 70)
+        logger.info("ENTRENANDO MODELO GLOBAL DE ANOMALÍAS")
+        logger.info("=" * 70)
+
+        self.feature_columns = feature_cols
+
+        df_clean = df.dropna(subset=feature_cols)
+        if regiones is not None:
+            df_clean = df_clean[df_clean[col_departamento].isin(regiones)]
+        X = df_clean[feature_cols].to_numpy(dtype=float)
+
+        # Normalización por serie (estadísticas por región en una sola agrupación)
+        stats = pd.DataFrame(X).groupby(df_clean[col_departamento].to_numpy()).agg(['mean', 'std'])
+        self.regiones = pd.Index(stats.index)
+        self.medias = stats.xs('mean', axis=1, level=1).to_numpy()
+        stds = stats.xs('std', axis=1, level=1).to_numpy()
+        self.stds = np.where(np.isnan(stds) | (stds == 0), 1.0, stds)
+
+        X_norm = self._normalizar(df_clean, X, col_departamento)
+        logger.info(f"Datos agrupados: {len(X_norm):,} registros de {len(self.regiones)} regiones")
+
+        self.models = {'if': IsolationForest(
+            contamination=self.contamination,
+            random_state=42,
+            n_estimators=100,
+            max_samples='auto',
+            n_jobs=-1
+        ).fit(X_norm)}
+
+        if self.usar_ocsvm:
+            config = {'contamination': self.contamination, 'ocsvm_backend': self.ocsvm_backend,
+                      'ocsvm_componentes': self.ocsvm_componentes}
+            self.models['ocsvm'] = crear_modelo('ocsvm', config, n_features=X_norm.shape[1]).fit(X_norm)
+
+        # Umbrales por región: cuantil de contaminación de los scores de entrenamiento
+        scores = pd.DataFrame(self._scores(X_norm), index=df_clean.index)
+        self.scores_entrenamiento = {
+            region: {tipo: grupo[tipo].to_numpy() for tipo in scores.columns}
+            for region, grupo in scores.groupby(df_clean[col_departamento])
+        }
+        self.calibrar_umbrales()
+
+        logger.info(f"✓ Modelo global entrenado: {list(self.models)}, "
+                    f"umbrales calibrados para {len(self.umbrales) - 1} regiones")
+
+    def calibrar_umbrales(self, contaminacion: float = None):
+        """
+        Recalcula los umbrales de las banderas desde los scores de entrenamiento
+
+        Args:
+            contaminacion: Proporción de anomalías por región (por defecto
+                          contaminacion_umbral); no requiere reentrenar
+        """
+        if contaminacion is not None:
+            self.contaminacion_umbral = contaminacion
+
+        tabla = calcular_umbrales(self.scores_entrenamiento, [self.contaminacion_umbral])
+        self.umbrales = {
+            region: dict(zip(grupo['modelo'], grupo['umbral']))
+            for region, grupo in tabla.groupby('region', sort=False)
+        }
+        self.umbrales[UMBRAL_GLOBAL] = {
+            tipo: float(np.quantile(np.concatenate([s[tipo] for s in self.scores_entrenamiento.values()]),
+                                    self.contaminacion_umbral))
+            for tipo in self.models
+        }
+
+    def umbrales_contaminacion(self, contaminaciones: List[float]) -> pd.DataFrame:
+        """
+        Umbrales por región y modelo para varios niveles de contaminación sin reentrenar
+
+        Args:
+            contaminaciones: Proporciones de anomalías a evaluar
+
+        Returns:
+            DataFrame con columnas region, modelo, contaminacion, umbral
+        """
+        return calcular_umbrales(self.scores_entrenamiento, contaminaciones)
+
+    def detectar_anomalias(self, df: pd.DataFrame, feature_cols: List[str] = None,
+                           col_departamento: str = 'departamento') -> pd.DataFrame:
+        """
+        Detecta anomalías en todas las regiones con el modelo global
+
+        Args:
+            df: DataFrame con datos
+            feature_cols: Columnas de features (por defecto las del entrenamiento)
+            col_departamento: Columna de departamento
+
+        Returns:
+            DataFrame con columnas anomalia_<tipo>, score_<tipo> y anomalia_consenso
+        """
+        feature_cols = feature_cols or self.feature_columns
+
+        df_clean = df.dropna(subset=feature_cols).copy()
+        X_norm = self._normalizar(df_clean, df_clean[feature_cols].to_numpy(dtype=float), col_departamento)
+
+        # Regiones no vistas en el entrenamiento no tienen estadísticas para normalizar
+        conocidas = ~np.isnan(X_norm).any(axis=1)
+        df_clean = df_clean[conocidas]
+        scores = self._scores(X_norm[conocidas])
+
+        regiones = df_clean[col_departamento]
+        for tipo, valores in scores.items():
+            umbral = regiones.map({r: u[tipo] for r, u in self.umbrales.items()})
+            umbral = umbral.fillna(self.umbrales[UMBRAL_GLOBAL][tipo]).to_numpy()
+            df_clean[f'anomalia_{tipo}'] = (valores < umbral).astype(int)
+            df_clean[f'score_{tipo}'] = valores
+
+        # Consenso: todos los modelos globales coinciden
+        anomaly_cols = [f'anomalia_{tipo}' for tipo in self.models]
+        df_clean['anomalia_consenso'] = (df_clean[anomaly_cols].sum(axis=1) == len(anomaly_cols)).astype(int)
+
+        logger.info(f"✓ Anomalías detectadas (modelo global): {df_clean['anomalia_consenso'].sum():,}")
+
+        return df_clean
+
+    def guardar_modelos(self, output_dir: Path) -> Path:
+        """
+        Guarda el modelo global en un solo archivo
+
+        Args:
+            output_dir: Directorio de salida
+
+        Returns:
+            Ruta del archivo guardado
+        """
+        output_dir.mkdir(parents=True, exist_ok=True)
+        path = output_dir / 'anomaly_global.joblib'
+        joblib.dump(self, path)
+
+        logger.info(f"✓ Modelo global guardado en: {path}")
+
+        return path
+
+    @staticmethod
+    def cargar_modelos(input_dir: Path) -> 'GlobalAnomalyDetector':
+        """
+        Carga un modelo global guardado
+
+        Args:
+            input_dir: Directorio con el modelo
+
+        Returns:
+            Detector global
+        """
+        return joblib.load(input_dir / 'anomaly_global.joblib')
@@ -0,0 +1,126 @@
+"""
+Local Outlier Factor (modo novelty) con índice de vecinos explícito
+El índice se construye una vez al entrenar, se guarda junto al modelo y se
+reutiliza en todas las consultas de scoring posteriores. Los árboles solo
+ganan a la búsqueda exhaustiva en pocas dimensiones (del orden de 10-20), por
+eso el detector exige reducir las features antes de usarlo
+"""
+
+import numpy as np
+from joblib import Parallel, delayed, effective_n_jobs
+from sklearn.neighbors import KDTree, BallTree
+
+# Índices de vecinos soportados
+INDICES_VECINOS = {'kd_tree': KDTree, 'ball_tree': BallTree}
+
+
+class LOFIndexado:
+    """
+    LOF novelty con la misma interfaz que LocalOutlierFactor(novelty=True)
+    (fit, predict, score_samples, decision_function).
+
+    Guarda el árbol de vecinos, la k-distancia y la densidad local (lrd) de
+    los puntos de entrenamiento, de modo que puntuar un lote de semanas nuevas
+    solo requiere una consulta k-NN por punto sobre el árbol.
+    """
+
+    def __init__(self, n_neighbors: int = 20, contamination: float = 0.1,
+                 indice: str = 'kd_tree', leaf_size: int = 30, n_jobs: int = None):
+        """
+        Inicializa el modelo
+
+        Args:
+            n_neighbors: Número de vecinos
+            contamination: Proporción esperada de anomalías
+            indice: 'kd_tree' o 'ball_tree'
+            leaf_size: Tamaño de hoja del árbol
+            n_jobs: Hilos para las consultas de vecinos (-1 = todos los núcleos)
+        """
+        if indice not in INDICES_VECINOS:
+            raise ValueError(f"Índice de vecinos no soportado: {indice}")
+
+        self.n_neighbors = n_neighbors
+        self.contamination = contamination
+        self.indice = indice
+        self.leaf_size = leaf_size
+        self.n_jobs = n_jobs
+
+    def _consultar(self, X: np.ndarray, k: int):
+        """
+        Consulta k-NN sobre el árbol repartiendo las filas en bloques por hilo
+
+        La consulta del árbol libera el GIL, así que los hilos corren en paralelo.
+        """
+        n_hilos = min(effective_n_jobs(getattr(self, 'n_jobs', None)), len(X))
+        if n_hilos <= 1:
+            return self.tree_.query(X, k=k)
+        bloques = Parallel(n_jobs=n_hilos, prefer='threads')(
+            delayed(self.tree_.query)(bloque, k=k) for bloque in np.array_split(X, n_hilos)
+        )
+        return np.vstack([d for d, _ in bloques]), np.vstack([i for _, i in bloques])
+
+    def fit(self, X: np.ndarray) -> 'LOFIndexado':
+        """
+        Construye el índice y las densidades de los puntos de entrenamiento
+
+        Args:
+            X: Array de features escaladas
+
+        Returns:
+            El propio modelo
+        """
+        X = np.asarray(X, dtype=float)
+        self.n_neighbors_ = max(1, min(self.n_neighbors, len(X) - 1))
+        self.tree_ = INDICES_VECINOS[self.indice](X, leaf_size=self.leaf_size)
+
+        # Vecinos de cada punto de entrenamiento excluyéndose a sí mismo
+        distancias, indices = self._consultar(X, self.n_neighbors_ + 1)
+        propio = indices == np.arange(len(X))[:, np.newaxis]
+        # Con duplicados el punto puede no aparecer: se descarta el vecino más lejano
+        propio[~propio.any(axis=1), -1] = True
+        distancias = distancias[~propio].reshape(len(X), self.n_neighbors_)
+        indices = indices[~propio].reshape(len(X), self.n_neighbors_)
+
+        self.k_distancia_ = distancias[:, -1]
+        self.lrd_ = self._densidad_local(distancias, indices)
+
+        ratios = self.lrd_[indices] / self.lrd_[:, np.newaxis]
+        self.negative_outlier_factor_ = -np.mean(ratios, axis=1)
+        self.offset_ = np.percentile(self.negative_outlier_factor_, 100.0 * self.contamination)
+
+        return self
+
+    def _densidad_local(self, distancias: np.ndarray, indices: np.ndarray) -> np.ndarray:
+        """Densidad de alcanzabilidad local a partir de los k vecinos"""
+        alcanzabilidad = np.maximum(distancias, self.k_distancia_[indices])
+        return 1.0 / (np.mean(alcanzabilidad, axis=1) + 1e-10)
+
+    def score_samples(self, X: np.ndarray) -> np.ndarray:
+        """
+        Score LOF negativo (más bajo = más anómalo)
+
+        Args:
+            X: Array de features escaladas
+
+        Returns:
+            Array de scores
+        """
+        distancias, indices = self._consultar(np.asarray(X, dtype=float), self.n_neighbors_)
+        lrd = self._densidad_local(distancias, indices)
+        return -np.mean(self.lrd_[indices] / lrd[:, np.newaxis], axis=1)
+
+    def decision_function(self, X: np.ndarray) -> np.ndarray:
+        """Score desplazado por el umbral de contaminación (negativo = anomalía)"""
+        return self.score_samples(X) - self.offset_
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        """
+        Predice anomalías
+
+        Args:
+            X: Array de features escaladas
+
+        Returns:
+            Array con -1 (anomalía) o 1 (normal)
+        """
+        return np.where(self.decision_function(X) < 0, -1, 1)
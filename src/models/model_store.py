@@ -0,0 +1,158 @@
+"""
+Almacén de modelos de anomalías por región
+Un bundle por región (scaler compartido + modelos) guardado sin compresión para
+poder mapear sus arrays en memoria, con carga perezosa y desalojo LRU
+"""
+
+import hashlib
+import json
+import os
+import re
+import logging
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List
+
+import joblib
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class AnomalyModelStore:
+    """Modelos de anomalías en bundles por región que se cargan bajo demanda"""
+
+    MANIFEST = 'manifest.json'
+
+    def __init__(self, directorio: Path, memoria_max_mb: float = 512, mmap: bool = True):
+        """
+        Inicializa el almacén
+
+        Args:
+            directorio: Directorio del almacén
+            memoria_max_mb: Tamaño máximo de los bundles cargados a la vez
+            mmap: Si True, los arrays grandes se mapean desde disco en lugar de copiarse
+        """
+        self.directorio = Path(directorio)
+        self.memoria_max_bytes = memoria_max_mb * 1024 ** 2
+        self.mmap = mmap
+
+        self._cache: OrderedDict = OrderedDict()
+        self._tamanos: Dict[str, int] = {}
+        self.manifest = self._leer_manifest()
+
+    def _leer_manifest(self) -> Dict:
+        """Lee el índice de regiones del almacén"""
+        path = self.directorio / self.MANIFEST
+        if path.exists():
+            with open(path, encoding='utf-8') as f:
+                return json.load(f)
+        return {'regiones': {}, 'feature_columns': None}
+
+    def _escribir_manifest(self):
+        """Escribe el índice de regiones del almacén"""
+        self.directorio.mkdir(parents=True, exist_ok=True)
+        with open(self.directorio / self.MANIFEST, 'w', encoding='utf-8') as f:
+            json.dump(self.manifest, f, ensure_ascii=False, indent=2)
+
+    @staticmethod
+    def _nombre_archivo(region: str) -> str:
+        """
+        Nombre de archivo seguro y único para una región
+
+        El prefijo legible pierde acentos y símbolos ('PEÑA' y 'PEÚA' dan el
+        mismo), así que el nombre lleva además el hash SHA-1 del nombre completo.
+        """
+        legible = re.sub(r'[^A-Za-z0-9_-]+', '_', region.strip()).lower()
+        huella = hashlib.sha1(region.encode('utf-8')).hexdigest()[:16]
+        return f'{legible}_{huella}.joblib'
+
+    def regiones(self) -> List[str]:
+        """Regiones con modelos en el almacén"""
+        return list(self.manifest['regiones'])
+
+    def __contains__(self, region: str) -> bool:
+        return region in self.manifest['regiones']
+
+    @property
+    def feature_columns(self) -> List[str]:
+        return self.manifest.get('feature_columns')
+
+    def guardar_region(self, region: str, scaler, modelos: Dict, reductor=None, extra: Dict = None):
+        """
+        Guarda el bundle de una región
+
+        Args:
+            region: Nombre de la región
+            scaler: Scaler compartido por los modelos de la región
+            modelos: Diccionario tipo → modelo entrenado
+            reductor: Reductor de features de la región (opcional)
+            extra: Datos adicionales a guardar en el bundle (opcional)
+        """
+        archivo = self._nombre_archivo(region)
+        for otra, archivo_otra in self.manifest['regiones'].items():
+            if otra != region and archivo_otra == archivo:
+                raise ValueError(f"El archivo {archivo} de la región '{region}' ya lo usa la región '{otra}'")
+
+        self.directorio.mkdir(parents=True, exist_ok=True)
+
+        bundle = {'scaler': scaler, 'modelos': modelos, 'reductor': reductor}
+        if extra:
+            bundle.update(extra)
+
+        # Sin compresión: joblib guarda los arrays numpy de forma mapeable.
+        # Se escribe a un temporal y se renombra: los bundles mapeados del
+        # archivo anterior siguen siendo válidos mientras estén en uso
+        temporal = self.directorio / (archivo + '.tmp')
+        joblib.dump(bundle, temporal, compress=0)
+        os.replace(temporal, self.directorio / archivo)
+
+        # Bundle guardado antes con otro nombre de archivo
+        anterior = self.manifest['regiones'].get(region)
+        if anterior is not None and anterior != archivo:
+            (self.directorio / anterior).unlink(missing_ok=True)
+
+        self.manifest['regiones'][region] = archivo
+        self._cache.pop(region, None)
+        self._escribir_manifest()
+
+    def guardar_feature_columns(self, feature_columns: List[str]):
+        """Guarda las columnas de features usadas en el entrenamiento"""
+        self.manifest['feature_columns'] = list(feature_columns) if feature_columns is not None else None
+        self._escribir_manifest()
+
+    def cargar_region(self, region: str) -> Dict:
+        """
+        Obtiene el bundle de una región, cargándolo la primera vez que se usa
+
+        Args:
+            region: Nombre de la región
+
+        Returns:
+            Diccionario con scaler, modelos y reductor
+        """
+        if region in self._cache:
+            self._cache.move_to_end(region)
+            return self._cache[region]
+
+        if region not in self:
+            raise KeyError(f"Región sin modelos en el almacén: {region}")
+
+        path = self.directorio / self.manifest['regiones'][region]
+        bundle = joblib.load(path, mmap_mode='r' if self.mmap else None)
+
+        self._cache[region] = bundle
+        self._tamanos[region] = path.stat().st_size
+        self._desalojar()
+
+        return bundle
+
+    def _desalojar(self):
+        """Libera los bundles menos usados mientras se supere el límite de memoria"""
+        while len(self._cache) > 1 and sum(self._tamanos[r] for r in self._cache) > self.memoria_max_bytes:
+            region, _ = self._cache.popitem(last=False)
+            logger.info(f"Bundle desalojado de memoria: {region}")
+
+    def limpiar_cache(self):
+        """Libera todos los bundles cargados"""
+        self._cache.clear()
@@ -0,0 +1,218 @@
+"""
+Motor de reglas de alerta
+Lee umbrales y lógica de combinación desde la configuración (o un archivo
+JSON que se recarga en caliente), los compila una vez en cortes ordenados y
+evalúa todas las reglas de un conjunto sobre columnas completas con
+np.searchsorted, sin recorrer filas
+"""
+
+import hashlib
+import json
+from pathlib import Path
+from typing import Dict
+import numpy as np
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+COMPARACIONES = {'>=': 'right', '>': 'left'}  # lado de searchsorted que cuenta los cortes superados
+COMBINACIONES = {'maximo': np.max, 'minimo': np.min}
+
+
+def umbrales_desde_limites_superiores(limites: Dict[str, float]) -> Dict[str, float]:
+    """
+    Convierte límites superiores por nivel (formato de UMBRALES_ALERTA_PREDICTIVA)
+    en el umbral que hay que superar para entrar en cada nivel
+
+    Args:
+        limites: {nivel: límite superior}, en orden de severidad
+
+    Returns:
+        {nivel: umbral de entrada} para todos los niveles salvo el primero
+    """
+    niveles = list(limites)
+    return {nivel: limites[anterior] for anterior, nivel in zip(niveles[:-1], niveles[1:])}
+
+
+def reglas_desde_umbrales(umbrales: Dict[str, float], umbrales_predictivos: Dict[str, float],
+                          probabilidad_minima: Dict[str, float] = None) -> Dict:
+    """
+    Reglas equivalentes a la clasificación por z-score, consenso de modelos e incremento esperado
+
+    Args:
+        umbrales: Umbrales de z-score por nivel (formato de UMBRALES_ALERTA)
+        umbrales_predictivos: Límites superiores del incremento por nivel (formato de UMBRALES_ALERTA_PREDICTIVA)
+        probabilidad_minima: Probabilidad de superar el umbral epidémico que abre cada nivel predictivo
+
+    Returns:
+        Diccionario de reglas con los conjuntos 'semanal', 'predictivo' y (si hay probabilidades) 'probabilistico'
+    """
+    reglas = {
+        'semanal': {
+            'niveles': ['normal', 'bajo', 'medio', 'alto', 'critico'],
+            'combinacion': 'maximo',
+            'reglas': {
+                'nivel_estadistico': {'variable': 'z_score', 'comparacion': '>=', 'umbrales': dict(umbrales)},
+                'nivel_anomalia': {'variable': 'consenso_modelos', 'comparacion': '>=',
+                                   'umbrales': {'medio': 1, 'alto': 2, 'critico': 3}},
+            },
+        },
+        'predictivo': {
+            'niveles': list(umbrales_predictivos),
+            'combinacion': 'maximo',
+            'reglas': {
+                'nivel_riesgo_predictivo': {'variable': 'incremento_esperado', 'comparacion': '>',
+                                            'umbrales': umbrales_desde_limites_superiores(umbrales_predictivos)},
+            },
+        },
+    }
+    if probabilidad_minima:
+        reglas['probabilistico'] = {
+            'niveles': list(umbrales_predictivos),
+            'combinacion': 'maximo',
+            'reglas': {
+                'nivel_probabilidad': {'variable': 'probabilidad_excedencia', 'comparacion': '>=',
+                                       'umbrales': dict(probabilidad_minima)},
+            },
+        }
+    return reglas
+
+
+def compilar_conjunto(nombre: str, conjunto: Dict) -> Dict:
+    """
+    Valida un conjunto de reglas y lo convierte en cortes ordenados
+
+    Args:
+        nombre: Nombre del conjunto (para los mensajes de error)
+        conjunto: {'niveles': [...], 'combinacion': ..., 'reglas': {regla: {...}}}
+
+    Returns:
+        Conjunto compilado: niveles, función de combinación y por regla (variable, cortes, índices, lado)
+    """
+    niveles = list(conjunto['niveles'])
+    combinacion = conjunto.get('combinacion', 'maximo')
+    if combinacion not in COMBINACIONES:
+        raise ValueError(f"{nombre}: combinación desconocida '{combinacion}' (opciones: {list(COMBINACIONES)})")
+
+    if not conjunto.get('reglas'):
+        raise ValueError(f"{nombre}: el conjunto no tiene reglas")
+
+    reglas = {}
+    for regla, spec in conjunto['reglas'].items():
+        comparacion = spec.get('comparacion', '>=')
+        if comparacion not in COMPARACIONES:
+            raise ValueError(f"{nombre}.{regla}: comparación desconocida '{comparacion}'")
+
+        desconocidos = set(spec['umbrales']) - set(niveles)
+        if desconocidos:
+            raise ValueError(f"{nombre}.{regla}: niveles desconocidos {sorted(desconocidos)}")
+
+        # Umbrales en orden de severidad; deben ser crecientes para que el nivel sea el del último corte superado
+        indices = np.array([niveles.index(n) for n in niveles if n in spec['umbrales']], dtype=np.int64)
+        cortes = np.array([float(spec['umbrales'][niveles[i]]) for i in indices])
+        if np.any(np.diff(cortes) < 0):
+            raise ValueError(f"{nombre}.{regla}: los umbrales deben crecer con la severidad del nivel")
+
+        reglas[regla] = {
+            'variable': spec['variable'],
+            'cortes': cortes,
+            'indices': np.concatenate([[0], indices]),  # 0 cortes superados → primer nivel
+            'lado': COMPARACIONES[comparacion],
+        }
+
+    return {'niveles': np.array(niveles, dtype=object), 'combinacion': COMBINACIONES[combinacion],
+            'reglas': reglas}
+
+
+class MotorReglas:
+    """
+    Conjuntos de reglas de nivel compilados.
+
+    Cada regla asigna a cada fila el nivel del último umbral que supera su
+    variable (NaN → primer nivel); el nivel del conjunto combina las reglas
+    (el más severo por defecto). Si el motor tiene un archivo asociado, se
+    vuelve a compilar cuando cambia su fecha de modificación.
+    """
+
+    def __init__(self, reglas: Dict, ruta: Path = None):
+        """
+        Args:
+            reglas: Reglas por defecto ({conjunto: {...}})
+            ruta: Archivo JSON opcional que sobrescribe conjuntos completos y se recarga en caliente
+        """
+        self.reglas_por_defecto = reglas
+        self.ruta = Path(ruta) if ruta is not None else None
+        self._mtime = None
+        self.reglas = dict(reglas)
+        self.compilado = {nombre: compilar_conjunto(nombre, c) for nombre, c in reglas.items()}
+        self.recargar()
+
+    def recargar(self) -> bool:
+        """
+        Vuelve a compilar las reglas si el archivo cambió desde la última lectura
+
+        Un archivo inválido se ignora (se registra el error y siguen las reglas anteriores).
+
+        Returns:
+            True si se cargaron reglas nuevas
+        """
+        if self.ruta is None:
+            return False
+        mtime = self.ruta.stat().st_mtime_ns if self.ruta.exists() else None
+        if mtime == self._mtime:
+            return False
+        self._mtime = mtime
+
+        reglas = dict(self.reglas_por_defecto)
+        if mtime is not None:
+            try:
+                reglas.update(json.loads(self.ruta.read_text(encoding='utf-8')))
+                compilado = {nombre: compilar_conjunto(nombre, c) for nombre, c in reglas.items()}
+            except (ValueError, KeyError, TypeError) as e:
+                logger.error(f"Reglas de {self.ruta} no válidas, se mantienen las anteriores: {e}")
+                return False
+        else:
+            compilado = {nombre: compilar_conjunto(nombre, c) for nombre, c in reglas.items()}
+
+        self.reglas = reglas
+        self.compilado = compilado
+        logger.info(f"✓ Reglas de alerta cargadas{f' desde {self.ruta}' if mtime is not None else ''}")
+        return True
+
+    def huella(self, conjunto: str) -> str:
+        """
+        Hash de las reglas vigentes de un conjunto (tras recargar el archivo si cambió)
+
+        Permite saber si los niveles guardados se calcularon con las reglas actuales.
+        """
+        self.recargar()
+        return hashlib.sha1(json.dumps(self.reglas[conjunto], sort_keys=True).encode('utf-8')).hexdigest()
+
+    def niveles(self, conjunto: str) -> np.ndarray:
+        """Niveles de un conjunto en orden de severidad"""
+        return self.compilado[conjunto]['niveles']
+
+    def evaluar(self, conjunto: str, variables: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+        """
+        Evalúa todas las reglas de un conjunto en una pasada
+
+        Args:
+            conjunto: Nombre del conjunto de reglas
+            variables: {variable: valores por fila}
+
+        Returns:
+            {regla: índice de nivel por fila} más 'combinado' con la combinación de todas
+        """
+        self.recargar()
+        compilado = self.compilado[conjunto]
+
+        resultado = {}
+        for regla, spec in compilado['reglas'].items():
+            valores = np.asarray(variables[spec['variable']], dtype=float)
+            superados = np.searchsorted(spec['cortes'], valores, side=spec['lado'])
+            superados[np.isnan(valores)] = 0
+            resultado[regla] = spec['indices'][superados]
+
+        resultado['combinado'] = compilado['combinacion'](np.stack(list(resultado.values())), axis=0)
+        return resultado
@@ -0,0 +1,88 @@
+"""
+Módulo de reducción de dimensionalidad para los modelos de anomalías
+PCA o poda por correlación ajustados por región sobre las features escaladas
+"""
+
+import numpy as np
+from sklearn.decomposition import PCA
+from typing import List
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class ReductorFeatures:
+    """Reduce las features escaladas antes de entrenar/aplicar los detectores"""
+
+    def __init__(self, metodo: str = 'pca', varianza_explicada: float = 0.95,
+                 umbral_correlacion: float = 0.95):
+        """
+        Inicializa el reductor
+
+        Args:
+            metodo: 'pca' o 'correlacion'
+            varianza_explicada: Varianza a conservar con PCA
+            umbral_correlacion: Correlación absoluta a partir de la cual se descarta una feature
+        """
+        if metodo not in ('pca', 'correlacion'):
+            raise ValueError(f"Método de reducción no soportado: {metodo}")
+
+        self.metodo = metodo
+        self.varianza_explicada = varianza_explicada
+        self.umbral_correlacion = umbral_correlacion
+
+        self.pca = None
+        self.columnas_seleccionadas: List[int] = None
+        self.n_features_entrada = None
+        self.n_features_salida = None
+
+    def fit(self, X: np.ndarray) -> 'ReductorFeatures':
+        """
+        Ajusta el reductor
+
+        Args:
+            X: Array de features escaladas
+
+        Returns:
+            El propio reductor
+        """
+        self.n_features_entrada = X.shape[1]
+
+        if self.metodo == 'pca':
+            self.pca = PCA(n_components=self.varianza_explicada, svd_solver='full', random_state=42)
+            self.pca.fit(X)
+            self.n_features_salida = self.pca.n_components_
+        else:
+            with np.errstate(invalid='ignore', divide='ignore'):
+                corr = np.abs(np.corrcoef(X, rowvar=False))
+            corr = np.nan_to_num(corr, nan=0.0)
+
+            # Recorrer en orden y descartar las que correlacionan con una ya elegida
+            seleccionadas = []
+            for j in range(X.shape[1]):
+                if not seleccionadas or corr[j, seleccionadas].max() < self.umbral_correlacion:
+                    seleccionadas.append(j)
+
+            self.columnas_seleccionadas = seleccionadas
+            self.n_features_salida = len(seleccionadas)
+
+        return self
+
+    def transform(self, X: np.ndarray) -> np.ndarray:
+        """
+        Aplica la reducción
+
+        Args:
+            X: Array de features escaladas
+
+        Returns:
+            Array reducido
+        """
+        if self.metodo == 'pca':
+            return self.pca.transform(X)
+        return X[:, self.columnas_seleccionadas]
+
+    def fit_transform(self, X: np.ndarray) -> np.ndarray:
+        """Ajusta el reductor y devuelve X reducido"""
+        return self.fit(X).transform(X)
@@ -0,0 +1,143 @@
+"""
+Refresco incremental de los modelos de anomalías
+Añade árboles entrenados con la ventana reciente a un Isolation Forest ya
+ajustado (warm_start), retira los más antiguos y mide la deriva de los scores
+para decidir cuándo hace falta reentrenar desde cero
+"""
+
+import numpy as np
+import pandas as pd
+from scipy.stats import ks_2samp
+from sklearn.ensemble import IsolationForest
+from typing import Dict
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Atributos por árbol que deben recortarse junto con estimators_
+# (_seeds solo guarda las semillas del último fit y no se recorta)
+ATRIBUTOS_POR_ARBOL = ['estimators_', 'estimators_features_',
+                       '_average_path_length_per_tree', '_decision_path_lengths']
+
+
+def refrescar_isolation_forest(model: IsolationForest, X_scaled: np.ndarray,
+                               arboles_nuevos: int, semilla: int = None,
+                               X_umbral: np.ndarray = None) -> IsolationForest:
+    """
+    Añade árboles entrenados sobre X_scaled y retira el mismo número de árboles antiguos
+
+    El tamaño del bosque se mantiene constante. Las muestras por árbol se fijan
+    a las del entrenamiento original para que la normalización de la longitud
+    de camino sea la misma en árboles viejos y nuevos.
+
+    Args:
+        model: Isolation Forest ya entrenado (se modifica en el sitio)
+        X_scaled: Features escaladas de la ventana reciente
+        arboles_nuevos: Árboles a añadir (y a retirar)
+        semilla: Semilla de los árboles nuevos (por defecto la del modelo)
+        X_umbral: Features escaladas sobre las que se recalcula el umbral
+                  (por defecto X_scaled; conviene pasar el histórico completo para
+                  que el umbral no dependa solo de las semanas recientes)
+
+    Returns:
+        El propio modelo refrescado
+    """
+    n_arboles = len(model.estimators_)
+    arboles_nuevos = min(arboles_nuevos, n_arboles)
+
+    model.set_params(warm_start=True, n_estimators=n_arboles + arboles_nuevos,
+                     max_samples=min(model.max_samples_, len(X_scaled)))
+    if semilla is not None:
+        model.set_params(random_state=semilla)
+    model.fit(X_scaled)
+
+    # Retirar los árboles más antiguos (los primeros de la lista)
+    for atributo in ATRIBUTOS_POR_ARBOL:
+        if hasattr(model, atributo):
+            setattr(model, atributo, getattr(model, atributo)[arboles_nuevos:])
+
+    model.set_params(warm_start=False, n_estimators=n_arboles)
+
+    # Umbral recalculado con el bosque final
+    if model.contamination != 'auto':
+        X_umbral = X_scaled if X_umbral is None else X_umbral
+        model.offset_ = np.percentile(model.score_samples(X_umbral), 100.0 * model.contamination)
+
+    return model
+
+
+def indice_estabilidad_poblacional(referencia: np.ndarray, actual: np.ndarray,
+                                   n_bins: int = 10) -> float:
+    """
+    Population Stability Index entre dos distribuciones de scores
+
+    Los intervalos son los cuantiles de la referencia.
+
+    Args:
+        referencia: Scores de referencia (entrenamiento)
+        actual: Scores actuales
+        n_bins: Número de intervalos
+
+    Returns:
+        PSI (< 0.1 estable, 0.1-0.2 moderado, > 0.2 deriva importante)
+    """
+    bordes = np.unique(np.quantile(referencia, np.linspace(0, 1, n_bins + 1)))
+    bordes[0], bordes[-1] = -np.inf, np.inf
+
+    p_ref = np.histogram(referencia, bordes)[0] / len(referencia)
+    p_act = np.histogram(actual, bordes)[0] / len(actual)
+
+    p_ref = np.clip(p_ref, 1e-6, None)
+    p_act = np.clip(p_act, 1e-6, None)
+
+    return float(np.sum((p_act - p_ref) * np.log(p_act / p_ref)))
+
+
+def medir_deriva(referencia: np.ndarray, actual: np.ndarray, n_bins: int = 10) -> Dict[str, float]:
+    """
+    Mide la deriva de la distribución de scores
+
+    Args:
+        referencia: Scores de referencia (entrenamiento)
+        actual: Scores de la ventana reciente
+
+    Returns:
+        Diccionario con psi, ks y ks_pvalor
+    """
+    ks = ks_2samp(referencia, actual)
+    return {
+        'psi': indice_estabilidad_poblacional(referencia, actual, n_bins),
+        'ks': float(ks.statistic),
+        'ks_pvalor': float(ks.pvalue)
+    }
+
+
+def decidir_accion(estado: Dict, fecha: pd.Timestamp, deriva: Dict[str, float],
+                   config: Dict) -> str:
+    """
+    Decide la acción de mantenimiento de una región según el calendario y la deriva
+
+    Args:
+        estado: Último refresco/reentrenamiento de la región (fechas o None)
+        fecha: Fecha de los datos más recientes
+        deriva: Resultado de medir_deriva
+        config: Configuración de refresco (ver IF_REFRESCO_CONFIG)
+
+    Returns:
+        'reentrenar', 'refrescar' o 'ninguna'
+    """
+    if deriva['psi'] > config['psi_max'] or deriva['ks_pvalor'] < config['ks_pvalor_min']:
+        return 'reentrenar'
+
+    ultimo_reentrenamiento = estado.get('ultimo_reentrenamiento')
+    if ultimo_reentrenamiento is not None and \
+            (fecha - pd.Timestamp(ultimo_reentrenamiento)).days >= 7 * config['reentrenar_cada_semanas']:
+        return 'reentrenar'
+
+    ultimo_refresco = estado.get('ultimo_refresco')
+    if ultimo_refresco is None or \
+            (fecha - pd.Timestamp(ultimo_refresco)).days >= 7 * config['refrescar_cada_semanas']:
+        return 'refrescar'
+
+    return 'ninguna'
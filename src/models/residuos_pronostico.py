@@ -0,0 +1,145 @@
+"""
+Vigilancia basada en modelo: residuos de pronóstico
+Compara los casos observados con los pronósticos del ensamble ya guardados
+(sin volver a ejecutar los modelos) y marca las semanas cuyo residuo
+estandarizado o exceso sobre el intervalo supera un umbral
+"""
+
+import pandas as pd
+import numpy as np
+from scipy.stats import norm
+from pathlib import Path
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+COLUMNAS_ARCHIVO = ['region', 'fecha_emision', 'fecha', 'horizonte', 'casos_predichos_ensamble',
+                    'intervalo_inferior_95', 'intervalo_superior_95']
+
+
+def archivar_pronosticos(df_predicciones: pd.DataFrame, archivo: Path,
+                         horizonte_max: int = 4) -> pd.DataFrame:
+    """
+    Añade los primeros pasos de una corrida de pronóstico al archivo de pronósticos
+
+    Args:
+        df_predicciones: Salida de 08_generate_predictions (region, fecha, casos_predichos_ensamble,
+                         intervalo_inferior_95, intervalo_superior_95)
+        archivo: CSV acumulado de pronósticos
+        horizonte_max: Pasos por región a archivar
+
+    Returns:
+        Archivo completo actualizado
+    """
+    nuevos = df_predicciones.copy()
+    nuevos['fecha'] = pd.to_datetime(nuevos['fecha'])
+    nuevos = nuevos.sort_values(['region', 'fecha'])
+    nuevos['horizonte'] = nuevos.groupby('region').cumcount() + 1
+    nuevos = nuevos[nuevos['horizonte'] <= horizonte_max]
+    nuevos['fecha_emision'] = nuevos['fecha'] - pd.to_timedelta(7 * nuevos['horizonte'], unit='D')
+    nuevos = nuevos[COLUMNAS_ARCHIVO]
+
+    if archivo.exists():
+        previos = pd.read_csv(archivo, parse_dates=['fecha_emision', 'fecha'])
+        nuevos = pd.concat([previos, nuevos], ignore_index=True)
+
+    # Una corrida repetida reemplaza a la anterior con la misma emisión
+    nuevos = nuevos.drop_duplicates(['region', 'fecha_emision', 'fecha'], keep='last')
+    archivo.parent.mkdir(parents=True, exist_ok=True)
+    nuevos.to_csv(archivo, index=False)
+
+    return nuevos
+
+
+class DetectorResiduosPronostico:
+    """Marca semanas observadas que se salen de su pronóstico a un paso"""
+
+    def __init__(self, umbral_z: float = 3.0, nivel_intervalo: float = 0.95,
+                 usar_intervalo: bool = True, horizonte: int = 1):
+        """
+        Inicializa el detector
+
+        Args:
+            umbral_z: Residuo estandarizado a partir del cual se marca la semana
+            nivel_intervalo: Nivel de los intervalos guardados (para derivar sigma)
+            usar_intervalo: Si True, también marca las semanas por encima del límite superior
+            horizonte: Pasos de antelación del pronóstico usado (1 = una semana antes)
+        """
+        self.umbral_z = umbral_z
+        self.nivel_intervalo = nivel_intervalo
+        self.usar_intervalo = usar_intervalo
+        self.horizonte = horizonte
+
+    def seleccionar_pronosticos(self, df_pronosticos: pd.DataFrame) -> pd.DataFrame:
+        """
+        Un pronóstico por región y semana: el emitido con el horizonte configurado
+
+        Si el archivo no tiene horizonte (una sola corrida), se usa tal cual.
+        """
+        df_pron = df_pronosticos.copy()
+        df_pron['fecha'] = pd.to_datetime(df_pron['fecha'])
+
+        if 'horizonte' in df_pron.columns:
+            df_pron = df_pron[df_pron['horizonte'] == self.horizonte]
+        if 'fecha_emision' in df_pron.columns:
+            df_pron = df_pron.sort_values('fecha_emision')
+
+        return df_pron.drop_duplicates(['region', 'fecha'], keep='last')
+
+    def detectar_anomalias(self, df: pd.DataFrame, df_pronosticos: pd.DataFrame,
+                           col_casos: str = 'casos', col_fecha: str = 'fecha',
+                           col_departamento: str = 'departamento') -> pd.DataFrame:
+        """
+        Compara observados con pronósticos para todas las regiones a la vez
+
+        Args:
+            df: DataFrame con casos observados (una fila por región y semana)
+            df_pronosticos: Pronósticos guardados (archivo acumulado o salida de 08)
+            col_casos: Columna de casos
+            col_fecha: Columna de fecha
+            col_departamento: Columna de departamento
+
+        Returns:
+            Filas con pronóstico: casos_pronosticados, residuo, sigma_pronostico,
+            z_residuo, excede_intervalo, anomalia_residuo y anomalia_consenso
+        """
+        logger.info("Comparando casos observados con pronósticos guardados...")
+
+        pron = self.seleccionar_pronosticos(df_pronosticos)
+        pron = pron.rename(columns={
+            'region': col_departamento,
+            'fecha': col_fecha,
+            'casos_predichos_ensamble': 'casos_pronosticados',
+            'intervalo_inferior_95': 'pronostico_inferior',
+            'intervalo_superior_95': 'pronostico_superior'
+        })[[col_departamento, col_fecha, 'casos_pronosticados', 'pronostico_inferior',
+            'pronostico_superior']]
+
+        df_resultado = df.copy()
+        df_resultado[col_fecha] = pd.to_datetime(df_resultado[col_fecha])
+        df_resultado = df_resultado.merge(pron, on=[col_departamento, col_fecha], how='inner')
+
+        # Sigma implícita en el intervalo: (superior - inferior) / (2 z)
+        z_nivel = norm.ppf(0.5 + self.nivel_intervalo / 2)
+        sigma = (df_resultado['pronostico_superior'] - df_resultado['pronostico_inferior']).to_numpy() \
+            / (2 * z_nivel)
+        residuo = (df_resultado[col_casos] - df_resultado['casos_pronosticados']).to_numpy(dtype=float)
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            z = np.where(sigma > 0, residuo / sigma, np.nan)
+
+        excede = (df_resultado[col_casos] > df_resultado['pronostico_superior']).to_numpy()
+        anomalia = (z >= self.umbral_z) | (excede & self.usar_intervalo)
+
+        df_resultado['residuo'] = residuo
+        df_resultado['sigma_pronostico'] = sigma
+        df_resultado['z_residuo'] = z
+        df_resultado['excede_intervalo'] = excede.astype(int)
+        df_resultado['anomalia_residuo'] = anomalia.astype(int)
+        df_resultado['anomalia_consenso'] = df_resultado['anomalia_residuo']
+
+        logger.info(f"✓ Semanas con pronóstico: {len(df_resultado):,}, "
+                    f"fuera de lo esperado: {int(anomalia.sum()):,}")
+
+        return df_resultado
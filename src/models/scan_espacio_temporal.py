@@ -0,0 +1,258 @@
+"""
+Estadístico de barrido espacio-temporal (permutación espacio-temporal de Kulldorff)
+Busca cilindros (zona de regiones vecinas × semanas recientes) con más casos de
+los esperados y evalúa su significancia con réplicas Monte Carlo en paralelo
+"""
+
+import pandas as pd
+import numpy as np
+from scipy.special import xlogy
+from sklearn.neighbors import BallTree
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Tuple
+import logging
+
+from src.features.panel import PanelSemanal
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def cargar_centroides(filepath: Path, series: pd.Index, col_region: str = 'region',
+                      col_lat: str = 'lat', col_lon: str = 'lon') -> pd.DataFrame:
+    """
+    Carga los centroides de las regiones desde un CSV local
+
+    Args:
+        filepath: Ruta del archivo (una fila por región)
+        series: Regiones del panel
+        col_region: Columna con el nombre de la región
+        col_lat: Columna de latitud (grados)
+        col_lon: Columna de longitud (grados)
+
+    Returns:
+        DataFrame indexado por región con columnas lat y lon, solo regiones del panel
+    """
+    df = pd.read_csv(filepath)
+    centroides = df.set_index(col_region)[[col_lat, col_lon]]
+    centroides.columns = ['lat', 'lon']
+
+    faltantes = [s for s in series if s not in centroides.index]
+    if faltantes:
+        logger.warning(f"Regiones sin centroide (se excluyen del barrido): {faltantes}")
+
+    return centroides.loc[[s for s in series if s in centroides.index]]
+
+
+def ordenar_vecinos(centroides: pd.DataFrame, max_vecinos: int) -> np.ndarray:
+    """
+    Ordena, para cada región, sus regiones más cercanas (ella misma primero)
+
+    Las zonas candidatas de cada centro son los prefijos de esta ordenación,
+    así que el barrido no evalúa combinaciones que no sean círculos.
+
+    Args:
+        centroides: DataFrame con lat y lon
+        max_vecinos: Tamaño máximo de zona (en regiones)
+
+    Returns:
+        Array (n_regiones, k) con los índices de las regiones vecinas
+    """
+    coords = np.radians(centroides[['lat', 'lon']].to_numpy(dtype=float))
+    k = min(max_vecinos, len(coords))
+    _, vecinos = BallTree(coords, metric='haversine').query(coords, k=k)
+    return vecinos
+
+
+def estadisticos_cilindros(tabla: np.ndarray, vecinos: np.ndarray, max_semanas: int,
+                           max_fraccion_casos: float) -> Tuple[np.ndarray, ...]:
+    """
+    Log-verosimilitud de todos los cilindros que terminan en la última semana
+
+    Con la permutación espacio-temporal los casos esperados del cilindro son
+    (casos de la zona en el período) × (casos de todas las regiones en la
+    ventana) / total, de modo que todo se obtiene con sumas acumuladas.
+
+    Args:
+        tabla: Casos (n_semanas, n_regiones) del período de estudio
+        vecinos: Ordenación de vecinos (n_regiones, k)
+        max_semanas: Duración máxima del cilindro
+        max_fraccion_casos: Fracción máxima de los casos totales dentro de la zona
+
+    Returns:
+        Tupla (llr, observados, esperados) con forma (n_regiones, k, max_semanas)
+    """
+    total = tabla.sum()
+    max_semanas = min(max_semanas, tabla.shape[0])
+
+    # Casos por semana de cada zona (prefijos de vecinos): (semanas, centros, k)
+    zona_semana = np.cumsum(tabla[:, vecinos], axis=2)
+    casos_zona = zona_semana.sum(axis=0)
+
+    # Ventanas que terminan en la última semana: (centros, k, duración)
+    observados = np.cumsum(zona_semana[::-1][:max_semanas], axis=0).transpose(1, 2, 0)
+    casos_ventana = np.cumsum(tabla.sum(axis=1)[::-1][:max_semanas])
+    esperados = casos_zona[:, :, np.newaxis] * casos_ventana / max(total, 1)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        llr = xlogy(observados, observados / esperados) + \
+            xlogy(total - observados, (total - observados) / (total - esperados))
+    llr = np.where((observados > esperados) & (casos_zona[:, :, np.newaxis] <= max_fraccion_casos * total),
+                   np.nan_to_num(llr), 0.0)
+
+    return llr, observados, esperados
+
+
+def _replicas_max_llr(regiones_caso: np.ndarray, semanas_caso: np.ndarray, forma: Tuple[int, int],
+                      vecinos: np.ndarray, max_semanas: int, max_fraccion_casos: float,
+                      n_replicas: int, semilla) -> np.ndarray:
+    """
+    Máxima log-verosimilitud de réplicas con las semanas de los casos permutadas
+
+    Permutar la semana de cada caso conserva los totales por región y por
+    semana, que es la hipótesis nula de la permutación espacio-temporal.
+    """
+    rng = np.random.default_rng(semilla)
+    n_semanas, n_regiones = forma
+    maximos = np.empty(n_replicas)
+
+    for r in range(n_replicas):
+        semanas = rng.permutation(semanas_caso)
+        tabla = np.bincount(semanas * n_regiones + regiones_caso,
+                            minlength=n_semanas * n_regiones).reshape(forma).astype(float)
+        llr, _, _ = estadisticos_cilindros(tabla, vecinos, max_semanas, max_fraccion_casos)
+        maximos[r] = llr.max()
+
+    return maximos
+
+
+class ScanEspacioTemporal:
+    """Detección prospectiva de clusters espacio-temporales de casos"""
+
+    def __init__(self, centroides: pd.DataFrame, max_vecinos: int = 10, max_semanas: int = 4,
+                 max_fraccion_casos: float = 0.5, replicas: int = 999, n_workers: int = 1,
+                 semilla: int = 42):
+        """
+        Inicializa el barrido
+
+        Args:
+            centroides: DataFrame indexado por región con lat y lon
+            max_vecinos: Regiones máximas por zona
+            max_semanas: Duración máxima del cilindro (semanas hasta la última)
+            max_fraccion_casos: Fracción máxima de casos dentro de una zona
+            replicas: Réplicas Monte Carlo para el p-valor
+            n_workers: Procesos para las réplicas (1 = secuencial)
+            semilla: Semilla de las réplicas
+        """
+        self.centroides = centroides
+        self.max_vecinos = max_vecinos
+        self.max_semanas = max_semanas
+        self.max_fraccion_casos = max_fraccion_casos
+        self.replicas = replicas
+        self.n_workers = n_workers
+        self.semilla = semilla
+
+    @classmethod
+    def desde_archivo(cls, filepath: Path, series: pd.Index, **kwargs) -> 'ScanEspacioTemporal':
+        """Crea el barrido leyendo los centroides de un archivo"""
+        return cls(cargar_centroides(filepath, series), **kwargs)
+
+    def _maximos_replicas(self, tabla: np.ndarray, vecinos: np.ndarray) -> np.ndarray:
+        """Máximos de las réplicas Monte Carlo, repartidas entre procesos"""
+        conteos = tabla.astype(int).ravel()
+        celdas = np.arange(tabla.size)
+        semanas_caso = np.repeat(celdas // tabla.shape[1], conteos)
+        regiones_caso = np.repeat(celdas % tabla.shape[1], conteos)
+
+        # Semillas independientes por bloque de réplicas
+        n_bloques = max(1, min(self.n_workers, self.replicas))
+        tamanos = np.diff(np.linspace(0, self.replicas, n_bloques + 1).astype(int))
+        semillas = np.random.SeedSequence(self.semilla).spawn(n_bloques)
+        args = (regiones_caso, semanas_caso, tabla.shape, vecinos, self.max_semanas,
+                self.max_fraccion_casos)
+
+        if n_bloques == 1:
+            return _replicas_max_llr(*args, tamanos[0], semillas[0])
+
+        with ProcessPoolExecutor(max_workers=n_bloques) as executor:
+            futuros = [executor.submit(_replicas_max_llr, *args, n, s)
+                       for n, s in zip(tamanos, semillas)]
+            return np.concatenate([f.result() for f in futuros])
+
+    def detectar_clusters(self, df: pd.DataFrame, col_casos: str = 'casos',
+                          col_fecha: str = 'fecha', col_departamento: str = 'departamento',
+                          fecha_fin: str = None, semanas_estudio: int = 52,
+                          max_clusters: int = 10) -> pd.DataFrame:
+        """
+        Busca los clusters más probables que siguen activos en la semana final
+
+        Args:
+            df: DataFrame con una fila por región y semana
+            col_casos: Columna de casos
+            col_fecha: Columna de fecha
+            col_departamento: Columna de departamento
+            fecha_fin: Última semana analizada (por defecto la más reciente)
+            semanas_estudio: Semanas del período de estudio
+            max_clusters: Clusters sin solapamiento geográfico a reportar
+
+        Returns:
+            DataFrame con un cluster por fila: centro, regiones, fechas, casos
+            observados y esperados, riesgo relativo, llr y p_valor
+        """
+        logger.info("Barrido espacio-temporal de clusters...")
+
+        panel = PanelSemanal.desde_dataframe(df, col_casos, col_fecha, col_departamento)
+        fin = len(panel.fechas) if fecha_fin is None else \
+            int(panel.fechas.searchsorted(pd.Timestamp(fecha_fin), side='right'))
+        inicio = max(0, fin - semanas_estudio)
+
+        columnas = panel.series.get_indexer(self.centroides.index)
+        columnas = columnas[columnas >= 0]
+        regiones = panel.series[columnas]
+        tabla = np.nan_to_num(panel.valores[inicio:fin][:, columnas]).round()
+        fechas = panel.fechas[inicio:fin]
+
+        vecinos = ordenar_vecinos(self.centroides.loc[regiones], self.max_vecinos)
+        llr, observados, esperados = estadisticos_cilindros(
+            tabla, vecinos, self.max_semanas, self.max_fraccion_casos
+        )
+
+        maximos = self._maximos_replicas(tabla, vecinos) if self.replicas > 0 else np.array([])
+
+        # Clusters sin solapamiento geográfico, de mayor a menor llr
+        clusters = []
+        usadas = np.zeros(len(regiones), dtype=bool)
+        for plano in np.argsort(llr, axis=None)[::-1]:
+            if len(clusters) >= max_clusters:
+                break
+            centro, k, d = np.unravel_index(plano, llr.shape)
+            if llr[centro, k, d] <= 0:
+                break
+            zona = vecinos[centro, :k + 1]
+            if usadas[zona].any():
+                continue
+            usadas[zona] = True
+
+            c, mu = observados[centro, k, d], esperados[centro, k, d]
+            clusters.append({
+                'cluster_id': len(clusters) + 1,
+                'centro': regiones[centro],
+                'regiones': ';'.join(regiones[zona]),
+                'n_regiones': len(zona),
+                'fecha_inicio': fechas[len(fechas) - 1 - d],
+                'fecha_fin': fechas[-1],
+                'semanas': d + 1,
+                'casos_observados': c,
+                'casos_esperados': mu,
+                'riesgo_relativo': c / mu if mu > 0 else np.inf,
+                'llr': llr[centro, k, d],
+                'p_valor': (1 + (maximos >= llr[centro, k, d]).sum()) / (1 + len(maximos))
+            })
+
+        df_clusters = pd.DataFrame(clusters)
+        logger.info(f"✓ Clusters candidatos: {len(df_clusters)} "
+                    f"({len(maximos)} réplicas, {len(regiones)} regiones, {len(fechas)} semanas)")
+
+        return df_clusters
+
@@ -0,0 +1,218 @@
+"""
+Servicio de scoring de anomalías para semanas epidemiológicas nuevas
+Carga una vez los modelos guardados y puntúa micro-lotes de filas nuevas de
+cualquier conjunto de regiones sin reentrenar ni repuntuar el histórico
+"""
+
+import json
+import sys
+import time
+import logging
+from pathlib import Path
+from typing import Dict, List, TextIO
+
+import numpy as np
+import pandas as pd
+
+from src.models.anomaly_detection import AnomalyDetector
+from src.models.global_anomaly import GlobalAnomalyDetector
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class ServicioScoring:
+    """Puntúa filas de features nuevas con los modelos de anomalías ya entrenados"""
+
+    def __init__(self, models_dir: Path, modo: str = 'por_region', formato: str = 'store',
+                 memoria_max_mb: float = 512, precargar: bool = True,
+                 col_departamento: str = 'departamento', contaminacion_umbral: float = None,
+                 contaminacion_por_region: Dict[str, float] = None, archivo_anomalias: Path = None):
+        """
+        Inicializa el servicio y carga los modelos
+
+        Args:
+            models_dir: Directorio de modelos guardados por 05_train_anomaly_models.py
+            modo: 'por_region' o 'global'
+            formato: Formato de los modelos por región ('store' o 'pickle')
+            memoria_max_mb: Límite de bundles cargados a la vez (solo 'store')
+            precargar: Si True, carga todos los bundles al iniciar para que la
+                      primera llamada no pague la lectura de disco
+            col_departamento: Columna de departamento
+            contaminacion_umbral: Proporción de anomalías de las banderas; solo recalcula
+                                 umbrales (por defecto la de AnomalyDetector o, en modo
+                                 global, la calibrada al entrenar)
+            contaminacion_por_region: Proporción propia de algunas regiones (solo 'por_region')
+            archivo_anomalias: CSV de anomalías que lee 06_generate_alerts.py; si se indica,
+                              servir() actualiza en él las filas de cada micro-lote
+        """
+        if modo not in ('por_region', 'global'):
+            raise ValueError(f"Modo de scoring no soportado: {modo}")
+
+        self.modo = modo
+        self.col_departamento = col_departamento
+        self.archivo_anomalias = Path(archivo_anomalias) if archivo_anomalias is not None else None
+
+        inicio = time.perf_counter()
+        if modo == 'global':
+            self.detector = GlobalAnomalyDetector.cargar_modelos(Path(models_dir))
+            if contaminacion_umbral is not None:
+                self.detector.calibrar_umbrales(contaminacion_umbral)
+        else:
+            self.detector = AnomalyDetector(contaminacion_umbral=contaminacion_umbral,
+                                            contaminacion_por_region=contaminacion_por_region)
+            self.detector.cargar_modelos(Path(models_dir), formato=formato, memoria_max_mb=memoria_max_mb)
+            if precargar and self.detector.store is not None:
+                for region in self.detector.store.regiones():
+                    self.detector.store.cargar_region(region)
+
+        self.feature_columns = self.detector.feature_columns
+
+        logger.info(f"✓ Servicio de scoring listo ({modo}) en {time.perf_counter() - inicio:.2f}s")
+
+    def puntuar(self, df_nuevas: pd.DataFrame) -> pd.DataFrame:
+        """
+        Puntúa un micro-lote de filas nuevas
+
+        Args:
+            df_nuevas: Filas con la columna de departamento y las features del entrenamiento
+
+        Returns:
+            DataFrame con las filas puntuadas, anomalia_<tipo>, score_<tipo> y anomalia_consenso
+        """
+        faltantes = [col for col in self.feature_columns if col not in df_nuevas.columns]
+        if faltantes:
+            raise ValueError(f"Faltan features en las filas nuevas: {faltantes}")
+
+        if self.modo == 'global':
+            return self.detector.detectar_anomalias(df_nuevas, self.feature_columns,
+                                                    col_departamento=self.col_departamento)
+
+        return self.detector.detectar_anomalias_lote(
+            df_nuevas, self.feature_columns,
+            col_departamento=self.col_departamento,
+            todos_scores=True
+        )
+
+    def puntuar_registros(self, registros: List[Dict]) -> List[Dict]:
+        """
+        Puntúa una lista de registros (una fila por región y semana)
+
+        Args:
+            registros: Lista de diccionarios con departamento y features
+
+        Returns:
+            Lista de diccionarios con departamento, fecha (si viene), flags y scores
+        """
+        return self._a_registros(self.puntuar(pd.DataFrame.from_records(registros)))
+
+    def _a_registros(self, resultado: pd.DataFrame) -> List[Dict]:
+        """Departamento, fecha, flags y scores de las filas puntuadas como registros"""
+        columnas = [c for c in [self.col_departamento, 'fecha'] if c in resultado.columns]
+        columnas += [c for c in resultado.columns
+                     if c.startswith('anomalia_') or c.startswith('score_')]
+        resultado = resultado[columnas].replace({np.nan: None})
+
+        return resultado.to_dict(orient='records')
+
+    def servir(self, entrada: TextIO = sys.stdin, salida: TextIO = sys.stdout):
+        """
+        Worker de larga duración: un micro-lote JSON por línea de entrada
+
+        Cada línea es una lista de registros (o un único registro) y se responde
+        con una línea JSON {"resultados": [...], "ms": ...} o {"error": ...}; un
+        error en una línea se registra y el worker sigue con la siguiente. Con
+        archivo_anomalias, las filas puntuadas se actualizan en ese CSV antes de
+        responder, para que la siguiente ejecución de 06 genere sus alertas.
+
+        Args:
+            entrada: Flujo de entrada (por defecto stdin)
+            salida: Flujo de salida (por defecto stdout)
+        """
+        logger.info("Esperando micro-lotes (un JSON por línea)...")
+
+        for linea in entrada:
+            linea = linea.strip()
+            if not linea:
+                continue
+
+            inicio = time.perf_counter()
+            try:
+                registros = json.loads(linea)
+                if isinstance(registros, dict):
+                    registros = [registros]
+                resultado = self.puntuar(pd.DataFrame.from_records(registros))
+                if self.archivo_anomalias is not None:
+                    actualizar_anomalias(resultado, self.archivo_anomalias, self.col_departamento)
+                respuesta = {'resultados': self._a_registros(resultado)}
+            except (ValueError, KeyError) as e:
+                logger.warning(f"Micro-lote rechazado: {e}")
+                respuesta = {'error': str(e)}
+            except Exception as e:
+                # Un fallo inesperado en un micro-lote no debe detener el worker
+                logger.exception("Error inesperado al puntuar un micro-lote")
+                respuesta = {'error': f'{type(e).__name__}: {e}'}
+            respuesta['ms'] = round((time.perf_counter() - inicio) * 1000, 2)
+
+            salida.write(json.dumps(respuesta, ensure_ascii=False, default=str) + '\n')
+            salida.flush()
+
+
+def puntuar_semanas_nuevas(df_nuevas: pd.DataFrame, models_dir: Path,
+                           **kwargs) -> pd.DataFrame:
+    """
+    Puntúa filas nuevas en una sola llamada (carga los modelos en cada llamada;
+    para actualizaciones frecuentes conviene reutilizar un ServicioScoring)
+
+    Args:
+        df_nuevas: Filas de features nuevas
+        models_dir: Directorio de modelos guardados
+        **kwargs: Argumentos de ServicioScoring
+
+    Returns:
+        DataFrame con flags y scores
+    """
+    return ServicioScoring(models_dir, precargar=False, **kwargs).puntuar(df_nuevas)
+
+
+def actualizar_anomalias(df_puntuadas: pd.DataFrame, path: Path,
+                         col_departamento: str = 'departamento') -> pd.DataFrame:
+    """
+    Inserta o reemplaza filas puntuadas en el CSV de anomalías por (departamento, fecha)
+
+    Una semana que ya estaba en el archivo (revisión de casos) se sustituye por
+    la nueva puntuación; las columnas del archivo se conservan y la escritura es
+    atómica para que 06_generate_alerts.py nunca lea un archivo a medias.
+
+    Args:
+        df_puntuadas: Filas puntuadas (con departamento y fecha)
+        path: CSV de anomalías (dengue_anomalias.csv)
+        col_departamento: Columna de departamento
+
+    Returns:
+        Tabla de anomalías actualizada
+    """
+    if 'fecha' not in df_puntuadas.columns:
+        raise ValueError("Las filas puntuadas no tienen columna 'fecha'")
+
+    path = Path(path)
+    df_nuevas = df_puntuadas.assign(fecha=pd.to_datetime(df_puntuadas['fecha']))
+    if path.exists():
+        df_tabla = pd.read_csv(path, parse_dates=['fecha'])
+        df_tabla = pd.concat([df_tabla, df_nuevas[df_nuevas.columns.intersection(df_tabla.columns)]],
+                             ignore_index=True)
+    else:
+        df_tabla = df_nuevas.reset_index(drop=True)
+
+    df_tabla = (df_tabla.drop_duplicates(subset=[col_departamento, 'fecha'], keep='last')
+                .sort_values([col_departamento, 'fecha'], kind='stable')
+                .reset_index(drop=True))
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    temporal = path.with_suffix('.tmp')
+    df_tabla.to_csv(temporal, index=False)
+    temporal.replace(path)
+
+    logger.info(f"✓ {len(df_nuevas):,} filas puntuadas actualizadas en {path}")
+
+    return df_tabla
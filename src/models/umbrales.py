@@ -0,0 +1,218 @@
+"""
+Umbrales de anomalía derivados de scores continuos
+Permite elegir el nivel de contaminación (global o por región) después del
+entrenamiento, sobre los scores de entrenamiento guardados con los modelos
+"""
+
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Tuple
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Modelos con score continuo (más bajo = más anómalo)
+MODELOS_SCORE = ['if', 'lof', 'ocsvm']
+
+
+def calcular_umbrales(scores_entrenamiento: Dict[str, Dict[str, np.ndarray]],
+                      contaminaciones: List[float]) -> pd.DataFrame:
+    """
+    Umbral de cada región y modelo como cuantil de sus scores de entrenamiento
+
+    Args:
+        scores_entrenamiento: Por región, diccionario tipo → array de scores
+        contaminaciones: Proporciones de anomalías a evaluar
+
+    Returns:
+        DataFrame con columnas region, modelo, contaminacion, umbral
+    """
+    contaminaciones = np.asarray(contaminaciones, dtype=float)
+    filas = []
+
+    for region, por_modelo in scores_entrenamiento.items():
+        for modelo, scores in por_modelo.items():
+            if len(scores) == 0:
+                continue
+            # Todos los cuantiles en una sola llamada
+            umbrales = np.quantile(scores, contaminaciones)
+            filas.append(pd.DataFrame({
+                'region': region,
+                'modelo': modelo,
+                'contaminacion': contaminaciones,
+                'umbral': umbrales
+            }))
+
+    if not filas:
+        return pd.DataFrame(columns=['region', 'modelo', 'contaminacion', 'umbral'])
+    return pd.concat(filas, ignore_index=True)
+
+
+def _matriz_umbrales(umbrales: pd.DataFrame, modelo: str,
+                     regiones: pd.Series) -> Tuple[np.ndarray, np.ndarray]:
+    """Matriz de umbrales (filas × contaminaciones) de un modelo y sus contaminaciones"""
+    tabla = umbrales[umbrales['modelo'] == modelo].pivot(
+        index='region', columns='contaminacion', values='umbral'
+    )
+    codigos = tabla.index.get_indexer(regiones)
+    matriz = np.full((len(regiones), tabla.shape[1]), np.nan)
+    conocidas = codigos >= 0
+    matriz[conocidas] = tabla.to_numpy()[codigos[conocidas]]
+    return matriz, tabla.columns.to_numpy()
+
+
+def marcar_anomalias(df_scores: pd.DataFrame, umbrales: pd.DataFrame, contaminacion: float,
+                     col_departamento: str = 'departamento', min_votos: int = 2,
+                     contaminacion_por_region: Dict[str, float] = None) -> pd.DataFrame:
+    """
+    Deriva las banderas de anomalía de los scores para un nivel de contaminación
+
+    Las filas de una región y modelo sin umbral (modelos guardados sin scores
+    de entrenamiento) conservan la bandera anomalia_<tipo> que ya traigan.
+
+    Args:
+        df_scores: DataFrame con columnas score_<tipo> (ver detectar_anomalias_lote
+                   con todos_scores=True)
+        umbrales: Resultado de calcular_umbrales
+        contaminacion: Nivel de contaminación a aplicar (debe estar en umbrales)
+        col_departamento: Columna de departamento
+        min_votos: Modelos que deben coincidir para el consenso
+        contaminacion_por_region: Nivel propio de algunas regiones ({región: contaminación})
+
+    Returns:
+        Copia de df_scores con anomalia_<tipo> y anomalia_consenso recalculadas
+    """
+    df_resultado = df_scores.copy()
+    regiones = df_resultado[col_departamento]
+
+    # Nivel de cada fila (redondeado para comparar con los de la tabla de umbrales)
+    nivel = regiones.map(contaminacion_por_region or {}).fillna(contaminacion).to_numpy(dtype=float).round(10)
+    disponibles = umbrales['contaminacion'].to_numpy(dtype=float).round(10)
+    faltantes = sorted(set(np.unique(nivel)) - set(disponibles))
+    if len(umbrales) > 0 and faltantes:
+        raise ValueError(f"Sin umbrales para contaminación {faltantes}")
+
+    claves = pd.MultiIndex.from_arrays([regiones.to_numpy(), nivel])
+    anomaly_cols = []
+    for modelo in MODELOS_SCORE:
+        col_score = f'score_{modelo}'
+        if col_score not in df_resultado.columns:
+            continue
+        del_modelo = umbrales['modelo'] == modelo
+        tabla = pd.Series(umbrales.loc[del_modelo, 'umbral'].to_numpy(dtype=float),
+                          index=pd.MultiIndex.from_arrays([umbrales.loc[del_modelo, 'region'].to_numpy(),
+                                                           disponibles[del_modelo.to_numpy()]]))
+        umbral = tabla.reindex(claves).to_numpy()
+
+        col = f'anomalia_{modelo}'
+        previa = df_resultado[col].to_numpy() if col in df_resultado.columns else np.zeros(len(df_resultado))
+        marcadas = df_resultado[col_score].to_numpy(dtype=float) < umbral
+        df_resultado[col] = np.where(np.isnan(umbral), previa, marcadas).astype(int)
+        anomaly_cols.append(col)
+
+    df_resultado['anomalia_consenso'] = (
+        df_resultado[anomaly_cols].sum(axis=1) >= min(min_votos, len(anomaly_cols))
+    ).astype(int)
+
+    return df_resultado
+
+
+def _resumen(banderas: np.ndarray, referencia: np.ndarray = None) -> Dict[str, np.ndarray]:
+    """Conteos y métricas tipo precisión por columna de una matriz de banderas"""
+    n_anomalias = banderas.sum(axis=0)
+    resumen = {
+        'n_anomalias': n_anomalias,
+        'pct_anomalias': n_anomalias / max(len(banderas), 1) * 100,
+    }
+
+    if referencia is not None:
+        verdaderos = (banderas & referencia[:, np.newaxis]).sum(axis=0)
+        n_referencia = referencia.sum()
+        with np.errstate(invalid='ignore', divide='ignore'):
+            precision = np.where(n_anomalias > 0, verdaderos / n_anomalias, np.nan)
+            sensibilidad = verdaderos / n_referencia if n_referencia > 0 else np.full(len(verdaderos), np.nan)
+            f1 = 2 * precision * sensibilidad / (precision + sensibilidad)
+        resumen.update({
+            'verdaderos_positivos': verdaderos,
+            'precision': precision,
+            'sensibilidad': sensibilidad,
+            'f1': f1,
+        })
+
+    return resumen
+
+
+def barrido_umbrales(df_scores: pd.DataFrame, umbrales: pd.DataFrame,
+                     col_referencia: str = None, col_departamento: str = 'departamento',
+                     min_votos: int = 2) -> pd.DataFrame:
+    """
+    Evalúa todos los niveles de contaminación de una vez sobre los scores cacheados
+
+    Para cada modelo se compara el vector de scores con la matriz de umbrales
+    (filas × contaminaciones) de su región; el consenso se obtiene sumando las
+    matrices de banderas.
+
+    Args:
+        df_scores: DataFrame con columnas score_<tipo>
+        umbrales: Resultado de calcular_umbrales
+        col_referencia: Columna binaria de referencia (p.ej. brote confirmado) para
+                        calcular precisión, sensibilidad y F1 (opcional)
+        col_departamento: Columna de departamento
+        min_votos: Modelos que deben coincidir para el consenso
+
+    Returns:
+        DataFrame con una fila por contaminación y modelo (incluido 'consenso')
+    """
+    regiones = df_scores[col_departamento]
+    referencia = None
+    if col_referencia is not None:
+        referencia = df_scores[col_referencia].fillna(0).to_numpy().astype(bool)
+
+    resultados = []
+    votos = None
+    contaminaciones = None
+
+    for modelo in MODELOS_SCORE:
+        col_score = f'score_{modelo}'
+        if col_score not in df_scores.columns or not (umbrales['modelo'] == modelo).any():
+            continue
+
+        matriz, contaminaciones = _matriz_umbrales(umbrales, modelo, regiones)
+        scores = df_scores[col_score].to_numpy(dtype=float)
+        banderas = scores[:, np.newaxis] < matriz
+
+        votos = banderas.astype(int) if votos is None else votos + banderas
+        resultados.append(pd.DataFrame({'contaminacion': contaminaciones, 'modelo': modelo,
+                                        **_resumen(banderas, referencia)}))
+
+    if votos is None:
+        return pd.DataFrame()
+
+    n_modelos = len(resultados)
+    consenso = votos >= min(min_votos, n_modelos)
+    resultados.append(pd.DataFrame({'contaminacion': contaminaciones, 'modelo': 'consenso',
+                                    **_resumen(consenso, referencia)}))
+
+    return pd.concat(resultados, ignore_index=True).sort_values(
+        ['contaminacion', 'modelo'], ignore_index=True
+    )
+
+
+def etiqueta_referencia_brote(df: pd.DataFrame, col_casos: str = 'casos',
+                              col_departamento: str = 'departamento', k: float = 2.0) -> pd.Series:
+    """
+    Etiqueta de referencia simple: casos por encima de la media + k desviaciones de la región
+
+    Args:
+        df: DataFrame con casos
+        col_casos: Columna de casos
+        col_departamento: Columna de departamento
+        k: Número de desviaciones estándar
+
+    Returns:
+        Serie binaria (1 = semana epidémica)
+    """
+    grupos = df.groupby(col_departamento)[col_casos]
+    umbral = grupos.transform('mean') + k * grupos.transform('std').fillna(0)
+    return (df[col_casos] > umbral).astype(int)
@@ -0,0 +1,9 @@
+"""
+Configuración común de los tests: raíz del proyecto en el path para importar src y config
+"""
+
+import sys
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT_DIR))
@@ -0,0 +1,458 @@
+"""
+Tests del sistema de alertas
+
+Las implementaciones fila a fila anteriores se conservan aquí como referencia:
+la clasificación columnar, el modo incremental y el motor de reglas deben dar
+exactamente la misma salida sobre tablas pequeñas con los casos límite
+(regiones intercaladas, casos constantes, faltantes, regiones de una semana).
+Los tiempos sobre 1M de filas están en src/models/benchmark_alertas.py.
+"""
+
+import json
+import os
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from config import UMBRALES_ALERTA, UMBRALES_ALERTA_PREDICTIVA
+from src.models.alert_system import AlertSystem
+from src.models.alertas_incrementales import EstadoAlertas
+from src.models.alertas_probabilisticas import (probabilidad_desde_muestras, probabilidad_desde_cuantiles,
+                                                probabilidad_desde_intervalos)
+from src.models.detectores_epidemiologicos import DETECTORES
+from src.models.motor_reglas import MotorReglas, reglas_desde_umbrales
+
+
+def generar_alertas_referencia(alert_system: AlertSystem, df: pd.DataFrame,
+                               col_casos: str = 'casos', col_departamento: str = 'departamento',
+                               col_fecha: str = 'fecha', ventana_historica: int = 52) -> pd.DataFrame:
+    """Implementación anterior de generar_alertas (iterrows)"""
+    df_alertas = df.copy()
+    df_alertas[col_fecha] = pd.to_datetime(df_alertas[col_fecha])
+
+    df_alertas['media_historica'] = df_alertas.groupby(col_departamento)[col_casos].transform(
+        lambda x: x.rolling(window=ventana_historica, min_periods=1).mean().shift(1)
+    )
+    df_alertas['std_historica'] = df_alertas.groupby(col_departamento)[col_casos].transform(
+        lambda x: x.rolling(window=ventana_historica, min_periods=1).std().shift(1)
+    )
+
+    alertas = []
+    for idx, row in df_alertas.iterrows():
+        alertas.append(alert_system.calcular_nivel_riesgo_combinado(
+            casos_actual=row[col_casos],
+            media_historica=row['media_historica'],
+            std_historica=row['std_historica'],
+            anomalia_if=row.get('anomalia_if', 0),
+            anomalia_lof=row.get('anomalia_lof', 0),
+            anomalia_ocsvm=row.get('anomalia_ocsvm', 0)
+        ))
+
+    return pd.concat([df_alertas.reset_index(drop=True), pd.DataFrame(alertas)], axis=1)
+
+
+def nivel_riesgo_predictivo_referencia(casos_predichos: float, media_historica: float):
+    """Clasificación predictiva anterior con los cortes fijos 0.10/0.30/0.60/1.0"""
+    if media_historica == 0:
+        porcentaje_incremento = 0
+    else:
+        porcentaje_incremento = (casos_predichos - media_historica) / media_historica
+
+    if porcentaje_incremento > 1.0:
+        nivel = 'critico'
+    elif porcentaje_incremento > 0.60:
+        nivel = 'alerta_temprana'
+    elif porcentaje_incremento > 0.30:
+        nivel = 'preparacion'
+    elif porcentaje_incremento > 0.10:
+        nivel = 'vigilancia'
+    else:
+        nivel = 'normal'
+
+    return nivel, porcentaje_incremento
+
+
+def generar_alertas_predictivas_referencia(df_predicciones: pd.DataFrame, df_historico: pd.DataFrame,
+                                           col_casos_pred: str = 'casos_predichos_ensamble',
+                                           col_region: str = 'region', col_fecha: str = 'fecha') -> pd.DataFrame:
+    """Implementación anterior de generar_alertas_predictivas (iterrows)"""
+    df_pred = df_predicciones.copy()
+    df_pred[col_fecha] = pd.to_datetime(df_pred[col_fecha])
+    medias_historicas = df_historico.groupby('departamento')['casos'].mean().to_dict()
+
+    alertas_predictivas = []
+    for idx, row in df_pred.iterrows():
+        region = row[col_region]
+        casos_pred = row[col_casos_pred]
+        fecha = row[col_fecha]
+
+        media_hist = medias_historicas.get(region, casos_pred)
+        nivel, incremento = nivel_riesgo_predictivo_referencia(casos_pred, media_hist)
+
+        lower = row.get('intervalo_inferior_95', casos_pred * 0.85)
+        upper = row.get('intervalo_superior_95', casos_pred * 1.15)
+
+        alertas_predictivas.append({
+            'region': region,
+            'fecha': fecha,
+            'año': fecha.year,
+            'mes': fecha.month,
+            'semana': fecha.isocalendar().week,
+            'casos_predichos': casos_pred,
+            'media_historica': media_hist,
+            'incremento_esperado': incremento,
+            'porcentaje_incremento': incremento * 100,
+            'nivel_riesgo_predictivo': nivel,
+            'intervalo_inferior': lower,
+            'intervalo_superior': upper,
+            'rango_incertidumbre': upper - lower
+        })
+
+    return pd.DataFrame(alertas_predictivas)
+
+
+def datos_semanales(n_regiones: int = 6, semanas: int = 80, con_anomalias: bool = True,
+                    semilla: int = 42) -> pd.DataFrame:
+    """
+    Casos semanales con regiones intercaladas, una región de casos constantes
+    (std = 0), faltantes y una región con una sola semana
+    """
+    rng = np.random.default_rng(semilla)
+    fechas = pd.date_range('2015-01-04', periods=semanas, freq='W')
+    n = n_regiones * semanas
+
+    df = pd.DataFrame({
+        'departamento': np.tile([f'R{i:02d}' for i in range(n_regiones)], semanas),
+        'fecha': np.repeat(fechas, n_regiones),
+        'casos': rng.poisson(rng.uniform(0, 50, n)).astype(float),
+    })
+    df.loc[df['departamento'] == 'R00', 'casos'] = 7.0
+    df.loc[rng.random(n) < 0.02, 'casos'] = np.nan
+    df.loc[len(df)] = ['UNICA', fechas[0], 3.0]
+
+    if con_anomalias:
+        for col in ['anomalia_if', 'anomalia_lof', 'anomalia_ocsvm']:
+            df[col] = (rng.random(len(df)) < 0.1).astype(int)
+
+    return df
+
+
+def predicciones(n_series: int = 6, semanas: int = 30, con_intervalos: bool = True, semilla: int = 42):
+    """
+    Pronósticos e histórico con regiones sin histórico, una media histórica
+    nula, cruces exactos de los cortes de nivel y predicciones faltantes
+    """
+    rng = np.random.default_rng(semilla)
+    regiones = [f'R{i:02d}' for i in range(n_series)]
+    df_pred = pd.DataFrame({
+        'region': np.repeat(regiones, semanas),
+        'fecha': np.tile(pd.date_range('2026-01-04', periods=semanas, freq='W'), n_series),
+        'casos_predichos_ensamble': rng.gamma(2.0, 10.0, n_series * semanas),
+    })
+    df_pred.loc[rng.random(len(df_pred)) < 0.05, 'casos_predichos_ensamble'] = np.nan
+    if con_intervalos:
+        df_pred['intervalo_inferior_95'] = df_pred['casos_predichos_ensamble'] * 0.7
+        df_pred['intervalo_superior_95'] = df_pred['casos_predichos_ensamble'] * 1.4
+
+    historicas = regiones[:max(1, n_series - 1)]
+    df_hist = pd.DataFrame({'departamento': np.repeat(historicas, 2),
+                            'casos': np.tile([5.0, 15.0], len(historicas))})
+    df_hist.loc[df_hist['departamento'] == regiones[0], 'casos'] = 0.0
+
+    # Incrementos exactamente en los cortes (10%, 30%, 60%, 100%) sobre la media 10
+    cortes = df_pred.index[df_pred['region'] == regiones[-1 if n_series == 1 else 1]][:4]
+    df_pred.loc[cortes, 'casos_predichos_ensamble'] = [11.0, 13.0, 16.0, 20.0]
+
+    return df_pred, df_hist
+
+
+@pytest.fixture
+def alert_system():
+    return AlertSystem()
+
+
+# --- Clasificación semanal columnar (fila a fila como referencia) ---
+
+def _desordenado():
+    df = datos_semanales().sample(frac=1, random_state=0)
+    df.index = np.arange(len(df)) % 50  # índice con duplicados
+    return df
+
+
+@pytest.mark.parametrize('df', [
+    pytest.param(datos_semanales(), id='con anomalías'),
+    pytest.param(datos_semanales(con_anomalias=False), id='sin columnas de anomalías'),
+    pytest.param(datos_semanales().dropna().astype({'casos': int}), id='casos enteros'),
+    pytest.param(_desordenado(), id='filas desordenadas e índice duplicado'),
+    pytest.param(datos_semanales().iloc[:0], id='vacío'),
+])
+def test_generar_alertas_igual_a_referencia(alert_system, df):
+    pd.testing.assert_frame_equal(alert_system.generar_alertas(df),
+                                  generar_alertas_referencia(alert_system, df), check_exact=True)
+
+
+# --- Alertas predictivas columnares ---
+
+@pytest.mark.parametrize('df_pred, df_hist', [
+    pytest.param(*predicciones(), id='con intervalos'),
+    pytest.param(*predicciones(con_intervalos=False), id='sin intervalos'),
+    pytest.param(predicciones()[0].dropna().astype({'casos_predichos_ensamble': int}), predicciones()[1],
+                 id='casos enteros'),
+    pytest.param(predicciones()[0], predicciones()[1].iloc[:0], id='sin histórico'),
+    pytest.param(*predicciones(n_series=1, semanas=10), id='una región con media 0'),
+])
+def test_generar_alertas_predictivas_igual_a_referencia(alert_system, df_pred, df_hist):
+    pd.testing.assert_frame_equal(alert_system.generar_alertas_predictivas(df_pred, df_hist),
+                                  generar_alertas_predictivas_referencia(df_pred, df_hist), check_exact=True)
+
+
+# --- Modo incremental frente a recálculo completo ---
+
+def comparar_con_completo(df_incremental: pd.DataFrame, df_completo: pd.DataFrame):
+    """Estadísticas con tolerancia (sumas móviles frente a rolling) y niveles exactos"""
+    m = df_incremental.merge(df_completo.loc[:, ~df_completo.columns.duplicated()],
+                             on=['departamento', 'fecha'], suffixes=('', '_completo'))
+    assert len(m) == len(df_incremental)
+    for col in ['media_historica', 'std_historica', 'z_score', 'porcentaje_incremento']:
+        np.testing.assert_allclose(m[col].astype(float), m[f'{col}_completo'].astype(float),
+                                   rtol=1e-9, atol=1e-9)
+    for col in ['nivel_riesgo', 'nivel_estadistico', 'nivel_anomalia']:
+        assert (m[col] == m[f'{col}_completo']).all(), col
+
+
+def test_alertas_incrementales_igual_a_recalculo(alert_system):
+    df = datos_semanales(n_regiones=5, semanas=100)
+    df['casos'] += np.where(np.arange(len(df)) % 3 == 0, 0.25, 0.0)
+    df = df.sort_values(['departamento', 'fecha'], kind='stable').reset_index(drop=True)
+    fechas = np.sort(df['fecha'].unique())
+    estado = EstadoAlertas(ventana=52, semanas_revision=8)
+
+    for corte in fechas[-4:]:
+        df_corte = df[df['fecha'] <= corte]
+        comparar_con_completo(alert_system.generar_alertas_incrementales(df_corte, estado),
+                              alert_system.generar_alertas(df_corte))
+
+    # Revisión de una semana reciente en dos regiones (solo se envían las últimas semanas)
+    regiones = df['departamento'].unique()[:2]
+    revisado = df.copy()
+    revisado.loc[(revisado['fecha'] == fechas[-6]) & revisado['departamento'].isin(regiones), 'casos'] += 100
+    df_nuevas = alert_system.generar_alertas_incrementales(revisado[revisado['fecha'] >= fechas[-20]], estado)
+    assert set(df_nuevas['departamento']) == set(regiones)
+    comparar_con_completo(df_nuevas, alert_system.generar_alertas(revisado))
+
+    # Revisión dentro de la memoria pero sin ventana completa anterior: hay que recalcular todo
+    antiguo = revisado.copy()
+    antiguo.loc[(antiguo['fecha'] == fechas[-58]) & (antiguo['departamento'] == regiones[0]), 'casos'] = 1000.0
+    with pytest.raises(ValueError):
+        alert_system.generar_alertas_incrementales(antiguo, estado)
+
+
+def test_alertas_incrementales_con_flags_revisados(alert_system):
+    df = datos_semanales(n_regiones=5, semanas=100)
+    df = df.sort_values(['departamento', 'fecha'], kind='stable').reset_index(drop=True)
+    fechas = np.sort(df['fecha'].unique())
+    estado = EstadoAlertas(ventana=52, semanas_revision=8)
+    df_tabla = alert_system.generar_alertas_incrementales(df, estado)
+
+    # Reentrenamiento: cambian solo los flags de una semana reciente (los casos son los mismos)
+    region = 'R03'
+    reciente = df.copy()
+    semana = (reciente['fecha'] == fechas[-3]) & (reciente['departamento'] == region)
+    reciente.loc[semana, ['anomalia_if', 'anomalia_lof', 'anomalia_ocsvm']] = 1
+
+    df_nuevas = alert_system.generar_alertas_incrementales(reciente, estado)
+    assert set(df_nuevas['departamento']) == {region}
+    assert (df_nuevas.loc[df_nuevas['fecha'] == fechas[-3], 'nivel_riesgo'] == 'critico').all()
+    df_tabla = alert_system.actualizar_tabla_alertas(df_tabla, df_nuevas)
+    comparar_con_completo(df_tabla, alert_system.generar_alertas(reciente))
+
+    # Flags cambiados en una semana anterior a la memoria: hay que recalcular todo
+    antiguo = reciente.copy()
+    antiguo.loc[(antiguo['fecha'] == fechas[10]) & (antiguo['departamento'] == region),
+                ['anomalia_if', 'anomalia_lof', 'anomalia_ocsvm']] = 1
+    with pytest.raises(ValueError, match='regenerar'):
+        alert_system.generar_alertas_incrementales(antiguo, estado)
+
+
+def test_csv_de_alertas_con_el_mismo_esquema_en_ambos_modos(alert_system, tmp_path):
+    df = datos_semanales()
+    df = df.sort_values(['departamento', 'fecha'], kind='stable').reset_index(drop=True)
+    fechas = np.sort(df['fecha'].unique())
+
+    completo = tmp_path / 'completo.csv'
+    alert_system.generar_alertas(df).to_csv(completo, index=False)  # exportación del modo completo original
+
+    # Modo incremental: primera ejecución y actualización de la tabla leída del CSV
+    estado = EstadoAlertas()
+    incremental = tmp_path / 'incremental.csv'
+    alert_system.exportar_alertas_csv(
+        alert_system.generar_alertas_incrementales(df[df['fecha'] < fechas[-1]], estado), incremental)
+    assert list(pd.read_csv(incremental).columns) == list(pd.read_csv(completo).columns)
+
+    df_tabla = alert_system.actualizar_tabla_alertas(pd.read_csv(incremental),
+                                                     alert_system.generar_alertas_incrementales(df, estado))
+    alert_system.exportar_alertas_csv(df_tabla, incremental)
+    leido, esperado = pd.read_csv(incremental), pd.read_csv(completo)
+    assert list(leido.columns) == list(esperado.columns)
+    np.testing.assert_allclose(leido['media_historica.1'], esperado['media_historica.1'], rtol=1e-9)
+
+
+# --- Motor de reglas con recarga en caliente ---
+
+def test_recarga_de_reglas(tmp_path):
+    df = datos_semanales()
+    ruta = tmp_path / 'reglas_alerta.json'
+    base = reglas_desde_umbrales(UMBRALES_ALERTA, UMBRALES_ALERTA_PREDICTIVA)
+    alert_system = AlertSystem(motor_reglas=MotorReglas(base, ruta))
+
+    antes = alert_system.generar_alertas(df)
+    pd.testing.assert_frame_equal(antes, AlertSystem().generar_alertas(df), check_exact=True)
+
+    # Umbrales de z-score más altos y combinación por el nivel menos severo
+    semanal = json.loads(json.dumps(base['semanal']))
+    semanal['reglas']['nivel_estadistico']['umbrales'] = {'bajo': 2.0, 'medio': 2.5, 'alto': 3.0, 'critico': 4.0}
+    semanal['combinacion'] = 'minimo'
+    ruta.write_text(json.dumps({'semanal': semanal}))
+    despues = alert_system.generar_alertas(df)
+
+    z = despues['z_score'].to_numpy()
+    esperado = np.select([z >= 4.0, z >= 3.0, z >= 2.5, z >= 2.0], ['critico', 'alto', 'medio', 'bajo'],
+                         default='normal')
+    np.testing.assert_array_equal(despues['nivel_estadistico'].to_numpy(), esperado)
+    orden = pd.Series(range(5), index=['normal', 'bajo', 'medio', 'alto', 'critico'])
+    np.testing.assert_array_equal(despues['nivel_riesgo'].map(orden).to_numpy(),
+                                  np.minimum(despues['nivel_estadistico'].map(orden),
+                                             despues['nivel_anomalia'].map(orden)).to_numpy())
+
+    # Archivo inválido (umbrales decrecientes): se mantienen las reglas anteriores
+    semanal['reglas']['nivel_estadistico']['umbrales']['critico'] = 1.0
+    ruta.write_text(json.dumps({'semanal': semanal}))
+    os.utime(ruta, ns=(time.time_ns(), time.time_ns() + 1_000_000))
+    pd.testing.assert_frame_equal(alert_system.generar_alertas(df), despues, check_exact=True)
+
+    # Sin archivo otra vez: vuelven los umbrales de config
+    ruta.unlink()
+    pd.testing.assert_frame_equal(alert_system.generar_alertas(df), antes, check_exact=True)
+
+
+
+def test_reglas_recargadas_invalidan_el_estado_incremental(tmp_path):
+    df = datos_semanales().sort_values(['departamento', 'fecha'], kind='stable').reset_index(drop=True)
+    fechas = np.sort(df['fecha'].unique())
+    ruta = tmp_path / 'reglas_alerta.json'
+    base = reglas_desde_umbrales(UMBRALES_ALERTA, UMBRALES_ALERTA_PREDICTIVA)
+    alert_system = AlertSystem(motor_reglas=MotorReglas(base, ruta))
+
+    estado = EstadoAlertas()
+    alert_system.generar_alertas_incrementales(df[df['fecha'] < fechas[-1]], estado)
+
+    # Cambiar las reglas predictivas no afecta a los niveles semanales guardados
+    predictivo = json.loads(json.dumps(base['predictivo']))
+    predictivo['combinacion'] = 'minimo'
+    ruta.write_text(json.dumps({'predictivo': predictivo}))
+    alert_system.generar_alertas_incrementales(df[df['fecha'] < fechas[-1]], estado)
+
+    # Reglas semanales nuevas: los niveles del estado no corresponden, hay que recalcular todo
+    semanal = json.loads(json.dumps(base['semanal']))
+    semanal['reglas']['nivel_estadistico']['umbrales'] = {'bajo': 2.0, 'medio': 2.5, 'alto': 3.0, 'critico': 4.0}
+    ruta.write_text(json.dumps({'predictivo': predictivo, 'semanal': semanal}))
+    os.utime(ruta, ns=(time.time_ns(), time.time_ns() + 1_000_000))
+    with pytest.raises(ValueError, match='reglas'):
+        alert_system.generar_alertas_incrementales(df, estado)
+
+    # Recalculo desde un estado vacío con las reglas nuevas
+    estado = EstadoAlertas()
+    comparar_con_completo(alert_system.generar_alertas_incrementales(df, estado),
+                          alert_system.generar_alertas(df))
+    assert estado.huella_reglas == alert_system.motor_reglas.huella('semanal')
+
+
+# --- Probabilidad de superar el umbral epidémico ---
+
+def test_probabilidad_por_bloques_igual_a_calculo_directo():
+    rng = np.random.default_rng(7)
+    muestras = rng.gamma(2.0, 10.0, (20, 8, 200))
+    muestras[rng.random(muestras.shape) < 0.02] = np.nan
+    umbral = rng.uniform(10, 40, 20)
+    umbral[3] = np.nan
+
+    directo = (muestras > umbral[:, None, None]).sum(axis=2) / (~np.isnan(muestras)).sum(axis=2)
+    directo[3] = np.nan
+
+    np.testing.assert_array_equal(probabilidad_desde_muestras(muestras, umbral, series_por_bloque=7), directo)
+
+
+def test_probabilidad_desde_cuantiles_aproxima_trayectorias():
+    rng = np.random.default_rng(7)
+    muestras = rng.gamma(2.0, 10.0, (20, 5, 4000))
+    umbral = rng.uniform(10, 40, 20)
+    niveles = np.linspace(0.05, 0.95, 19)
+    cuantiles = np.moveaxis(np.quantile(muestras, niveles, axis=2), 0, 2)
+
+    error = np.abs(probabilidad_desde_cuantiles(cuantiles, niveles, umbral)
+                   - probabilidad_desde_muestras(muestras, umbral)).max()
+    assert error < 0.03
+
+
+def test_probabilidad_desde_intervalos_aproxima_normal():
+    rng = np.random.default_rng(7)
+    centro = rng.uniform(20, 60, 100)
+    sigma = rng.uniform(2, 10, 100)
+    umbral = centro + rng.uniform(-2, 2, 100) * sigma
+    trayectorias = centro[:, None, None] + sigma[:, None, None] * rng.standard_normal((100, 1, 20_000))
+
+    error = np.abs(probabilidad_desde_intervalos(centro, centro - 1.96 * sigma, centro + 1.96 * sigma, umbral)
+                   - probabilidad_desde_muestras(trayectorias, umbral)[:, 0]).max()
+    assert error < 0.02
+
+
+# --- Detectores epidemiológicos ---
+
+def test_detectores_epidemiologicos_votan_por_familia(alert_system):
+    fechas = pd.date_range('2024-01-07', periods=4, freq='W')
+    df_alertas = pd.DataFrame({'departamento': 'PIURA', 'fecha': fechas,
+                               'nivel_riesgo': ['normal', 'bajo', 'medio', 'normal']})
+    df_epi = pd.DataFrame({'departamento': 'PIURA', 'fecha': fechas})
+    for detector in DETECTORES:
+        df_epi[f'anomalia_{detector}'] = 0
+    # Semana 1: solo EARS (C1, C2 y C3); semana 2: EARS + CUSUM; semana 3: las tres familias
+    df_epi.loc[0:2, ['anomalia_ears_c1', 'anomalia_ears_c2', 'anomalia_ears_c3']] = 1
+    df_epi.loc[1:2, 'anomalia_cusum'] = 1
+    df_epi.loc[2, 'anomalia_farrington'] = 1
+
+    resultado = alert_system.incorporar_detectores_epidemiologicos(df_alertas, df_epi)
+
+    np.testing.assert_array_equal(resultado['votos_epidemiologicos'], [1, 2, 3, 0])
+    assert resultado['nivel_epidemiologico'].tolist() == ['bajo', 'medio', 'alto', 'normal']
+    assert resultado['nivel_riesgo'].tolist() == df_alertas['nivel_riesgo'].tolist()
+
+
+def test_alertas_probabilisticas_sin_distribucion_conservan_nivel_puntual(alert_system):
+    df_pred, df_hist = predicciones()
+    puntual = alert_system.generar_alertas_predictivas(df_pred, df_hist)
+
+    resultado = alert_system.generar_alertas_probabilisticas(df_pred, df_hist)
+
+    assert resultado['nivel_riesgo_predictivo'].tolist() == puntual['nivel_riesgo_predictivo'].tolist()
+    assert resultado['nivel_incremento'].tolist() == puntual['nivel_riesgo_predictivo'].tolist()
+    assert resultado['probabilidad_excedencia'].notna().any()
+    assert 'nivel_probabilidad' in resultado
+
+
+def test_alertas_probabilisticas_desde_trayectorias(alert_system):
+    df_pred, df_hist = predicciones()
+    series = sorted(df_pred['region'].unique())
+    semanas = df_pred['fecha'].nunique()
+    # Todas las trayectorias de la primera región muy por encima del umbral, el resto en 0
+    muestras = np.zeros((len(series), semanas, 100))
+    muestras[0] = 1e6
+
+    resultado = alert_system.generar_alertas_probabilisticas(df_pred, df_hist, muestras=muestras)
+
+    primera = resultado['region'] == series[0]
+    assert (resultado.loc[primera, 'nivel_riesgo_predictivo'] == 'critico').all()
+    assert (resultado.loc[~primera & resultado['umbral_epidemico'].notna(), 'nivel_riesgo_predictivo']
+            == 'normal').all()
+    assert (resultado['nivel_riesgo_predictivo'] == resultado['nivel_probabilidad']).all()
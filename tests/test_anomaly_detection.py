@@ -0,0 +1,72 @@
+"""
+Tests de la detección de anomalías por región
+"""
+
+import numpy as np
+import pandas as pd
+
+import src.models.anomaly_detection as anomaly_detection
+from src.models.anomaly_detection import AnomalyDetector
+from src.models.umbrales import marcar_anomalias
+
+REGIONES = ['PIURA', 'TUMBES', 'LORETO']
+FEATURES = ['x0', 'x1', 'x2']
+
+
+def features_sinteticas(semanas: int = 80, semilla: int = 0) -> pd.DataFrame:
+    """Features gaussianas semanales para varias regiones"""
+    rng = np.random.default_rng(semilla)
+    n = semanas * len(REGIONES)
+    df = pd.DataFrame({'departamento': np.repeat(REGIONES, semanas),
+                       'fecha': np.tile(pd.date_range('2020-01-05', periods=semanas, freq='W'), len(REGIONES)),
+                       'casos': rng.poisson(30, n).astype(float)})
+    for col in FEATURES:
+        df[col] = rng.normal(size=n)
+    return df
+
+
+def test_lote_carga_cada_region_al_puntuarla(tmp_path, monkeypatch):
+    df = features_sinteticas()
+    detector = AnomalyDetector()
+    detector.entrenar_todos_modelos(df, FEATURES, REGIONES)
+    referencia = pd.concat([detector.detectar_anomalias(df, FEATURES, r) for r in REGIONES])
+
+    detector.guardar_modelos(tmp_path, formato='store')
+    cargado = AnomalyDetector()
+    cargado.cargar_modelos(tmp_path, formato='store', memoria_max_mb=0)
+
+    eventos = []
+    cargar = cargado._modelos_region
+    puntuar = anomaly_detection._puntuar_tarea
+    monkeypatch.setattr(cargado, '_modelos_region', lambda r: eventos.append(('carga', r)) or cargar(r))
+    monkeypatch.setattr(anomaly_detection, '_puntuar_tarea',
+                        lambda r, *args: eventos.append(('puntua', r)) or puntuar(r, *args))
+
+    resultado = cargado.detectar_anomalias_lote(df, FEATURES)
+
+    assert eventos == [(e, r) for r in sorted(REGIONES) for e in ('carga', 'puntua')]
+    assert len(cargado.store._cache) == 1
+    pd.testing.assert_frame_equal(resultado.sort_index(), referencia.sort_index()[resultado.columns],
+                                  check_dtype=False)
+
+
+def test_banderas_por_umbral_de_contaminacion_sin_reentrenar():
+    df = features_sinteticas()
+    detector = AnomalyDetector(contamination=0.1)
+    detector.entrenar_todos_modelos(df, FEATURES, REGIONES)
+    modelos = dict(detector.models)
+
+    base = detector.detectar_anomalias_lote(df, FEATURES, todos_scores=True)
+    detector.contaminacion_umbral = 0.02
+    detector.contaminacion_por_region = {'PIURA': 0.2}
+    resultado = detector.detectar_anomalias_lote(df, FEATURES, todos_scores=True)
+
+    assert detector.models == modelos
+    pd.testing.assert_frame_equal(resultado[base.columns].filter(like='score_'), base.filter(like='score_'))
+    esperado = marcar_anomalias(resultado, detector.umbrales([0.02, 0.2]), 0.02,
+                                contaminacion_por_region={'PIURA': 0.2})
+    pd.testing.assert_frame_equal(resultado, esperado)
+
+    por_region = resultado.groupby('departamento')['anomalia_if'].mean()
+    assert por_region['PIURA'] > 0.15
+    assert por_region['TUMBES'] < 0.05 < base.groupby('departamento')['anomalia_if'].mean()['TUMBES']
@@ -0,0 +1,66 @@
+"""Pruebas de la carga de covariables externas"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.features.covariables import CovariablesExternas
+
+
+def escribir_clima(ruta, **variables):
+    fechas = pd.date_range('2024-01-01', periods=28, freq='D')
+    df = pd.DataFrame({'fecha': fechas, 'departamento': 'PIURA', 'año': fechas.year,
+                       'semana': fechas.isocalendar().week.to_numpy(), 'mes': fechas.month})
+    for nombre, valor in variables.items():
+        df[nombre] = valor
+    df.to_csv(ruta, index=False)
+    return ruta
+
+
+def test_columnas_de_calendario_no_son_covariables(tmp_path):
+    covariables = CovariablesExternas()
+    covariables.cargar_fuente(escribir_clima(tmp_path / 'clima_piura.csv', temperatura=27.5))
+
+    assert list(covariables.variables) == ['temperatura']
+    assert np.allclose(covariables.variables['temperatura']['PIURA'], 27.5)
+
+
+def test_nombre_repetido_entre_archivos(tmp_path):
+    covariables = CovariablesExternas()
+    covariables.cargar_fuente(escribir_clima(tmp_path / 'clima_a.csv', precipitacion=1.0))
+
+    with pytest.raises(ValueError, match='precipitacion'):
+        covariables.cargar_fuente(escribir_clima(tmp_path / 'clima_b.csv', precipitacion=9.0))
+    assert np.allclose(covariables.variables['precipitacion']['PIURA'], 1.0)
+
+    # Volver a cargar el mismo archivo lo actualiza
+    escribir_clima(tmp_path / 'clima_a.csv', precipitacion=2.0)
+    covariables.cargar_fuente(tmp_path / 'clima_a.csv')
+    assert np.allclose(covariables.variables['precipitacion']['PIURA'], 2.0)
+
+
+def test_lags_por_semana_y_huecos_rellenados(tmp_path):
+    # Temperatura diaria = número de semana desde el inicio; sin datos de la semana 5
+    fechas = pd.date_range('2024-01-01', periods=10 * 7, freq='D')
+    semana = (np.arange(len(fechas)) // 7).astype(float)
+    clima = pd.DataFrame({'fecha': fechas, 'departamento': 'PIURA', 'temperatura': semana})
+    clima[semana != 5].to_csv(tmp_path / 'clima_piura.csv', index=False)
+
+    covariables = CovariablesExternas(lags=[0, 1, 2])
+    covariables.cargar_fuente(tmp_path / 'clima_piura.csv')
+    covariables.tolerancias['temperatura'] = pd.Timedelta(days=0)
+
+    # Panel sin la fila de la semana 3: el lag 1 de la semana 4 es la semana 3, no la fila anterior
+    semanas = pd.date_range('2024-01-01', periods=10, freq='7D')
+    df = pd.DataFrame({'departamento': 'PIURA', 'fecha': semanas, 'casos': 1.0}).drop(index=3)
+    df_features = covariables.crear_features_covariables(df)
+
+    fila = df_features.set_index('fecha').loc[semanas[4]]
+    assert fila['temperatura'] == 4.0
+    assert fila['temperatura_lag_1'] == 3.0
+    assert fila['temperatura_lag_2'] == 2.0
+    assert not df_features[['temperatura', 'temperatura_lag_1', 'temperatura_lag_2']].isna().any().any()
+
+    sin_relleno = CovariablesExternas(lags=[0], rellenar=False)
+    sin_relleno.variables, sin_relleno.tolerancias = covariables.variables, covariables.tolerancias
+    assert sin_relleno.crear_features_covariables(df)['temperatura'].isna().sum() == 1
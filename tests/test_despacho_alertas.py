@@ -0,0 +1,227 @@
+"""
+Tests del despacho de alertas contra servidores HTTP y SMTP locales
+
+Comprueban que DespachadorAlertas agrupa por destinatario, reintenta los
+fallos transitorios, respeta el límite de envíos, no repite notificaciones y
+vuelve a notificar solo las semanas que escalan de nivel
+"""
+
+import json
+import socketserver
+import threading
+import time
+from email import message_from_bytes, policy
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.models.despacho_alertas import (DespachadorAlertas, DestinoDespacho, DestinoArchivo,
+                                         DestinoWebhook, DestinoSMTP)
+
+REGIONES_NORTE = ['REGION_00', 'REGION_01']
+
+
+class ServidorWebhook(HTTPServer):
+    """Servidor HTTP local que registra los POST y responde `codigo_fallo` a las primeras `fallos` peticiones"""
+
+    def __init__(self, fallos: int = 0, codigo_fallo: int = 503):
+        self.fallos = fallos
+        self.codigo_fallo = codigo_fallo
+        self.recibidos = []
+        self.tiempos = []
+        super().__init__(('127.0.0.1', 0), ManejadorWebhook)
+
+    @property
+    def url(self) -> str:
+        return f'http://127.0.0.1:{self.server_address[1]}'
+
+    def alertas(self, ruta: str) -> int:
+        """Alertas recibidas en una ruta"""
+        return sum(len(cuerpo['alertas']) for r, _, cuerpo in self.recibidos if r == ruta)
+
+
+class ManejadorWebhook(BaseHTTPRequestHandler):
+    def do_POST(self):
+        cuerpo = self.rfile.read(int(self.headers['Content-Length']))
+        servidor = self.server
+        servidor.tiempos.append(time.monotonic())
+        if servidor.fallos > 0:
+            servidor.fallos -= 1
+            self.send_response(servidor.codigo_fallo)
+            self.end_headers()
+            return
+        servidor.recibidos.append((self.path, self.headers['Idempotency-Key'], json.loads(cuerpo)))
+        self.send_response(200)
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+class ServidorSMTP(socketserver.ThreadingTCPServer):
+    """Servidor SMTP mínimo (sin autenticación) que guarda los mensajes recibidos"""
+
+    allow_reuse_address = True
+    daemon_threads = True
+
+    def __init__(self):
+        self.mensajes = []
+        super().__init__(('127.0.0.1', 0), ManejadorSMTP)
+
+
+class ManejadorSMTP(socketserver.StreamRequestHandler):
+    def responder(self, linea: str):
+        self.wfile.write((linea + '\r\n').encode())
+
+    def handle(self):
+        self.responder('220 localhost prueba')
+        destinatarios = []
+        while True:
+            linea = self.rfile.readline().decode().strip()
+            comando = linea[:4].upper()
+            if not linea or comando == 'QUIT':
+                self.responder('221 adios')
+                return
+            if comando in ('EHLO', 'HELO'):
+                self.responder('250 localhost')
+            elif comando == 'MAIL':
+                destinatarios = []
+                self.responder('250 ok')
+            elif comando == 'RCPT':
+                destinatarios.append(linea.split(':', 1)[1].strip('<> '))
+                self.responder('250 ok')
+            elif comando == 'DATA':
+                self.responder('354 fin con .')
+                datos = []
+                while (fila := self.rfile.readline()) not in (b'.\r\n', b''):
+                    datos.append(fila[1:] if fila.startswith(b'..') else fila)
+                self.server.mensajes.append((destinatarios, message_from_bytes(b''.join(datos),
+                                                                               policy=policy.default)))
+                self.responder('250 recibido')
+            else:
+                self.responder('250 ok')
+
+
+def _servir(servidor):
+    """Atiende un servidor en un hilo de fondo y lo cierra al terminar el test"""
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    yield servidor
+    servidor.shutdown()
+    servidor.server_close()
+
+
+@pytest.fixture
+def webhook():
+    # Las dos primeras peticiones fallan con 503 (error transitorio)
+    yield from _servir(ServidorWebhook(fallos=2))
+
+
+@pytest.fixture
+def webhook_roto():
+    yield from _servir(ServidorWebhook(fallos=10 ** 6, codigo_fallo=404))
+
+
+@pytest.fixture
+def smtp():
+    yield from _servir(ServidorSMTP())
+
+
+@pytest.fixture
+def alertas() -> pd.DataFrame:
+    """Alertas semanales con niveles aleatorios"""
+    rng = np.random.default_rng(0)
+    fechas = pd.date_range('2024-01-07', periods=8, freq='W')
+    df = pd.DataFrame({
+        'departamento': np.repeat([f'REGION_{i:02d}' for i in range(6)], len(fechas)),
+        'fecha': np.tile(fechas, 6),
+    })
+    df['nivel_riesgo'] = rng.choice(['normal', 'bajo', 'medio', 'alto', 'critico'], len(df))
+    df['casos_actual'] = rng.poisson(50, len(df)).astype(float)
+    return df
+
+
+@pytest.fixture
+def crear_despachador(webhook, smtp, tmp_path):
+    """Despachadores nuevos que comparten el registro en disco"""
+    def crear():
+        destinos = [
+            DestinoWebhook('webhook', [{'id': 'nacional'},
+                                       {'id': 'norte', 'url': webhook.url + '/norte', 'regiones': REGIONES_NORTE}],
+                           url=webhook.url + '/nacional', envios_por_minuto=600),
+            DestinoSMTP('correo', [{'id': 'epi', 'email': 'epi@example.org', 'nivel_minimo': 'critico'}],
+                        host='127.0.0.1', puerto=smtp.server_address[1]),
+            DestinoArchivo('buzon', [{'id': 'vigilancia'}], directorio=str(tmp_path)),
+        ]
+        return DespachadorAlertas(destinos, tmp_path / 'registro.json', tamano_lote=5,
+                                  reintentos=3, espera_base=0.05)
+    return crear
+
+
+def test_destino_sin_enviar_no_se_puede_instanciar():
+    class DestinoIncompleto(DestinoDespacho):
+        tipo = 'incompleto'
+
+    with pytest.raises(TypeError):
+        DestinoIncompleto('x', [{'id': 'x'}])
+
+
+def test_primer_despacho(crear_despachador, alertas, webhook, smtp, tmp_path):
+    esperadas = alertas[alertas['nivel_riesgo'].isin(['alto', 'critico'])]
+    norte = esperadas[esperadas['departamento'].isin(REGIONES_NORTE)]
+    criticas = esperadas[esperadas['nivel_riesgo'] == 'critico']
+
+    resultado = crear_despachador().despachar(alertas, nivel_minimo='alto')
+
+    assert (resultado['estado'] == 'enviado').all()
+    assert resultado['intentos'].max() > 1  # los 503 se reintentan
+    assert webhook.alertas('/nacional') == len(esperadas)
+    assert webhook.alertas('/norte') == len(norte)
+    assert sum(len(m.get_content().strip().splitlines()) for _, m in smtp.mensajes) == len(criticas)
+    assert all(d == ['epi@example.org'] for d, _ in smtp.mensajes)
+
+    archivos = list((tmp_path / 'vigilancia').glob('*.json'))
+    assert len(archivos) == -(-len(esperadas) // 5)
+    assert all(len(json.loads(a.read_text())['alertas']) <= 5 for a in archivos)
+
+    assert all(clave == cuerpo['clave_lote'] for _, clave, cuerpo in webhook.recibidos)
+    # 600 envíos por minuto: al menos 0.1 s entre peticiones (con margen del reloj)
+    assert np.diff(webhook.tiempos).min() >= 0.08
+
+
+def test_sin_notificaciones_repetidas(crear_despachador, alertas, webhook, smtp):
+    crear_despachador().despachar(alertas, nivel_minimo='alto')
+    n_http, n_smtp = len(webhook.recibidos), len(smtp.mensajes)
+
+    resultado = crear_despachador().despachar(alertas, nivel_minimo='alto')
+
+    assert len(resultado) == 0
+    assert len(webhook.recibidos) == n_http
+    assert len(smtp.mensajes) == n_smtp
+
+
+def test_solo_se_notifica_la_escalada(crear_despachador, alertas, webhook, smtp):
+    crear_despachador().despachar(alertas, nivel_minimo='alto')
+    n_http, n_smtp = len(webhook.recibidos), len(smtp.mensajes)
+
+    esperadas = alertas[alertas['nivel_riesgo'].isin(['alto', 'critico'])]
+    escalada = esperadas[esperadas['nivel_riesgo'] == 'alto'].head(1).assign(nivel_riesgo='critico')
+    bajada = esperadas.tail(1).assign(nivel_riesgo='medio')
+    crear_despachador().despachar(pd.concat([escalada, bajada]), nivel_minimo='alto')
+
+    nuevas = [a for _, _, cuerpo in webhook.recibidos[n_http:] for a in cuerpo['alertas']]
+    assert len(nuevas) == 1 + escalada['departamento'].isin(REGIONES_NORTE).sum()
+    assert all(a['nivel'] == 'critico' for a in nuevas)
+    assert len(smtp.mensajes) == n_smtp + 1
+
+
+def test_error_permanente_sin_reintentos(alertas, webhook_roto):
+    despachador = DespachadorAlertas([DestinoWebhook('roto', [{'id': 'x'}], url=webhook_roto.url + '/')],
+                                     tamano_lote=5, reintentos=3, espera_base=0.05)
+
+    resultado = despachador.despachar(alertas, nivel_minimo='alto')
+
+    assert (resultado['estado'] == 'fallido').all()
+    assert (resultado['intentos'] == 1).all()
+    assert len(despachador.registro) == 0
@@ -0,0 +1,58 @@
+"""
+Tests de los episodios de alerta: la actualización incremental debe coincidir
+con reconstruir los episodios sobre la tabla completa
+"""
+
+import pandas as pd
+import pytest
+
+from src.models.episodios_alerta import construir_episodios, actualizar_episodios
+
+
+def alertas(niveles_por_region: dict, inicio: str = '2022-07-03') -> pd.DataFrame:
+    """Tabla de alertas semanal a partir de la lista de niveles de cada región"""
+    filas = []
+    for region, niveles in niveles_por_region.items():
+        fechas = pd.date_range(inicio, periods=len(niveles), freq='W')
+        for i, (fecha, nivel) in enumerate(zip(fechas, niveles)):
+            filas.append({'departamento': region, 'fecha': fecha, 'nivel_riesgo': nivel,
+                          'z_score': float(i), 'casos_actual': 10.0 * (i + 1)})
+    return pd.DataFrame(filas)
+
+
+def test_actualizacion_con_semanas_nuevas():
+    completa = alertas({'PIURA': ['normal', 'normal', 'alto', 'alto', 'normal'],
+                        'TUMBES': ['medio', 'medio', 'medio', 'normal', 'normal']})
+    semanas = completa['fecha'].sort_values().unique()
+
+    episodios = construir_episodios(completa[completa['fecha'] <= semanas[2]])
+    nuevas = completa[completa['fecha'] > semanas[2]]
+    resultado = actualizar_episodios(episodios, nuevas, completa)
+
+    pd.testing.assert_frame_equal(resultado, construir_episodios(completa), check_dtype=False)
+
+
+@pytest.mark.parametrize('nivel_revisado', ['alto', 'normal'])
+def test_revision_une_con_el_episodio_anterior(nivel_revisado):
+    # PIURA en alerta la semana 5; la semana 6 (ya guardada como normal) se revisa
+    original = alertas({'PIURA': ['normal'] * 4 + ['alto', 'normal', 'normal'],
+                        'TUMBES': ['bajo', 'normal', 'normal', 'bajo', 'bajo', 'bajo', 'normal']})
+    episodios = construir_episodios(original)
+
+    revisada = original.copy()
+    semana = sorted(original['fecha'].unique())[5]
+    cambio = (revisada['departamento'] == 'PIURA') & (revisada['fecha'] == semana)
+    revisada.loc[cambio, 'nivel_riesgo'] = nivel_revisado
+    revisada.loc[cambio, 'z_score'] = 9.0
+
+    resultado = actualizar_episodios(episodios, revisada[cambio], revisada)
+
+    pd.testing.assert_frame_equal(resultado, construir_episodios(revisada), check_dtype=False)
+
+
+def test_revision_sin_tabla_completa():
+    original = alertas({'PIURA': ['normal', 'alto', 'normal']})
+    episodios = construir_episodios(original)
+
+    with pytest.raises(ValueError):
+        actualizar_episodios(episodios, original.tail(1))
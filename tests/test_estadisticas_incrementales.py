@@ -0,0 +1,79 @@
+"""Pruebas de las estadísticas incrementales por región"""
+
+import numpy as np
+import pandas as pd
+
+from src.features.estadisticas_incrementales import EstadisticasIncrementales
+from src.features.panel import PanelSemanal
+
+
+def casos_sinteticos(semanas: int = 60, semilla: int = 0) -> pd.DataFrame:
+    """Casos semanales de dos regiones con huecos"""
+    rng = np.random.default_rng(semilla)
+    fechas = pd.date_range('2023-01-02', periods=semanas, freq='7D')
+    df = pd.DataFrame({'departamento': np.repeat(['PIURA', 'TUMBES'], semanas),
+                       'fecha': np.tile(fechas, 2),
+                       'casos': rng.poisson(20, 2 * semanas).astype(float)})
+    return df.drop(index=rng.choice(len(df), 10, replace=False)).reset_index(drop=True)
+
+
+def referencia(casos: np.ndarray, alpha: float) -> pd.DataFrame:
+    """Estado previo a cada semana recorriendo la serie una semana a la vez"""
+    filas, vistos, ewm_media, ewm_var = [], [], np.nan, np.nan
+    for x in casos:
+        filas.append({'media': np.mean(vistos) if vistos else np.nan,
+                      'std': np.std(vistos, ddof=1) if len(vistos) > 1 else np.nan,
+                      'max': max(vistos, default=np.nan), 'min': min(vistos, default=np.nan),
+                      'ewm_media': ewm_media, 'ewm_std': np.sqrt(ewm_var)})
+        if np.isnan(x):
+            continue
+        if not vistos:
+            ewm_media, ewm_var = x, 0.0
+        delta = x - ewm_media
+        ewm_var = (1 - alpha) * (ewm_var + alpha * delta ** 2)
+        ewm_media += alpha * delta
+        vistos.append(x)
+    return pd.DataFrame(filas)
+
+
+def test_bloque_igual_a_semana_a_semana_y_en_dos_llamadas():
+    panel = PanelSemanal.desde_dataframe(casos_sinteticos())
+    stats = EstadisticasIncrementales(alpha=0.3).actualizar(panel)
+
+    for j in range(len(panel.series)):
+        esperado = referencia(panel.valores[:, j], 0.3)
+        for nombre in esperado.columns:
+            np.testing.assert_allclose(stats[nombre][:, j], esperado[nombre], rtol=1e-9, equal_nan=True)
+
+    # Dos llamadas sobre bloques consecutivos dan lo mismo que una
+    estado = EstadisticasIncrementales(alpha=0.3)
+    corte = 25
+    estado.actualizar(PanelSemanal(panel.valores[:corte], panel.fechas[:corte], panel.series))
+    incorporadas = panel.fechas.values[:, None] <= estado.cortes()[panel.series].to_numpy()[None, :]
+    segunda = estado.actualizar(panel)
+    for nombre in stats:
+        np.testing.assert_allclose(segunda[nombre][corte:], stats[nombre][corte:], rtol=1e-9, equal_nan=True)
+        assert np.isnan(segunda[nombre][incorporadas]).all()
+
+
+def test_semanas_atrasadas_de_otra_region():
+    df = casos_sinteticos(semanas=12).dropna()
+    ultima = df['fecha'].max()
+    tumbes_tarde = (df['departamento'] == 'TUMBES') & (df['fecha'] >= ultima - pd.Timedelta(weeks=1))
+
+    estado = EstadisticasIncrementales()
+    estado.actualizar(PanelSemanal.desde_dataframe(df[~tumbes_tarde]))
+    corte_tumbes = estado.cortes()['TUMBES']
+    assert estado.cortes()['PIURA'] > corte_tumbes
+
+    # Las semanas de TUMBES que llegan tarde se incorporan aunque PIURA ya tenga la última
+    stats = estado.actualizar(PanelSemanal.desde_dataframe(df))
+    completo = EstadisticasIncrementales()
+    completo.actualizar(PanelSemanal.desde_dataframe(df))
+
+    panel = PanelSemanal.desde_dataframe(df)
+    tumbes = panel.series.get_loc('TUMBES')
+    assert (~np.isnan(stats['media'][:, tumbes])).sum() == (panel.fechas > corte_tumbes).sum()
+    np.testing.assert_allclose(estado.media, completo.media)
+    np.testing.assert_allclose(estado.m2, completo.m2)
+    assert estado.cortes().equals(completo.cortes())
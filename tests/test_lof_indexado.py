@@ -0,0 +1,32 @@
+"""
+Tests del LOF con índice de vecinos persistido
+"""
+
+import numpy as np
+import pytest
+from sklearn.neighbors import LocalOutlierFactor
+
+from src.models.anomaly_detection import AnomalyDetector
+from src.models.lof_indexado import LOFIndexado
+
+
+@pytest.mark.parametrize('indice', ['kd_tree', 'ball_tree'])
+@pytest.mark.parametrize('n_jobs', [None, 3])
+def test_scores_iguales_a_scikit_learn(indice, n_jobs):
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(300, 5))
+    X[10] = X[11]  # duplicados
+    X_nuevo = rng.normal(size=(50, 5)) * 1.5
+
+    referencia = LocalOutlierFactor(n_neighbors=20, contamination=0.1, novelty=True).fit(X)
+    modelo = LOFIndexado(n_neighbors=20, contamination=0.1, indice=indice, n_jobs=n_jobs).fit(X)
+
+    np.testing.assert_allclose(modelo.negative_outlier_factor_, referencia.negative_outlier_factor_)
+    np.testing.assert_allclose(modelo.score_samples(X_nuevo), referencia.score_samples(X_nuevo))
+    assert np.isclose(modelo.offset_, referencia.offset_)
+
+
+def test_indice_requiere_reduccion():
+    with pytest.raises(ValueError):
+        AnomalyDetector(lof_indice='kd_tree')
+    AnomalyDetector(lof_indice='kd_tree', reduccion='pca')
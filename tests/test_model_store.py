@@ -0,0 +1,40 @@
+"""
+Tests del almacén de modelos de anomalías por región
+"""
+
+import pytest
+
+from src.models.model_store import AnomalyModelStore
+
+
+def test_regiones_con_nombres_parecidos_no_comparten_archivo(tmp_path):
+    almacen = AnomalyModelStore(tmp_path)
+    almacen.guardar_region('PEÑA', scaler=None, modelos={'if': 'peña'})
+    almacen.guardar_region('PEÚA', scaler=None, modelos={'if': 'peúa'})
+
+    nuevo = AnomalyModelStore(tmp_path)
+    assert nuevo.manifest['regiones']['PEÑA'] != nuevo.manifest['regiones']['PEÚA']
+    assert nuevo.cargar_region('PEÑA')['modelos']['if'] == 'peña'
+    assert nuevo.cargar_region('PEÚA')['modelos']['if'] == 'peúa'
+
+
+def test_archivo_de_otra_region_se_rechaza(tmp_path, monkeypatch):
+    almacen = AnomalyModelStore(tmp_path)
+    monkeypatch.setattr(AnomalyModelStore, '_nombre_archivo', staticmethod(lambda region: 'fijo.joblib'))
+    almacen.guardar_region('LIMA', scaler=None, modelos={})
+    almacen.guardar_region('LIMA', scaler=None, modelos={})
+
+    with pytest.raises(ValueError):
+        almacen.guardar_region('CALLAO', scaler=None, modelos={})
+    assert almacen.regiones() == ['LIMA']
+
+
+def test_bundle_con_nombre_anterior_se_reemplaza(tmp_path):
+    almacen = AnomalyModelStore(tmp_path)
+    (tmp_path / 'pe_a.joblib').write_bytes(b'')
+    almacen.manifest['regiones']['PEÑA'] = 'pe_a.joblib'
+
+    almacen.guardar_region('PEÑA', scaler=None, modelos={})
+
+    assert not (tmp_path / 'pe_a.joblib').exists()
+    assert almacen.cargar_region('PEÑA')['modelos'] == {}
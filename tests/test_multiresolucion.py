@@ -0,0 +1,58 @@
+"""Pruebas de los agregados multi-resolución"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.features.multiresolucion import ResampleadorPanel, crear_features_multiresolucion
+from src.features.panel import PanelSemanal
+
+
+@pytest.fixture
+def serie():
+    rng = np.random.default_rng(0)
+    fechas = pd.date_range('2019-01-06', periods=160, freq='W')
+    return pd.DataFrame({'fecha': fechas, 'casos': rng.poisson(20, len(fechas)).astype(float)})
+
+
+def agregados_referencia(df: pd.DataFrame, codigos: np.ndarray) -> pd.DataFrame:
+    """Agregados con groupby: acumulado con y sin la semana actual y total del período anterior"""
+    grupos = df['casos'].groupby(codigos)
+    totales = grupos.sum()
+    return pd.DataFrame({
+        'acumulado': grupos.cumsum().to_numpy(),
+        'acumulado_previo': (grupos.cumsum() - df['casos']).to_numpy(),
+        'anterior': totales.shift(1).reindex(codigos).to_numpy(),
+    })
+
+
+@pytest.mark.parametrize('resolucion', ['4semanas', 'mensual', 'temporada'])
+def test_total_del_periodo_anterior_en_todas_las_semanas(serie, resolucion):
+    resampleador = ResampleadorPanel([resolucion])
+    panel = PanelSemanal(serie[['casos']].to_numpy(), pd.DatetimeIndex(serie['fecha']), pd.Index(['casos']))
+    codigos = resampleador.codigos_periodo(panel.fechas, resolucion)
+    referencia = agregados_referencia(serie, codigos)
+
+    con_actual = resampleador.agregar(panel)[resolucion]
+    sin_actual = resampleador.agregar(panel, incluir_actual=False)[resolucion]
+
+    np.testing.assert_allclose(con_actual['acumulado'][:, 0], referencia['acumulado'])
+    np.testing.assert_allclose(sin_actual['acumulado'][:, 0], referencia['acumulado_previo'])
+    np.testing.assert_allclose(sin_actual['anterior'][:, 0], referencia['anterior'])
+    np.testing.assert_allclose(con_actual['anterior'][:, 0], referencia['anterior'])
+
+    # Sin la semana actual, la primera semana de cada período empieza en 0
+    primeras = np.r_[True, np.diff(codigos) > 0]
+    assert (sin_actual['acumulado'][primeras, 0] == 0).all()
+
+
+def test_features_por_region(serie):
+    df = pd.concat([serie.assign(departamento='A'),
+                    serie.assign(departamento='B', casos=serie['casos'] * 2)], ignore_index=True)
+
+    resultado = crear_features_multiresolucion(df, resoluciones=['mensual'])
+
+    a = resultado[resultado['departamento'] == 'A'].reset_index(drop=True)
+    b = resultado[resultado['departamento'] == 'B'].reset_index(drop=True)
+    np.testing.assert_allclose(b['casos_mensual_acumulado'], 2 * a['casos_mensual_acumulado'])
+    np.testing.assert_allclose(b['casos_mensual_anterior'], 2 * a['casos_mensual_anterior'])
@@ -0,0 +1,49 @@
+"""
+Tests del refresco incremental de los modelos de anomalías
+"""
+
+import numpy as np
+import pandas as pd
+
+from src.models.anomaly_detection import AnomalyDetector
+
+CONFIG = {'ventana_semanas': 26, 'arboles_nuevos': 10, 'refrescar_cada_semanas': 4,
+          'reentrenar_cada_semanas': 520, 'psi_max': 10.0, 'ks_pvalor_min': 0.0}
+
+
+def features_sinteticas(semanas: int = 200, semilla: int = 0) -> pd.DataFrame:
+    """Una región con features gaussianas semanales"""
+    rng = np.random.default_rng(semilla)
+    df = pd.DataFrame({'departamento': 'PIURA',
+                       'fecha': pd.date_range('2018-01-07', periods=semanas, freq='W'),
+                       'casos': rng.poisson(30, semanas).astype(float)})
+    for i in range(4):
+        df[f'x{i}'] = rng.normal(size=semanas)
+    return df
+
+
+def test_refresco_conserva_la_referencia_de_entrenamiento(tmp_path):
+    df = features_sinteticas()
+    feature_cols = [f'x{i}' for i in range(4)]
+    detector = AnomalyDetector(contamination=0.1)
+    detector.entrenar_todos_modelos(df.head(180), feature_cols, ['PIURA'])
+    referencia = detector.scores_entrenamiento['PIURA']['if'].copy()
+
+    reporte = detector.refrescar_modelos(df, CONFIG)
+
+    assert reporte['accion'].tolist() == ['refrescar']
+    np.testing.assert_array_equal(detector.scores_entrenamiento['PIURA']['if'], referencia)
+    assert len(detector.scores_ventana['PIURA']['if']) == reporte['filas_ventana'].iloc[0]
+
+    # El umbral del bosque refrescado se calcula sobre todo el histórico
+    modelo = detector.models['if_PIURA']
+    X = detector.scalers['if_PIURA'].transform(df[feature_cols].to_numpy())
+    assert np.isclose(modelo.offset_, np.percentile(modelo.score_samples(X), 10.0))
+
+    # Los scores de la ventana se guardan y se recuperan aparte
+    detector.guardar_modelos(tmp_path, formato='store')
+    cargado = AnomalyDetector()
+    cargado.cargar_modelos(tmp_path, formato='store')
+    cargado._materializar_region('PIURA')
+    np.testing.assert_array_equal(cargado.scores_entrenamiento['PIURA']['if'], referencia)
+    np.testing.assert_array_equal(cargado.scores_ventana['PIURA']['if'], detector.scores_ventana['PIURA']['if'])
@@ -0,0 +1,80 @@
+"""Pruebas del worker de scoring"""
+
+import io
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+import pandas as pd
+
+from src.models.anomaly_detection import AnomalyDetector
+from src.models.scoring import ServicioScoring
+from test_anomaly_detection import features_sinteticas, FEATURES, REGIONES
+
+ROOT_DIR = Path(__file__).parent.parent
+
+
+class ServicioFalso(ServicioScoring):
+    """Servicio sin modelos: score = x, falla con x negativo"""
+
+    def __init__(self):
+        self.col_departamento = 'departamento'
+        self.feature_columns = ['x']
+        self.archivo_anomalias = None
+
+    def puntuar(self, df_nuevas: pd.DataFrame) -> pd.DataFrame:
+        if (df_nuevas['x'] < 0).any():
+            raise RuntimeError('modelo corrupto')
+        return df_nuevas.assign(score_if=df_nuevas['x'], anomalia_consenso=0)
+
+
+def test_servir_continua_tras_errores():
+    lineas = [
+        {'departamento': 'PIURA', 'x': 1.5},
+        'no es json',
+        [{'departamento': 'TUMBES', 'x': -1.0}],
+        [{'departamento': 'LIMA', 'x': 2.0}],
+    ]
+    entrada = io.StringIO('\n'.join(l if isinstance(l, str) else json.dumps(l) for l in lineas) + '\n')
+    salida = io.StringIO()
+
+    ServicioFalso().servir(entrada, salida)
+
+    respuestas = [json.loads(l) for l in salida.getvalue().splitlines()]
+    assert len(respuestas) == 4
+    assert respuestas[0]['resultados'] == [{'departamento': 'PIURA', 'anomalia_consenso': 0, 'score_if': 1.5}]
+    assert 'error' in respuestas[1]
+    assert respuestas[2]['error'] == 'RuntimeError: modelo corrupto'
+    assert respuestas[3]['resultados'][0]['score_if'] == 2.0
+    assert all('ms' in r for r in respuestas)
+
+
+def test_worker_actualiza_la_tabla_de_anomalias(tmp_path):
+    df = features_sinteticas()
+    detector = AnomalyDetector()
+    detector.entrenar_todos_modelos(df, FEATURES, REGIONES)
+    detector.guardar_modelos(tmp_path / 'modelos', formato='store')
+    esperado = detector.detectar_anomalias_lote(df, FEATURES, todos_scores=True)
+
+    # Tabla previa sin las dos últimas semanas y con la antepenúltima por revisar
+    fechas = sorted(df['fecha'].unique())
+    archivo = tmp_path / 'dengue_anomalias.csv'
+    previa = esperado[esperado['fecha'] < fechas[-2]].copy()
+    previa.loc[previa['fecha'] == fechas[-3], ['score_if', 'anomalia_consenso']] = [0.0, 1]
+    previa.to_csv(archivo, index=False)
+
+    # Worker en otro proceso: un micro-lote por línea de stdin
+    lineas = [df[df['fecha'] == f].to_json(orient='records', date_format='iso') for f in fechas[-3:]]
+    codigo = ("from pathlib import Path; from src.models.scoring import ServicioScoring; "
+              f"ServicioScoring(Path({str(tmp_path / 'modelos')!r}), "
+              f"archivo_anomalias=Path({str(archivo)!r})).servir()")
+    proceso = subprocess.run([sys.executable, '-c', codigo], input='\n'.join(lineas) + '\n',
+                             capture_output=True, text=True, cwd=ROOT_DIR, timeout=120)
+
+    respuestas = [json.loads(l) for l in proceso.stdout.splitlines()]
+    assert [len(r['resultados']) for r in respuestas] == [3, 3, 3]
+
+    tabla = pd.read_csv(archivo, parse_dates=['fecha'])
+    esperado = esperado.sort_values(['departamento', 'fecha']).reset_index(drop=True)
+    pd.testing.assert_frame_equal(tabla, esperado[tabla.columns], check_dtype=False)
@@ -0,0 +1,42 @@
+"""Pruebas de las features de regiones vecinas"""
+
+import numpy as np
+import pandas as pd
+
+from src.features.spatial_features import cargar_adyacencia, SpatialFeatureEngineer
+
+SERIES = pd.Index(['PIURA', 'TUMBES', 'LAMBAYEQUE'])
+
+
+def test_pares_repetidos_no_suman_pesos(tmp_path):
+    ruta = tmp_path / 'adyacencia.csv'
+    pd.DataFrame({'region_origen': ['PIURA', 'piura ', 'TUMBES', 'PIURA'],
+                  'region_destino': ['TUMBES', 'TUMBES', 'PIURA', 'LAMBAYEQUE'],
+                  'peso': [0.5, 0.5, 0.7, 2.0]}).to_csv(ruta, index=False)
+
+    adyacencia = cargar_adyacencia(ruta, SERIES).toarray()
+
+    # Cada sentido listado conserva su peso; el simétrico solo completa los que faltan
+    assert adyacencia[0, 1] == 0.5
+    assert adyacencia[1, 0] == 0.7
+    assert adyacencia[0, 2] == adyacencia[2, 0] == 2.0
+
+
+def test_nombre_de_ventanas_segun_normalizacion(tmp_path):
+    ruta = tmp_path / 'adyacencia.csv'
+    pd.DataFrame({'region_origen': ['PIURA', 'PIURA'],
+                  'region_destino': ['TUMBES', 'LAMBAYEQUE']}).to_csv(ruta, index=False)
+    fechas = pd.date_range('2024-01-01', periods=6, freq='7D')
+    df = pd.DataFrame({'departamento': np.repeat(SERIES, 6), 'fecha': np.tile(fechas, 3),
+                       'casos': np.repeat([1.0, 10.0, 30.0], 6)})
+
+    media = SpatialFeatureEngineer.desde_archivo(ruta, SERIES).crear_features_espaciales(df, windows=[4])
+    suma = SpatialFeatureEngineer.desde_archivo(ruta, SERIES, normalizar=False).crear_features_espaciales(
+        df, windows=[4])
+
+    assert 'casos_vecinos_suma_4' not in media.columns
+    assert 'casos_vecinos_media_4' not in suma.columns
+    piura = df['departamento'] == 'PIURA'
+    assert (media.loc[piura, 'casos_vecinos_lag_1'].dropna() == 20.0).all()
+    assert (suma.loc[piura, 'casos_vecinos_lag_1'].dropna() == 40.0).all()
+    assert media.loc[piura, 'casos_vecinos_media_4'].iloc[-1] == 80.0